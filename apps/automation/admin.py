@@ -1,3 +1,49 @@
 from django.contrib import admin
 
-# Register automation models here when needed
+from .models import LicenseBackfill, OCRCallRecord, OCRJob
+
+
+@admin.register(OCRJob)
+class OCRJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'tenant', 'document_type', 'status', 'customer', 'processing_time_ms', 'created_at']
+    list_filter = ['document_type', 'status', 'model_tier']
+    search_fields = ['tenant__name', 'customer__first_name', 'customer__last_name']
+    readonly_fields = [
+        'tenant', 'customer', 'created_by', 'document_type', 'status', 'image',
+        'image_media_type', 'result', 'confidence', 'error_message', 'model_used', 'model_tier',
+        'processing_time_ms', 'created_at', 'started_at', 'completed_at',
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(OCRCallRecord)
+class OCRCallRecordAdmin(admin.ModelAdmin):
+    list_display = ['id', 'tenant', 'parser', 'model', 'outcome', 'latency_ms', 'tokens_in', 'tokens_out',
+                    'cost_usd', 'created_at']
+    list_filter = ['outcome', 'parser', 'model']
+    search_fields = ['tenant__name', 'error']
+    date_hierarchy = 'created_at'
+    readonly_fields = [
+        'tenant', 'parser', 'model', 'outcome', 'input_bytes', 'tokens_in', 'tokens_cached', 'tokens_out', 'cost_usd',
+        'latency_ms', 'attempts', 'cache_hit', 'error', 'created_at',
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(LicenseBackfill)
+class LicenseBackfillAdmin(admin.ModelAdmin):
+    list_display = ['id', 'tenant', 'status', 'processed', 'applied', 'failed', 'resume_at', 'updated_at']
+    list_filter = ['status']
+    search_fields = ['tenant__name']
+    readonly_fields = [
+        'tenant', 'created_by', 'status', 'batch_size', 'concurrency', 'limit', 'last_customer_id',
+        'processed', 'applied', 'failed', 'failed_customer_ids', 'resume_at', 'error_message',
+        'lease_token', 'lease_expires_at', 'created_at', 'updated_at', 'completed_at',
+    ]
+
+    def has_add_permission(self, request):
+        return False
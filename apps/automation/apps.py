@@ -5,3 +5,16 @@ class AutomationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.automation'
     verbose_name = 'Automation'
+
+    def ready(self):
+        from django.conf import settings
+        from .integration import clients  # noqa: F401
+        from .ocr.transport import TransportConfig, configure_transport
+
+        configure_transport(TransportConfig(
+            max_connections=settings.OCR_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OCR_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.OCR_HTTP_KEEPALIVE_EXPIRY,
+            connect_timeout=settings.OCR_HTTP_CONNECT_TIMEOUT,
+            http2=settings.OCR_HTTP2,
+        ))
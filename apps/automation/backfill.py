@@ -0,0 +1,345 @@
+"""
+Resumable license OCR backfill.
+
+A tenant that upgrades to a plan with license OCR may already have
+thousands of customers with a stored ``license_image_front`` that was never
+parsed. A ``LicenseBackfill`` walks them in primary key order,
+``batch_size`` customers at a time:
+
+- the barcode on the back of the license is read first, as for OCR jobs;
+- every customer that still needs the model takes a token from the
+  tenant's OCR rate limit, and the batch stops early when one is refused;
+- the admitted images are parsed concurrently with ``parse_async``, at
+  most ``concurrency`` at once;
+- results fill only the customer's empty fields, as ``ApplyLicenseDataView``
+  does, and set ``license_ocr_parsed_at``.
+
+The position and counters are saved after every batch. Customers are
+selected by ``license_ocr_parsed_at`` as well, so a run that crashed mid
+batch neither skips nor re-bills anyone when it is resumed. A refused
+token pauses the run until the bucket refills, or until tomorrow when the
+daily cap is spent. The ``backfill_license_ocr`` command runs a backfill
+in the foreground or queues the ``process_license_backfill`` Celery task,
+which works for ``OCR_BACKFILL_TASK_SECONDS`` at a time and queues itself
+again until the backfill is done.
+
+A runner holds a lease on the backfill (``OCR_BACKFILL_LEASE_SECONDS``,
+renewed every batch), so a foreground run and a queued task for the same
+backfill never read the same batch and bill it twice. A runner that finds
+the lease held does nothing; one that crashed is taken over once its lease
+expires.
+"""
+import asyncio
+import logging
+import math
+import mimetypes
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.automation.ocr.ratelimit import RateLimitDecision
+from .integration.feature_check import check_ocr_access
+from .integration.result_cache import get_result_cache
+from .integration.telemetry import flush_call_records
+from .jobs import (
+    _with_barcode,
+    apply_license_data,
+    get_document_parser,
+    get_tenant_client,
+    read_customer_license_barcode,
+    serialize_license_result,
+)
+from .models import LicenseBackfill
+
+logger = logging.getLogger(__name__)
+
+# Failed customer ids kept on the backfill for a retry
+MAX_FAILED_IDS = 1000
+
+
+class BackfillInProgress(Exception):
+    """Raised when another runner holds the backfill's lease."""
+
+
+@dataclass
+class BatchOutcome:
+    """What one batch of a backfill did.
+
+    Attributes:
+        processed: Customers the backfill moved past
+        applied: Customers updated from their license
+        failed: Customers whose license could not be read
+        refused: The rate limit decision that stopped the batch early
+        done: Whether no customers are left
+    """
+    processed: int = 0
+    applied: int = 0
+    failed: int = 0
+    refused: Optional[RateLimitDecision] = None
+    done: bool = False
+
+
+def pending_customers(backfill):
+    """Customers the backfill has yet to parse, in the order it takes them."""
+    from apps.customers.models import Customer
+
+    return (
+        Customer.objects
+        .filter(tenant_id=backfill.tenant_id, pk__gt=backfill.last_customer_id, license_ocr_parsed_at__isnull=True)
+        .exclude(Q(license_image_front='') | Q(license_image_front__isnull=True))
+        .order_by('pk')
+    )
+
+
+def start_license_backfill(tenant, batch_size=None, concurrency=None, limit=None, user=None, restart=False):
+    """Return the tenant's unfinished backfill, or start a new one.
+
+    Args:
+        tenant: Tenant whose customers are parsed
+        batch_size: Customers per batch; ``OCR_BACKFILL_BATCH_SIZE`` by default
+        concurrency: Model calls in flight; ``OCR_BACKFILL_CONCURRENCY`` by default
+        limit: Stop after this many customers
+        user: User who started the backfill
+        restart: Start a new backfill even if one is unfinished; the old
+            one is marked failed
+
+    Returns:
+        The LicenseBackfill. Arguments given for a resumed backfill update it.
+    """
+    unfinished = (
+        LicenseBackfill.objects.filter(tenant=tenant)
+        .exclude(status__in=['completed', 'failed']).order_by('-created_at').first()
+    )
+    if unfinished is not None and restart:
+        unfinished.mark_failed('Superseded by a new backfill')
+        unfinished = None
+
+    if unfinished is not None:
+        changes = {'batch_size': batch_size, 'concurrency': concurrency, 'limit': limit}
+        for field, value in changes.items():
+            if value is not None:
+                setattr(unfinished, field, value)
+        unfinished.save(update_fields=['batch_size', 'concurrency', 'limit', 'updated_at'])
+        return unfinished
+
+    return LicenseBackfill.objects.create(
+        tenant=tenant,
+        created_by=user if user and user.is_authenticated else None,
+        batch_size=batch_size or settings.OCR_BACKFILL_BATCH_SIZE,
+        concurrency=concurrency or settings.OCR_BACKFILL_CONCURRENCY,
+        limit=limit,
+    )
+
+
+def queue_license_backfill(backfill, eta=None):
+    """Queue the Celery task that runs a backfill."""
+    from .tasks import process_license_backfill
+
+    process_license_backfill.apply_async((backfill.pk,), eta=eta)
+
+
+def _read_front(customer):
+    source = customer.license_image_front
+    with source.open('rb') as image:
+        data = image.read()
+    return data, mimetypes.guess_type(source.name)[0] or 'image/jpeg'
+
+
+async def _parse(semaphore, parser, data, media_type):
+    async with semaphore:
+        try:
+            return await parser.parse_async(data, image_media_type=media_type)
+        except Exception as e:
+            return e
+
+
+async def _parse_all(concurrency, calls):
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    return await asyncio.gather(*[_parse(semaphore, *call) for call in calls])
+
+
+def _remaining(backfill):
+    if backfill.limit is None:
+        return backfill.batch_size
+    return min(backfill.batch_size, max(backfill.limit - backfill.processed, 0))
+
+
+def run_backfill_batch(backfill):
+    """Parse the next batch of a backfill's customers and save its position.
+
+    Returns:
+        BatchOutcome
+    """
+    from .serializers import LicenseDataSerializer
+
+    size = _remaining(backfill)
+    customers = list(pending_customers(backfill)[:size]) if size else []
+    if not customers:
+        return BatchOutcome(done=True)
+
+    tenant = backfill.tenant
+    tenant_settings = tenant.settings
+    client = get_tenant_client(tenant)
+    cache = get_result_cache(tenant)
+
+    outcome = BatchOutcome()
+    taken = []          # customers the batch got to, in order
+    results = {}        # customer pk -> (barcode, result or exception)
+    calls, called = [], []
+    for customer in customers:
+        label = f'customer {customer.pk}'
+        barcode, complete = read_customer_license_barcode(customer, label)
+        if complete:
+            taken.append(customer)
+            results[customer.pk] = (None, barcode)
+            continue
+        decision = tenant_settings.check_ocr_rate_limit()
+        if not decision.allowed:
+            outcome.refused = decision
+            break
+        taken.append(customer)
+        try:
+            data, media_type = _read_front(customer)
+            parser, _ = get_document_parser('license', client, cache=cache)
+        except Exception as e:
+            results[customer.pk] = (barcode, e)
+            continue
+        calls.append((parser, data, media_type))
+        called.append((customer, barcode, parser))
+
+    parsed = asyncio.run(_parse_all(backfill.concurrency, calls)) if calls else []
+    # Calls recorded inside the event loop wait for synchronous code to store them
+    flush_call_records()
+
+    billable = 0
+    for (customer, barcode, parser), result in zip(called, parsed):
+        results[customer.pk] = (barcode, result)
+        if not isinstance(result, Exception) and not parser.last_cache_hit:
+            billable += 1
+
+    for customer in taken:
+        barcode, result = results[customer.pk]
+        if not isinstance(result, Exception):
+            serializer = LicenseDataSerializer(data=serialize_license_result(_with_barcode(barcode, result)))
+            if serializer.is_valid():
+                apply_license_data(customer, serializer.validated_data)
+                customer.save()
+                outcome.applied += 1
+                continue
+            result = ValueError(f'Invalid license data: {serializer.errors}')
+        logger.warning('License backfill %s: customer %s failed: %s', backfill.pk, customer.pk, result)
+        outcome.failed += 1
+        if len(backfill.failed_customer_ids) < MAX_FAILED_IDS:
+            backfill.failed_customer_ids.append(customer.pk)
+
+    if billable:
+        tenant_settings.increment_ocr_requests(billable)
+
+    outcome.processed = len(taken)
+    if taken:
+        backfill.last_customer_id = taken[-1].pk
+    backfill.processed += outcome.processed
+    backfill.applied += outcome.applied
+    backfill.failed += outcome.failed
+    backfill.save(update_fields=[
+        'last_customer_id', 'processed', 'applied', 'failed', 'failed_customer_ids', 'updated_at',
+    ])
+    return outcome
+
+
+def _resume_time(decision):
+    """When a backfill refused by the rate limiter should carry on."""
+    now = timezone.now()
+    if decision.reason == 'daily_cap':
+        return timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    return now + timedelta(seconds=math.ceil(decision.retry_after or 1))
+
+
+def run_license_backfill(backfill_id, max_seconds=None, sleep=None, on_batch=None):
+    """Run a backfill's batches until it is done, out of time or refused.
+
+    Args:
+        backfill_id: LicenseBackfill to run
+        max_seconds: Pause the backfill after this long; run until done
+            when omitted
+        sleep: Called with the seconds to wait when the rate limit refuses
+            a token, e.g. ``time.sleep``; without it the backfill is paused
+            instead. A spent daily cap always pauses it.
+        on_batch: Called with the backfill and the BatchOutcome after
+            every batch
+
+    Returns:
+        The LicenseBackfill, or None if it no longer exists
+
+    Raises:
+        BackfillInProgress: If another runner is working on the backfill
+    """
+    backfill = LicenseBackfill.objects.select_related('tenant__settings').filter(pk=backfill_id).first()
+    if backfill is None or backfill.is_finished:
+        return backfill
+    lease = settings.OCR_BACKFILL_LEASE_SECONDS
+    if not backfill.take_lease(lease):
+        raise BackfillInProgress(f'License backfill #{backfill.pk} is being run by another worker')
+    try:
+        return _run_batches(backfill, lease, max_seconds, sleep, on_batch)
+    finally:
+        backfill.release_lease()
+
+
+def _run_batches(backfill, lease, max_seconds, sleep, on_batch):
+    if not check_ocr_access(backfill.tenant):
+        backfill.mark_failed('License OCR is not available or not configured for this tenant')
+        return backfill
+
+    backfill.mark_running()
+    deadline = time.monotonic() + max_seconds if max_seconds else None
+    while True:
+        if not backfill.renew_lease(lease):
+            logger.warning('License backfill %s was taken over by another worker; stopping', backfill.pk)
+            return backfill
+        try:
+            outcome = run_backfill_batch(backfill)
+        except Exception as e:
+            logger.exception('License backfill %s failed', backfill.pk)
+            backfill.mark_failed(str(e))
+            return backfill
+        if on_batch is not None:
+            on_batch(backfill, outcome)
+
+        if outcome.done:
+            backfill.mark_completed()
+            return backfill
+        if outcome.refused is not None:
+            resume_at = _resume_time(outcome.refused)
+            if sleep is None or outcome.refused.reason == 'daily_cap':
+                backfill.mark_paused(resume_at)
+                return backfill
+            sleep((resume_at - timezone.now()).total_seconds())
+        if deadline is not None and time.monotonic() >= deadline:
+            backfill.mark_paused(timezone.now())
+            return backfill
+
+
+def continue_license_backfill(backfill_id):
+    """Run a backfill for ``OCR_BACKFILL_TASK_SECONDS`` and queue the rest.
+
+    Used by the ``process_license_backfill`` task; a paused backfill is
+    queued again for when it may resume. Nothing is done while another
+    runner holds the backfill, which queues its own continuation.
+
+    Returns:
+        The LicenseBackfill, or None if it no longer exists
+    """
+    try:
+        backfill = run_license_backfill(backfill_id, max_seconds=settings.OCR_BACKFILL_TASK_SECONDS)
+    except BackfillInProgress as e:
+        logger.info('%s; not running it again', e)
+        return LicenseBackfill.objects.filter(pk=backfill_id).first()
+    if backfill is not None and backfill.status == 'paused':
+        queue_license_backfill(backfill, eta=backfill.resume_at)
+    return backfill
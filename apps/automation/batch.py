@@ -0,0 +1,197 @@
+"""
+Concurrent analysis of every photo in a condition report.
+
+A check-in report carries one photo per location, 8-11 in all. Sending them
+one after another makes the report take the sum of every model call; here
+they are sent together with ``parse_async`` under ``asyncio.gather``, so the
+report takes roughly as long as its slowest photo.
+
+Concurrency is capped per tenant by ``OCR_BATCH_CONCURRENCY`` so large or
+simultaneous reports cannot exhaust the tenant's OpenRouter rate limit or
+the shared connection pool. Each call holds one of the tenant's slots from
+``integration.rate_limit.tenant_slot``; with ``OCR_RATE_LIMIT_URL`` set the
+slots are shared by every worker process, otherwise only within this one.
+The InspectionAnalysis rows are created in one query when the batch is
+queued and written back in one query when it finishes.
+
+With ``OCR_DAMAGE_PACK_SIZE`` above 1, damage photos are additionally
+packed that many to a request (``DamageParser.parse_many_async``), cutting
+the number of model calls per report; ``benchmark_damage_packing`` compares
+the two modes.
+"""
+import asyncio
+import logging
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from .dedup import copy_analysis, reusable_analyses
+from .integration.rate_limit import tenant_slot
+from .integration.result_cache import get_result_cache
+from .integration.telemetry import flush_call_records
+from .jobs import (
+    _queue,
+    apply_dashboard_readings,
+    default_analysis_type,
+    get_damage_parser,
+    get_inspection_parser,
+    get_tenant_client,
+    read_photo,
+)
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_RESULT_FIELDS = [
+    'status', 'result', 'confidence', 'error_message', 'model_used',
+    'processing_time_ms', 'completed_at',
+]
+
+
+def enqueue_report_analysis(report):
+    """Create pending analyses for every photo of a report and queue the batch.
+
+    Photos that already have a pending, processing or completed analysis
+    are skipped, so queuing twice does not pay twice. Near-duplicates of
+    photos analysed before get a completed copy of that analysis instead
+    (see ``dedup``).
+
+    Returns:
+        The newly created InspectionAnalysis rows, reused ones included
+    """
+    from apps.contracts.models import InspectionAnalysis
+    from .tasks import process_report_analysis
+
+    photos = list(report.photos.exclude(
+        analyses__status__in=['pending', 'processing', 'completed']
+    ))
+    types = [(photo, default_analysis_type(photo)) for photo in photos]
+    reusable = reusable_analyses(types)
+    rows = [
+        copy_analysis(reusable[photo.pk], photo) if photo.pk in reusable
+        else InspectionAnalysis(condition_report=report, photo=photo, analysis_type=analysis_type)
+        for photo, analysis_type in types
+    ]
+    analyses = InspectionAnalysis.objects.bulk_create(rows)
+    apply_dashboard_readings(analyses)
+
+    pending = [analysis for analysis in analyses if analysis.status == 'pending']
+    if pending:
+        ids = [analysis.pk for analysis in pending]
+        _queue(
+            process_report_analysis, ids,
+            lambda error: InspectionAnalysis.objects.filter(pk__in=ids).update(
+                status='failed', error_message=error, completed_at=timezone.now(),
+            ),
+        )
+    return analyses
+
+
+async def _timed(tenant_id, call):
+    """Await ``call()`` in a tenant slot; returns (result or exception, elapsed ms)."""
+    async with tenant_slot(tenant_id):
+        started = time.monotonic()
+        try:
+            result = await call()
+        except Exception as e:
+            result = e
+        return result, int((time.monotonic() - started) * 1000)
+
+
+async def _analyze_all(tenant_id, calls):
+    return await asyncio.gather(*[_timed(tenant_id, call) for call in calls])
+
+
+def run_report_analysis(analysis_ids):
+    """Analyse a batch of InspectionAnalysis rows concurrently.
+
+    Images are read before the event loop starts so the coroutines never
+    touch the database or storage. Rows that are already finished are
+    skipped, so a redelivered task is harmless. Dashboard readings are
+    applied as in ``run_inspection_analysis``.
+
+    Returns:
+        The InspectionAnalysis rows processed
+    """
+    from apps.automation.ocr.parsers import PackedPhoto
+    from apps.contracts.models import InspectionAnalysis
+
+    analyses = list(
+        InspectionAnalysis.objects
+        .filter(pk__in=analysis_ids, status__in=['pending', 'processing'])
+        .select_related('photo', 'condition_report__contract__tenant__settings')
+        .order_by('pk')
+    )
+    if not analyses:
+        return []
+
+    tenant = analyses[0].condition_report.contract.tenant
+    InspectionAnalysis.objects.filter(pk__in=[a.pk for a in analyses]).update(status='processing')
+
+    client = get_tenant_client(tenant)
+    cache = get_result_cache(tenant)
+    pack_size = settings.OCR_DAMAGE_PACK_SIZE
+    singles, packable = [], []
+    for analysis in analyses:
+        analysis.completed_at = timezone.now()
+        try:
+            if analysis.photo is None:
+                raise ValueError('Analysis has no photo to process')
+            parser = get_inspection_parser(analysis, client, cache=cache)
+            image_data, media_type = read_photo(analysis.photo)
+        except Exception as e:
+            analysis.status = 'failed'
+            analysis.error_message = str(e)
+            continue
+        if pack_size > 1 and analysis.analysis_type == 'damage_detection':
+            packable.append((analysis, PackedPhoto(image_data, media_type, analysis.photo.location)))
+        else:
+            singles.append((analysis, parser, image_data, media_type))
+
+    # Each unit is one model call (or one pack) and the analyses it answers
+    units = [
+        ([analysis], parser, lambda p=parser, d=data, m=media_type: p.parse_async(d, image_media_type=m))
+        for analysis, parser, data, media_type in singles
+    ]
+    for start in range(0, len(packable), max(pack_size, 1)):
+        pack = packable[start:start + pack_size]
+        parser = get_damage_parser(client, cache=cache)
+        photos = [photo for _, photo in pack]
+        units.append((
+            [analysis for analysis, _ in pack], parser,
+            lambda p=parser, ph=photos: p.parse_many_async(ph, pack_size=pack_size),
+        ))
+
+    outcomes = asyncio.run(_analyze_all(tenant.pk, [call for _, _, call in units])) if units else []
+    # Calls recorded inside the event loop wait for synchronous code to store them
+    flush_call_records()
+
+    billable = 0
+    now = timezone.now()
+    for (unit_analyses, parser, _), (result, elapsed_ms) in zip(units, outcomes):
+        if isinstance(result, list):
+            billable += parser.last_pack_stats['requests']
+            results = result
+        else:
+            if not isinstance(result, Exception) and not parser.last_cache_hit:
+                billable += 1
+            results = [result] * len(unit_analyses)
+
+        for analysis, photo_result in zip(unit_analyses, results):
+            analysis.processing_time_ms = elapsed_ms
+            analysis.completed_at = now
+            if isinstance(photo_result, Exception):
+                logger.warning('Inspection analysis %s failed: %s', analysis.pk, photo_result)
+                analysis.status = 'failed'
+                analysis.error_message = str(photo_result)
+                continue
+            analysis.status = 'completed'
+            analysis.result = photo_result.model_dump(mode='json')
+            analysis.confidence = photo_result.confidence
+            analysis.model_used = client.model
+
+    InspectionAnalysis.objects.bulk_update(analyses, ANALYSIS_RESULT_FIELDS)
+    apply_dashboard_readings(analyses)
+    if billable:
+        tenant.settings.increment_ocr_requests(billable)
+    return analyses
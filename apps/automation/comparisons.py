@@ -0,0 +1,287 @@
+"""
+Checkout/checkin damage comparison.
+
+When a reservation is checked in, the checkout and checkin condition reports
+of its contract are compared photo by photo: for every location photographed
+in both reports the latest photo of each side is sent to ``ComparisonParser``
+as a before/after pair. Pairs are compared concurrently and the per-location
+answers are aggregated into one ``DamageComparison`` with the new damages,
+the damages that were no longer visible, and the total estimated repair cost.
+
+The comparison runs in a Celery task. ``pairs_completed`` is updated as each
+pair finishes so the status endpoint can report progress.
+"""
+import asyncio
+import logging
+import time
+from decimal import Decimal
+
+from .integration.feature_check import check_inspection_access
+from .integration.rate_limit import tenant_slot
+from .integration.result_cache import get_result_cache
+from .integration.telemetry import flush_call_records
+from .jobs import _queue, get_preprocess_config, get_tenant_client, read_photo
+
+logger = logging.getLogger(__name__)
+
+# Locations photographed the same way at checkout and checkin. Dashboard and
+# damage detail shots are framed differently every time and are not paired.
+COMPARABLE_LOCATIONS = (
+    'front', 'back', 'driver_side', 'passenger_side',
+    'interior_front', 'interior_back', 'trunk',
+)
+
+
+def latest_report(contract, report_type):
+    return contract.condition_reports.filter(report_type=report_type).order_by('-created_at').first()
+
+
+def pair_photos(checkout_report, checkin_report):
+    """Match the photos of two condition reports by location.
+
+    The most recent photo of each location is used on both sides.
+
+    Returns:
+        (pairs, unmatched) where pairs is a list of (location, before, after)
+        in location order and unmatched lists the comparable locations
+        photographed in only one of the reports
+    """
+    def by_location(report):
+        photos = {}
+        for photo in report.photos.filter(location__in=COMPARABLE_LOCATIONS).order_by('created_at', 'pk'):
+            photos[photo.location] = photo
+        return photos
+
+    before, after = by_location(checkout_report), by_location(checkin_report)
+    pairs = [
+        (location, before[location], after[location])
+        for location in COMPARABLE_LOCATIONS
+        if location in before and location in after
+    ]
+    unmatched = [
+        location for location in COMPARABLE_LOCATIONS
+        if (location in before) != (location in after)
+    ]
+    return pairs, unmatched
+
+
+def enqueue_damage_comparison(checkout_report, checkin_report):
+    """Record a pending DamageComparison for two reports and queue it.
+
+    An existing pending, processing or completed comparison of the same
+    reports is returned instead of starting another.
+    """
+    from apps.contracts.models import DamageComparison
+    from .tasks import process_damage_comparison
+
+    existing = DamageComparison.objects.filter(
+        checkout_report=checkout_report,
+        checkin_report=checkin_report,
+        status__in=['pending', 'processing', 'completed'],
+    ).first()
+    if existing:
+        return existing
+
+    comparison = DamageComparison.objects.create(
+        checkout_report=checkout_report, checkin_report=checkin_report,
+    )
+    _queue(process_damage_comparison, comparison.pk, comparison.mark_failed)
+    return comparison
+
+
+def schedule_checkin_comparison(reservation):
+    """Queue the damage comparison for a reservation that was just checked in.
+
+    Nothing is queued unless the tenant's plan includes inspection AI, OCR
+    is configured, and the contract has both a checkout and a checkin report.
+
+    Returns:
+        The DamageComparison, or None
+    """
+    from apps.contracts.models import Contract
+
+    if not check_inspection_access(reservation.tenant):
+        return None
+
+    try:
+        contract = reservation.contract
+    except Contract.DoesNotExist:
+        return None
+
+    checkout_report = latest_report(contract, 'checkout')
+    checkin_report = latest_report(contract, 'checkin')
+    if checkout_report is None or checkin_report is None:
+        return None
+    return enqueue_damage_comparison(checkout_report, checkin_report)
+
+
+async def _compare(tenant_id, parser, before, after):
+    """Run one pair in a tenant slot; returns (result or exception, elapsed ms)."""
+    async with tenant_slot(tenant_id):
+        started = time.monotonic()
+        try:
+            result = await parser.compare_async(
+                before[0], after[0], before_media_type=before[1], after_media_type=after[1],
+            )
+        except Exception as e:
+            result = e
+        return result, int((time.monotonic() - started) * 1000)
+
+
+def _run_pairs(comparison, tenant_id, jobs):
+    """Compare all pairs concurrently, saving progress as each one finishes.
+
+    The loop is driven one completion at a time so progress is written from
+    synchronous code, where the ORM may be used.
+
+    Returns:
+        List of (result or exception, elapsed ms), in ``jobs`` order
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        tasks = {
+            loop.create_task(_compare(tenant_id, parser, before, after)): index
+            for index, (_, parser, before, after) in enumerate(jobs)
+        }
+        outcomes = [None] * len(jobs)
+        pending = set(tasks)
+        while pending:
+            done, pending = loop.run_until_complete(
+                asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            )
+            for task in done:
+                outcomes[tasks[task]] = task.result()
+            comparison.pairs_completed += len(done)
+            comparison.save(update_fields=['pairs_completed'])
+        return outcomes
+    finally:
+        loop.close()
+        # Calls recorded inside the loop wait for synchronous code to store them
+        flush_call_records()
+
+
+def _pair_cost(result):
+    if result.estimated_total_repair_cost is not None:
+        return Decimal(str(result.estimated_total_repair_cost))
+    costs = [d.estimated_repair_cost for d in result.new_damages if d.estimated_repair_cost is not None]
+    return sum((Decimal(str(cost)) for cost in costs), Decimal('0')) if costs else None
+
+
+def _summarize(new_damages, pair_results, unmatched):
+    locations = {damage['photo_location'] for damage in new_damages}
+    if new_damages:
+        lines = [f'{len(new_damages)} new damage(s) found at {len(locations)} location(s).']
+    else:
+        lines = ['No new damage found.']
+    for pair in pair_results:
+        if pair['status'] == 'failed':
+            lines.append(f'{pair["location"]}: comparison failed ({pair["error"]}).')
+        elif pair['summary']:
+            lines.append(f'{pair["location"]}: {pair["summary"]}')
+    if unmatched:
+        lines.append(f'Not compared, photographed only once: {", ".join(unmatched)}.')
+    return '\n'.join(lines)
+
+
+def run_damage_comparison(comparison_id):
+    """Compare the checkout and checkin photos of a DamageComparison.
+
+    Finished comparisons are left untouched, so a redelivered task is
+    harmless. Pairs that fail are recorded in ``pair_results``; the
+    comparison only fails when no pair could be compared. The daily OCR
+    counter is charged for each pair that reached the model.
+
+    Returns:
+        The DamageComparison, or None if it no longer exists
+    """
+    from apps.automation.ocr.parsers import ComparisonParser, DamageParser
+    from apps.contracts.models import DamageComparison
+
+    comparison = (
+        DamageComparison.objects
+        .select_related('checkout_report', 'checkin_report__contract__tenant__settings')
+        .filter(pk=comparison_id).first()
+    )
+    if comparison is None or comparison.is_finished:
+        return comparison
+
+    tenant = comparison.checkin_report.contract.tenant
+    pairs, unmatched = pair_photos(comparison.checkout_report, comparison.checkin_report)
+    comparison.mark_processing(len(pairs), unmatched)
+    if not pairs:
+        comparison.mark_failed('The checkout and checkin reports have no photo locations in common')
+        return comparison
+
+    try:
+        client = get_tenant_client(tenant)
+        cache = get_result_cache(tenant)
+        preprocess = get_preprocess_config('damage', DamageParser)
+        jobs = [
+            (
+                (location, before, after),
+                ComparisonParser(client, location=location, cache=cache, preprocess=preprocess),
+                read_photo(before),
+                read_photo(after),
+            )
+            for location, before, after in pairs
+        ]
+    except Exception as e:
+        logger.warning('Damage comparison %s failed: %s', comparison.pk, e)
+        comparison.mark_failed(str(e))
+        return comparison
+
+    outcomes = _run_pairs(comparison, tenant.pk, jobs)
+
+    new_damages, resolved_damages, pair_results = [], [], []
+    total_cost, billable = None, 0
+    for ((location, before, after), parser, _, _), (result, elapsed_ms) in zip(jobs, outcomes):
+        pair = {
+            'location': location,
+            'before_photo_id': before.pk,
+            'after_photo_id': after.pk,
+            'processing_time_ms': elapsed_ms,
+        }
+        if isinstance(result, Exception):
+            logger.warning('Comparing %s photos for comparison %s failed: %s', location, comparison.pk, result)
+            pair.update(status='failed', error=str(result))
+            pair_results.append(pair)
+            continue
+
+        if not parser.last_cache_hit:
+            billable += 1
+        pair.update(
+            status='completed',
+            new_damage_count=len(result.new_damages),
+            resolved_count=result.resolved_count,
+            pre_existing_count=result.pre_existing_count,
+            comparison_quality=result.comparison_quality,
+            confidence=result.confidence,
+            summary=result.summary,
+        )
+        pair_results.append(pair)
+        for damage in result.new_damages:
+            new_damages.append({**damage.model_dump(mode='json'), 'photo_location': location})
+        if result.resolved_count:
+            resolved_damages.append({'photo_location': location, 'count': result.resolved_count})
+        cost = _pair_cost(result)
+        if cost is not None:
+            total_cost = (total_cost or Decimal('0')) + cost
+
+    if billable:
+        tenant.settings.increment_ocr_requests(billable)
+
+    comparison.pair_results = pair_results
+    comparison.model_used = client.model
+    if all(pair['status'] == 'failed' for pair in pair_results):
+        comparison.save(update_fields=['pair_results', 'model_used'])
+        comparison.mark_failed('; '.join(f'{p["location"]}: {p["error"]}' for p in pair_results))
+        return comparison
+
+    comparison.mark_completed(
+        new_damages,
+        _summarize(new_damages, pair_results, unmatched),
+        total_count=len(new_damages),
+        estimated_cost=total_cost.quantize(Decimal('0.01')) if total_cost is not None else None,
+        resolved_damages=resolved_damages,
+    )
+    return comparison
@@ -0,0 +1,189 @@
+"""
+Near-duplicate detection for uploaded photos and documents.
+
+Vehicle photos, condition report photos and OCR job images get perceptual
+hashes (``apps.automation.ocr.imagehash``) when they are uploaded. A new
+photo is compared with the earlier photos of the same vehicle, or of the
+same location on the same condition report, and an OCR job with the
+customer's earlier jobs for the same document type. Exact hash matches are
+found through the ``phash`` indexes; the few rows left in scope are then
+compared bit by bit.
+
+What happens to a near-duplicate photo depends on ``PHOTO_DUPLICATE_POLICY``:
+'keep' (the default) stores it and sets ``duplicate_of``, 'link' sets
+``duplicate_of`` and points the photo at the original's file, so no second
+copy is stored, and 'reject' raises ``DuplicatePhotoError``. Condition
+report photos are damage evidence and always keep their own file. With
+``PHOTO_DUPLICATE_REUSE_RESULTS`` on, the duplicate's inspection analysis
+or OCR result is copied from the original's instead of being paid for
+again.
+"""
+import logging
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.automation.ocr.imagehash import ImageHashes, compute_image_hashes
+
+logger = logging.getLogger(__name__)
+
+# Photos whose uploaded file is evidence: 'link' falls back to 'keep'
+NEVER_LINKED = {'contracts.ConditionReportPhoto'}
+
+
+class DuplicatePhotoError(Exception):
+    """Raised for a near-duplicate upload under the 'reject' policy."""
+
+    def __init__(self, original):
+        super().__init__(f'This photo is a near-duplicate of photo {original.pk}')
+        self.original = original
+
+
+def hash_upload(upload):
+    """Perceptual hashes of an uploaded file, or None if it is not an image.
+
+    The file is rewound, so it can still be saved afterwards.
+    """
+    upload.seek(0)
+    data = upload.read()
+    upload.seek(0)
+    return compute_image_hashes(data)
+
+
+def find_duplicate(queryset, hashes, prefix=''):
+    """The oldest row of ``queryset`` whose image is a near-duplicate.
+
+    Args:
+        queryset: Rows in scope, e.g. the photos of one vehicle
+        hashes: ImageHashes of the new image, or None
+        prefix: Prefix of the rows' ``ahash``/``phash`` fields
+
+    Returns:
+        The matching row, or None
+    """
+    if hashes is None:
+        return None
+    ahash, phash = f'{prefix}ahash', f'{prefix}phash'
+    exact = queryset.filter(**{ahash: hashes.average, phash: hashes.perceptual}).order_by('pk').first()
+    if exact is not None:
+        return exact
+
+    max_distance = settings.PHOTO_DUPLICATE_MAX_DISTANCE
+    candidates = queryset.exclude(**{phash: ''}).order_by('pk').values_list('pk', ahash, phash)
+    for pk, average, perceptual in candidates:
+        if hashes.matches(ImageHashes(average=average, perceptual=perceptual), max_distance):
+            return queryset.get(pk=pk)
+    return None
+
+
+def create_photo(model, image, scope, **fields):
+    """Create a photo, handling a near-duplicate per ``PHOTO_DUPLICATE_POLICY``.
+
+    Args:
+        model: VehiclePhoto or ConditionReportPhoto
+        image: Uploaded image file
+        scope: Fields limiting the duplicate check, e.g. ``{'vehicle': vehicle}``;
+            also set on the photo
+        **fields: Other fields of the photo
+
+    Returns:
+        The saved photo; ``duplicate_of`` is set for a near-duplicate
+
+    Raises:
+        DuplicatePhotoError: For a near-duplicate under the 'reject' policy
+    """
+    hashes = hash_upload(image)
+    photo = model(**scope, **fields)
+    if hashes is not None:
+        photo.ahash, photo.phash = hashes.average, hashes.perceptual
+
+    original = find_duplicate(model.objects.filter(**scope), hashes)
+    photo.image = image
+    if original is not None:
+        policy = settings.PHOTO_DUPLICATE_POLICY
+        if policy == 'reject':
+            raise DuplicatePhotoError(original)
+        photo.duplicate_of_id = original.duplicate_of_id or original.pk
+        if policy == 'link' and model._meta.label not in NEVER_LINKED:
+            photo.image = original.image.name
+        logger.info('%s upload is a near-duplicate of photo %s', model.__name__, photo.duplicate_of_id)
+    photo.save()
+    return photo
+
+
+def reusable_analyses(photos):
+    """Completed analyses that near-duplicates of the photos can reuse.
+
+    A photo's near-duplicates are its original and the original's other
+    duplicates. One query covers all the photos.
+
+    Args:
+        photos: (ConditionReportPhoto, analysis type) pairs
+
+    Returns:
+        Dict of photo id to the most recent completed InspectionAnalysis of
+        the same type of one of its near-duplicates
+    """
+    from apps.contracts.models import InspectionAnalysis
+
+    if not settings.PHOTO_DUPLICATE_REUSE_RESULTS or not photos:
+        return {}
+    roots = {photo.duplicate_of_id or photo.pk for photo, _ in photos}
+    analyses = (
+        InspectionAnalysis.objects
+        .filter(Q(photo_id__in=roots) | Q(photo__duplicate_of_id__in=roots), status='completed')
+        .select_related('photo')
+        .order_by('-completed_at')
+    )
+    reusable = {}
+    for photo, analysis_type in photos:
+        root = photo.duplicate_of_id or photo.pk
+        for analysis in analyses:
+            if (analysis.analysis_type == analysis_type and analysis.photo_id != photo.pk
+                    and root in (analysis.photo_id, analysis.photo.duplicate_of_id)):
+                reusable[photo.pk] = analysis
+                break
+    return reusable
+
+
+def reusable_analysis(photo, analysis_type):
+    """A completed analysis of a near-duplicate of the photo, or None."""
+    return reusable_analyses([(photo, analysis_type)]).get(photo.pk)
+
+
+def copy_analysis(source, photo):
+    """A completed, unsaved InspectionAnalysis of ``photo`` with ``source``'s result."""
+    from apps.contracts.models import InspectionAnalysis
+
+    return InspectionAnalysis(
+        condition_report_id=photo.condition_report_id,
+        photo=photo,
+        analysis_type=source.analysis_type,
+        status='completed',
+        result=source.result,
+        confidence=source.confidence,
+        model_used=source.model_used,
+        processing_time_ms=0,
+        completed_at=timezone.now(),
+    )
+
+
+def set_job_hashes(job, hashes):
+    if hashes is not None:
+        job.image_ahash, job.image_phash = hashes.average, hashes.perceptual
+
+
+def reusable_ocr_job(job):
+    """The customer's earlier completed job on a near-duplicate document, or None."""
+    from .models import OCRJob
+
+    if not settings.PHOTO_DUPLICATE_REUSE_RESULTS or job.customer_id is None or not job.image_phash:
+        return None
+    earlier = (
+        OCRJob.objects
+        .filter(customer_id=job.customer_id, document_type=job.document_type, status='completed')
+        .exclude(pk=job.pk)
+    )
+    hashes = ImageHashes(average=job.image_ahash, perceptual=job.image_phash)
+    return find_duplicate(earlier, hashes, prefix='image_')
@@ -0,0 +1,164 @@
+"""
+Cached per-tenant OpenRouter clients.
+
+Building a tenant's client decrypts its stored API key and assembles the
+retry, breaker and metrics settings. ``ClientFactory`` keeps one configured
+client per (tenant, key fingerprint, model, API URL), so the decryption
+happens once per key rotation instead of on every request. The fingerprint
+is a hash of the encrypted key, so a lookup never decrypts anything.
+
+Entries expire after ``OCR_CLIENT_CACHE_TTL`` seconds and the least recently
+used are dropped beyond ``OCR_CLIENT_CACHE_SIZE``. Saving TenantSettings
+drops the tenant's clients, and changing OCR or OpenRouter settings (e.g.
+``override_settings`` in tests or the load test) drops them all. Every
+client sends through the process-wide pooled transport, so caching them
+costs no connections.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+_factory = None
+_factory_lock = threading.Lock()
+
+
+def key_fingerprint(encrypted_key):
+    """Short hash identifying a stored (encrypted) API key."""
+    if not encrypted_key:
+        return ''
+    return hashlib.sha256(bytes(encrypted_key)).hexdigest()[:16]
+
+
+class ClientFactory:
+    """Bounded, expiring cache of configured OpenRouterClients.
+
+    Thread safe; a client is built outside the lock, so two threads missing
+    at once may both build one and the later wins.
+    """
+
+    def __init__(self, max_size=256, ttl=300, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _key(self, tenant_settings):
+        return (
+            tenant_settings.tenant_id,
+            key_fingerprint(tenant_settings.openrouter_api_key_encrypted),
+            tenant_settings.openrouter_model,
+            settings.OPENROUTER_BASE_URL,
+        )
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                client, expires_at = entry
+                if expires_at > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return client
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def _store(self, key, client):
+        with self._lock:
+            # A rotated key or changed model leaves the tenant's old entry behind
+            for stale in [k for k in self._entries if k[0] == key[0] and k != key]:
+                del self._entries[stale]
+            self._entries[key] = (client, self.clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get(self, tenant_settings):
+        """The tenant's client, building and caching it on a miss."""
+        if self.ttl <= 0 or self.max_size <= 0:
+            return build_client(tenant_settings)
+        key = self._key(tenant_settings)
+        client = self._lookup(key)
+        if client is None:
+            client = build_client(tenant_settings)
+            self._store(key, client)
+        return client
+
+    def invalidate(self, tenant_id):
+        """Drop every cached client of a tenant."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == tenant_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def build_client(tenant_settings, **kwargs):
+    """Build an uncached OpenRouterClient from a tenant's OCR settings.
+
+    Requests go to ``OPENROUTER_BASE_URL``. The client retries transient
+    failures, shares the per-model circuit breaker with every other worker,
+    marks system prompts cacheable unless ``OCR_PROMPT_CACHE`` is off and
+    records its calls for the usage dashboards. ``kwargs`` override the
+    client's arguments, e.g. ``timeout``.
+    """
+    from apps.automation.ocr.client import OpenRouterClient, chat_completions_url
+
+    from .resilience import client_resilience_kwargs
+    from .telemetry import get_call_recorder
+
+    return OpenRouterClient(**{
+        'api_key': tenant_settings.get_api_key(),
+        'model': tenant_settings.openrouter_model,
+        'api_url': chat_completions_url(settings.OPENROUTER_BASE_URL),
+        'recorder': get_call_recorder(tenant_settings.tenant_id),
+        'prompt_cache': settings.OCR_PROMPT_CACHE,
+        **client_resilience_kwargs(),
+        **kwargs,
+    })
+
+
+def get_client_factory():
+    """The process-wide client factory."""
+    global _factory
+    if _factory is None:
+        with _factory_lock:
+            if _factory is None:
+                _factory = ClientFactory(
+                    max_size=settings.OCR_CLIENT_CACHE_SIZE,
+                    ttl=settings.OCR_CLIENT_CACHE_TTL,
+                )
+    return _factory
+
+
+def reset_client_factory():
+    """Drop the factory and its clients, e.g. after changing settings in tests."""
+    global _factory
+    _factory = None
+
+
+@receiver(setting_changed, dispatch_uid='ocr_clients_setting_changed')
+def ocr_setting_changed(sender, setting, **kwargs):
+    if setting.startswith(('OCR_', 'OPENROUTER_', 'FIELD_ENCRYPTION_KEY')):
+        reset_client_factory()
+
+
+@receiver(post_save, sender='tenants.TenantSettings', dispatch_uid='ocr_clients_tenant_settings_saved')
+@receiver(post_delete, sender='tenants.TenantSettings', dispatch_uid='ocr_clients_tenant_settings_deleted')
+def tenant_settings_changed(sender, instance, **kwargs):
+    if _factory is not None:
+        _factory.invalidate(instance.tenant_id)
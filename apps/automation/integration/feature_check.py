@@ -21,3 +21,17 @@ def check_ocr_access(tenant):
         return tenant.settings.has_api_key
 
     return False
+
+
+def check_inspection_access(tenant):
+    """Check if tenant can have inspection photos analysed in the background.
+
+    Requires:
+    1. Plan includes the inspection_ai feature
+    2. Tenant has settings with openrouter_enabled=True and an API key
+    """
+    if not tenant_has_feature(tenant, 'inspection_ai'):
+        return False
+
+    tenant_settings = getattr(tenant, 'settings', None)
+    return bool(tenant_settings and tenant_settings.openrouter_enabled and tenant_settings.has_api_key)
@@ -0,0 +1,211 @@
+"""
+Per-tenant OCR rate limits backed by Redis.
+
+Limits come from ``OCR_RATE_LIMITS`` keyed by plan. With
+``OCR_RATE_LIMIT_URL`` set (it defaults to ``OCR_RESULT_CACHE_URL``) the
+buckets and billed-usage counters live in Redis and are shared by every
+process; without it a process-local ``LocalTokenBucket`` is used, which is
+enough for development and tests.
+
+Billed usage is counted in the limiter rather than on the TenantSettings
+row. ``flush_usage`` copies the counters to ``ocr_requests_today`` and is
+run periodically by the ``flush_ocr_usage`` Celery task. When a counter is
+missing, e.g. after Redis was restarted, it is seeded from the row so the
+daily cap still holds.
+
+``tenant_slot`` caps a tenant's model calls in flight at
+``OCR_BATCH_CONCURRENCY``. The slots live next to the buckets, so with
+Redis the cap holds across every report, comparison and worker process of
+the tenant rather than within one event loop.
+"""
+import asyncio
+import logging
+import uuid
+from contextlib import asynccontextmanager
+from datetime import date
+
+from django.conf import settings
+from django.db.models import F, Q
+
+from apps.automation.ocr.ratelimit import (
+    LocalSlots,
+    LocalTokenBucket,
+    RateLimit,
+    RateLimitDecision,
+    RedisSlots,
+    RedisTokenBucket,
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds between attempts to take a slot while the tenant's are all held
+SLOT_POLL_INTERVAL = 0.05
+
+_limiter = None
+_slots = None
+
+
+def get_rate_limiter():
+    """The process-wide limiter backend."""
+    global _limiter
+    if _limiter is None:
+        if settings.OCR_RATE_LIMIT_URL:
+            import redis
+
+            client = redis.Redis.from_url(settings.OCR_RATE_LIMIT_URL, decode_responses=True)
+            _limiter = RedisTokenBucket(client)
+        else:
+            _limiter = LocalTokenBucket()
+    return _limiter
+
+
+def get_slots():
+    """The process-wide concurrency slot backend."""
+    global _slots
+    if _slots is None:
+        if settings.OCR_RATE_LIMIT_URL:
+            import redis
+
+            client = redis.Redis.from_url(settings.OCR_RATE_LIMIT_URL, decode_responses=True)
+            _slots = RedisSlots(client)
+        else:
+            _slots = LocalSlots()
+    return _slots
+
+
+def reset_rate_limiter():
+    """Drop the limiter backends, e.g. after changing settings in tests."""
+    global _limiter, _slots
+    _limiter = None
+    _slots = None
+
+
+def get_plan_limit(plan):
+    """RateLimit for a plan, falling back to the ``default`` entry."""
+    limits = settings.OCR_RATE_LIMITS.get(plan) or settings.OCR_RATE_LIMITS['default']
+    return RateLimit(**limits)
+
+
+def _billed_today(tenant_settings, today):
+    """Usage recorded on the row for today, used to seed missing counters."""
+    if tenant_settings.ocr_requests_reset_at == today:
+        return tenant_settings.ocr_requests_today
+    return 0
+
+
+def acquire(tenant_settings, cost=1):
+    """Admit an OCR request for a tenant, taking a token from its bucket.
+
+    Limiter errors are logged and the request is allowed: OCR keeps working
+    when Redis is unavailable.
+
+    Returns:
+        RateLimitDecision
+    """
+    today = date.today()
+    try:
+        return get_rate_limiter().acquire(
+            str(tenant_settings.tenant_id),
+            get_plan_limit(tenant_settings.tenant.plan),
+            today.isoformat(),
+            seed=_billed_today(tenant_settings, today),
+            cost=cost,
+        )
+    except Exception as e:
+        logger.warning(f'OCR rate limiter unavailable, allowing request: {e}')
+        return RateLimitDecision(allowed=True)
+
+
+@asynccontextmanager
+async def tenant_slot(tenant_id):
+    """Hold one of the tenant's ``OCR_BATCH_CONCURRENCY`` slots for a model call.
+
+    Waits while every slot is held. Slots not released, e.g. by a killed
+    worker, are freed after ``OCR_BATCH_SLOT_TTL`` seconds. Limiter errors
+    are logged and the call goes ahead without a slot.
+    """
+    slots = get_slots()
+    key, holder = str(tenant_id), uuid.uuid4().hex
+    limit, ttl = settings.OCR_BATCH_CONCURRENCY, settings.OCR_BATCH_SLOT_TTL
+    try:
+        while not await asyncio.to_thread(slots.take, key, limit, holder, ttl):
+            await asyncio.sleep(SLOT_POLL_INTERVAL)
+    except Exception as e:
+        logger.warning(f'OCR concurrency limiter unavailable, not waiting for a slot: {e}')
+    try:
+        yield
+    finally:
+        try:
+            await asyncio.to_thread(slots.release, key, holder)
+        except Exception as e:
+            logger.warning(f'Could not release OCR concurrency slot: {e}')
+
+
+def record_usage(tenant_settings, count=1):
+    """Count billed OCR requests for a tenant.
+
+    Falls back to an atomic update of the row when the limiter is
+    unavailable, so billing is not lost.
+
+    Returns:
+        The tenant's billed requests today
+    """
+    from apps.tenants.models import TenantSettings
+
+    today = date.today()
+    try:
+        return get_rate_limiter().record(
+            str(tenant_settings.tenant_id), today.isoformat(), count,
+            seed=_billed_today(tenant_settings, today),
+        )
+    except Exception as e:
+        logger.warning(f'OCR rate limiter unavailable, counting usage in the database: {e}')
+        TenantSettings.objects.filter(pk=tenant_settings.pk).update(
+            ocr_requests_today=F('ocr_requests_today') + count,
+        )
+        return _billed_today(tenant_settings, today) + count
+
+
+def get_usage(tenant_settings):
+    """Billed requests today against the plan's daily cap, for display.
+
+    Returns:
+        Dict with used, daily_cap (None for no cap) and percent of the cap
+    """
+    today = date.today()
+    try:
+        used = get_rate_limiter().usage(str(tenant_settings.tenant_id), today.isoformat())
+    except Exception as e:
+        logger.warning(f'OCR rate limiter unavailable: {e}')
+        used = None
+    if used is None:
+        used = _billed_today(tenant_settings, today)
+    daily_cap = get_plan_limit(tenant_settings.tenant.plan).daily_cap
+    percent = min(100, round(used * 100 / daily_cap)) if daily_cap else 0
+    return {'used': used, 'daily_cap': daily_cap, 'percent': percent}
+
+
+def flush_usage():
+    """Copy billed usage counters to TenantSettings for billing and display.
+
+    Counters are totals for their day, so writing one twice is harmless.
+    Rows not yet moved to today are then reset to zero.
+
+    Returns:
+        Number of counters written
+    """
+    from apps.tenants.models import TenantSettings
+
+    changed = get_rate_limiter().drain()
+    for tenant_id, day, total in changed:
+        day = date.fromisoformat(day)
+        TenantSettings.objects.filter(
+            Q(ocr_requests_reset_at__isnull=True) | Q(ocr_requests_reset_at__lte=day),
+            tenant_id=tenant_id,
+        ).update(ocr_requests_today=total, ocr_requests_reset_at=day)
+
+    today = date.today()
+    TenantSettings.objects.filter(
+        Q(ocr_requests_reset_at__isnull=True) | Q(ocr_requests_reset_at__lt=today),
+    ).update(ocr_requests_today=0, ocr_requests_reset_at=today)
+    return len(changed)
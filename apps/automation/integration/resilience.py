@@ -0,0 +1,51 @@
+"""
+Retry, circuit breaker and metrics settings for OpenRouter clients.
+
+Breaker state and counters live in the ``ocr`` cache alias, so with
+``OCR_RESULT_CACHE_URL`` pointing at Redis every web and Celery process
+sees the same circuit: once one worker has seen the upstream fail
+repeatedly, all of them stop calling it until the cool-down is over.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+from apps.automation.ocr.resilience import CircuitBreaker, Metrics, RetryPolicy
+
+from .result_cache import CACHE_ALIAS
+
+
+def get_retry_policy():
+    return RetryPolicy(
+        max_attempts=settings.OCR_RETRY_ATTEMPTS,
+        base_delay=settings.OCR_RETRY_BASE_DELAY,
+        max_delay=settings.OCR_RETRY_MAX_DELAY,
+    )
+
+
+def _ocr_cache():
+    # Cache connections are per thread; a proxy lets cached clients be shared
+    return ConnectionProxy(caches, CACHE_ALIAS)
+
+
+def get_metrics():
+    return Metrics(_ocr_cache())
+
+
+def get_circuit_breaker():
+    return CircuitBreaker(
+        _ocr_cache(),
+        failure_threshold=settings.OCR_BREAKER_FAILURE_THRESHOLD,
+        window=settings.OCR_BREAKER_WINDOW,
+        reset_timeout=settings.OCR_BREAKER_RESET_TIMEOUT,
+        metrics=get_metrics(),
+    )
+
+
+def client_resilience_kwargs():
+    """Keyword arguments adding retries, the shared breaker and metrics to an OpenRouterClient."""
+    return {
+        'retry': get_retry_policy(),
+        'breaker': get_circuit_breaker(),
+        'metrics': get_metrics(),
+    }
@@ -0,0 +1,47 @@
+"""
+Django-backed storage for the OCR result cache.
+
+Results live in the ``ocr`` cache alias (see ``CACHES`` in settings) under a
+per-tenant namespace, so identical uploads from two tenants never share a
+result. Cache backend errors are logged and treated as misses; OCR must keep
+working when the cache is unavailable.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+
+from apps.automation.ocr.cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+CACHE_ALIAS = 'ocr'
+
+
+class DjangoResultCache(ResultCache):
+    """ResultCache stored in a Django cache alias."""
+
+    def __init__(self, alias=CACHE_ALIAS, timeout=None):
+        self.alias = alias
+        self.timeout = timeout
+
+    def get(self, key):
+        try:
+            return caches[self.alias].get(key)
+        except Exception:
+            logger.warning('OCR result cache read failed', exc_info=True)
+            return None
+
+    def set(self, key, value):
+        try:
+            caches[self.alias].set(key, value, self.timeout)
+        except Exception:
+            logger.warning('OCR result cache write failed', exc_info=True)
+
+
+def get_result_cache(tenant):
+    """Return the tenant's OCR result cache, or None when caching is disabled."""
+    ttl = settings.OCR_RESULT_CACHE_TTL
+    if not ttl:
+        return None
+    return DjangoResultCache(timeout=ttl).for_namespace(f'tenant-{tenant.pk}')
@@ -0,0 +1,242 @@
+"""
+OCR call telemetry storage and usage reports.
+
+Tenant clients (see ``clients``) are given a ``CallRecorder``. Recording
+only appends the call to a process-wide buffer, so it never adds a database
+write to a model call. The buffer is flushed whenever a call is recorded
+outside an event loop; concurrent batch and comparison runs flush it once
+their event loop has finished. A flush hands the records to the
+``store_ocr_call_records`` Celery task when ``OCR_TELEMETRY_ASYNC_WRITES``
+is on, and writes them in place otherwise.
+
+Each stored OCRCallRecord is also added to its hourly OCRUsageBucket. The
+dashboards read only the buckets, so their cost does not grow with the
+number of calls, and call records can be pruned after
+``OCR_CALL_RECORD_RETENTION_DAYS``.
+"""
+import asyncio
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.automation.ocr.telemetry import (
+    CallRecord,
+    empty_histogram,
+    estimate_cost,
+    histogram_percentile,
+    latency_bin,
+    merge_histograms,
+)
+
+logger = logging.getLogger(__name__)
+
+_buffer = []
+_buffer_lock = threading.Lock()
+
+
+class CallRecorder:
+    """OpenRouterClient recorder that buffers calls for one tenant."""
+
+    def __init__(self, tenant_id):
+        self.tenant_id = tenant_id
+
+    def __call__(self, record: CallRecord):
+        row = record.to_dict()
+        row.update(tenant_id=self.tenant_id, created_at=timezone.now().isoformat())
+        with _buffer_lock:
+            _buffer.append(row)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            flush_call_records()
+
+
+def get_call_recorder(tenant_id):
+    """Recorder for a tenant's client, or None with telemetry turned off."""
+    if not settings.OCR_TELEMETRY_ENABLED:
+        return None
+    return CallRecorder(tenant_id)
+
+
+def flush_call_records():
+    """Store or ship every buffered call record.
+
+    Returns:
+        The number of records flushed
+    """
+    global _buffer
+    with _buffer_lock:
+        rows, _buffer = _buffer, []
+    if not rows:
+        return 0
+    try:
+        if settings.OCR_TELEMETRY_ASYNC_WRITES:
+            from apps.automation.tasks import store_ocr_call_records
+
+            store_ocr_call_records.delay(rows)
+        else:
+            write_call_records(rows)
+    except Exception:
+        logger.exception('Could not store %d OCR call records', len(rows))
+    return len(rows)
+
+
+atexit.register(flush_call_records)
+
+
+def _bucket_hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def write_call_records(rows):
+    """Insert call records and add them to their hourly usage buckets."""
+    from apps.automation.models import OCRCallRecord, OCRUsageBucket
+
+    records = []
+    for row in rows:
+        row = dict(row)
+        tenant_id = row.pop('tenant_id')
+        created_at = parse_datetime(row.pop('created_at'))
+        call = CallRecord(**row)
+        records.append(OCRCallRecord(
+            tenant_id=tenant_id,
+            parser=call.parser,
+            model=call.model,
+            outcome=call.outcome,
+            input_bytes=call.input_bytes,
+            tokens_in=call.tokens_in,
+            tokens_cached=call.tokens_cached,
+            tokens_out=call.tokens_out,
+            cost_usd=estimate_cost(call, settings.OCR_MODEL_PRICES),
+            latency_ms=round(call.latency_ms) if call.latency_ms is not None else None,
+            attempts=call.attempts,
+            cache_hit=call.cache_hit,
+            error=call.error[:255],
+            created_at=created_at,
+        ))
+
+    groups = defaultdict(list)
+    for record in records:
+        groups[(record.tenant_id, _bucket_hour(record.created_at), record.parser, record.model)].append(record)
+
+    with transaction.atomic():
+        OCRCallRecord.objects.bulk_create(records)
+        for (tenant_id, hour, parser, model), group in groups.items():
+            bucket, _ = OCRUsageBucket.objects.select_for_update().get_or_create(
+                tenant_id=tenant_id, hour=hour, parser=parser, model=model,
+                defaults={'latency_histogram': empty_histogram()},
+            )
+            histogram = merge_histograms([bucket.latency_histogram])
+            for record in group:
+                bucket.calls += 1
+                bucket.cache_hits += record.cache_hit
+                bucket.errors += record.outcome in ('error', 'rate_limited', 'unavailable')
+                bucket.retries += max(record.attempts - 1, 0)
+                bucket.input_bytes += record.input_bytes
+                bucket.tokens_in += record.tokens_in or 0
+                bucket.tokens_cached += record.tokens_cached or 0
+                bucket.tokens_out += record.tokens_out or 0
+                bucket.cost_usd += record.cost_usd or 0
+                if record.latency_ms is not None and not record.cache_hit:
+                    bucket.latency_total_ms += record.latency_ms
+                    histogram[latency_bin(record.latency_ms)] += 1
+            bucket.latency_histogram = histogram
+            bucket.save()
+    return len(records)
+
+
+def prune_call_records(retention_days=None):
+    """Delete call records older than the retention period; buckets are kept."""
+    from apps.automation.models import OCRCallRecord
+
+    days = settings.OCR_CALL_RECORD_RETENTION_DAYS if retention_days is None else retention_days
+    deleted, _ = OCRCallRecord.objects.filter(created_at__lt=timezone.now() - timedelta(days=days)).delete()
+    return deleted
+
+
+def _summary(buckets):
+    calls = sum(b['calls'] for b in buckets)
+    cache_hits = sum(b['cache_hits'] for b in buckets)
+    errors = sum(b['errors'] for b in buckets)
+    model_calls = calls - cache_hits
+    histogram = merge_histograms(b['latency_histogram'] for b in buckets)
+    timed = sum(histogram)
+    return {
+        'calls': calls,
+        'model_calls': model_calls,
+        'cache_hits': cache_hits,
+        'errors': errors,
+        'error_rate': round(errors / model_calls, 4) if model_calls else 0.0,
+        'retries': sum(b['retries'] for b in buckets),
+        'tokens_in': sum(b['tokens_in'] for b in buckets),
+        'tokens_cached': sum(b['tokens_cached'] for b in buckets),
+        'tokens_out': sum(b['tokens_out'] for b in buckets),
+        'cost_usd': sum((b['cost_usd'] for b in buckets), Decimal(0)),
+        'avg_ms': round(sum(b['latency_total_ms'] for b in buckets) / timed) if timed else None,
+        'p50_ms': histogram_percentile(histogram, 0.50),
+        'p95_ms': histogram_percentile(histogram, 0.95),
+    }
+
+
+BUCKET_FIELDS = (
+    'tenant_id', 'hour', 'parser', 'model', 'calls', 'errors', 'cache_hits', 'retries',
+    'tokens_in', 'tokens_cached', 'tokens_out', 'cost_usd', 'latency_total_ms', 'latency_histogram',
+)
+
+
+def usage_report(buckets, days=7, interval='day'):
+    """Summarise OCR usage buckets over the last ``days`` days.
+
+    Args:
+        buckets: OCRUsageBucket queryset, e.g. filtered to one tenant
+        days: How far back to report
+        interval: 'hour' or 'day' for the ``series`` rows
+
+    Returns:
+        Dict with ``totals``, a ``series`` row per interval that had calls
+        (oldest first) and ``models``, one row per model by spend; every
+        row has calls, errors, error_rate, tokens (cached prompt tokens in
+        ``tokens_cached``), cost_usd and p50/p95 latency in ms
+    """
+    since = _bucket_hour(timezone.now()) - timedelta(days=days) + timedelta(hours=1)
+    rows = list(buckets.filter(hour__gte=since).values(*BUCKET_FIELDS))
+
+    by_period, by_model = defaultdict(list), defaultdict(list)
+    for row in rows:
+        hour = timezone.localtime(row['hour'])
+        by_period[hour if interval == 'hour' else hour.date()].append(row)
+        by_model[row['model']].append(row)
+
+    models = [{'model': model, **_summary(group)} for model, group in by_model.items()]
+    return {
+        'since': since,
+        'interval': interval,
+        'totals': _summary(rows),
+        'series': [{'period': period, **_summary(by_period[period])} for period in sorted(by_period)],
+        'models': sorted(models, key=lambda row: row['cost_usd'], reverse=True),
+    }
+
+
+def spend_by_tenant(buckets, days=7, limit=20):
+    """Tenants with the highest OCR spend over the last ``days`` days."""
+    since = _bucket_hour(timezone.now()) - timedelta(days=days) + timedelta(hours=1)
+    rows = (
+        buckets.filter(hour__gte=since)
+        .values('tenant_id', 'tenant__name', 'tenant__slug')
+        .annotate(calls=Sum('calls'), errors=Sum('errors'), cache_hits=Sum('cache_hits'), cost_usd=Sum('cost_usd'))
+        .order_by('-cost_usd', '-calls')[:limit]
+    )
+    return [
+        {**row, 'error_rate': round(row['errors'] / (row['calls'] - row['cache_hits']), 4)
+         if row['calls'] > row['cache_hits'] else 0.0}
+        for row in rows
+    ]
@@ -0,0 +1,638 @@
+"""
+Background OCR and inspection analysis jobs.
+
+Vision model calls take seconds to a minute, so the API views never make
+them. They record an OCRJob (documents) or InspectionAnalysis (inspection
+photos) in ``pending`` state and queue a Celery task once the transaction
+commits; the worker runs the matching ``BaseDocumentParser`` subclass and
+moves the row through ``processing`` to ``completed`` or ``failed``. Clients
+poll the job's status endpoint for the result.
+"""
+import logging
+import mimetypes
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.automation.ocr.imagehash import compute_image_hashes
+from .dedup import copy_analysis, hash_upload, reusable_analysis, reusable_ocr_job, set_job_hashes
+from .integration.result_cache import get_result_cache
+from .models import OCRJob
+
+logger = logging.getLogger(__name__)
+
+# Seconds clients are asked to wait between status polls
+POLL_INTERVAL = 2
+
+# ConditionReportPhoto locations analysed as a dashboard instead of for damage
+DASHBOARD_PHOTO_LOCATIONS = ('dashboard',)
+
+
+def get_tenant_client(tenant):
+    """The tenant's OpenRouterClient, configured from its OCR settings.
+
+    Clients are cached per tenant, key and model (see
+    ``integration.clients``), so the stored key is decrypted once per
+    rotation rather than on every call.
+    """
+    from .integration.clients import get_client_factory
+
+    return get_client_factory().get(tenant.settings)
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def serialize_license_result(result):
+    """Flatten a LicenseOCRResponse into the fields ApplyLicenseDataView accepts."""
+    return {
+        'country': result.country,
+        'issuing_authority': result.issuing_authority,
+        'license_number': result.license_number,
+        'license_class': result.license_class,
+        'issue_date': _iso(result.issue_date),
+        'expiration_date': _iso(result.expiration_date),
+        'first_name': result.first_name,
+        'middle_name': result.middle_name,
+        'last_name': result.last_name,
+        'date_of_birth': _iso(result.date_of_birth),
+        'address_street': result.address.street,
+        'address_city': result.address.city,
+        'address_state': result.address.state,
+        'address_zip': result.address.zip_code,
+        'gender': result.gender,
+        'height': result.height,
+        'weight': result.weight,
+        'eye_color': result.eye_color,
+        'hair_color': result.hair_color,
+        'restrictions': result.restrictions,
+        'endorsements': result.endorsements,
+        'donor_status': result.donor_status,
+        'confidence': result.confidence,
+        'has_photo': result.has_photo,
+    }
+
+
+# Serialized license result fields and the Customer fields they fill
+LICENSE_FIELD_MAPPING = {
+    'first_name': 'first_name',
+    'middle_name': 'middle_name',
+    'last_name': 'last_name',
+    'date_of_birth': 'date_of_birth',
+    'license_number': 'license_number',
+    'license_class': 'license_class',
+    'issuing_authority': 'license_state',
+    'issue_date': 'license_issue_date',
+    'expiration_date': 'license_expiry',
+    'restrictions': 'license_restrictions',
+    'endorsements': 'license_endorsements',
+    'donor_status': 'license_donor_status',
+    'address_street': 'address',
+    'address_city': 'city',
+    'address_state': 'state',
+    'address_zip': 'zip_code',
+    'gender': 'gender',
+    'height': 'height',
+    'weight': 'weight',
+    'eye_color': 'eye_color',
+    'hair_color': 'hair_color',
+}
+
+
+def apply_license_data(customer, data, fields=None):
+    """Fill a customer's empty fields from parsed license data.
+
+    Fields the customer already has, and empty values, are skipped. The
+    customer's OCR confidence and parse time are set; the caller saves.
+
+    Args:
+        customer: Customer to update
+        data: Validated ``LicenseDataSerializer`` data
+        fields: Names of the fields to apply; all of LICENSE_FIELD_MAPPING
+            when omitted. Unknown names are ignored.
+
+    Returns:
+        (applied field names, skipped field names)
+    """
+    applied, skipped = [], []
+    for field in LICENSE_FIELD_MAPPING if fields is None else fields:
+        if field not in LICENSE_FIELD_MAPPING:
+            continue
+
+        customer_field = LICENSE_FIELD_MAPPING[field]
+        value = data.get(field)
+        if value is None or value == '':
+            skipped.append(field)
+            continue
+
+        current_value = getattr(customer, customer_field, None)
+        if current_value and current_value != '':
+            skipped.append(field)
+            continue
+
+        setattr(customer, customer_field, value)
+        applied.append(field)
+
+    if 'confidence' in data:
+        customer.license_ocr_confidence = data['confidence']
+    customer.license_ocr_parsed_at = timezone.now()
+    return applied, skipped
+
+
+def serialize_insurance_result(result):
+    """Flatten an InsuranceOCRResponse into the fields ApplyInsuranceDataView accepts."""
+    return {
+        'company_name': result.company_name,
+        'policy_number': result.policy_number,
+        'group_number': result.group_number,
+        'effective_date': _iso(result.effective_date),
+        'expiration_date': _iso(result.expiration_date),
+        'policyholder_name': result.policyholder_name,
+        'policyholder_relationship': result.policyholder_relationship,
+        'coverage_type': result.coverage_type,
+        'covered_vehicles': [
+            {
+                'year': v.year,
+                'make': v.make,
+                'model': v.model,
+                'vin': v.vin
+            } for v in result.covered_vehicles
+        ],
+        'agent_name': result.agent_name,
+        'agent_phone': result.agent_phone,
+        'confidence': result.confidence,
+    }
+
+
+def get_preprocess_config(kind, parser_class):
+    """Return a parser's image preprocessing with ``OCR_PREPROCESS[kind]`` applied."""
+    overrides = settings.OCR_PREPROCESS.get(kind)
+    if not overrides:
+        return None
+    return parser_class.default_preprocess.with_overrides(**overrides)
+
+
+def get_document_parser(document_type, client, cache=None):
+    """Return the parser and result serializer for an OCRJob document type.
+
+    The parser tries ``OCR_CASCADE_MODEL`` before the client's model.
+    """
+    from apps.automation.ocr import parsers
+
+    if document_type == 'license':
+        parser_class, serialize = parsers.LicenseParser, serialize_license_result
+    elif document_type == 'insurance':
+        parser_class, serialize = parsers.InsuranceParser, serialize_insurance_result
+    else:
+        raise ValueError(f'Unsupported document type: {document_type}')
+    preprocess = get_preprocess_config(document_type, parser_class)
+    parser = parser_class(
+        client, cache=cache, preprocess=preprocess,
+        fast_model=settings.OCR_CASCADE_MODEL or None,
+        cascade_threshold=settings.OCR_CASCADE_THRESHOLDS.get(document_type),
+    )
+    return parser, serialize
+
+
+def _queue(task, object_id, on_error):
+    """Send ``task`` for ``object_id`` once the surrounding transaction commits."""
+    def send():
+        try:
+            task.delay(object_id)
+        except Exception as exc:
+            logger.exception('Could not queue %s for %s', task.name, object_id)
+            on_error(f'Could not queue job: {exc}')
+
+    transaction.on_commit(send)
+
+
+def create_ocr_job(tenant, document_type, image_file=None, customer=None, user=None):
+    """Record a pending OCR job.
+
+    Args:
+        tenant: Tenant the job belongs to
+        document_type: One of OCRJob.DOCUMENT_TYPE_CHOICES
+        image_file: Uploaded image; may be omitted for a license job on a
+            customer with a stored license image
+        customer: Customer the document belongs to, if known
+        user: User who requested the job
+
+    Returns:
+        The pending OCRJob
+    """
+    job = OCRJob(
+        tenant=tenant,
+        customer=customer,
+        created_by=user if user and user.is_authenticated else None,
+        document_type=document_type,
+    )
+    if image_file is not None:
+        job.image_media_type = getattr(image_file, 'content_type', None) or 'image/jpeg'
+        if customer is not None:
+            set_job_hashes(job, hash_upload(image_file))
+        job.image.save(image_file.name.rsplit('/', 1)[-1], image_file, save=False)
+    job.save()
+    return job
+
+
+def enqueue_ocr_job(tenant, document_type, image_file=None, customer=None, user=None):
+    """Record an OCR job and queue it for a worker.
+
+    Takes the same arguments as ``create_ocr_job``.
+
+    Returns:
+        The pending OCRJob
+    """
+    from .tasks import process_ocr_job
+
+    job = create_ocr_job(tenant, document_type, image_file=image_file, customer=customer, user=user)
+    _queue(process_ocr_job, job.pk, job.mark_failed)
+    return job
+
+
+def _read_job_image(job):
+    """Return the job's image bytes and media type."""
+    if job.image:
+        with job.image.open('rb') as image:
+            return image.read(), job.image_media_type
+
+    source = job.customer.license_image_front if job.customer else None
+    if job.document_type == 'license' and source:
+        media_type = mimetypes.guess_type(source.name)[0] or 'image/jpeg'
+        with source.open('rb') as image:
+            return image.read(), media_type
+
+    raise ValueError('Job has no image to process')
+
+
+def _prepare_ocr_job(job):
+    """Return the client, parser and result serializer for a job."""
+    client = get_tenant_client(job.tenant)
+    parser, serialize = get_document_parser(
+        job.document_type, client, cache=get_result_cache(job.tenant)
+    )
+    return client, parser, serialize
+
+
+def _complete_from_duplicate(job, image_data, started):
+    """Complete a customer's job from an earlier job on a near-duplicate image.
+
+    No model call is made or charged. Returns whether the job was completed.
+    """
+    if job.customer_id is None:
+        return False
+    if not job.image_phash:
+        set_job_hashes(job, compute_image_hashes(image_data))
+        job.save(update_fields=['image_ahash', 'image_phash'])
+    source = reusable_ocr_job(job)
+    if source is None:
+        return False
+    job.duplicate_of = source
+    job.mark_completed(
+        source.result,
+        confidence=source.confidence,
+        model_used=source.model_used,
+        model_tier=source.model_tier,
+        processing_time_ms=int((time.monotonic() - started) * 1000),
+    )
+    return True
+
+
+def _complete_ocr_job(job, client, parser, serialize, result, started):
+    if not parser.last_cache_hit:
+        job.tenant.settings.increment_ocr_requests()
+    job.mark_completed(
+        serialize(result),
+        confidence=result.confidence,
+        model_used=parser.last_model or client.model,
+        model_tier=parser.last_tier,
+        processing_time_ms=int((time.monotonic() - started) * 1000),
+    )
+
+
+# Metrics key of the license barcode counters (BARCODE_METRIC_NAMES)
+LICENSE_BARCODE_METRICS = 'license-barcode'
+
+
+def read_customer_license_barcode(customer, label):
+    """Read the AAMVA barcode on the back of a customer's license.
+
+    Every license parse is counted in the barcode metrics, along with how
+    far the barcode got: served the whole result, decoded but incomplete,
+    or unreadable.
+
+    Args:
+        customer: Customer whose ``license_image_back`` is read, or None
+        label: What is being parsed, for log messages, e.g. 'OCR job 12'
+
+    Returns:
+        (LicenseOCRResponse or None, whether it is complete on its own)
+    """
+    from apps.automation.ocr.barcode import missing_fields, read_license_barcode
+    from .integration.resilience import get_metrics
+
+    metrics = get_metrics()
+    metrics.incr('parses', LICENSE_BARCODE_METRICS)
+    back = customer.license_image_back if customer else None
+    if not settings.OCR_LICENSE_BARCODE or not back:
+        return None, False
+
+    try:
+        with back.open('rb') as image:
+            barcode = read_license_barcode(image.read())
+    except Exception as e:
+        logger.warning('Reading the license barcode for %s failed: %s', label, e)
+        barcode = None
+    if barcode is None:
+        metrics.incr('barcode_unreadable', LICENSE_BARCODE_METRICS)
+        return None, False
+    missing = missing_fields(barcode)
+    if missing:
+        logger.info('License barcode for %s lacks %s; asking the model', label, ', '.join(missing))
+        metrics.incr('barcode_partial', LICENSE_BARCODE_METRICS)
+        return barcode, False
+    metrics.incr('barcode_served', LICENSE_BARCODE_METRICS)
+    return barcode, True
+
+
+def _read_license_barcode(job):
+    if job.document_type != 'license':
+        return None, False
+    return read_customer_license_barcode(job.customer, f'OCR job {job.pk}')
+
+
+def _complete_from_barcode(job, barcode, started):
+    """Complete a license job from its barcode alone; no model call is charged."""
+    from apps.automation.ocr.barcode import BARCODE_MODEL
+
+    job.mark_completed(
+        serialize_license_result(barcode),
+        confidence=barcode.confidence,
+        model_used=BARCODE_MODEL,
+        processing_time_ms=int((time.monotonic() - started) * 1000),
+    )
+
+
+def _with_barcode(barcode, result):
+    from apps.automation.ocr.barcode import merge_barcode_result
+
+    return merge_barcode_result(barcode, result) if barcode is not None else result
+
+
+def _discard_job_image(job):
+    if job.image:
+        job.image.delete(save=False)
+        job.save(update_fields=['image'])
+
+
+def run_ocr_job(job_id):
+    """Parse an OCRJob's image and store the result on the job.
+
+    License jobs first try the barcode on the back of the customer's
+    license and only ask the model when it is unreadable or incomplete; a
+    partial barcode result is merged over the model's answer.
+
+    A customer's document that is a near-duplicate of one parsed before
+    reuses that job's result (see ``dedup``).
+
+    Finished jobs are left untouched, so a redelivered task is harmless.
+    The daily OCR counter is only charged for successful parses that
+    reached the model; barcode reads, reused results and result cache hits
+    are free.
+
+    Returns:
+        The OCRJob, or None if it no longer exists
+    """
+    job = (
+        OCRJob.objects.select_related('tenant__settings', 'customer')
+        .filter(pk=job_id).first()
+    )
+    if job is None or job.is_finished:
+        return job
+
+    job.mark_processing()
+    started = time.monotonic()
+    try:
+        barcode, complete = _read_license_barcode(job)
+        if complete:
+            _complete_from_barcode(job, barcode, started)
+            return job
+        image_data, media_type = _read_job_image(job)
+        if _complete_from_duplicate(job, image_data, started):
+            return job
+        client, parser, serialize = _prepare_ocr_job(job)
+        result = parser.parse(image_data, image_media_type=media_type)
+    except Exception as e:
+        logger.warning('OCR job %s failed: %s', job.pk, e)
+        job.mark_failed(str(e))
+    else:
+        _complete_ocr_job(job, client, parser, serialize, _with_barcode(barcode, result), started)
+    finally:
+        _discard_job_image(job)
+
+    return job
+
+
+# Streamed license address parts, under the names serialize_license_result uses
+STREAMED_ADDRESS_FIELDS = {
+    'street': 'address_street',
+    'city': 'address_city',
+    'state': 'address_state',
+    'zip_code': 'address_zip',
+}
+
+
+def _flatten_streamed_field(name, value):
+    if name == 'address' and isinstance(value, dict):
+        return [(STREAMED_ADDRESS_FIELDS[part], value[part]) for part in STREAMED_ADDRESS_FIELDS if part in value]
+    return [(name, value)]
+
+
+def stream_ocr_job(job):
+    """Run an OCRJob in the current process, reporting fields as they are read.
+
+    For clients that fill a form while the model is still writing. Yields
+    ``('field', {'name': ..., 'value': ...})`` for each field of the job's
+    result as soon as the model has written it, using the names of the
+    serialized result, then ``('completed', result)`` or
+    ``('failed', {'error': ...})``. The job ends in the same state, and is
+    charged the same way, as after ``run_ocr_job``; a complete license
+    barcode or a reused result is reported all at once.
+    """
+    job.mark_processing()
+    started = time.monotonic()
+    try:
+        barcode, complete = _read_license_barcode(job)
+        if complete:
+            _complete_from_barcode(job, barcode, started)
+        else:
+            image_data, media_type = _read_job_image(job)
+            _complete_from_duplicate(job, image_data, started)
+        if job.is_finished:
+            for name, value in job.result.items():
+                yield 'field', {'name': name, 'value': value}
+            yield 'completed', {'job_id': job.pk, 'data': job.result}
+            return
+        client, parser, serialize = _prepare_ocr_job(job)
+        result_fields = set(serialize(parser.response_model()))
+        result = None
+        for event in parser.parse_stream(image_data, image_media_type=media_type):
+            if event.event == 'result':
+                result = event.data
+                continue
+            for name, value in _flatten_streamed_field(*event.data):
+                if name in result_fields:
+                    yield 'field', {'name': name, 'value': value}
+    except GeneratorExit:
+        if not job.is_finished:
+            job.mark_failed('Client disconnected before the result was complete')
+        raise
+    except Exception as e:
+        logger.warning('OCR job %s failed: %s', job.pk, e)
+        job.mark_failed(str(e))
+        yield 'failed', {'job_id': job.pk, 'error': f'OCR processing failed: {e}'}
+    else:
+        _complete_ocr_job(job, client, parser, serialize, _with_barcode(barcode, result), started)
+        yield 'completed', {'job_id': job.pk, 'data': job.result}
+    finally:
+        _discard_job_image(job)
+
+
+def get_damage_parser(client, location='exterior', cache=None):
+    """Return a DamageParser with the configured damage preprocessing."""
+    from apps.automation.ocr import parsers
+
+    return parsers.DamageParser(
+        client, location=location, cache=cache,
+        preprocess=get_preprocess_config('damage', parsers.DamageParser),
+    )
+
+
+def get_inspection_parser(analysis, client, cache=None):
+    """Return the parser for an InspectionAnalysis row."""
+    from apps.automation.ocr import parsers
+
+    if analysis.analysis_type == 'damage_detection':
+        return get_damage_parser(client, location=analysis.photo.location, cache=cache)
+    if analysis.analysis_type == 'dashboard_analysis':
+        return parsers.DashboardParser(
+            client, cache=cache,
+            preprocess=get_preprocess_config('dashboard', parsers.DashboardParser),
+        )
+    raise ValueError(f'Unsupported analysis type: {analysis.analysis_type}')
+
+
+def read_photo(photo):
+    """Return a ConditionReportPhoto's image bytes and media type."""
+    with photo.image.open('rb') as image:
+        data = image.read()
+    return data, mimetypes.guess_type(photo.image.name)[0] or 'image/jpeg'
+
+
+def default_analysis_type(photo):
+    if photo.location in DASHBOARD_PHOTO_LOCATIONS:
+        return 'dashboard_analysis'
+    return 'damage_detection'
+
+
+def enqueue_inspection_analysis(photo, analysis_type=None):
+    """Record a pending InspectionAnalysis for a photo and queue it.
+
+    A near-duplicate of a photo analysed before gets a copy of that
+    analysis, already completed, instead (see ``dedup``).
+
+    Args:
+        photo: ConditionReportPhoto to analyse
+        analysis_type: ``damage_detection`` or ``dashboard_analysis``;
+            chosen from the photo location when omitted
+
+    Returns:
+        The pending, or reused and completed, InspectionAnalysis
+    """
+    from apps.contracts.models import InspectionAnalysis
+    from .tasks import process_inspection_analysis
+
+    analysis_type = analysis_type or default_analysis_type(photo)
+    source = reusable_analysis(photo, analysis_type)
+    if source is not None:
+        analysis = copy_analysis(source, photo)
+        analysis.save()
+        apply_dashboard_readings([analysis])
+        return analysis
+
+    analysis = InspectionAnalysis.objects.create(
+        condition_report_id=photo.condition_report_id,
+        photo=photo,
+        analysis_type=analysis_type,
+    )
+    _queue(process_inspection_analysis, analysis.pk, analysis.mark_failed)
+    return analysis
+
+
+def apply_dashboard_readings(analyses):
+    """Copy the readings of completed dashboard analyses to their condition reports.
+
+    See ``odometer``; a reading that cannot be applied is logged and the
+    analysis left as it is.
+    """
+    from .odometer import apply_dashboard_reading
+
+    for analysis in analyses:
+        if analysis.analysis_type != 'dashboard_analysis' or analysis.status != 'completed':
+            continue
+        try:
+            apply_dashboard_reading(analysis)
+        except Exception:
+            logger.exception('Could not apply dashboard analysis %s', analysis.pk)
+
+
+def run_inspection_analysis(analysis_id):
+    """Run the vision model over an InspectionAnalysis photo and store the result.
+
+    Dashboard readings are applied to the condition report, reservation and
+    vehicle as well.
+
+    Returns:
+        The InspectionAnalysis, or None if it no longer exists
+    """
+    from apps.contracts.models import InspectionAnalysis
+
+    analysis = (
+        InspectionAnalysis.objects
+        .select_related('photo', 'condition_report__contract__tenant__settings')
+        .filter(pk=analysis_id).first()
+    )
+    if analysis is None or analysis.status in ('completed', 'failed'):
+        return analysis
+
+    analysis.mark_processing()
+    try:
+        if analysis.photo is None:
+            raise ValueError('Analysis has no photo to process')
+        image_data, media_type = read_photo(analysis.photo)
+
+        tenant = analysis.condition_report.contract.tenant
+        client = get_tenant_client(tenant)
+        parser = get_inspection_parser(analysis, client, cache=get_result_cache(tenant))
+
+        started = time.monotonic()
+        result = parser.parse(image_data, image_media_type=media_type)
+        elapsed_ms = int((time.monotonic() - started) * 1000)
+    except Exception as e:
+        logger.warning('Inspection analysis %s failed: %s', analysis.pk, e)
+        analysis.mark_failed(str(e))
+    else:
+        if not parser.last_cache_hit:
+            tenant.settings.increment_ocr_requests()
+        analysis.mark_completed(
+            result.model_dump(mode='json'),
+            confidence=result.confidence,
+            model_used=client.model,
+            processing_time_ms=elapsed_ms,
+        )
+        apply_dashboard_readings([analysis])
+
+    return analysis
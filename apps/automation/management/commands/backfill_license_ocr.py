@@ -0,0 +1,100 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Parse the stored license images of a tenant's customers that were never run through OCR and "
+        "fill their empty fields. Resumes the tenant's unfinished backfill from its last checkpoint; "
+        "respects the tenant's OCR rate limit and daily cap."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', required=True, help='Slug of a tenant with license OCR enabled')
+        parser.add_argument('--batch-size', type=int, help='Customers per checkpointed batch')
+        parser.add_argument('--concurrency', type=int, help='Model calls in flight')
+        parser.add_argument('--limit', type=int, help='Stop after this many customers')
+        parser.add_argument('--queue', action='store_true',
+                            help='Run the backfill in a Celery worker instead of in this process')
+        parser.add_argument('--restart', action='store_true',
+                            help='Start a new backfill instead of resuming the unfinished one')
+        parser.add_argument('--status', action='store_true', help="Show the tenant's latest backfill and exit")
+
+    def handle(self, *args, **options):
+        from apps.automation.backfill import (
+            BackfillInProgress,
+            pending_customers,
+            queue_license_backfill,
+            run_license_backfill,
+            start_license_backfill,
+        )
+        from apps.automation.integration.feature_check import check_ocr_access
+        from apps.automation.models import LicenseBackfill
+        from apps.tenants.models import Tenant
+
+        tenant = Tenant.objects.filter(slug=options['tenant']).select_related('settings').first()
+        if tenant is None:
+            raise CommandError(f'No tenant with slug {options["tenant"]!r}')
+
+        if options['status']:
+            backfill = LicenseBackfill.objects.filter(tenant=tenant).first()
+            if backfill is None:
+                self.stdout.write('No backfill has been run for this tenant')
+            else:
+                self._report(backfill)
+            return
+
+        if not check_ocr_access(tenant):
+            raise CommandError("The tenant's plan must include license OCR, with OCR enabled and an API key stored")
+
+        backfill = start_license_backfill(
+            tenant,
+            batch_size=options['batch_size'],
+            concurrency=options['concurrency'],
+            limit=options['limit'],
+            restart=options['restart'],
+        )
+        remaining = pending_customers(backfill).count()
+        self.stdout.write(
+            f'License backfill #{backfill.pk}: {remaining} customers to parse, '
+            f'{backfill.processed} done before'
+        )
+
+        if options['queue']:
+            queue_license_backfill(backfill)
+            self.stdout.write(self.style.SUCCESS('Queued; check progress with --status'))
+            return
+
+        try:
+            backfill = run_license_backfill(backfill.pk, sleep=self._wait, on_batch=self._progress)
+        except BackfillInProgress as e:
+            raise CommandError(f'{e}; check progress with --status')
+        self._report(backfill)
+
+    def _wait(self, seconds):
+        self.stdout.write(f'  rate limited, waiting {seconds:.0f}s')
+        time.sleep(max(seconds, 0))
+
+    def _progress(self, backfill, outcome):
+        if outcome.processed:
+            self.stdout.write(
+                f'  {backfill.processed} processed: {outcome.applied} applied, {outcome.failed} failed '
+                f'in this batch (checkpoint: customer {backfill.last_customer_id})'
+            )
+
+    def _report(self, backfill):
+        line = (
+            f'License backfill #{backfill.pk} {backfill.status}: {backfill.processed} processed, '
+            f'{backfill.applied} applied, {backfill.failed} failed'
+        )
+        if backfill.status == 'completed':
+            self.stdout.write(self.style.SUCCESS(line))
+        elif backfill.status == 'failed':
+            self.stdout.write(self.style.ERROR(f'{line}: {backfill.error_message}'))
+        else:
+            self.stdout.write(line)
+        if backfill.status == 'paused' and backfill.resume_at:
+            resume_at = timezone.localtime(backfill.resume_at)
+            self.stdout.write(f'Paused by the rate limit until {resume_at:%Y-%m-%d %H:%M}; run again to resume')
@@ -0,0 +1,101 @@
+import asyncio
+import io
+import json
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+LOCATIONS = ['front', 'back', 'driver_side', 'passenger_side', 'interior_front', 'interior_back', 'trunk']
+
+DAMAGE_RESULT = {'damages': [], 'overall_condition': 'good', 'image_quality': 'good', 'confidence': 0.8}
+
+
+def stub_responder(base_latency, image_latency):
+    """Answer single and packed damage requests, taking longer for more images."""
+    def respond(payload):
+        content = payload['messages'][-1]['content']
+        images = sum(1 for part in content if part['type'] == 'image_url')
+        labels = [part['text'] for part in content[:-1] if part['type'] == 'text']
+        time.sleep(base_latency + image_latency * images)
+        if labels:
+            return json.dumps({'photos': [{'photo': label, **DAMAGE_RESULT} for label in labels]})
+        return json.dumps(DAMAGE_RESULT)
+    return respond
+
+
+def make_photo(seed, size=(1024, 768)):
+    from PIL import Image
+
+    rng = random.Random(seed)
+    image = Image.effect_noise(size, 40).convert('RGB')
+    image.paste((rng.randrange(256), rng.randrange(256), rng.randrange(256)), (0, 0, size[0] // 3, size[1] // 3))
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=85)
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = 'Compare model calls and latency per condition report with and without damage photo packing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reports', type=int, default=10, help='Reports analysed per mode')
+        parser.add_argument('--photos', type=int, default=8, help='Photos per report')
+        parser.add_argument('--pack-size', type=int, default=4, help='Photos per packed request')
+        parser.add_argument('--concurrency', type=int, default=4, help='Requests in flight per report')
+        parser.add_argument('--latency', type=float, default=0.5,
+                            help='Simulated model latency per request in seconds')
+        parser.add_argument('--image-latency', type=float, default=0.1,
+                            help='Additional simulated latency per image in seconds')
+
+    def handle(self, *args, **options):
+        from apps.automation.ocr.client import OpenRouterClient
+        from apps.automation.ocr.parsers import DamageParser, PackedPhoto
+        from apps.automation.ocr.testing import StubOpenRouterServer
+
+        reports = [
+            [
+                PackedPhoto(make_photo(report * 1000 + index), 'image/jpeg', LOCATIONS[index % len(LOCATIONS)])
+                for index in range(options['photos'])
+            ]
+            for report in range(options['reports'])
+        ]
+        pack_size = options['pack_size']
+
+        async def unpacked(client, photos, semaphore):
+            async def one(photo):
+                async with semaphore:
+                    parser = DamageParser(client, location=photo.location)
+                    return await parser.parse_async(photo.image_data, image_media_type=photo.media_type)
+            return await asyncio.gather(*[one(photo) for photo in photos])
+
+        async def packed(client, photos, semaphore):
+            async def pack(chunk):
+                async with semaphore:
+                    return await DamageParser(client).parse_many_async(chunk, pack_size=pack_size)
+            chunks = [photos[i:i + pack_size] for i in range(0, len(photos), pack_size)]
+            return [result for chunk in await asyncio.gather(*[pack(c) for c in chunks]) for result in chunk]
+
+        responder = stub_responder(options['latency'], options['image_latency'])
+        for label, analyse in (('unpacked', unpacked), (f'packed x{pack_size}', packed)):
+            with StubOpenRouterServer(responder=responder) as stub:
+                client = OpenRouterClient(api_key='benchmark', api_url=stub.url)
+
+                async def run_all():
+                    semaphore = asyncio.Semaphore(options['concurrency'])
+                    latencies = []
+                    for photos in reports:
+                        started = time.perf_counter()
+                        await analyse(client, photos, semaphore)
+                        latencies.append(time.perf_counter() - started)
+                    return latencies
+
+                latencies = sorted(asyncio.run(run_all()))
+
+            p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+            self.stdout.write(
+                f'{label:>12}: {stub.request_count / len(reports):5.1f} calls/report  '
+                f'mean {statistics.mean(latencies) * 1000:8.1f} ms  '
+                f'p95 {p95 * 1000:8.1f} ms per report'
+            )
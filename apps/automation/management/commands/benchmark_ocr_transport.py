@@ -0,0 +1,55 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request HTTP clients with the shared OCR transport against a local stub'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per run')
+        parser.add_argument('--concurrency', type=int, default=4, help='Concurrent callers')
+        parser.add_argument('--latency', type=float, default=0.0,
+                            help='Simulated upstream latency per request in seconds')
+
+    def handle(self, *args, **options):
+        from apps.automation.ocr.client import OpenRouterClient, VisionRequest
+        from apps.automation.ocr.testing import StubOpenRouterServer
+
+        class PerRequestClient(OpenRouterClient):
+            """The previous behaviour: a new client and connection per call."""
+
+            def _post(self, payload):
+                started = time.perf_counter()
+                with httpx.Client(timeout=self.timeout) as client:
+                    response = client.post(self.api_url, headers=self._build_headers(), json=payload)
+                return response, {'latency_ms': (time.perf_counter() - started) * 1000}
+
+        request = VisionRequest(system_prompt='system', user_prompt='user', image_data=b'\xff' * 2048)
+
+        for label, client_class in (('per-request client', PerRequestClient),
+                                    ('shared transport', OpenRouterClient)):
+            with StubOpenRouterServer(latency=options['latency']) as stub:
+                client = client_class(api_key='benchmark', api_url=stub.url)
+                client.send_vision_request(request)  # warm up
+
+                def timed_call(_):
+                    start = time.perf_counter()
+                    client.send_vision_request(request)
+                    return time.perf_counter() - start
+
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                    latencies = sorted(pool.map(timed_call, range(options['requests'])))
+                elapsed = time.perf_counter() - started
+
+                p95 = latencies[int(len(latencies) * 0.95) - 1]
+                self.stdout.write(
+                    f'{label:>20}: {len(latencies) / elapsed:8.1f} req/s  '
+                    f'p50 {statistics.median(latencies) * 1000:6.2f} ms  '
+                    f'p95 {p95 * 1000:6.2f} ms  '
+                    f'connections {stub.connection_count}'
+                )
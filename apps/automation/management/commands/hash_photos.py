@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Compute the perceptual hashes of vehicle and condition report photos uploaded before '
+        'duplicate detection, so new uploads are compared with them too.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Photos saved per query')
+
+    def handle(self, *args, **options):
+        from apps.automation.ocr.imagehash import compute_image_hashes
+        from apps.contracts.models import ConditionReportPhoto
+        from apps.fleet.models import VehiclePhoto
+
+        for model in (VehiclePhoto, ConditionReportPhoto):
+            hashed = unreadable = 0
+            batch = []
+            for photo in model.objects.filter(phash='').exclude(image='').order_by('pk').iterator():
+                try:
+                    with photo.image.open('rb') as image:
+                        hashes = compute_image_hashes(image.read())
+                except OSError:
+                    hashes = None
+                if hashes is None:
+                    unreadable += 1
+                    continue
+                photo.ahash, photo.phash = hashes.average, hashes.perceptual
+                batch.append(photo)
+                if len(batch) >= options['batch_size']:
+                    hashed += model.objects.bulk_update(batch, ['ahash', 'phash'])
+                    batch = []
+            if batch:
+                hashed += model.objects.bulk_update(batch, ['ahash', 'phash'])
+            self.stdout.write(f'{model.__name__}: {hashed} hashed, {unreadable} unreadable')
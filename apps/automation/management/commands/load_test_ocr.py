@@ -0,0 +1,234 @@
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .benchmark_damage_packing import LOCATIONS, make_photo
+
+SCENARIOS = ('license', 'batch', 'comparison')
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(math.ceil(fraction * len(sorted_values)), 1) - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test license parsing (ParseLicenseView), batch damage analysis and damage comparisons '
+        'against a local OpenRouter stub; reports throughput and p50/p95/p99 latency. Creates reports, '
+        'photos and jobs for the tenant and deletes them afterwards; run it against a development or '
+        'staging database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', required=True, help='Slug of a tenant with OCR enabled')
+        parser.add_argument('--scenario', choices=SCENARIOS + ('all',), default='all')
+        parser.add_argument('--requests', type=int, default=50, help='Operations per scenario')
+        parser.add_argument('--concurrency', type=int, default=8, help='Operations in flight')
+        parser.add_argument('--photos', type=int, default=8, help='Photos per condition report')
+        parser.add_argument('--contract', type=int, help='Contract to attach reports to (default: the latest)')
+        parser.add_argument('--base-url',
+                            help='Use an already running OpenRouter-compatible API instead of starting a stub')
+        parser.add_argument('--latency', type=float, default=0.5,
+                            help='Simulated model latency per request in seconds')
+        parser.add_argument('--latency-jitter', type=float, default=0.25,
+                            help='Up to this many seconds added to the latency at random')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with a 502')
+        parser.add_argument('--rate-limit-rate', type=float, default=0.0,
+                            help='Share of requests answered with a 429')
+        parser.add_argument('--tenant-rate-limits', action='store_true',
+                            help="Apply the tenant's OCR rate limits instead of lifting them for the run")
+        parser.add_argument('--result-cache', action='store_true',
+                            help='Keep the OCR result cache on; repeated test images then skip the model')
+
+    def handle(self, *args, **options):
+        from apps.automation.ocr.testing import StubOpenRouterServer, canned_responder
+        from apps.tenants.models import Tenant, TenantUser
+
+        tenant = Tenant.objects.filter(slug=options['tenant']).select_related('settings').first()
+        if tenant is None:
+            raise CommandError(f'No tenant with slug {options["tenant"]!r}')
+        tenant_settings = getattr(tenant, 'settings', None)
+        if not tenant_settings or not tenant_settings.openrouter_enabled or not tenant_settings.has_api_key:
+            raise CommandError(
+                'Enable OCR and store an API key for the tenant first; any key works against the stub'
+            )
+        tenant_user = TenantUser.objects.filter(tenant=tenant, is_active=True).select_related('user').first()
+        if tenant_user is None:
+            raise CommandError('The tenant has no active users to send requests as')
+
+        scenarios = SCENARIOS if options['scenario'] == 'all' else (options['scenario'],)
+        contract = None
+        if {'batch', 'comparison'} & set(scenarios):
+            contract = self._contract(tenant, options['contract'])
+
+        overrides = {}
+        if not options['result_cache']:
+            overrides['OCR_RESULT_CACHE_TTL'] = 0
+        if not options['tenant_rate_limits']:
+            overrides['OCR_RATE_LIMITS'] = {
+                plan: {'burst': 10 ** 6, 'per_minute': 10 ** 6, 'daily_cap': None}
+                for plan in settings.OCR_RATE_LIMITS
+            }
+
+        stub = None
+        if options['base_url']:
+            overrides['OPENROUTER_BASE_URL'] = options['base_url']
+        else:
+            stub = StubOpenRouterServer(
+                responder=canned_responder,
+                latency=options['latency'],
+                latency_jitter=options['latency_jitter'],
+                error_rate=options['error_rate'],
+                rate_limit_rate=options['rate_limit_rate'],
+            ).start()
+            overrides['OPENROUTER_BASE_URL'] = stub.base_url
+
+        self._image = make_photo(0)
+        self._reports = []
+        self._local = threading.local()
+        started_at = timezone.now()
+        try:
+            with override_settings(**overrides):
+                for name in scenarios:
+                    prepare = {
+                        'license': lambda index: self._license_operation(tenant, tenant_user.user),
+                        'batch': lambda index: self._batch_operation(contract, options['photos']),
+                        'comparison': lambda index: self._comparison_operation(contract),
+                    }[name]
+                    self._report(name, *self._run(prepare, options['requests'], options['concurrency']))
+        finally:
+            if stub is not None:
+                stub.stop()
+                counts = ', '.join(f'{code}: {n}' for code, n in sorted(stub.status_counts.items()))
+                self.stdout.write(f'stub: {stub.request_count} model requests ({counts or "none"})')
+            self._clean_up(tenant, tenant_user.user, started_at)
+
+    def _contract(self, tenant, contract_id):
+        from apps.contracts.models import Contract
+
+        contracts = Contract.objects.filter(tenant=tenant)
+        contract = contracts.filter(pk=contract_id).first() if contract_id else contracts.order_by('-pk').first()
+        if contract is None:
+            raise CommandError('The batch and comparison scenarios need a contract; pass --contract')
+        return contract
+
+    def _run(self, prepare, count, concurrency):
+        """Run ``count`` operations; returns (sorted latencies, outcome counts, elapsed seconds)."""
+        def one(index):
+            try:
+                operation = prepare(index)
+                started = time.perf_counter()
+                outcome = operation()
+                elapsed = time.perf_counter() - started
+            except Exception as e:
+                outcome, elapsed = f'error: {type(e).__name__}: {e}', None
+            # Worker threads each hold their own database connection
+            connections.close_all()
+            return elapsed, outcome
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+            results = list(pool.map(one, range(count)))
+        elapsed = time.perf_counter() - started
+
+        outcomes = {}
+        for _, outcome in results:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        latencies = sorted(latency for latency, _ in results if latency is not None)
+        return latencies, outcomes, elapsed
+
+    def _report(self, name, latencies, outcomes, elapsed):
+        def ms(fraction):
+            value = percentile(latencies, fraction)
+            return f'{value * 1000:8.1f} ms' if value is not None else '       - ms'
+
+        total = sum(outcomes.values())
+        self.stdout.write(
+            f'{name:>10}: {total} in {elapsed:6.1f} s  {total / elapsed if elapsed else 0:6.2f} ops/s  '
+            f'p50 {ms(0.50)}  p95 {ms(0.95)}  p99 {ms(0.99)}'
+        )
+        for outcome, count in sorted(outcomes.items(), key=lambda item: -item[1]):
+            self.stdout.write(f'{"":>12}{count:5d} {outcome}')
+
+    def _license_operation(self, tenant, user):
+        local = self._local
+        if getattr(local, 'client', None) is None:
+            local.client = Client(HTTP_HOST=f'{tenant.slug}.localhost')
+            local.client.force_login(user)
+        upload = SimpleUploadedFile('license.jpg', self._image, content_type='image/jpeg')
+        url = reverse('automation:parse-license') + '?stream=1'
+
+        def operation():
+            response = local.client.post(url, {'image': upload})
+            if response.status_code != 200:
+                return f'http {response.status_code}'
+            body = b''.join(response.streaming_content).decode()
+            return 'ok' if 'event: completed' in body else 'failed'
+        return operation
+
+    def _new_report(self, contract, report_type, locations):
+        from apps.contracts.models import ConditionReport, ConditionReportPhoto
+
+        report = ConditionReport.objects.create(
+            contract=contract, report_type=report_type, fuel_level='full', mileage=0,
+            exterior_condition='good', interior_condition='good', notes='OCR load test',
+        )
+        self._reports.append(report.pk)
+        for location in locations:
+            ConditionReportPhoto.objects.create(
+                condition_report=report, location=location,
+                image=ContentFile(self._image, name=f'load-test-{location}.jpg'),
+            )
+        return report
+
+    def _batch_operation(self, contract, photos):
+        from apps.automation.batch import run_report_analysis
+        from apps.automation.jobs import default_analysis_type
+        from apps.contracts.models import InspectionAnalysis
+
+        report = self._new_report(contract, 'checkin', [LOCATIONS[i % len(LOCATIONS)] for i in range(photos)])
+        analyses = InspectionAnalysis.objects.bulk_create([
+            InspectionAnalysis(condition_report=report, photo=photo, analysis_type=default_analysis_type(photo))
+            for photo in report.photos.all()
+        ])
+
+        def operation():
+            results = run_report_analysis([analysis.pk for analysis in analyses])
+            return 'ok' if all(a.status == 'completed' for a in results) else 'failed'
+        return operation
+
+    def _comparison_operation(self, contract):
+        from apps.automation.comparisons import COMPARABLE_LOCATIONS, run_damage_comparison
+        from apps.contracts.models import DamageComparison
+
+        comparison = DamageComparison.objects.create(
+            checkout_report=self._new_report(contract, 'checkout', COMPARABLE_LOCATIONS),
+            checkin_report=self._new_report(contract, 'checkin', COMPARABLE_LOCATIONS),
+        )
+
+        def operation():
+            result = run_damage_comparison(comparison.pk)
+            return 'ok' if result.status == 'completed' else 'failed'
+        return operation
+
+    def _clean_up(self, tenant, user, started_at):
+        from apps.automation.models import OCRJob
+        from apps.contracts.models import ConditionReport, ConditionReportPhoto
+
+        for photo in ConditionReportPhoto.objects.filter(condition_report_id__in=self._reports):
+            photo.image.delete(save=False)
+        ConditionReport.objects.filter(pk__in=self._reports).delete()
+        OCRJob.objects.filter(tenant=tenant, created_by=user, created_at__gte=started_at).delete()
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Serve a local OpenRouter-compatible stub that answers every OCR parser with canned results'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Interface to bind')
+        parser.add_argument('--port', type=int, default=8089, help='Port to bind')
+        parser.add_argument('--latency', type=float, default=1.0,
+                            help='Simulated model latency per request in seconds')
+        parser.add_argument('--latency-jitter', type=float, default=0.5,
+                            help='Up to this many seconds added to the latency at random')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with a 502')
+        parser.add_argument('--rate-limit-rate', type=float, default=0.0,
+                            help='Share of requests answered with a 429')
+        parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After seconds sent with a 429')
+        parser.add_argument('--stream-delay', type=float, default=0.02,
+                            help='Seconds between streamed events')
+        parser.add_argument('--seed', type=int, default=None, help='Seed for repeatable latency and faults')
+
+    def handle(self, *args, **options):
+        from apps.automation.ocr.testing import StubOpenRouterServer, canned_responder
+
+        stub = StubOpenRouterServer(
+            responder=canned_responder,
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency'],
+            latency_jitter=options['latency_jitter'],
+            error_rate=options['error_rate'],
+            rate_limit_rate=options['rate_limit_rate'],
+            retry_after=options['retry_after'],
+            stream_delay=options['stream_delay'],
+            seed=options['seed'],
+        )
+        with stub:
+            self.stdout.write(f'OpenRouter stub listening on {stub.url}')
+            self.stdout.write(f'Point the app at it with OPENROUTER_BASE_URL={stub.base_url}')
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                pass
+            counts = ', '.join(f'{status}: {count}' for status, count in sorted(stub.status_counts.items()))
+            self.stdout.write(f'Served {stub.request_count} requests ({counts or "none"})')
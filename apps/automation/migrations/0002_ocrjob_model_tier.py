@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("automation", "0001_ocrjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ocrjob",
+            name="model_tier",
+            field=models.CharField(
+                blank=True,
+                choices=[("fast", "Fast model"), ("full", "Configured model")],
+                help_text="Which model of the OCR cascade answered",
+                max_length=10,
+            ),
+        ),
+    ]
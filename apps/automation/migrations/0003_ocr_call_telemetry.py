@@ -0,0 +1,110 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("automation", "0002_ocrjob_model_tier"),
+        ("tenants", "0007_auditlogarchive"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OCRCallRecord",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("parser", models.CharField(blank=True, max_length=50)),
+                ("model", models.CharField(max_length=100)),
+                (
+                    "outcome",
+                    models.CharField(
+                        choices=[
+                            ("ok", "Succeeded"),
+                            ("cached", "Cache hit"),
+                            ("error", "Failed"),
+                            ("rate_limited", "Rate limited"),
+                            ("unavailable", "Circuit open"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("input_bytes", models.PositiveIntegerField(default=0)),
+                ("tokens_in", models.PositiveIntegerField(blank=True, null=True)),
+                ("tokens_out", models.PositiveIntegerField(blank=True, null=True)),
+                (
+                    "cost_usd",
+                    models.DecimalField(blank=True, decimal_places=6, max_digits=12, null=True),
+                ),
+                ("latency_ms", models.IntegerField(blank=True, null=True)),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("cache_hit", models.BooleanField(default=False)),
+                ("error", models.CharField(blank=True, max_length=255)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="tenants.tenant"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "OCR call",
+                "verbose_name_plural": "OCR calls",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(fields=["tenant", "-created_at"], name="ocrcall_tenant_created"),
+                    models.Index(fields=["created_at"], name="ocrcall_created"),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="OCRUsageBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("hour", models.DateTimeField()),
+                ("parser", models.CharField(blank=True, max_length=50)),
+                ("model", models.CharField(max_length=100)),
+                ("calls", models.PositiveIntegerField(default=0)),
+                ("errors", models.PositiveIntegerField(default=0)),
+                ("cache_hits", models.PositiveIntegerField(default=0)),
+                ("retries", models.PositiveIntegerField(default=0)),
+                ("input_bytes", models.BigIntegerField(default=0)),
+                ("tokens_in", models.BigIntegerField(default=0)),
+                ("tokens_out", models.BigIntegerField(default=0)),
+                ("cost_usd", models.DecimalField(decimal_places=6, default=0, max_digits=14)),
+                ("latency_total_ms", models.BigIntegerField(default=0)),
+                ("latency_histogram", models.JSONField(blank=True, default=list)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="tenants.tenant"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "OCR usage bucket",
+                "verbose_name_plural": "OCR usage buckets",
+                "ordering": ["-hour"],
+                "indexes": [models.Index(fields=["hour"], name="ocrbucket_hour")],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("tenant", "hour", "parser", "model"), name="ocrbucket_unique_hour"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("automation", "0004_license_backfill"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ocrcallrecord",
+            name="tokens_cached",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="ocrusagebucket",
+            name="tokens_cached",
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
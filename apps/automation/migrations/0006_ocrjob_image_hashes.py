@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("automation", "0005_ocr_cached_tokens"),
+        ("customers", "0003_customer_document_verification"),
+        ("tenants", "0007_auditlogarchive"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ocrjob",
+            name="duplicate_of",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Earlier job whose result was reused",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="duplicates",
+                to="automation.ocrjob",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ocrjob",
+            name="image_ahash",
+            field=models.CharField(blank=True, max_length=16),
+        ),
+        migrations.AddField(
+            model_name="ocrjob",
+            name="image_phash",
+            field=models.CharField(blank=True, max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name="ocrjob",
+            index=models.Index(fields=["customer", "image_phash"], name="ocrjob_customer_phash"),
+        ),
+    ]
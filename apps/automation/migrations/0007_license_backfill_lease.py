@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("automation", "0006_ocrjob_image_hashes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="licensebackfill",
+            name="lease_expires_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="licensebackfill",
+            name="lease_token",
+            field=models.CharField(blank=True, max_length=32),
+        ),
+    ]
@@ -1,3 +1,323 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.tenants.models import TenantModel
+
+
+class OCRJob(TenantModel):
+    """
+    A document OCR request queued for a Celery worker.
+
+    The upload endpoints create the job and return its id straight away;
+    ``apps.automation.jobs.run_ocr_job`` sends the image to the vision model
+    and records the parsed result, which clients fetch by polling the job.
+    The uploaded image is deleted once the job finishes.
+    """
+    DOCUMENT_TYPE_CHOICES = [
+        ('license', "Driver's License"),
+        ('insurance', 'Insurance Card'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    MODEL_TIER_CHOICES = [
+        ('fast', 'Fast model'),
+        ('full', 'Configured model'),
+    ]
+
+    customer = models.ForeignKey(
+        'customers.Customer',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ocr_jobs'
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ocr_jobs'
+    )
+    document_type = models.CharField(max_length=20, choices=DOCUMENT_TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+
+    image = models.FileField(upload_to='ocr_jobs/', blank=True)
+    image_media_type = models.CharField(max_length=50, default='image/jpeg')
+    # Perceptual hashes of the image, kept after it is deleted; a customer's
+    # near-duplicate document reuses the earlier job's result
+    image_ahash = models.CharField(max_length=16, blank=True)
+    image_phash = models.CharField(max_length=16, blank=True)
+    duplicate_of = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='duplicates',
+        help_text='Earlier job whose result was reused',
+    )
+
+    result = models.JSONField(default=dict, blank=True)
+    confidence = models.FloatField(null=True, blank=True)
+    error_message = models.TextField(blank=True)
+
+    model_used = models.CharField(max_length=100, blank=True)
+    model_tier = models.CharField(
+        max_length=10,
+        choices=MODEL_TIER_CHOICES,
+        blank=True,
+        help_text='Which model of the OCR cascade answered',
+    )
+    processing_time_ms = models.IntegerField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'OCR job'
+        verbose_name_plural = 'OCR jobs'
+        indexes = [
+            models.Index(fields=['tenant', '-created_at'], name='ocrjob_tenant_created'),
+            models.Index(fields=['customer', 'image_phash'], name='ocrjob_customer_phash'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_document_type_display()} OCR - {self.status}'
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+
+    def mark_processing(self):
+        self.status = 'processing'
+        self.started_at = timezone.now()
+        self.save(update_fields=['status', 'started_at'])
+
+    def mark_completed(self, result, confidence=None, model_used=None, processing_time_ms=None,
+                       model_tier=None):
+        self.status = 'completed'
+        self.result = result
+        self.confidence = confidence
+        self.model_used = model_used or ''
+        self.model_tier = model_tier or ''
+        self.processing_time_ms = processing_time_ms
+        self.completed_at = timezone.now()
+        self.save()
+
+    def mark_failed(self, error_message):
+        self.status = 'failed'
+        self.error_message = error_message
+        self.completed_at = timezone.now()
+        self.save(update_fields=['status', 'error_message', 'completed_at'])
+
+
+
+class LicenseBackfill(TenantModel):
+    """
+    A resumable run parsing the stored license images of a tenant's customers.
+
+    ``apps.automation.backfill`` walks the customers with a front license
+    image and no ``license_ocr_parsed_at`` in primary key order, a batch at
+    a time, and saves its position after every batch. A run that crashed or
+    was paused by the rate limiter carries on from ``last_customer_id``.
+    Only the runner holding the lease works on it, so a queued task and a
+    foreground command never parse the same batch twice.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('paused', 'Paused'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='license_backfills'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+
+    batch_size = models.PositiveIntegerField(default=25)
+    concurrency = models.PositiveIntegerField(default=4)
+    limit = models.PositiveIntegerField(null=True, blank=True, help_text='Stop after this many customers')
+
+    last_customer_id = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    applied = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    failed_customer_ids = models.JSONField(default=list, blank=True)
+
+    resume_at = models.DateTimeField(null=True, blank=True)
+    error_message = models.TextField(blank=True)
+
+    # The runner working on the backfill; an expired lease may be taken over
+    lease_token = models.CharField(max_length=32, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['tenant', '-created_at'], name='backfill_tenant_created'),
+        ]
+
+    def __str__(self):
+        return f'License backfill #{self.pk} - {self.status}'
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+
+    def mark_running(self):
+        self.status = 'running'
+        self.resume_at = None
+        self.save(update_fields=['status', 'resume_at', 'updated_at'])
+
+    def mark_paused(self, resume_at):
+        self.status = 'paused'
+        self.resume_at = resume_at
+        self.save(update_fields=['status', 'resume_at', 'updated_at'])
+
+    def mark_completed(self):
+        self.status = 'completed'
+        self.completed_at = timezone.now()
+        self.save(update_fields=['status', 'completed_at', 'updated_at'])
+
+    def mark_failed(self, error_message):
+        self.status = 'failed'
+        self.error_message = error_message
+        self.completed_at = timezone.now()
+        self.save(update_fields=['status', 'error_message', 'completed_at', 'updated_at'])
+
+    def take_lease(self, seconds):
+        """Claim the backfill for this runner; False while another holds it."""
+        now = timezone.now()
+        token = uuid.uuid4().hex
+        claimed = (
+            LicenseBackfill.objects.filter(pk=self.pk)
+            .filter(Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now))
+            .update(lease_token=token, lease_expires_at=now + timedelta(seconds=seconds))
+        )
+        if claimed:
+            self.lease_token, self.lease_expires_at = token, now + timedelta(seconds=seconds)
+        return bool(claimed)
+
+    def renew_lease(self, seconds):
+        """Extend this runner's lease; False if it was taken over or the backfill finished."""
+        expires_at = timezone.now() + timedelta(seconds=seconds)
+        renewed = (
+            LicenseBackfill.objects.filter(pk=self.pk, lease_token=self.lease_token)
+            .exclude(status__in=['completed', 'failed'])
+            .update(lease_expires_at=expires_at)
+        )
+        if renewed:
+            self.lease_expires_at = expires_at
+        return bool(renewed)
+
+    def release_lease(self):
+        LicenseBackfill.objects.filter(pk=self.pk, lease_token=self.lease_token).update(
+            lease_token='', lease_expires_at=None,
+        )
+        self.lease_token, self.lease_expires_at = '', None
+
+class OCRCallRecord(TenantModel):
+    """
+    One vision model call made for a tenant, or a result served from the
+    OCR result cache.
+
+    Written in batches off the request path by
+    ``apps.automation.integration.telemetry``, which also adds each record
+    to its OCRUsageBucket. Old records are pruned; the buckets keep the
+    history.
+    """
+    OUTCOME_CHOICES = [
+        ('ok', 'Succeeded'),
+        ('cached', 'Cache hit'),
+        ('error', 'Failed'),
+        ('rate_limited', 'Rate limited'),
+        ('unavailable', 'Circuit open'),
+    ]
+
+    parser = models.CharField(max_length=50, blank=True)
+    model = models.CharField(max_length=100)
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES)
+    input_bytes = models.PositiveIntegerField(default=0)
+    tokens_in = models.PositiveIntegerField(null=True, blank=True)
+    tokens_cached = models.PositiveIntegerField(null=True, blank=True)
+    tokens_out = models.PositiveIntegerField(null=True, blank=True)
+    cost_usd = models.DecimalField(max_digits=12, decimal_places=6, null=True, blank=True)
+    latency_ms = models.IntegerField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    cache_hit = models.BooleanField(default=False)
+    error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'OCR call'
+        verbose_name_plural = 'OCR calls'
+        indexes = [
+            models.Index(fields=['tenant', '-created_at'], name='ocrcall_tenant_created'),
+            models.Index(fields=['created_at'], name='ocrcall_created'),
+        ]
+
+    def __str__(self):
+        return f'{self.parser or "OCR"} call to {self.model} - {self.outcome}'
+
+
+class OCRUsageBucket(TenantModel):
+    """
+    OCR calls of one tenant, parser and model in one hour, pre-aggregated
+    for the usage dashboards.
+
+    ``latency_histogram`` counts model calls per bin of
+    ``apps.automation.ocr.telemetry.LATENCY_BOUNDS_MS``; percentiles over
+    any range of buckets come from the summed histograms.
+    """
+    hour = models.DateTimeField()
+    parser = models.CharField(max_length=50, blank=True)
+    model = models.CharField(max_length=100)
+
+    calls = models.PositiveIntegerField(default=0)
+    errors = models.PositiveIntegerField(default=0)
+    cache_hits = models.PositiveIntegerField(default=0)
+    retries = models.PositiveIntegerField(default=0)
+    input_bytes = models.BigIntegerField(default=0)
+    tokens_in = models.BigIntegerField(default=0)
+    tokens_cached = models.BigIntegerField(default=0)
+    tokens_out = models.BigIntegerField(default=0)
+    cost_usd = models.DecimalField(max_digits=14, decimal_places=6, default=0)
+    latency_total_ms = models.BigIntegerField(default=0)
+    latency_histogram = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        ordering = ['-hour']
+        verbose_name = 'OCR usage bucket'
+        verbose_name_plural = 'OCR usage buckets'
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'hour', 'parser', 'model'], name='ocrbucket_unique_hour'),
+        ]
+        indexes = [
+            models.Index(fields=['hour'], name='ocrbucket_hour'),
+        ]
 
-# OCR job tracking models can be added here if needed for async processing
+    def __str__(self):
+        return f'{self.tenant_id} {self.model} {self.hour:%Y-%m-%d %H:00}'
@@ -6,8 +6,47 @@ from .client import (
     OpenRouterAPIError,
     OpenRouterAuthError,
     OpenRouterRateLimitError,
+    OpenRouterConnectionError,
+    OpenRouterUnavailableError,
     VisionRequest,
     VisionResponse,
+    VisionStream,
+)
+from .streaming import (
+    IncrementalJSONParser,
+    StreamEvent,
+)
+from .cache import (
+    ResultCache,
+    InMemoryResultCache,
+)
+from .resilience import (
+    RetryPolicy,
+    CircuitBreaker,
+    Metrics,
+)
+from .ratelimit import (
+    RateLimit,
+    RateLimitDecision,
+    RedisTokenBucket,
+    LocalTokenBucket,
+)
+from .barcode import (
+    parse_aamva,
+    read_license_barcode,
+)
+from .preprocess import (
+    PreprocessConfig,
+    preprocess_image,
+)
+from .imagehash import (
+    ImageHashes,
+    compute_image_hashes,
+)
+from .transport import (
+    TransportConfig,
+    configure_transport,
+    close_transports,
 )
 from .parsers import (
     LicenseParser,
@@ -27,8 +66,39 @@ __all__ = [
     'OpenRouterAPIError',
     'OpenRouterAuthError',
     'OpenRouterRateLimitError',
+    'OpenRouterConnectionError',
+    'OpenRouterUnavailableError',
     'VisionRequest',
     'VisionResponse',
+    'VisionStream',
+    # Streaming
+    'IncrementalJSONParser',
+    'StreamEvent',
+    # Result cache
+    'ResultCache',
+    'InMemoryResultCache',
+    # Retries and circuit breaking
+    'RetryPolicy',
+    'CircuitBreaker',
+    'Metrics',
+    # Rate limiting
+    'RateLimit',
+    'RateLimitDecision',
+    'RedisTokenBucket',
+    'LocalTokenBucket',
+    # License barcodes
+    'parse_aamva',
+    'read_license_barcode',
+    # Preprocessing
+    'PreprocessConfig',
+    'preprocess_image',
+    # Duplicate detection
+    'ImageHashes',
+    'compute_image_hashes',
+    # Transport
+    'TransportConfig',
+    'configure_transport',
+    'close_transports',
     # Parsers
     'LicenseParser',
     'InsuranceParser',
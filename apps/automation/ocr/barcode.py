@@ -0,0 +1,257 @@
+"""
+Offline reading of the PDF417 barcode on the back of a driver's license.
+
+US and Canadian licenses encode their printed fields in an AAMVA PDF417
+barcode. Decoding it locally takes milliseconds and needs no model call, so
+license parsing tries it before falling back to ``LicenseParser``.
+
+Decoding uses the optional ``zxing-cpp`` package; without it
+``decode_pdf417`` always returns None and every license goes to the model.
+``parse_aamva`` is pure Python and turns the decoded text into a
+``LicenseOCRResponse``.
+"""
+import io
+import logging
+import re
+from datetime import date
+from typing import Optional
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .schemas.license import LicenseOCRResponse
+
+logger = logging.getLogger(__name__)
+
+# Model name recorded for results read from the barcode
+BARCODE_MODEL = 'local/pdf417-aamva'
+
+# Without these the barcode result is not used on its own
+REQUIRED_FIELDS = ('license_number', 'first_name', 'last_name', 'date_of_birth', 'expiration_date')
+
+# Counters kept by the license ingestion path, see Metrics
+BARCODE_METRIC_NAMES = ('parses', 'barcode_served', 'barcode_partial', 'barcode_unreadable')
+
+# Confidence reported for barcode results: the data is machine-readable
+BARCODE_CONFIDENCE = 0.99
+
+# Decoding works on the barcode's modules, not fine print; bigger images
+# only cost time
+DECODE_MAX_DIMENSION = 2400
+
+SEX_CODES = {'1': 'M', '2': 'F', '9': 'X', 'M': 'M', 'F': 'F', 'X': 'X'}
+
+_HEADER = re.compile(r'(?:ANSI|AAMVA) ?(\d{6})(\d{2})')
+_ELEMENT = re.compile(r'^(?:DL|ID)?([DZ][A-Z]{2})(.*)$')
+
+_decoder_warning_logged = False
+
+
+def decoder_available() -> bool:
+    try:
+        import zxingcpp  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def decode_pdf417(image_data: bytes) -> Optional[str]:
+    """Decode the first PDF417 barcode in an image.
+
+    Returns:
+        The barcode text, or None if there is none, it cannot be read, or
+        ``zxing-cpp`` is not installed
+    """
+    global _decoder_warning_logged
+    try:
+        import zxingcpp
+    except ImportError:
+        if not _decoder_warning_logged:
+            logger.warning('zxing-cpp is not installed; license barcodes will not be read')
+            _decoder_warning_logged = True
+        return None
+
+    try:
+        image = Image.open(io.BytesIO(image_data))
+        image.draft('L', (DECODE_MAX_DIMENSION, DECODE_MAX_DIMENSION))
+        image = ImageOps.exif_transpose(image).convert('L')
+    except (UnidentifiedImageError, OSError) as e:
+        logger.debug(f'Cannot decode barcode, image unreadable: {e}')
+        return None
+    if max(image.size) > DECODE_MAX_DIMENSION:
+        image.thumbnail((DECODE_MAX_DIMENSION, DECODE_MAX_DIMENSION))
+
+    for barcode in zxingcpp.read_barcodes(image, formats=zxingcpp.BarcodeFormat.PDF417):
+        if barcode.text:
+            return barcode.text
+    return None
+
+
+def _elements(data: str) -> tuple[dict, int, bool]:
+    """Split AAMVA text into data elements.
+
+    Returns:
+        (elements by id, AAMVA version, whether the header was found)
+    """
+    header = _HEADER.search(data)
+    version = int(header.group(2)) if header else 0
+    body = data[header.end():] if header else data
+
+    elements = {}
+    for line in re.split(r'[\r\n\x1e]+', body):
+        line = line.strip()
+        if not elements:
+            # The first element follows the subfile designators on the header line
+            start = re.search(r'(?:DL|ID)(?=D[A-Z]{2})', line)
+            if start is None:
+                continue
+            line = line[start.start():]
+        match = _ELEMENT.match(line)
+        if match and match.group(1) not in elements:
+            elements[match.group(1)] = match.group(2).strip()
+    return elements, version, header is not None
+
+
+def _parse_date(value: str, canadian: bool) -> Optional[date]:
+    digits = re.sub(r'\D', '', value or '')
+    if len(digits) != 8:
+        return None
+    # US barcodes use MMDDCCYY, Canadian ones and AAMVA 2000 CCYYMMDD;
+    # try the expected order first
+    candidates = [(digits[4:], digits[:2], digits[2:4]), (digits[:4], digits[4:6], digits[6:])]
+    if canadian:
+        candidates.reverse()
+    for year, month, day in candidates:
+        try:
+            return date(int(year), int(month), int(day))
+        except ValueError:
+            continue
+    return None
+
+
+def _height(value: str) -> str:
+    match = re.match(r'(\d+)\s*(IN|CM)?', value or '', re.IGNORECASE)
+    if not match:
+        return value or ''
+    number, unit = int(match.group(1)), (match.group(2) or 'IN').upper()
+    if unit == 'CM':
+        return f'{number}cm'
+    # Older barcodes write feet and inches as FII, e.g. 510
+    if number >= 100:
+        number = number // 100 * 12 + number % 100
+    return f'{number // 12}\'{number % 12}"'
+
+
+def _weight(elements: dict) -> str:
+    if elements.get('DAW'):
+        return f'{int(elements["DAW"])} lbs' if elements['DAW'].isdigit() else elements['DAW']
+    if elements.get('DAX'):
+        return f'{int(elements["DAX"])}kg' if elements['DAX'].isdigit() else elements['DAX']
+    return ''
+
+
+def _zip(value: str) -> str:
+    value = (value or '').strip()
+    if len(value) == 9 and value.isdigit():
+        return value[:5] if value.endswith('0000') else f'{value[:5]}-{value[5:]}'
+    return value
+
+
+def _none_to_blank(value: Optional[str]) -> str:
+    return '' if (value or '').upper() == 'NONE' else (value or '')
+
+
+def _names(elements: dict) -> tuple[str, str, str]:
+    last = elements.get('DCS') or elements.get('DAB', '')
+    first = elements.get('DAC', '')
+    middle = elements.get('DAD', '')
+    if not first and elements.get('DCT'):
+        given = re.split(r'[, ]+', elements['DCT'], maxsplit=1)
+        first, middle = given[0], middle or (given[1] if len(given) > 1 else '')
+    if not (first and last) and elements.get('DAA'):
+        parts = [part.strip() for part in elements['DAA'].split(',')]
+        last = last or parts[0]
+        first = first or (parts[1] if len(parts) > 1 else '')
+        middle = middle or (parts[2] if len(parts) > 2 else '')
+    return first, middle, last
+
+
+def parse_aamva(data: str) -> LicenseOCRResponse:
+    """Build a LicenseOCRResponse from decoded AAMVA barcode text.
+
+    Handles AAMVA 2000 (version 1) through the current version, where
+    element names and date orders changed. ``issuing_authority`` is the
+    jurisdiction code from the address, e.g. 'TX'.
+
+    Raises:
+        ValueError: If the text is not AAMVA license data
+    """
+    elements, version, has_header = _elements(data)
+    if not has_header or 'DAQ' not in elements:
+        raise ValueError('Not an AAMVA license barcode')
+
+    country = elements.get('DCG', 'USA') or 'USA'
+    canadian = country == 'CAN' or version <= 1
+    first, middle, last = _names(elements)
+    donor = elements.get('DDK')
+
+    return LicenseOCRResponse(
+        country=country,
+        issuing_authority=elements.get('DAJ', ''),
+        license_number=elements['DAQ'],
+        license_class=_none_to_blank(elements.get('DCA') or elements.get('DAR')),
+        issue_date=_parse_date(elements.get('DBD'), canadian),
+        expiration_date=_parse_date(elements.get('DBA'), canadian),
+        first_name=first,
+        middle_name=_none_to_blank(middle),
+        last_name=last,
+        date_of_birth=_parse_date(elements.get('DBB'), canadian),
+        address={
+            'street': ' '.join(filter(None, [elements.get('DAG'), elements.get('DAH')])),
+            'city': elements.get('DAI', ''),
+            'state': elements.get('DAJ', ''),
+            'zip_code': _zip(elements.get('DAK')),
+            'country': country,
+        },
+        gender=SEX_CODES.get(elements.get('DBC', ''), ''),
+        height=_height(elements.get('DAU', '')),
+        weight=_weight(elements),
+        eye_color=elements.get('DAY', ''),
+        hair_color=elements.get('DAZ', ''),
+        restrictions=_none_to_blank(elements.get('DCB') or elements.get('DAS')),
+        endorsements=_none_to_blank(elements.get('DCD') or elements.get('DAT')),
+        donor_status=True if donor == '1' else None,
+        confidence=BARCODE_CONFIDENCE,
+    )
+
+
+def read_license_barcode(image_data: bytes) -> Optional[LicenseOCRResponse]:
+    """Decode and parse the barcode on the back of a license.
+
+    Returns:
+        The parsed license, or None if no AAMVA barcode could be read
+    """
+    text = decode_pdf417(image_data)
+    if not text:
+        return None
+    try:
+        return parse_aamva(text)
+    except ValueError as e:
+        logger.info(f'Ignoring license barcode: {e}')
+        return None
+
+
+def missing_fields(result: LicenseOCRResponse) -> list[str]:
+    """Required fields a barcode result lacks."""
+    return [name for name in REQUIRED_FIELDS if not getattr(result, name)]
+
+
+def merge_barcode_result(barcode: LicenseOCRResponse, model_result: LicenseOCRResponse) -> LicenseOCRResponse:
+    """Overlay the fields a barcode provided onto a model result.
+
+    Barcode values win where present; the model fills the gaps and keeps
+    its own confidence and photo detection.
+    """
+    data = model_result.model_dump()
+    for name, value in barcode.model_dump(exclude_defaults=True, exclude={'confidence'}).items():
+        data[name] = {**data[name], **value} if isinstance(value, dict) else value
+    return LicenseOCRResponse.model_validate(data)
@@ -0,0 +1,123 @@
+"""
+Content-addressed cache for parsed OCR results.
+
+Results are keyed by the SHA-256 of the image bytes plus everything else that
+determines the model's answer: the parser class, a hash of its prompts and
+the model name. Re-running a parser on an unchanged image therefore returns
+the stored, already validated result without an API call, while editing a
+prompt or switching models naturally misses.
+
+Values are stored as the JSON-mode ``model_dump`` of the pydantic response
+and validated again on read. The storage backend is pluggable: this module
+ships an in-process LRU; the Django app supplies one backed by its cache
+framework.
+"""
+import hashlib
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 1000
+
+
+def prompt_version(*prompts: str) -> str:
+    """Short hash identifying a set of prompt texts."""
+    digest = hashlib.sha256()
+    for prompt in prompts:
+        digest.update(prompt.encode())
+        digest.update(b'\0')
+    return digest.hexdigest()[:12]
+
+
+def make_cache_key(images: Iterable[bytes], parser: str, version: str, model: str) -> str:
+    """Build the cache key for one parser call.
+
+    Args:
+        images: Raw bytes of every image sent, in request order
+        parser: Parser class name
+        version: Prompt version (see ``prompt_version``)
+        model: Model the request is sent to
+
+    Returns:
+        Key string, safe for memcached/redis-style backends
+    """
+    image_hashes = '+'.join(hashlib.sha256(image).hexdigest() for image in images)
+    return f'ocr:{parser}:{version}:{model}:{hashlib.sha256(image_hashes.encode()).hexdigest()}'
+
+
+class ResultCache(ABC):
+    """Storage for cached OCR results, as JSON-compatible dicts."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[dict]:
+        """Return the stored result, or None on a miss."""
+
+    @abstractmethod
+    def set(self, key: str, value: dict) -> None:
+        """Store a result."""
+
+    def for_namespace(self, namespace: str) -> 'ResultCache':
+        """Return a view of this cache whose keys are isolated under ``namespace``.
+
+        Use one namespace per tenant so results never cross tenants even
+        when they upload identical images.
+        """
+        return NamespacedResultCache(self, namespace)
+
+
+class NamespacedResultCache(ResultCache):
+    """Prefixes every key with a namespace before delegating."""
+
+    def __init__(self, cache: ResultCache, namespace: str):
+        self.cache = cache
+        self.namespace = namespace
+
+    def get(self, key: str) -> Optional[dict]:
+        return self.cache.get(f'{self.namespace}:{key}')
+
+    def set(self, key: str, value: dict) -> None:
+        self.cache.set(f'{self.namespace}:{key}', value)
+
+
+class InMemoryResultCache(ResultCache):
+    """Thread-safe in-process LRU cache with a TTL.
+
+    Args:
+        max_entries: Entries kept before the least recently used is evicted
+        ttl: Seconds an entry stays valid
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, tuple[float, dict]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: dict) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
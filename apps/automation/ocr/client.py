@@ -4,21 +4,32 @@ OpenRouter API client for vision model requests.
 This module provides a portable, framework-independent client for interacting
 with the OpenRouter API for OCR and image analysis tasks.
 """
+import asyncio
 import base64
 import json
 import logging
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional, Union
+from typing import Callable, Iterator, Optional, Union
 
 import httpx
 
+from .resilience import CircuitBreaker, Metrics, RetryPolicy, parse_retry_after
+from .streaming import iter_sse_data
+from .telemetry import CallRecord, usage_fields
+from .transport import get_shared_async_transport, get_shared_transport, get_transport_config
+
 logger = logging.getLogger(__name__)
 
-OPENROUTER_API_URL = 'https://openrouter.ai/api/v1/chat/completions'
+OPENROUTER_BASE_URL = 'https://openrouter.ai/api/v1'
+OPENROUTER_API_URL = f'{OPENROUTER_BASE_URL}/chat/completions'
 DEFAULT_MODEL = 'anthropic/claude-3.5-sonnet'
 DEFAULT_TIMEOUT = 60.0
 
+# Breakpoint ending a prompt prefix the provider may cache
+CACHE_CONTROL = {'type': 'ephemeral'}
+
 
 class OpenRouterError(Exception):
     """Base exception for OpenRouter client errors."""
@@ -27,10 +38,12 @@ class OpenRouterError(Exception):
 
 class OpenRouterAPIError(OpenRouterError):
     """Exception for API-level errors."""
-    def __init__(self, message: str, status_code: Optional[int] = None, response_body: Optional[str] = None):
+    def __init__(self, message: str, status_code: Optional[int] = None, response_body: Optional[str] = None,
+                 retry_after: Optional[float] = None):
         super().__init__(message)
         self.status_code = status_code
         self.response_body = response_body
+        self.retry_after = retry_after
 
 
 class OpenRouterRateLimitError(OpenRouterAPIError):
@@ -43,6 +56,19 @@ class OpenRouterAuthError(OpenRouterAPIError):
     pass
 
 
+class OpenRouterConnectionError(OpenRouterAPIError):
+    """Exception for connection failures and timeouts."""
+    pass
+
+
+class OpenRouterUnavailableError(OpenRouterError):
+    """Raised without calling the API while the model's circuit is open."""
+    def __init__(self, model: str, retry_after: Optional[float] = None):
+        super().__init__(f'{model} is temporarily unavailable, please try again shortly')
+        self.model = model
+        self.retry_after = retry_after
+
+
 @dataclass
 class VisionRequest:
     """Request structure for vision model API calls."""
@@ -53,15 +79,91 @@ class VisionRequest:
     model: str = DEFAULT_MODEL
     max_tokens: int = 4096
     temperature: float = 0.1
+    metadata: dict = field(default_factory=dict)
 
 
 @dataclass
 class VisionResponse:
-    """Response structure from vision model API calls."""
+    """Response structure from vision model API calls.
+
+    ``metadata`` carries request measurements: ``payload_bytes`` and
+    ``latency_ms`` from the client, plus anything the caller put in the
+    request's metadata, e.g. image preprocessing figures.
+    """
     content: str
     model: str
     usage: dict
     raw_response: dict
+    metadata: dict = field(default_factory=dict)
+
+
+class VisionStream:
+    """A completion streamed as the model writes it.
+
+    Iterating yields the message content piece by piece. Once the stream is
+    exhausted ``response`` holds the whole VisionResponse, as
+    ``send_vision_request`` would have returned it; its metadata adds
+    ``first_token_ms``, the wait for the first piece of content.
+
+    The request is only sent when iteration starts, so errors are raised
+    from the loop. ``on_finish`` is called with the response or the error,
+    and the time iteration started, once the stream ends.
+    """
+
+    def __init__(self, chunks: Iterator[dict], model: str, metadata: dict,
+                 on_finish: Optional[Callable] = None):
+        self._chunks = chunks
+        self.model = model
+        self.metadata = metadata
+        self.on_finish = on_finish
+        self.response: Optional[VisionResponse] = None
+
+    def __iter__(self) -> Iterator[str]:
+        started = time.perf_counter()
+        try:
+            yield from self._read(started)
+        except Exception as e:
+            if self.on_finish is not None:
+                self.on_finish(None, e, started)
+            raise
+        if self.on_finish is not None:
+            self.on_finish(self.response, None, started)
+
+    def _read(self, started: float) -> Iterator[str]:
+        parts = []
+        model, usage, last_chunk = self.model, {}, {}
+        for chunk in self._chunks:
+            if 'error' in chunk:
+                error = chunk['error'] if isinstance(chunk['error'], dict) else {'message': chunk['error']}
+                code = error.get('code')
+                raise OpenRouterAPIError(
+                    f'API request failed: {error.get("message", "stream error")}',
+                    status_code=code if isinstance(code, int) else None,
+                    response_body=json.dumps(chunk),
+                )
+            last_chunk = chunk
+            model = chunk.get('model', model)
+            usage = chunk.get('usage') or usage
+            for choice in chunk.get('choices') or []:
+                content = (choice.get('delta') or {}).get('content')
+                if content:
+                    if not parts:
+                        self.metadata['first_token_ms'] = round((time.perf_counter() - started) * 1000, 1)
+                    parts.append(content)
+                    yield content
+
+        self.response = VisionResponse(
+            content=''.join(parts),
+            model=model,
+            usage=usage,
+            raw_response=last_chunk,
+            metadata=self.metadata,
+        )
+
+
+def chat_completions_url(base_url: str) -> str:
+    """Chat completions endpoint of an OpenRouter-compatible API at ``base_url``."""
+    return f'{base_url.rstrip("/")}/chat/completions'
 
 
 def encode_image_base64(image_data: bytes) -> str:
@@ -107,21 +209,46 @@ class OpenRouterClient:
         timeout: float = DEFAULT_TIMEOUT,
         site_url: Optional[str] = None,
         site_name: Optional[str] = None,
+        api_url: str = OPENROUTER_API_URL,
+        retry: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        metrics: Optional[Metrics] = None,
+        recorder: Optional[Callable[[CallRecord], None]] = None,
+        prompt_cache: bool = True,
     ):
         """Initialize the OpenRouter client.
 
+        Requests go through the process-wide pooled transport (see
+        ``transport``), so creating many clients, e.g. one per tenant, does
+        not multiply connections.
+
         Args:
             api_key: OpenRouter API key
             model: Default model to use for requests
             timeout: Request timeout in seconds
             site_url: Optional site URL for OpenRouter analytics
             site_name: Optional site name for OpenRouter analytics
+            api_url: Chat completions endpoint (override for testing)
+            retry: Retry policy for rate limits, 5xx and connection errors;
+                without one every request is tried once
+            breaker: Circuit breaker failing fast while a model is degraded
+            metrics: Counters for attempts, retries and failures
+            recorder: Called with a CallRecord after every model call (see
+                ``telemetry``); its errors are logged, never raised
+            prompt_cache: Mark system prompts as cacheable prefixes (see
+                ``_system_message``)
         """
         self.api_key = api_key
         self.model = model
         self.timeout = timeout
         self.site_url = site_url
         self.site_name = site_name
+        self.api_url = api_url
+        self.retry = retry
+        self.breaker = breaker
+        self.metrics = metrics
+        self.recorder = recorder
+        self.prompt_cache = prompt_cache
 
     def _build_headers(self) -> dict:
         """Build request headers."""
@@ -135,6 +262,23 @@ class OpenRouterClient:
             headers['X-Title'] = self.site_name
         return headers
 
+    def _system_message(self, system_prompt: str) -> dict:
+        """Build the system message, its prompt marked as a cacheable prefix.
+
+        The system prompts are long and the same for every request a parser
+        makes, while the images after them change. Marking the prompt with
+        a ``cache_control`` breakpoint lets providers that need one
+        (Anthropic, Gemini) read it from their prompt cache instead of
+        processing it again; providers that cache prefixes on their own
+        ignore the marker. Cache reads show up in the response's ``usage``.
+        """
+        if not self.prompt_cache:
+            return {'role': 'system', 'content': system_prompt}
+        return {
+            'role': 'system',
+            'content': [{'type': 'text', 'text': system_prompt, 'cache_control': dict(CACHE_CONTROL)}],
+        }
+
     def _build_vision_payload(self, request: VisionRequest) -> dict:
         """Build the API payload for a vision request."""
         image_base64 = encode_image_base64(request.image_data)
@@ -144,10 +288,7 @@ class OpenRouterClient:
             'max_tokens': request.max_tokens,
             'temperature': request.temperature,
             'messages': [
-                {
-                    'role': 'system',
-                    'content': request.system_prompt,
-                },
+                self._system_message(request.system_prompt),
                 {
                     'role': 'user',
                     'content': [
@@ -180,7 +321,8 @@ class OpenRouterClient:
         Args:
             system_prompt: System prompt for the model
             user_prompt: User prompt for the model
-            images: List of dicts with 'data' (bytes) and 'media_type' (str) keys
+            images: List of dicts with 'data' (bytes) and 'media_type' (str) keys,
+                and optionally a 'label' (str) sent as text just before the image
             model: Model to use for the request
             max_tokens: Maximum tokens in response
             temperature: Model temperature
@@ -191,6 +333,8 @@ class OpenRouterClient:
         content = []
 
         for image in images:
+            if image.get('label'):
+                content.append({'type': 'text', 'text': image['label']})
             image_base64 = encode_image_base64(image['data'])
             media_type = image.get('media_type', 'image/jpeg')
             content.append({
@@ -210,10 +354,7 @@ class OpenRouterClient:
             'max_tokens': max_tokens,
             'temperature': temperature,
             'messages': [
-                {
-                    'role': 'system',
-                    'content': system_prompt,
-                },
+                self._system_message(system_prompt),
                 {
                     'role': 'user',
                     'content': content,
@@ -221,57 +362,224 @@ class OpenRouterClient:
             ],
         }
 
-    def _handle_error_response(self, response: httpx.Response) -> None:
-        """Handle error responses from the API."""
+    def _error_from_response(self, response: httpx.Response) -> OpenRouterAPIError:
+        """Build the exception for an error response."""
         try:
             error_body = response.json()
             error_message = error_body.get('error', {}).get('message', response.text)
         except Exception:
             error_message = response.text
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
 
         if response.status_code == 401:
-            raise OpenRouterAuthError(
-                f'Authentication failed: {error_message}',
-                status_code=response.status_code,
-                response_body=response.text,
-            )
+            error_class, message = OpenRouterAuthError, f'Authentication failed: {error_message}'
         elif response.status_code == 429:
-            raise OpenRouterRateLimitError(
-                f'Rate limit exceeded: {error_message}',
-                status_code=response.status_code,
-                response_body=response.text,
-            )
+            error_class, message = OpenRouterRateLimitError, f'Rate limit exceeded: {error_message}'
         else:
-            raise OpenRouterAPIError(
-                f'API request failed: {error_message}',
-                status_code=response.status_code,
-                response_body=response.text,
-            )
-
-    def send_vision_request(self, request: VisionRequest) -> VisionResponse:
-        """Send a synchronous vision request to the API.
+            error_class, message = OpenRouterAPIError, f'API request failed: {error_message}'
+        return error_class(
+            message,
+            status_code=response.status_code,
+            response_body=response.text,
+            retry_after=retry_after,
+        )
 
-        Args:
-            request: VisionRequest object containing the request details
+    def _handle_error_response(self, response: httpx.Response) -> None:
+        """Handle error responses from the API."""
+        raise self._error_from_response(response)
+
+    def _before_attempt(self, model: str) -> None:
+        if self.breaker is not None:
+            retry_after = self.breaker.blocked(model)
+            if retry_after is not None:
+                raise OpenRouterUnavailableError(model, retry_after=retry_after)
+        if self.metrics is not None:
+            self.metrics.incr('attempts', model)
+
+    def _after_attempt(self, model: str, attempt: int, error: Optional[OpenRouterAPIError]) -> Optional[float]:
+        """Record an attempt's outcome; returns seconds to wait before retrying, or None."""
+        upstream_failure = error is not None and (error.status_code is None or error.status_code >= 500)
+        if self.breaker is not None:
+            # Only connection errors and 5xx say anything about upstream health
+            if upstream_failure:
+                self.breaker.record_failure(model)
+            else:
+                self.breaker.record_success(model)
+        if error is None:
+            return None
+        if self.metrics is not None:
+            self.metrics.incr('failures', model)
+
+        if self.retry is None or not self.retry.should_retry(attempt, error.status_code):
+            return None
+        delay = self.retry.delay(attempt, error.retry_after)
+        if delay is not None:
+            logger.info(f'Retrying {model} request in {delay:.1f}s after attempt {attempt}: {error}')
+            if self.metrics is not None:
+                self.metrics.incr('retries', model)
+        return delay
+
+    def _send(self, payload: dict) -> tuple[httpx.Response, dict]:
+        """POST a payload with retries and circuit breaking.
 
         Returns:
-            VisionResponse object with the API response
+            The successful response and its measurements
 
         Raises:
-            OpenRouterAuthError: If authentication fails
-            OpenRouterRateLimitError: If rate limit is exceeded
-            OpenRouterAPIError: For other API errors
+            OpenRouterUnavailableError: If the model's circuit is open
+            OpenRouterAPIError: For the last error once retries are exhausted
         """
-        headers = self._build_headers()
-        payload = self._build_vision_payload(request)
+        model = payload['model']
+        attempt = 0
+        while True:
+            attempt += 1
+            self._before_attempt(model)
+            error = None
+            try:
+                response, measurements = self._post(payload)
+            except httpx.TransportError as e:
+                error = OpenRouterConnectionError(f'Request to OpenRouter failed: {e}')
+            else:
+                if response.status_code != 200:
+                    error = self._error_from_response(response)
+            delay = self._after_attempt(model, attempt, error)
+            if error is None:
+                measurements['attempts'] = attempt
+                return response, measurements
+            if delay is None:
+                error.attempts = attempt
+                raise error
+            time.sleep(delay)
+
+    async def _send_async(self, payload: dict) -> tuple[httpx.Response, dict]:
+        """Async counterpart of ``_send``."""
+        model = payload['model']
+        attempt = 0
+        while True:
+            attempt += 1
+            self._before_attempt(model)
+            error = None
+            try:
+                response, measurements = await self._post_async(payload)
+            except httpx.TransportError as e:
+                error = OpenRouterConnectionError(f'Request to OpenRouter failed: {e}')
+            else:
+                if response.status_code != 200:
+                    error = self._error_from_response(response)
+            delay = self._after_attempt(model, attempt, error)
+            if error is None:
+                measurements['attempts'] = attempt
+                return response, measurements
+            if delay is None:
+                error.attempts = attempt
+                raise error
+            await asyncio.sleep(delay)
+
+    def _post(self, payload: dict) -> tuple[httpx.Response, dict]:
+        """POST a payload through the shared connection pool.
 
-        with httpx.Client(timeout=self.timeout) as client:
+        Returns:
+            The response and its measurements (payload size, latency)
+        """
+        body = json.dumps(payload).encode()
+        started = time.perf_counter()
+        with httpx.Client(
+            transport=get_shared_transport(),
+            timeout=get_transport_config().timeout(self.timeout),
+        ) as client:
             response = client.post(
-                OPENROUTER_API_URL,
-                headers=headers,
-                json=payload,
+                self.api_url,
+                headers=self._build_headers(),
+                content=body,
+            )
+        return response, self._measurements(body, started)
+
+    async def _post_async(self, payload: dict) -> tuple[httpx.Response, dict]:
+        """POST a payload through the running loop's shared connection pool."""
+        body = json.dumps(payload).encode()
+        started = time.perf_counter()
+        async with httpx.AsyncClient(
+            transport=get_shared_async_transport(),
+            timeout=get_transport_config().timeout(self.timeout),
+        ) as client:
+            response = await client.post(
+                self.api_url,
+                headers=self._build_headers(),
+                content=body,
             )
+        return response, self._measurements(body, started)
+
+    def _post_stream(self, client: httpx.Client, body: bytes) -> httpx.Response:
+        """Send a streaming POST; the response body is left unread."""
+        request = client.build_request('POST', self.api_url, headers=self._build_headers(), content=body)
+        return client.send(request, stream=True)
+
+    def _stream_chunks(self, payload: dict, measurements: dict) -> Iterator[dict]:
+        """Send a streaming request and yield its decoded event chunks.
 
+        Opening the stream is retried like ``_send``; once content has
+        started arriving a failure is raised instead, since the caller has
+        already consumed part of the answer. ``measurements`` is filled in
+        as the stream progresses.
+        """
+        model = payload['model']
+        body = json.dumps(payload).encode()
+        started = time.perf_counter()
+        with httpx.Client(
+            transport=get_shared_transport(),
+            timeout=get_transport_config().timeout(self.timeout),
+        ) as client:
+            attempt = 0
+            while True:
+                attempt += 1
+                self._before_attempt(model)
+                error = response = None
+                try:
+                    response = self._post_stream(client, body)
+                except httpx.TransportError as e:
+                    error = OpenRouterConnectionError(f'Request to OpenRouter failed: {e}')
+                else:
+                    if response.status_code != 200:
+                        response.read()
+                        response.close()
+                        error = self._error_from_response(response)
+                delay = self._after_attempt(model, attempt, error)
+                if error is None:
+                    break
+                if delay is None:
+                    error.attempts = attempt
+                    raise error
+                time.sleep(delay)
+
+            measurements.update(payload_bytes=len(body), attempts=attempt)
+            try:
+                for data in iter_sse_data(response.iter_lines()):
+                    if data.strip() == '[DONE]':
+                        break
+                    try:
+                        yield json.loads(data)
+                    except ValueError:
+                        logger.debug(f'Skipping undecodable stream event: {data[:200]}')
+            except httpx.TransportError as e:
+                raise OpenRouterConnectionError(f'Stream from OpenRouter failed: {e}') from e
+            finally:
+                response.close()
+                measurements['latency_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+    @staticmethod
+    def _measurements(body: bytes, started: float) -> dict:
+        return {
+            'payload_bytes': len(body),
+            'latency_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    def _parse_response(
+        self,
+        response: httpx.Response,
+        model: str,
+        metadata: Optional[dict] = None,
+    ) -> VisionResponse:
+        """Raise for error responses, otherwise build a VisionResponse."""
         if response.status_code != 200:
             self._handle_error_response(response)
 
@@ -279,11 +587,92 @@ class OpenRouterClient:
 
         return VisionResponse(
             content=data['choices'][0]['message']['content'],
-            model=data.get('model', request.model),
+            model=data.get('model', model),
             usage=data.get('usage', {}),
             raw_response=data,
+            metadata=metadata or {},
         )
 
+    def _record(self, model: str, metadata: dict, started: float,
+                response: Optional[VisionResponse] = None, error: Optional[Exception] = None) -> None:
+        """Hand a CallRecord for a finished call to the recorder."""
+        if self.recorder is None:
+            return
+        if error is None:
+            outcome = 'ok'
+        elif isinstance(error, OpenRouterUnavailableError):
+            outcome = 'unavailable'
+        elif isinstance(error, OpenRouterRateLimitError):
+            outcome = 'rate_limited'
+        else:
+            outcome = 'error'
+        measurements = response.metadata if response is not None else metadata
+        self._emit(CallRecord(
+            model=model,
+            parser=metadata.get('parser', ''),
+            outcome=outcome,
+            input_bytes=metadata.get('image_bytes') or measurements.get('payload_bytes') or 0,
+            latency_ms=None if outcome == 'unavailable' else round((time.perf_counter() - started) * 1000, 1),
+            attempts=measurements.get('attempts') if response is not None else getattr(error, 'attempts', 0),
+            error=str(error)[:255] if error is not None else '',
+            **usage_fields(response.usage if response is not None else None),
+        ))
+
+    def _emit(self, record: CallRecord) -> None:
+        try:
+            self.recorder(record)
+        except Exception:
+            logger.exception('OCR call recorder failed')
+
+    def record_cache_hit(self, model: str, parser: str = '', input_bytes: int = 0) -> None:
+        """Tell the recorder a result was answered from the cache."""
+        if self.recorder is not None:
+            self._emit(CallRecord(model=model, parser=parser, outcome='cached', input_bytes=input_bytes))
+
+    def _complete(self, payload: dict, metadata: dict) -> VisionResponse:
+        """Send a payload and build its VisionResponse, recording the call."""
+        model = payload['model']
+        started = time.perf_counter()
+        try:
+            response, measurements = self._send(payload)
+            result = self._parse_response(response, model, {**metadata, **measurements})
+        except Exception as e:
+            self._record(model, metadata, started, error=e)
+            raise
+        self._record(model, metadata, started, response=result)
+        return result
+
+    async def _complete_async(self, payload: dict, metadata: dict) -> VisionResponse:
+        """Async counterpart of ``_complete``."""
+        model = payload['model']
+        started = time.perf_counter()
+        try:
+            response, measurements = await self._send_async(payload)
+            result = self._parse_response(response, model, {**metadata, **measurements})
+        except Exception as e:
+            self._record(model, metadata, started, error=e)
+            raise
+        self._record(model, metadata, started, response=result)
+        return result
+
+    def send_vision_request(self, request: VisionRequest) -> VisionResponse:
+        """Send a synchronous vision request to the API.
+
+        Args:
+            request: VisionRequest object containing the request details
+
+        Returns:
+            VisionResponse object with the API response
+
+        Raises:
+            OpenRouterAuthError: If authentication fails
+            OpenRouterRateLimitError: If rate limit is exceeded
+            OpenRouterUnavailableError: If the model's circuit is open
+            OpenRouterAPIError: For other API errors
+        """
+        payload = self._build_vision_payload(request)
+        return self._complete(payload, request.metadata)
+
     async def send_vision_request_async(self, request: VisionRequest) -> VisionResponse:
         """Send an asynchronous vision request to the API.
 
@@ -296,28 +685,32 @@ class OpenRouterClient:
         Raises:
             OpenRouterAuthError: If authentication fails
             OpenRouterRateLimitError: If rate limit is exceeded
+            OpenRouterUnavailableError: If the model's circuit is open
             OpenRouterAPIError: For other API errors
         """
-        headers = self._build_headers()
         payload = self._build_vision_payload(request)
+        return await self._complete_async(payload, request.metadata)
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(
-                OPENROUTER_API_URL,
-                headers=headers,
-                json=payload,
-            )
+    def stream_vision_request(self, request: VisionRequest) -> VisionStream:
+        """Send a vision request and stream the answer as it is written.
 
-        if response.status_code != 200:
-            self._handle_error_response(response)
+        Args:
+            request: VisionRequest object containing the request details
 
-        data = response.json()
+        Returns:
+            VisionStream yielding the content; iterate it to send the request
 
-        return VisionResponse(
-            content=data['choices'][0]['message']['content'],
-            model=data.get('model', request.model),
-            usage=data.get('usage', {}),
-            raw_response=data,
+        Raises:
+            Same as ``send_vision_request``, from the iteration
+        """
+        payload = {**self._build_vision_payload(request), 'stream': True}
+        metadata = dict(request.metadata)
+
+        def on_finish(response, error, started):
+            self._record(payload['model'], metadata, started, response=response, error=error)
+
+        return VisionStream(
+            self._stream_chunks(payload, metadata), request.model or self.model, metadata, on_finish=on_finish,
         )
 
     def send_multi_image_request(
@@ -328,6 +721,7 @@ class OpenRouterClient:
         model: str | None = None,
         max_tokens: int = 4096,
         temperature: float = 0.1,
+        metadata: Optional[dict] = None,
     ) -> VisionResponse:
         """Send a synchronous multi-image vision request to the API.
 
@@ -337,10 +731,12 @@ class OpenRouterClient:
         Args:
             system_prompt: System prompt for the model
             user_prompt: User prompt for the model
-            images: List of dicts with 'data' (bytes) and 'media_type' (str) keys
+            images: List of dicts with 'data' (bytes) and 'media_type' (str) keys,
+                and optionally a 'label' (str) identifying the image
             model: Optional model override
             max_tokens: Maximum tokens in response
             temperature: Model temperature
+            metadata: Extra entries for the response metadata
 
         Returns:
             VisionResponse object with the API response
@@ -348,9 +744,9 @@ class OpenRouterClient:
         Raises:
             OpenRouterAuthError: If authentication fails
             OpenRouterRateLimitError: If rate limit is exceeded
+            OpenRouterUnavailableError: If the model's circuit is open
             OpenRouterAPIError: For other API errors
         """
-        headers = self._build_headers()
         payload = self._build_multi_image_payload(
             system_prompt=system_prompt,
             user_prompt=user_prompt,
@@ -360,24 +756,7 @@ class OpenRouterClient:
             temperature=temperature,
         )
 
-        with httpx.Client(timeout=self.timeout) as client:
-            response = client.post(
-                OPENROUTER_API_URL,
-                headers=headers,
-                json=payload,
-            )
-
-        if response.status_code != 200:
-            self._handle_error_response(response)
-
-        data = response.json()
-
-        return VisionResponse(
-            content=data['choices'][0]['message']['content'],
-            model=data.get('model', model or self.model),
-            usage=data.get('usage', {}),
-            raw_response=data,
-        )
+        return self._complete(payload, metadata or {})
 
     async def send_multi_image_request_async(
         self,
@@ -387,6 +766,7 @@ class OpenRouterClient:
         model: str | None = None,
         max_tokens: int = 4096,
         temperature: float = 0.1,
+        metadata: Optional[dict] = None,
     ) -> VisionResponse:
         """Send an asynchronous multi-image vision request to the API.
 
@@ -396,10 +776,12 @@ class OpenRouterClient:
         Args:
             system_prompt: System prompt for the model
             user_prompt: User prompt for the model
-            images: List of dicts with 'data' (bytes) and 'media_type' (str) keys
+            images: List of dicts with 'data' (bytes) and 'media_type' (str) keys,
+                and optionally a 'label' (str) identifying the image
             model: Optional model override
             max_tokens: Maximum tokens in response
             temperature: Model temperature
+            metadata: Extra entries for the response metadata
 
         Returns:
             VisionResponse object with the API response
@@ -407,9 +789,9 @@ class OpenRouterClient:
         Raises:
             OpenRouterAuthError: If authentication fails
             OpenRouterRateLimitError: If rate limit is exceeded
+            OpenRouterUnavailableError: If the model's circuit is open
             OpenRouterAPIError: For other API errors
         """
-        headers = self._build_headers()
         payload = self._build_multi_image_payload(
             system_prompt=system_prompt,
             user_prompt=user_prompt,
@@ -419,24 +801,36 @@ class OpenRouterClient:
             temperature=temperature,
         )
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(
-                OPENROUTER_API_URL,
-                headers=headers,
-                json=payload,
-            )
+        return await self._complete_async(payload, metadata or {})
 
-        if response.status_code != 200:
-            self._handle_error_response(response)
+    def get_key_info(self, timeout: Optional[float] = None) -> dict:
+        """Look up the API key's label, credit limit and usage (``GET /auth/key``).
 
-        data = response.json()
+        The lookup is tried once, without retries or the circuit breaker.
 
-        return VisionResponse(
-            content=data['choices'][0]['message']['content'],
-            model=data.get('model', model or self.model),
-            usage=data.get('usage', {}),
-            raw_response=data,
-        )
+        Args:
+            timeout: Request timeout in seconds; defaults to the client's
+
+        Returns:
+            The ``data`` object of the response
+
+        Raises:
+            OpenRouterAuthError: If the key is rejected
+            OpenRouterConnectionError: On timeouts and connection failures
+            OpenRouterAPIError: For other error responses
+        """
+        base_url = self.api_url.removesuffix('/chat/completions')
+        try:
+            with httpx.Client(
+                transport=get_shared_transport(),
+                timeout=get_transport_config().timeout(timeout or self.timeout),
+            ) as client:
+                response = client.get(f'{base_url}/auth/key', headers=self._build_headers())
+        except httpx.TransportError as e:
+            raise OpenRouterConnectionError(f'Request to OpenRouter failed: {e}') from e
+        if response.status_code != 200:
+            raise self._error_from_response(response)
+        return response.json().get('data', {})
 
     def extract_json_from_response(self, content: str) -> dict:
         """Extract JSON from model response content.
@@ -0,0 +1,109 @@
+"""
+Perceptual image hashes for spotting re-uploaded photos.
+
+Staff often upload the same photo twice: straight from the phone and again
+after it was resized or recompressed by a messenger app, so the bytes (and
+the result cache key) differ while the picture does not. Two 64-bit hashes
+of the picture survive that:
+
+- the average hash (aHash) marks which cells of an 8x8 grayscale thumbnail
+  are brighter than the thumbnail's mean;
+- the perceptual hash (pHash) marks which of the 8x8 lowest frequencies of
+  a 32x32 thumbnail's discrete cosine transform are above their median.
+
+Photos are near-duplicates when both hashes differ in few bits
+(``hamming_distance``). The EXIF orientation is applied first, so a rotated
+copy of the same upload matches too.
+
+The transform only needs 64 coefficients of a 32x32 image and is computed
+in pure Python; data Pillow cannot decode has no hashes.
+"""
+import io
+import math
+from dataclasses import dataclass
+from typing import Optional
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+HASH_SIZE = 8
+# pHash thumbnail side; the hash keeps the lowest HASH_SIZE frequencies
+PHASH_SIZE = 32
+
+# Default hash bits two near-duplicates may differ in, out of 64
+DEFAULT_MAX_DISTANCE = 6
+
+# cos(pi * (2n + 1) * k / 2N) for the HASH_SIZE lowest frequencies k
+_DCT_BASIS = [
+    [math.cos(math.pi * (2 * n + 1) * k / (2 * PHASH_SIZE)) for n in range(PHASH_SIZE)]
+    for k in range(HASH_SIZE)
+]
+
+
+@dataclass(frozen=True)
+class ImageHashes:
+    """aHash and pHash of an image as 16-digit hex strings."""
+    average: str
+    perceptual: str
+
+    def distance(self, other: 'ImageHashes') -> int:
+        """Bits the further apart of the two hashes differ in."""
+        return max(
+            hamming_distance(self.average, other.average),
+            hamming_distance(self.perceptual, other.perceptual),
+        )
+
+    def matches(self, other: 'ImageHashes', max_distance: int = DEFAULT_MAX_DISTANCE) -> bool:
+        """Whether the two images are near-duplicates."""
+        return self.distance(other) <= max_distance
+
+
+def _bits_to_hex(bits: list[bool]) -> str:
+    value = 0
+    for bit in bits:
+        value = (value << 1) | bit
+    return f'{value:0{len(bits) // 4}x}'
+
+
+def _pixels(image: Image.Image, size: int) -> list[int]:
+    """Grayscale pixel values of the image scaled to size x size, row by row."""
+    thumbnail = image.convert('L').resize((size, size), Image.Resampling.LANCZOS)
+    return list(thumbnail.tobytes())
+
+
+def average_hash(image: Image.Image) -> str:
+    pixels = _pixels(image, HASH_SIZE)
+    mean = sum(pixels) / len(pixels)
+    return _bits_to_hex([pixel > mean for pixel in pixels])
+
+
+def perceptual_hash(image: Image.Image) -> str:
+    pixels = _pixels(image, PHASH_SIZE)
+    rows = [pixels[start:start + PHASH_SIZE] for start in range(0, len(pixels), PHASH_SIZE)]
+    # Separable 2D DCT-II, keeping only the lowest frequencies of each pass
+    row_coefficients = [[sum(x * c for x, c in zip(row, basis)) for basis in _DCT_BASIS] for row in rows]
+    coefficients = [
+        sum(row_coefficients[n][u] * basis[n] for n in range(PHASH_SIZE))
+        for basis in _DCT_BASIS
+        for u in range(HASH_SIZE)
+    ]
+    median = sorted(coefficients)[len(coefficients) // 2]
+    return _bits_to_hex([value > median for value in coefficients])
+
+
+def compute_image_hashes(image_data: bytes) -> Optional[ImageHashes]:
+    """Hash an image.
+
+    Returns:
+        ImageHashes, or None if Pillow cannot decode the data
+    """
+    try:
+        with Image.open(io.BytesIO(image_data)) as image:
+            image = ImageOps.exif_transpose(image)
+            return ImageHashes(average=average_hash(image), perceptual=perceptual_hash(image))
+    except (UnidentifiedImageError, OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+
+def hamming_distance(first: str, second: str) -> int:
+    """Bits two hex hashes differ in."""
+    return bin(int(first, 16) ^ int(second, 16)).count('1')
@@ -1,7 +1,7 @@
 from .base import BaseDocumentParser
 from .license import LicenseParser, create_license_parser
 from .insurance import InsuranceParser, create_insurance_parser
-from .damage import DamageParser, create_damage_parser
+from .damage import DamageParser, PackedPhoto, create_damage_parser
 from .dashboard import DashboardParser, create_dashboard_parser
 from .comparison import ComparisonParser, create_comparison_parser
 
@@ -13,6 +13,7 @@ __all__ = [
     'create_insurance_parser',
     'DamageParser',
     'create_damage_parser',
+    'PackedPhoto',
     'DashboardParser',
     'create_dashboard_parser',
     'ComparisonParser',
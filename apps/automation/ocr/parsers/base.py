@@ -1,29 +1,132 @@
 """
 Base parser class for OCR document parsing.
+
+Document parsers can cascade between two models: given a ``fast_model``,
+``parse`` first asks that cheaper, faster model and keeps its answer when
+it validates and its ``confidence`` reaches the parser's
+``cascade_threshold``; otherwise the image goes to the client's model.
+Crisp images are then answered at the fast model's latency and price
+while hard ones still get the stronger model.
 """
+import asyncio
 import logging
 from abc import ABC, abstractmethod
-from typing import TypeVar, Generic, Type
+from typing import Iterator, Optional, TypeVar, Generic, Type
 
 from pydantic import BaseModel, ValidationError
 
-from ..client import OpenRouterClient, VisionRequest, VisionResponse
+from ..cache import ResultCache, make_cache_key, prompt_version
+from ..client import OpenRouterAuthError, OpenRouterClient, OpenRouterError, VisionRequest, VisionResponse
+from ..preprocess import PreprocessConfig, preprocess_image
+from ..streaming import IncrementalJSONParser, StreamEvent
 
 logger = logging.getLogger(__name__)
 
 T = TypeVar('T', bound=BaseModel)
 
+# Counters kept per parser by the cascade, under cascade_metrics_key()
+CASCADE_METRIC_NAMES = (
+    'parses', 'fast_served', 'escalated_confidence', 'escalated_invalid', 'escalated_error',
+)
+
+
+def cascade_metrics_key(parser_name: str) -> str:
+    """Metrics key of a parser's cascade counters, e.g. 'cascade:LicenseParser'."""
+    return f'cascade:{parser_name}'
+
+
+class CachedResultMixin:
+    """Result cache lookups shared by the document and comparison parsers.
+
+    Expects ``cache``, ``system_prompt``, ``user_prompt`` and
+    ``response_model`` on the parser. ``last_cache_hit`` tells the caller
+    whether the most recent call was answered without an API request.
+    """
+    cache: Optional[ResultCache] = None
+    last_cache_hit: bool = False
+
+    @property
+    def prompt_version(self) -> str:
+        """Identifies the prompts in use, so prompt edits miss the result cache."""
+        return prompt_version(self.system_prompt, self.user_prompt)
+
+    def _cache_key(self, images: list[bytes], model: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return make_cache_key(images, type(self).__name__, self.prompt_version, model)
+
+    def _cached_result(self, key: Optional[str]):
+        """Return the cached result for ``key`` and record whether it was a hit."""
+        self.last_cache_hit = False
+        if key is None:
+            return None
+        data = self.cache.get(key)
+        if data is None:
+            return None
+        try:
+            result = self.response_model.model_validate(data)
+        except ValidationError:
+            logger.warning(f'Ignoring cached {type(self).__name__} result that no longer validates')
+            return None
+        self.last_cache_hit = True
+        return result
+
+    def _store_result(self, key: Optional[str], result):
+        if key is not None:
+            self.cache.set(key, result.model_dump(mode='json'))
+        return result
+
+    def _record_cache_hit(self, model: str, images: list[bytes]) -> None:
+        """Report a cached answer to the client's call recorder."""
+        record = getattr(self.client, 'record_cache_hit', None)
+        if record is not None:
+            record(model, type(self).__name__, sum(len(image) for image in images))
+
+
+class BaseDocumentParser(CachedResultMixin, ABC, Generic[T]):
+    """Abstract base class for document parsers.
 
-class BaseDocumentParser(ABC, Generic[T]):
-    """Abstract base class for document parsers."""
+    Subclasses set ``default_preprocess`` to the image preparation suited to
+    their documents (see ``preprocess``) and ``cascade_threshold`` to the
+    lowest confidence at which a fast-model answer is kept.
 
-    def __init__(self, client: OpenRouterClient):
+    After each parse ``last_tier`` is 'fast' or 'full', the tier that
+    answered, and ``last_model`` the model that did.
+    """
+
+    default_preprocess: PreprocessConfig = PreprocessConfig()
+    cascade_threshold: float = 0.85
+
+    def __init__(
+        self,
+        client: OpenRouterClient,
+        cache: Optional[ResultCache] = None,
+        preprocess: Optional[PreprocessConfig] = None,
+        fast_model: Optional[str] = None,
+        cascade_threshold: Optional[float] = None,
+    ):
         """Initialize the parser with an OpenRouter client.
 
         Args:
             client: Configured OpenRouterClient instance
+            cache: Optional result cache; repeat parses of the same image
+                with the same prompts and model are answered from it
+            preprocess: Image preparation settings, overriding
+                ``default_preprocess``
+            fast_model: Model to try before the client's model; None
+                disables the cascade
+            cascade_threshold: Overrides the class ``cascade_threshold``
         """
         self.client = client
+        self.cache = cache
+        self.preprocess = preprocess or self.default_preprocess
+        self.fast_model = fast_model
+        if cascade_threshold is not None:
+            self.cascade_threshold = cascade_threshold
+        self.last_cache_hit = False
+        self.last_metadata: dict = {}
+        self.last_tier: Optional[str] = None
+        self.last_model: Optional[str] = None
 
     @property
     @abstractmethod
@@ -54,7 +157,7 @@ class BaseDocumentParser(ABC, Generic[T]):
         Args:
             image_data: Raw image bytes
             image_media_type: MIME type of the image
-            model: Optional model override
+            model: Optional model override; skips the cascade
 
         Returns:
             Parsed and validated response object
@@ -63,16 +166,20 @@ class BaseDocumentParser(ABC, Generic[T]):
             ValueError: If response cannot be parsed or validated
             OpenRouterError: For API errors
         """
-        request = VisionRequest(
-            system_prompt=self.system_prompt,
-            user_prompt=self.user_prompt,
-            image_data=image_data,
-            image_media_type=image_media_type,
-            model=model or self.client.model,
-        )
-
-        response = self.client.send_vision_request(request)
-        return self._process_response(response)
+        tiers = self._cascade_tiers(model)
+        requests = 0
+        for tier, tier_model in tiers:
+            try:
+                result = self._parse_with(image_data, image_media_type, tier_model)
+            except (ValueError, OpenRouterError) as e:
+                requests += not self.last_cache_hit
+                if not self._escalate_on(e, tier_model, tiers):
+                    raise
+                continue
+            requests += not self.last_cache_hit
+            if self._accept(result, tier_model, tiers):
+                break
+        return self._answered(tier, tier_model, result, requests)
 
     async def parse_async(
         self,
@@ -85,7 +192,7 @@ class BaseDocumentParser(ABC, Generic[T]):
         Args:
             image_data: Raw image bytes
             image_media_type: MIME type of the image
-            model: Optional model override
+            model: Optional model override; skips the cascade
 
         Returns:
             Parsed and validated response object
@@ -94,16 +201,174 @@ class BaseDocumentParser(ABC, Generic[T]):
             ValueError: If response cannot be parsed or validated
             OpenRouterError: For API errors
         """
-        request = VisionRequest(
-            system_prompt=self.system_prompt,
-            user_prompt=self.user_prompt,
-            image_data=image_data,
-            image_media_type=image_media_type,
-            model=model or self.client.model,
+        tiers = self._cascade_tiers(model)
+        requests = 0
+        for tier, tier_model in tiers:
+            try:
+                result = await self._parse_with_async(image_data, image_media_type, tier_model)
+            except (ValueError, OpenRouterError) as e:
+                requests += not self.last_cache_hit
+                if not self._escalate_on(e, tier_model, tiers):
+                    raise
+                continue
+            requests += not self.last_cache_hit
+            if self._accept(result, tier_model, tiers):
+                break
+        return self._answered(tier, tier_model, result, requests)
+
+    def parse_stream(
+        self,
+        image_data: bytes,
+        image_media_type: str = 'image/jpeg',
+        model: str | None = None,
+    ) -> Iterator[StreamEvent]:
+        """Parse a document image, reporting fields as the model writes them.
+
+        Yields a 'field' event for each top-level field of the response
+        model once its value is complete and valid on its own, then a
+        'result' event with the fully validated response. A cached result is
+        replayed as the same events. When the fast model's answer is not
+        kept, the client's model streams the fields again.
+
+        Args:
+            image_data: Raw image bytes
+            image_media_type: MIME type of the image
+            model: Optional model override; skips the cascade
+
+        Raises:
+            ValueError: If the complete response cannot be parsed or validated
+            OpenRouterError: For API errors
+        """
+        tiers = self._cascade_tiers(model)
+        requests = 0
+        for tier, tier_model in tiers:
+            try:
+                result = yield from self._stream_with(image_data, image_media_type, tier_model)
+            except (ValueError, OpenRouterError) as e:
+                requests += not self.last_cache_hit
+                if not self._escalate_on(e, tier_model, tiers):
+                    raise
+                continue
+            requests += not self.last_cache_hit
+            if self._accept(result, tier_model, tiers):
+                break
+        yield StreamEvent('result', self._answered(tier, tier_model, result, requests))
+
+    def _cascade_tiers(self, model: Optional[str]) -> list[tuple[str, str]]:
+        """(tier, model) pairs to try in order."""
+        full = model or self.client.model
+        if model or not self.fast_model or self.fast_model == full:
+            return [('full', full)]
+        self._count('parses')
+        return [('fast', self.fast_model), ('full', full)]
+
+    def _escalate_on(self, error: Exception, model: str, tiers: list) -> bool:
+        """Whether a failed tier should hand over to the next; a bad key fails both."""
+        if model == tiers[-1][1] or isinstance(error, OpenRouterAuthError):
+            return False
+        reason = 'escalated_invalid' if isinstance(error, ValueError) else 'escalated_error'
+        logger.info(f'{type(self).__name__}: {model} failed ({error}), escalating')
+        self._count(reason)
+        return True
+
+    def _accept(self, result: T, model: str, tiers: list) -> bool:
+        """Whether a tier's result is final."""
+        if model == tiers[-1][1]:
+            return True
+        confidence = getattr(result, 'confidence', 0.0) or 0.0
+        if confidence >= self.cascade_threshold:
+            self._count('fast_served')
+            return True
+        logger.info(
+            f'{type(self).__name__}: {model} confidence {confidence:.2f} '
+            f'below {self.cascade_threshold:.2f}, escalating'
         )
+        self._count('escalated_confidence')
+        return False
+
+    def _answered(self, tier: str, model: str, result: T, requests: int) -> T:
+        self.last_tier = tier
+        self.last_model = model
+        self.last_cache_hit = requests == 0
+        return result
+
+    def _count(self, name: str) -> None:
+        metrics = getattr(self.client, 'metrics', None)
+        if metrics is not None:
+            metrics.incr(name, cascade_metrics_key(type(self).__name__))
+
+    def _parse_with(self, image_data: bytes, image_media_type: str, model: str) -> T:
+        """One model's parse, answered from the cache when possible."""
+        key = self._cache_key([image_data], model)
+        cached = self._cached_result(key)
+        if cached is not None:
+            self._record_cache_hit(model, [image_data])
+            return cached
+
+        request = self._build_request(image_data, image_media_type, model)
+
+        response = self.client.send_vision_request(request)
+        self.last_metadata = response.metadata
+        return self._store_result(key, self._process_response(response))
+
+    async def _parse_with_async(self, image_data: bytes, image_media_type: str, model: str) -> T:
+        key = self._cache_key([image_data], model)
+        cached = self._cached_result(key)
+        if cached is not None:
+            self._record_cache_hit(model, [image_data])
+            return cached
+
+        # Resizing is CPU-bound; keep it off the event loop
+        request = await asyncio.to_thread(self._build_request, image_data, image_media_type, model)
 
         response = await self.client.send_vision_request_async(request)
-        return self._process_response(response)
+        self.last_metadata = response.metadata
+        return self._store_result(key, self._process_response(response))
+
+    def _stream_with(self, image_data: bytes, image_media_type: str, model: str):
+        """Yield one model's field events; returns its validated result."""
+        key = self._cache_key([image_data], model)
+        cached = self._cached_result(key)
+        if cached is not None:
+            self._record_cache_hit(model, [image_data])
+            for name, value in cached.model_dump(mode='json').items():
+                yield StreamEvent('field', (name, value))
+            return cached
+
+        request = self._build_request(image_data, image_media_type, model)
+        stream = self.client.stream_vision_request(request)
+        extractor = IncrementalJSONParser()
+        for text in stream:
+            for name, value in extractor.feed(text):
+                field = self._validate_field(name, value)
+                if field is not None:
+                    yield StreamEvent('field', field)
+
+        self.last_metadata = stream.response.metadata
+        return self._store_result(key, self._process_response(stream.response))
+
+    def _validate_field(self, name: str, value) -> Optional[tuple]:
+        """Validate one field of a partial response; returns (name, JSON value) or None."""
+        if name not in self.response_model.model_fields:
+            return None
+        partial = self.response_model.model_construct()
+        try:
+            self.response_model.__pydantic_validator__.validate_assignment(partial, name, value)
+        except ValidationError:
+            return None
+        return name, partial.model_dump(mode='json', include={name})[name]
+
+    def _build_request(self, image_data: bytes, image_media_type: str, model: str) -> VisionRequest:
+        """Preprocess the image and wrap it in a VisionRequest."""
+        prepared = preprocess_image(image_data, image_media_type, self.preprocess)
+        return VisionRequest(
+            system_prompt=self.system_prompt,
+            user_prompt=self.user_prompt,
+            image_data=prepared.data,
+            image_media_type=prepared.media_type,
+            model=model,
+            metadata={**prepared.metadata, 'parser': type(self).__name__},
+        )
 
     def _process_response(self, response: VisionResponse) -> T:
         """Process and validate the API response.
@@ -3,19 +3,23 @@ Vehicle damage comparison parser.
 
 Portability Note: This parser can be used in any before/after vehicle comparison context.
 """
+import asyncio
 import logging
-from typing import Type
+from typing import Optional, Type
 
 from pydantic import ValidationError
 
+from ..cache import ResultCache
 from ..client import OpenRouterClient, VisionResponse
+from ..preprocess import DAMAGE_PREPROCESS, PreprocessConfig, preprocess_image
 from ..prompts.comparison import COMPARISON_SYSTEM_PROMPT, COMPARISON_USER_PROMPT
 from ..schemas.comparison import DamageComparisonResponse
+from .base import CachedResultMixin
 
 logger = logging.getLogger(__name__)
 
 
-class ComparisonParser:
+class ComparisonParser(CachedResultMixin):
     """Parser for comparing two vehicle photos (before/after).
 
     Unlike other parsers, this one accepts TWO images - a "before" (checkout)
@@ -26,14 +30,27 @@ class ComparisonParser:
     assessment, insurance claims, etc.
     """
 
-    def __init__(self, client: OpenRouterClient, location: str = 'exterior'):
+    def __init__(
+        self,
+        client: OpenRouterClient,
+        location: str = 'exterior',
+        cache: Optional[ResultCache] = None,
+        preprocess: Optional[PreprocessConfig] = None,
+    ):
         """Initialize the comparison parser.
 
         Args:
             client: Configured OpenRouterClient instance
             location: Photo location being compared (front, back, etc.)
+            cache: Optional result cache, keyed on both images
+            preprocess: Image preparation for both photos; defaults to the
+                damage detection settings
         """
         self.client = client
+        self.cache = cache
+        self.preprocess = preprocess or DAMAGE_PREPROCESS
+        self.last_cache_hit = False
+        self.last_metadata: dict = {}
         self._location = location
 
     @property
@@ -82,16 +99,25 @@ class ComparisonParser:
             ValueError: If response cannot be parsed or validated
             OpenRouterError: For API errors
         """
+        model = model or self.client.model
+        key = self._cache_key([before_image, after_image], model)
+        cached = self._cached_result(key)
+        if cached is not None:
+            self._record_cache_hit(model, [before_image, after_image])
+            return cached
+
+        images, metadata = self._prepare_images(
+            (before_image, before_media_type), (after_image, after_media_type)
+        )
         response = self.client.send_multi_image_request(
             system_prompt=self.system_prompt,
             user_prompt=self.user_prompt,
-            images=[
-                {'data': before_image, 'media_type': before_media_type},
-                {'data': after_image, 'media_type': after_media_type},
-            ],
-            model=model or self.client.model,
+            images=images,
+            model=model,
+            metadata=metadata,
         )
-        return self._process_response(response)
+        self.last_metadata = response.metadata
+        return self._store_result(key, self._process_response(response))
 
     async def compare_async(
         self,
@@ -117,16 +143,37 @@ class ComparisonParser:
             ValueError: If response cannot be parsed or validated
             OpenRouterError: For API errors
         """
+        model = model or self.client.model
+        key = self._cache_key([before_image, after_image], model)
+        cached = self._cached_result(key)
+        if cached is not None:
+            self._record_cache_hit(model, [before_image, after_image])
+            return cached
+
+        images, metadata = await asyncio.to_thread(
+            self._prepare_images,
+            (before_image, before_media_type), (after_image, after_media_type),
+        )
         response = await self.client.send_multi_image_request_async(
             system_prompt=self.system_prompt,
             user_prompt=self.user_prompt,
-            images=[
-                {'data': before_image, 'media_type': before_media_type},
-                {'data': after_image, 'media_type': after_media_type},
-            ],
-            model=model or self.client.model,
+            images=images,
+            model=model,
+            metadata=metadata,
         )
-        return self._process_response(response)
+        self.last_metadata = response.metadata
+        return self._store_result(key, self._process_response(response))
+
+    def _prepare_images(self, *images: tuple[bytes, str]) -> tuple[list[dict], dict]:
+        """Preprocess each image; returns request images and combined metadata."""
+        prepared = [preprocess_image(data, media_type, self.preprocess) for data, media_type in images]
+        metadata = {
+            'parser': type(self).__name__,
+            'image_original_bytes': sum(p.original_bytes for p in prepared),
+            'image_bytes': sum(len(p.data) for p in prepared),
+            'preprocess_ms': round(sum(p.elapsed_ms for p in prepared), 1),
+        }
+        return [{'data': p.data, 'media_type': p.media_type} for p in prepared], metadata
 
     def _process_response(self, response: VisionResponse) -> DamageComparisonResponse:
         """Process and validate the API response.
@@ -3,13 +3,38 @@ Vehicle damage detection parser.
 
 Portability Note: This parser can be used in any vehicle inspection context.
 """
-from typing import Type
+import asyncio
+import logging
+from typing import NamedTuple, Optional, Type, Union
 
-from ..client import OpenRouterClient
-from ..prompts.damage import DAMAGE_DETECTION_SYSTEM_PROMPT, DAMAGE_DETECTION_USER_PROMPT
-from ..schemas.damage import DamageDetectionResponse
+from pydantic import ValidationError
+
+from ..cache import ResultCache, make_cache_key, prompt_version
+from ..client import OpenRouterClient, VisionResponse
+from ..preprocess import DAMAGE_PREPROCESS, PreprocessConfig, preprocess_image
+from ..prompts.damage import (
+    DAMAGE_DETECTION_SYSTEM_PROMPT,
+    DAMAGE_DETECTION_USER_PROMPT,
+    PACKED_DAMAGE_DETECTION_USER_PROMPT,
+)
+from ..schemas.damage import DamageDetectionResponse, PackedDamageDetectionResponse
 from .base import BaseDocumentParser
 
+logger = logging.getLogger(__name__)
+
+# Photos sent together in one packed request unless the caller says otherwise
+DEFAULT_PACK_SIZE = 4
+
+
+class PackedPhoto(NamedTuple):
+    """One photo for ``DamageParser.parse_many``."""
+    image_data: bytes
+    media_type: str = 'image/jpeg'
+    location: str = 'exterior'
+
+
+PackedResult = Union[DamageDetectionResponse, Exception]
+
 
 class DamageParser(BaseDocumentParser[DamageDetectionResponse]):
     """Parser for vehicle damage detection from photos.
@@ -22,15 +47,26 @@ class DamageParser(BaseDocumentParser[DamageDetectionResponse]):
     personal vehicle tracking, etc.
     """
 
-    def __init__(self, client: OpenRouterClient, location: str = 'exterior'):
+    default_preprocess = DAMAGE_PREPROCESS
+
+    def __init__(
+        self,
+        client: OpenRouterClient,
+        location: str = 'exterior',
+        cache: Optional[ResultCache] = None,
+        preprocess: Optional[PreprocessConfig] = None,
+    ):
         """Initialize the damage parser.
 
         Args:
             client: Configured OpenRouterClient instance
             location: Photo location (front, back, driver_side, etc.)
+            cache: Optional result cache
+            preprocess: Optional image preparation override
         """
-        super().__init__(client)
+        super().__init__(client, cache=cache, preprocess=preprocess)
         self._location = location
+        self.last_pack_stats: dict = {}
 
     @property
     def location(self) -> str:
@@ -54,6 +90,193 @@ class DamageParser(BaseDocumentParser[DamageDetectionResponse]):
     def response_model(self) -> Type[DamageDetectionResponse]:
         return DamageDetectionResponse
 
+    def parse_many(
+        self,
+        photos: list[PackedPhoto],
+        model: str | None = None,
+        pack_size: int = DEFAULT_PACK_SIZE,
+    ) -> list[PackedResult]:
+        """Analyse several photos, sending up to ``pack_size`` per request.
+
+        Each request carries its photos with a label before each one and asks
+        for one result per label. Photos whose result is missing or does not
+        validate are retried with a single-photo request. Cached photos are
+        not sent. ``last_pack_stats`` counts the requests made.
+
+        Args:
+            photos: Photos to analyse; each carries its own location
+            model: Optional model override
+            pack_size: Most photos sent in one request; 1 disables packing
+
+        Returns:
+            One entry per photo, in order: its DamageDetectionResponse, or the
+            exception raised when its single-photo request failed too
+
+        Raises:
+            OpenRouterError: For API errors on a packed request
+        """
+        model = model or self.client.model
+        results, chunks = self._start_packed(photos, model, pack_size)
+        for chunk in chunks:
+            if len(chunk) == 1:
+                self._fallback(photos, chunk, model, results, packed=False)
+                continue
+            user_prompt, images, metadata, labels = self._prepare_packed(photos, chunk)
+            response = self.client.send_multi_image_request(
+                system_prompt=self.system_prompt,
+                user_prompt=user_prompt,
+                images=images,
+                model=model,
+                metadata=metadata,
+            )
+            missing = self._collect_packed(response, photos, chunk, labels, model, results)
+            self._fallback(photos, missing, model, results)
+        return self._finish_packed(results)
+
+    async def parse_many_async(
+        self,
+        photos: list[PackedPhoto],
+        model: str | None = None,
+        pack_size: int = DEFAULT_PACK_SIZE,
+    ) -> list[PackedResult]:
+        """Analyse several photos asynchronously; see ``parse_many``.
+
+        Packed requests and single-photo fallbacks are sent concurrently.
+        """
+        model = model or self.client.model
+        results, chunks = self._start_packed(photos, model, pack_size)
+
+        async def run_chunk(chunk):
+            if len(chunk) == 1:
+                await self._fallback_async(photos, chunk, model, results, packed=False)
+                return
+            user_prompt, images, metadata, labels = await asyncio.to_thread(
+                self._prepare_packed, photos, chunk
+            )
+            response = await self.client.send_multi_image_request_async(
+                system_prompt=self.system_prompt,
+                user_prompt=user_prompt,
+                images=images,
+                model=model,
+                metadata=metadata,
+            )
+            missing = self._collect_packed(response, photos, chunk, labels, model, results)
+            await self._fallback_async(photos, missing, model, results)
+
+        await asyncio.gather(*[run_chunk(chunk) for chunk in chunks])
+        return self._finish_packed(results)
+
+    def _single_parser(self, location: str) -> 'DamageParser':
+        return DamageParser(self.client, location=location, cache=self.cache, preprocess=self.preprocess)
+
+    def _packed_cache_key(self, photo: PackedPhoto, model: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        version = prompt_version(self.system_prompt, PACKED_DAMAGE_DETECTION_USER_PROMPT, photo.location)
+        return make_cache_key([photo.image_data], f'{type(self).__name__}.packed', version, model)
+
+    def _start_packed(self, photos, model, pack_size):
+        """Answer what the cache can; returns the results list and chunks of photo indexes."""
+        self.last_pack_stats = {'photos': len(photos), 'requests': 0, 'fallbacks': 0, 'cache_hits': 0}
+        results: list[Optional[PackedResult]] = [None] * len(photos)
+        uncached = []
+        for index, photo in enumerate(photos):
+            single = self._single_parser(photo.location)
+            cached = single._cached_result(single._cache_key([photo.image_data], model))
+            if cached is None:
+                cached = self._cached_result(self._packed_cache_key(photo, model))
+            if cached is None:
+                uncached.append(index)
+            else:
+                results[index] = cached
+                self.last_pack_stats['cache_hits'] += 1
+                self._record_cache_hit(model, [photo.image_data])
+        size = max(1, pack_size)
+        return results, [uncached[i:i + size] for i in range(0, len(uncached), size)]
+
+    def _prepare_packed(self, photos, chunk):
+        """Preprocess a chunk's photos; returns prompt, labelled images, metadata and labels."""
+        labels = [f'Photo {position}' for position in range(1, len(chunk) + 1)]
+        prepared = [
+            preprocess_image(photos[index].image_data, photos[index].media_type, self.preprocess)
+            for index in chunk
+        ]
+        photo_list = '\n'.join(
+            f'- {label}: {photos[index].location}' for label, index in zip(labels, chunk)
+        )
+        user_prompt = PACKED_DAMAGE_DETECTION_USER_PROMPT.format(count=len(chunk), photo_list=photo_list)
+        images = [
+            {'data': p.data, 'media_type': p.media_type, 'label': label}
+            for p, label in zip(prepared, labels)
+        ]
+        metadata = {
+            'parser': type(self).__name__,
+            'packed_photos': len(chunk),
+            'image_original_bytes': sum(p.original_bytes for p in prepared),
+            'image_bytes': sum(len(p.data) for p in prepared),
+            'preprocess_ms': round(sum(p.elapsed_ms for p in prepared), 1),
+        }
+        return user_prompt, images, metadata, labels
+
+    def _collect_packed(self, response: VisionResponse, photos, chunk, labels, model, results):
+        """Store the per-photo results of a packed response; returns indexes left unanswered."""
+        self.last_pack_stats['requests'] += 1
+        self.last_metadata = response.metadata
+        try:
+            packed = PackedDamageDetectionResponse.model_validate(
+                self.client.extract_json_from_response(response.content)
+            )
+        except (ValueError, ValidationError) as e:
+            logger.warning(f'Packed damage response for {len(chunk)} photos was unusable: {e}')
+            return list(chunk)
+
+        by_label = {entry.photo.strip().casefold(): entry for entry in packed.photos}
+        missing = []
+        for label, index in zip(labels, chunk):
+            entry = by_label.get(label.casefold())
+            if entry is None:
+                missing.append(index)
+                continue
+            result = DamageDetectionResponse.model_validate(entry.model_dump(exclude={'photo'}))
+            results[index] = self._store_result(self._packed_cache_key(photos[index], model), result)
+        if missing:
+            logger.warning(f'Packed damage response had no result for {len(missing)} of {len(chunk)} photos')
+        return missing
+
+    def _record_single(self, parser: 'DamageParser', packed: bool):
+        if not parser.last_cache_hit:
+            self.last_pack_stats['requests'] += 1
+        if packed:
+            self.last_pack_stats['fallbacks'] += 1
+
+    def _fallback(self, photos, indexes, model, results, packed=True):
+        for index in indexes:
+            photo = photos[index]
+            parser = self._single_parser(photo.location)
+            try:
+                results[index] = parser.parse(photo.image_data, image_media_type=photo.media_type, model=model)
+            except Exception as e:
+                results[index] = e
+            self._record_single(parser, packed)
+
+    async def _fallback_async(self, photos, indexes, model, results, packed=True):
+        async def run(index):
+            photo = photos[index]
+            parser = self._single_parser(photo.location)
+            try:
+                results[index] = await parser.parse_async(
+                    photo.image_data, image_media_type=photo.media_type, model=model
+                )
+            except Exception as e:
+                results[index] = e
+            self._record_single(parser, packed)
+
+        await asyncio.gather(*[run(index) for index in indexes])
+
+    def _finish_packed(self, results):
+        self.last_cache_hit = self.last_pack_stats['requests'] == 0
+        return results
+
 
 def create_damage_parser(
     api_key: str,
@@ -6,6 +6,7 @@ Portability Note: This parser can be used in any vehicle inspection context.
 from typing import Type
 
 from ..client import OpenRouterClient
+from ..preprocess import DASHBOARD_PREPROCESS
 from ..prompts.dashboard import DASHBOARD_ANALYSIS_SYSTEM_PROMPT, DASHBOARD_ANALYSIS_USER_PROMPT
 from ..schemas.dashboard import DashboardAnalysisResponse
 from .base import BaseDocumentParser
@@ -25,6 +26,9 @@ class DashboardParser(BaseDocumentParser[DashboardAnalysisResponse]):
     insurance inspections, personal vehicle tracking, etc.
     """
 
+    default_preprocess = DASHBOARD_PREPROCESS
+    cascade_threshold = 0.8
+
     @property
     def system_prompt(self) -> str:
         return DASHBOARD_ANALYSIS_SYSTEM_PROMPT
@@ -4,6 +4,7 @@ Insurance card OCR parser.
 from typing import Type
 
 from ..client import OpenRouterClient
+from ..preprocess import INSURANCE_PREPROCESS
 from ..prompts.insurance import INSURANCE_OCR_SYSTEM_PROMPT, INSURANCE_OCR_USER_PROMPT
 from ..schemas.insurance import InsuranceOCRResponse
 from .base import BaseDocumentParser
@@ -12,6 +13,8 @@ from .base import BaseDocumentParser
 class InsuranceParser(BaseDocumentParser[InsuranceOCRResponse]):
     """Parser for insurance card images."""
 
+    default_preprocess = INSURANCE_PREPROCESS
+
     @property
     def system_prompt(self) -> str:
         return INSURANCE_OCR_SYSTEM_PROMPT
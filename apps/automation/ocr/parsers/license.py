@@ -4,6 +4,7 @@ Driver's license OCR parser.
 from typing import Type
 
 from ..client import OpenRouterClient
+from ..preprocess import LICENSE_PREPROCESS
 from ..prompts.license import LICENSE_OCR_SYSTEM_PROMPT, LICENSE_OCR_USER_PROMPT
 from ..schemas.license import LicenseOCRResponse
 from .base import BaseDocumentParser
@@ -12,6 +13,10 @@ from .base import BaseDocumentParser
 class LicenseParser(BaseDocumentParser[LicenseOCRResponse]):
     """Parser for driver's license images."""
 
+    default_preprocess = LICENSE_PREPROCESS
+    # License data fills identity fields, so the fast model must be sure
+    cascade_threshold = 0.9
+
     @property
     def system_prompt(self) -> str:
         return LICENSE_OCR_SYSTEM_PROMPT
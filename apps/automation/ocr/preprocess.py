@@ -0,0 +1,160 @@
+"""
+Image preprocessing before vision requests.
+
+Phone-camera uploads are often 4-12 MB and 4000+ pixels wide, far more than
+vision models use, and every byte is base64-encoded into the request. Each
+parser therefore shrinks its image first: it applies the EXIF orientation
+(models read sideways text poorly), optionally trims uniform borders,
+downsamples to the parser's target resolution and re-encodes without
+metadata, which also keeps location data in photos from leaving the system.
+
+Data Pillow cannot decode is passed through unchanged.
+"""
+import io
+import logging
+import time
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from PIL import Image, ImageChops, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = {
+    'JPEG': 'image/jpeg',
+    'WEBP': 'image/webp',
+    'PNG': 'image/png',
+}
+
+
+@dataclass(frozen=True)
+class PreprocessConfig:
+    """How a parser's images are prepared before sending.
+
+    Attributes:
+        enabled: Set False to send images exactly as given
+        max_dimension: Longest side in pixels after downsampling
+        format: Output format: JPEG, WEBP or PNG
+        quality: Encoder quality for JPEG/WEBP (1-100)
+        trim_borders: Crop away uniform margins around the subject, e.g. the
+            table a card was photographed on
+        grayscale: Drop colour, for documents where it carries no information
+    """
+    enabled: bool = True
+    max_dimension: int = 1600
+    format: str = 'JPEG'
+    quality: int = 85
+    trim_borders: bool = False
+    grayscale: bool = False
+
+    def __post_init__(self):
+        if self.format.upper() not in MEDIA_TYPES:
+            raise ValueError(f'Unsupported preprocess format: {self.format}')
+
+    def with_overrides(self, **overrides) -> 'PreprocessConfig':
+        return replace(self, **overrides)
+
+
+# Per-parser defaults. Documents keep enough resolution for fine print;
+# damage photos keep more detail for small scratches; dashboards only need
+# the digits to be legible.
+LICENSE_PREPROCESS = PreprocessConfig(max_dimension=1600, quality=90, trim_borders=True)
+INSURANCE_PREPROCESS = PreprocessConfig(max_dimension=1600, quality=88, trim_borders=True)
+DAMAGE_PREPROCESS = PreprocessConfig(max_dimension=2048, quality=85)
+DASHBOARD_PREPROCESS = PreprocessConfig(max_dimension=1280, quality=85)
+
+
+@dataclass
+class PreprocessedImage:
+    """A prepared image and what preprocessing did to it."""
+    data: bytes
+    media_type: str
+    original_bytes: int
+    original_size: Optional[tuple[int, int]] = None
+    size: Optional[tuple[int, int]] = None
+    elapsed_ms: float = 0.0
+    processed: bool = False
+
+    @property
+    def metadata(self) -> dict:
+        """Summary for VisionResponse metadata."""
+        return {
+            'image_original_bytes': self.original_bytes,
+            'image_bytes': len(self.data),
+            'image_original_size': list(self.original_size) if self.original_size else None,
+            'image_size': list(self.size) if self.size else None,
+            'preprocess_ms': round(self.elapsed_ms, 1),
+        }
+
+
+def _trim_borders(image: Image.Image, tolerance: int = 24) -> Image.Image:
+    """Crop margins that match the top-left pixel colour."""
+    rgb = image.convert('RGB')
+    background = Image.new('RGB', rgb.size, rgb.getpixel((0, 0)))
+    diff = ImageChops.difference(rgb, background).convert('L')
+    bbox = diff.point(lambda value: 255 if value > tolerance else 0).getbbox()
+    if not bbox:
+        return image
+    width, height = image.size
+    # Ignore trims that would remove almost everything: the "border" was the subject
+    if (bbox[2] - bbox[0]) * (bbox[3] - bbox[1]) < 0.2 * width * height:
+        return image
+    return image.crop(bbox)
+
+
+def preprocess_image(
+    image_data: bytes,
+    media_type: str = 'image/jpeg',
+    config: Optional[PreprocessConfig] = None,
+) -> PreprocessedImage:
+    """Orient, trim, downsample and re-encode an image.
+
+    Args:
+        image_data: Raw image bytes
+        media_type: MIME type of the input, returned when nothing is done
+        config: Preprocessing settings; defaults to PreprocessConfig()
+
+    Returns:
+        PreprocessedImage with the bytes to send
+    """
+    config = config or PreprocessConfig()
+    result = PreprocessedImage(data=image_data, media_type=media_type, original_bytes=len(image_data))
+    if not config.enabled:
+        return result
+
+    started = time.perf_counter()
+    try:
+        image = Image.open(io.BytesIO(image_data))
+        original_size = image.size
+        # Decode at a reduced scale where the codec supports it (JPEG)
+        image.draft('RGB', (config.max_dimension, config.max_dimension))
+        image = ImageOps.exif_transpose(image)
+
+        if config.trim_borders:
+            image = _trim_borders(image)
+        if max(image.size) > config.max_dimension:
+            image.thumbnail((config.max_dimension, config.max_dimension), Image.Resampling.LANCZOS)
+
+        output_format = config.format.upper()
+        if config.grayscale:
+            image = image.convert('L')
+        elif output_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        buffer = io.BytesIO()
+        save_kwargs = {'optimize': True}
+        if output_format in ('JPEG', 'WEBP'):
+            save_kwargs['quality'] = config.quality
+        # Saving without exif/icc arguments drops the source metadata
+        image.save(buffer, format=output_format, **save_kwargs)
+    except (UnidentifiedImageError, OSError, ValueError) as e:
+        logger.debug(f'Skipping preprocessing, image could not be processed: {e}')
+        return result
+
+    result.data = buffer.getvalue()
+    result.media_type = MEDIA_TYPES[output_format]
+    result.original_size = original_size
+    result.size = image.size
+    result.processed = True
+    result.elapsed_ms = (time.perf_counter() - started) * 1000
+    return result
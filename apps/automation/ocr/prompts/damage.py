@@ -80,3 +80,53 @@ Important:
 - Coordinates are percentages of image dimensions (0-100)
 - Be conservative - only report damage you're confident about
 - The overall confidence should reflect both image quality and certainty of findings"""
+
+PACKED_DAMAGE_DETECTION_USER_PROMPT = """Analyze each of these {count} vehicle photos separately and identify all visible damage in each one.
+
+Every photo is preceded by its label. The photos are:
+{photo_list}
+
+Assess each photo on its own: do not carry damage seen in one photo over to another, even where they show overlapping areas of the vehicle.
+
+Return your analysis as JSON in this exact format, with exactly one entry per photo:
+{{
+    "photos": [
+        {{
+            "photo": "the photo's label, e.g. Photo 1",
+            "damages": [
+                {{
+                    "type": "scratch|dent|crack|chip|stain|tear|missing|rust|other",
+                    "severity": "minor|moderate|severe",
+                    "location": {{
+                        "zone": "front|back|driver_side|passenger_side|roof|hood|trunk|interior",
+                        "area": "specific area like bumper, fender, door, etc.",
+                        "coordinates": {{"x": 0-100, "y": 0-100}}
+                    }},
+                    "dimensions_estimate": {{
+                        "length_cm": estimated length,
+                        "width_cm": estimated width,
+                        "depth_mm": estimated depth for dents (optional)
+                    }},
+                    "description": "detailed description of the damage",
+                    "confidence": 0.0-1.0
+                }}
+            ],
+            "overall_condition": "excellent|good|fair|poor|damaged",
+            "summary": {{
+                "total_count": number of damages found,
+                "by_type": {{"scratch": count, "dent": count, etc.}},
+                "by_severity": {{"minor": count, "moderate": count, "severe": count}}
+            }},
+            "image_quality": "excellent|good|fair|poor",
+            "notes": "any additional observations about this photo",
+            "confidence": 0.0-1.0
+        }}
+    ]
+}}
+
+Important:
+- Return ONLY valid JSON, no additional text
+- Use each photo's label exactly as given
+- If no damage is found in a photo, return an empty "damages" array with "excellent" condition for it
+- Coordinates are percentages of that photo's dimensions (0-100)
+- Be conservative - only report damage you're confident about"""
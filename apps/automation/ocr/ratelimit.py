@@ -0,0 +1,301 @@
+"""
+Token-bucket rate limiting with a daily cap for OCR requests.
+
+Each key (a tenant) has a bucket of ``burst`` tokens refilled at
+``per_minute`` tokens a minute; a request takes a token and is refused
+when the bucket is empty. Separately, the requests billed today are
+counted and new requests are refused once the count reaches
+``daily_cap``. Billing is recorded after the model call, since cached
+results are free, so the cap is checked at admission against what was
+billed so far: concurrent requests admitted just below the cap may pass
+it by at most the burst.
+
+``RedisTokenBucket`` runs the check-and-take and the usage increment as
+Lua scripts, so they are atomic across every web and Celery process
+sharing the Redis. ``LocalTokenBucket`` implements the same operations in
+process memory, for development and tests without Redis.
+
+Usage counters for keys that changed are handed out once by ``drain()``
+so a periodic job can copy them to the database.
+
+``RedisSlots`` and ``LocalSlots`` cap requests in flight per key instead:
+a holder takes one of ``limit`` slots before its request and releases it
+afterwards. Slots are leases that expire after ``ttl`` seconds, so a
+process that dies mid-request cannot leak them.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+# Usage counters outlive their day so the last increments can still be drained
+USAGE_TTL = 2 * 24 * 60 * 60
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Limits for one key.
+
+    Attributes:
+        burst: Requests allowed back to back with a full bucket
+        per_minute: Sustained requests per minute once the burst is spent
+        daily_cap: Billed requests per day, or None for no cap
+    """
+    burst: int
+    per_minute: float
+    daily_cap: Optional[int] = None
+
+    @property
+    def rate(self) -> float:
+        """Tokens added per second."""
+        return self.per_minute / 60.0
+
+
+@dataclass(frozen=True)
+class RateLimitDecision:
+    """Outcome of ``acquire``.
+
+    Attributes:
+        allowed: Whether the request may go ahead
+        reason: 'rate' or 'daily_cap' when refused
+        retry_after: Seconds until a token is available, when refused for rate
+        used_today: Requests billed today before this one
+    """
+    allowed: bool
+    reason: Optional[str] = None
+    retry_after: Optional[float] = None
+    used_today: int = 0
+
+
+# KEYS: bucket, usage. ARGV: burst, rate, daily cap (-1 for none), cost,
+# usage seed, usage ttl. Returns {allowed, reason, retry_after, used}.
+ACQUIRE_SCRIPT = """
+redis.call('SET', KEYS[2], ARGV[5], 'NX', 'EX', ARGV[6])
+local used = tonumber(redis.call('GET', KEYS[2]))
+local burst = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cap = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+if cap >= 0 and used + cost > cap then
+    return {0, 'daily_cap', '', used}
+end
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed, reason, retry = 1, '', ''
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    allowed, reason, retry = 0, 'rate', tostring((cost - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, reason, retry, used}
+"""
+
+# KEYS: usage, dirty set. ARGV: count, usage seed, usage ttl, dirty member.
+RECORD_SCRIPT = """
+redis.call('SET', KEYS[1], ARGV[2], 'NX', 'EX', ARGV[3])
+local used = redis.call('INCRBY', KEYS[1], ARGV[1])
+redis.call('SADD', KEYS[2], ARGV[4])
+return used
+"""
+
+
+# KEYS: slots. ARGV: limit, holder, ttl. Returns 1 when a slot was taken.
+TAKE_SLOT_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[2])
+redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[3])) + 1)
+return 1
+"""
+
+
+class RedisTokenBucket:
+    """Token buckets and usage counters in Redis.
+
+    Args:
+        client: A ``redis.Redis`` client created with ``decode_responses=True``
+        prefix: Key prefix
+    """
+
+    def __init__(self, client, prefix: str = 'ocr:ratelimit'):
+        self.client = client
+        self.prefix = prefix
+        self._acquire = client.register_script(ACQUIRE_SCRIPT)
+        self._record = client.register_script(RECORD_SCRIPT)
+
+    def _bucket_key(self, key: str) -> str:
+        return f'{self.prefix}:bucket:{key}'
+
+    def _usage_key(self, key: str, day: str) -> str:
+        return f'{self.prefix}:usage:{key}:{day}'
+
+    @property
+    def _dirty_key(self) -> str:
+        return f'{self.prefix}:dirty'
+
+    def acquire(self, key: str, limit: RateLimit, day: str, seed: int = 0, cost: int = 1) -> RateLimitDecision:
+        """Take ``cost`` tokens if the bucket and the daily cap allow it.
+
+        Args:
+            key: Bucket key
+            limit: Limits to apply
+            day: Current day (ISO date), naming the usage counter
+            seed: Usage already billed today, used when the counter is missing
+            cost: Tokens to take
+        """
+        allowed, reason, retry_after, used = self._acquire(
+            keys=[self._bucket_key(key), self._usage_key(key, day)],
+            args=[
+                limit.burst, limit.rate,
+                limit.daily_cap if limit.daily_cap is not None else -1,
+                cost, seed, USAGE_TTL,
+            ],
+        )
+        return RateLimitDecision(
+            allowed=bool(allowed),
+            reason=reason or None,
+            retry_after=float(retry_after) if retry_after else None,
+            used_today=int(used),
+        )
+
+    def record(self, key: str, day: str, count: int = 1, seed: int = 0) -> int:
+        """Add billed requests to today's usage; returns the new total."""
+        return int(self._record(
+            keys=[self._usage_key(key, day), self._dirty_key],
+            args=[count, seed, USAGE_TTL, f'{day}:{key}'],
+        ))
+
+    def usage(self, key: str, day: str) -> Optional[int]:
+        value = self.client.get(self._usage_key(key, day))
+        return int(value) if value is not None else None
+
+    def drain(self, batch_size: int = 1000) -> list:
+        """Usage counters changed since the last drain.
+
+        Returns:
+            List of (key, day, total) tuples
+        """
+        changed = []
+        while True:
+            members = self.client.spop(self._dirty_key, batch_size)
+            if not members:
+                return changed
+            for member in members:
+                day, key = member.split(':', 1)
+                total = self.usage(key, day)
+                if total is not None:
+                    changed.append((key, day, total))
+
+
+class LocalTokenBucket:
+    """In-process stand-in for ``RedisTokenBucket`` with the same behaviour.
+
+    Args:
+        clock: Seconds source, replaceable in tests
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._buckets: dict = {}
+        self._usage: dict = {}
+        self._dirty: set = set()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, limit: RateLimit, day: str, seed: int = 0, cost: int = 1) -> RateLimitDecision:
+        with self._lock:
+            used = self._usage.setdefault((key, day), seed)
+            if limit.daily_cap is not None and used + cost > limit.daily_cap:
+                return RateLimitDecision(False, 'daily_cap', None, used)
+            now = self.clock()
+            tokens, ts = self._buckets.get(key, (limit.burst, now))
+            tokens = min(limit.burst, tokens + max(0.0, now - ts) * limit.rate)
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                return RateLimitDecision(True, None, None, used)
+            self._buckets[key] = (tokens, now)
+            return RateLimitDecision(False, 'rate', (cost - tokens) / limit.rate, used)
+
+    def record(self, key: str, day: str, count: int = 1, seed: int = 0) -> int:
+        with self._lock:
+            used = self._usage.setdefault((key, day), seed) + count
+            self._usage[(key, day)] = used
+            self._dirty.add((key, day))
+            return used
+
+    def usage(self, key: str, day: str) -> Optional[int]:
+        with self._lock:
+            return self._usage.get((key, day))
+
+    def drain(self, batch_size: int = 1000) -> list:
+        with self._lock:
+            changed = [(key, day, self._usage[(key, day)]) for key, day in sorted(self._dirty)]
+            self._dirty.clear()
+            return changed
+
+
+class RedisSlots:
+    """Concurrency slots in Redis, one sorted set of lease expiries per key.
+
+    Args:
+        client: A ``redis.Redis`` client created with ``decode_responses=True``
+        prefix: Key prefix
+    """
+
+    def __init__(self, client, prefix: str = 'ocr:ratelimit'):
+        self.client = client
+        self.prefix = prefix
+        self._take = client.register_script(TAKE_SLOT_SCRIPT)
+
+    def _slots_key(self, key: str) -> str:
+        return f'{self.prefix}:slots:{key}'
+
+    def take(self, key: str, limit: int, holder: str, ttl: float) -> bool:
+        """Take a slot for ``holder`` if fewer than ``limit`` are held.
+
+        Args:
+            key: Slot pool key
+            limit: Slots in the pool
+            holder: Unique id of the request taking the slot
+            ttl: Seconds after which the slot is freed if not released
+        """
+        return bool(self._take(keys=[self._slots_key(key)], args=[limit, holder, ttl]))
+
+    def release(self, key: str, holder: str) -> None:
+        self.client.zrem(self._slots_key(key), holder)
+
+
+class LocalSlots:
+    """In-process stand-in for ``RedisSlots`` with the same behaviour.
+
+    Args:
+        clock: Seconds source, replaceable in tests
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._slots: dict = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, limit: int, holder: str, ttl: float) -> bool:
+        with self._lock:
+            now = self.clock()
+            held = {h: expiry for h, expiry in self._slots.get(key, {}).items() if expiry > now}
+            allowed = len(held) < limit
+            if allowed:
+                held[holder] = now + ttl
+            self._slots[key] = held
+            return allowed
+
+    def release(self, key: str, holder: str) -> None:
+        with self._lock:
+            self._slots.get(key, {}).pop(holder, None)
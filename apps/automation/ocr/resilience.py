@@ -0,0 +1,264 @@
+"""
+Retries and circuit breaking for OpenRouter requests.
+
+``RetryPolicy`` retries rate limits, upstream 5xx errors and connection
+failures with jittered exponential backoff, waiting as long as the
+``Retry-After`` header asks when one is sent. ``CircuitBreaker`` counts
+upstream failures per model and, past a threshold, fails calls immediately
+for a cool-down period instead of adding load to a degraded upstream; after
+the cool-down one trial call is let through to probe for recovery.
+
+Breaker state and ``Metrics`` counters live in a key-value store with the
+``get/set/add/incr/delete`` subset of Django's cache API, so a Django cache
+backed by Redis shares them across workers. ``InMemoryStore`` serves a
+single process. Updates are not transactional; under concurrency the
+breaker may open a few calls late, which is acceptable for its purpose.
+"""
+import email.utils
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Counters kept per model by Metrics
+METRIC_NAMES = ('attempts', 'retries', 'failures', 'short_circuited', 'breaker_opened')
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """When and how long to wait before retrying a failed request.
+
+    Attributes:
+        max_attempts: Total attempts, including the first
+        base_delay: Backoff ceiling for the first retry, in seconds
+        max_delay: Longest wait between attempts; a Retry-After longer than
+            this is not waited for and the error is raised instead
+        multiplier: Growth of the backoff ceiling per attempt
+        retry_statuses: HTTP statuses worth retrying
+    """
+    max_attempts: int = 3
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+    multiplier: float = 2.0
+    retry_statuses: tuple = (429, 500, 502, 503, 504)
+
+    def should_retry(self, attempt: int, status_code: Optional[int]) -> bool:
+        """Whether a failed attempt (numbered from 1) should be retried.
+
+        ``status_code`` is None for connection errors and timeouts.
+        """
+        if attempt >= self.max_attempts:
+            return False
+        return status_code is None or status_code in self.retry_statuses
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """Seconds to wait after failed attempt ``attempt``, or None to give up.
+
+        Uses "full jitter": a uniform wait up to the exponential ceiling, so
+        callers that failed together do not retry together.
+        """
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_delay else None
+        ceiling = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+
+class InMemoryStore:
+    """Process-local store with the cache methods the breaker and metrics use."""
+
+    def __init__(self):
+        self._data: dict = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._live(key)
+            return default if entry is None else entry[0]
+
+    def set(self, key, value, timeout=None):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + timeout if timeout else None)
+
+    def add(self, key, value, timeout=None):
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+            self._data[key] = (value, time.monotonic() + timeout if timeout else None)
+            return True
+
+    def incr(self, key, delta=1):
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                raise ValueError(f'Key {key!r} not found')
+            self._data[key] = (entry[0] + delta, entry[1])
+            return entry[0] + delta
+
+    def delete(self, key):
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+
+def _increment(store, key, timeout=None):
+    """Increment a counter, creating it first if needed."""
+    store.add(key, 0, timeout)
+    try:
+        return store.incr(key)
+    except ValueError:
+        # Expired between add and incr
+        store.set(key, 1, timeout)
+        return 1
+
+
+class Metrics:
+    """Per-model counters of request attempts, retries and breaker activity.
+
+    Args:
+        store: Cache-like store; share one across workers to aggregate
+        prefix: Key prefix
+    """
+
+    def __init__(self, store=None, prefix: str = 'ocr:metrics'):
+        self.store = store if store is not None else InMemoryStore()
+        self.prefix = prefix
+
+    def _key(self, name: str, model: str) -> str:
+        return f'{self.prefix}:{model}:{name}'
+
+    def incr(self, name: str, model: str) -> None:
+        try:
+            _increment(self.store, self._key(name, model))
+        except Exception as e:
+            logger.warning(f'Could not record OCR metric {name}: {e}')
+
+    def snapshot(self, model: str, names: tuple = METRIC_NAMES) -> dict:
+        """Current counters for a model."""
+        return {name: self.store.get(self._key(name, model)) or 0 for name in names}
+
+
+class CircuitBreaker:
+    """Fails fast for a model after repeated upstream failures.
+
+    Args:
+        store: Cache-like store holding the state; share it across workers
+        failure_threshold: Failures within ``window`` seconds that open the circuit
+        window: Seconds over which failures are counted
+        reset_timeout: Seconds the circuit stays open before a trial call
+        metrics: Optional Metrics receiving ``short_circuited`` and
+            ``breaker_opened`` counts
+        prefix: Key prefix
+    """
+
+    def __init__(self, store=None, failure_threshold: int = 5, window: float = 60.0,
+                 reset_timeout: float = 30.0, metrics: Optional[Metrics] = None,
+                 prefix: str = 'ocr:breaker'):
+        self.store = store if store is not None else InMemoryStore()
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.metrics = metrics
+        self.prefix = prefix
+
+    def _key(self, model: str, part: str) -> str:
+        return f'{self.prefix}:{model}:{part}'
+
+    def _open(self, model: str) -> None:
+        # The marker outlives the cool-down so the next call knows to probe
+        self.store.set(
+            self._key(model, 'open_until'), time.time() + self.reset_timeout,
+            self.reset_timeout + self.window,
+        )
+        self.store.delete(self._key(model, 'probe'))
+        self.store.delete(self._key(model, 'failures'))
+        logger.warning(f'Circuit opened for {model} for {self.reset_timeout:.0f}s')
+        if self.metrics:
+            self.metrics.incr('breaker_opened', model)
+
+    def blocked(self, model: str) -> Optional[float]:
+        """Check whether a call to ``model`` may go ahead.
+
+        Returns:
+            None if it may, otherwise the seconds until the circuit is next
+            probed
+        """
+        try:
+            open_until = self.store.get(self._key(model, 'open_until'))
+            if open_until is None:
+                return None
+            remaining = open_until - time.time()
+            # After the cool-down, exactly one caller gets to probe
+            if remaining <= 0 and self.store.add(self._key(model, 'probe'), 1, self.window):
+                return None
+        except Exception as e:
+            logger.warning(f'Circuit breaker state unavailable, allowing call: {e}')
+            return None
+        if self.metrics:
+            self.metrics.incr('short_circuited', model)
+        return max(remaining, 1.0)
+
+    def record_success(self, model: str) -> None:
+        try:
+            if self.store.get(self._key(model, 'open_until')) is not None:
+                logger.info(f'Circuit closed for {model}')
+                self.store.delete(self._key(model, 'open_until'))
+                self.store.delete(self._key(model, 'probe'))
+            self.store.delete(self._key(model, 'failures'))
+        except Exception as e:
+            logger.warning(f'Could not update circuit breaker: {e}')
+
+    def record_failure(self, model: str) -> None:
+        try:
+            if self.store.get(self._key(model, 'open_until')) is not None:
+                # The probe failed: stay open for another cool-down
+                self._open(model)
+                return
+            failures = _increment(self.store, self._key(model, 'failures'), self.window)
+            if failures >= self.failure_threshold:
+                self._open(model)
+        except Exception as e:
+            logger.warning(f'Could not update circuit breaker: {e}')
+
+    def status(self, model: str) -> dict:
+        """State of the circuit for a model: closed, open or half_open."""
+        open_until = self.store.get(self._key(model, 'open_until'))
+        if open_until is None:
+            state = 'closed'
+        elif open_until > time.time():
+            state = 'open'
+        else:
+            state = 'half_open'
+        return {
+            'state': state,
+            'recent_failures': self.store.get(self._key(model, 'failures')) or 0,
+            'retry_after': max(0.0, open_until - time.time()) if state == 'open' else None,
+        }
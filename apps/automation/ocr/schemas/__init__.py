@@ -5,6 +5,8 @@ from .damage import (
     DetectedDamage,
     DamageLocation,
     DamageSummary,
+    PackedPhotoDamage,
+    PackedDamageDetectionResponse,
 )
 from .dashboard import (
     DashboardAnalysisResponse,
@@ -27,6 +29,8 @@ __all__ = [
     'DetectedDamage',
     'DamageLocation',
     'DamageSummary',
+    'PackedPhotoDamage',
+    'PackedDamageDetectionResponse',
     'DashboardAnalysisResponse',
     'OdometerReading',
     'FuelGaugeReading',
@@ -116,3 +116,20 @@ class DamageDetectionResponse(BaseModel):
             }
         }
     )
+
+
+class PackedPhotoDamage(DamageDetectionResponse):
+    """Damage detection result for one photo of a packed request."""
+    photo: str = Field(description='Label of the photo this result describes, e.g. "Photo 2"')
+
+
+class PackedDamageDetectionResponse(BaseModel):
+    """Response from a damage detection request carrying several photos.
+
+    Each entry is a complete DamageDetectionResponse for one photo,
+    identified by the label the photo was sent with.
+    """
+    photos: list[PackedPhotoDamage] = Field(
+        default_factory=list,
+        description='One result per photo, in any order'
+    )
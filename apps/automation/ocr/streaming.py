@@ -0,0 +1,148 @@
+"""
+Helpers for streamed completions.
+
+With ``"stream": true`` OpenRouter answers with server-sent events, each
+``data:`` line carrying a chunk whose ``choices[0].delta.content`` is the
+next piece of the message. ``iter_sse_data`` splits the event stream and
+``IncrementalJSONParser`` picks the top-level fields of the JSON object out
+of the text as it arrives, so callers can show them before the model has
+finished writing the rest.
+"""
+import json
+from typing import Any, Iterable, Iterator, NamedTuple
+
+
+class StreamEvent(NamedTuple):
+    """An event from ``BaseDocumentParser.parse_stream``.
+
+    ``event`` is 'field', with ``data`` a (name, value) pair, or 'result',
+    with ``data`` the validated response.
+    """
+    event: str
+    data: Any
+
+
+def iter_sse_data(lines: Iterable[str]) -> Iterator[str]:
+    """Yield the data of each server-sent event in a stream of lines.
+
+    Comment lines (OpenRouter sends ``: OPENROUTER PROCESSING`` keep-alives)
+    and fields other than ``data`` are ignored.
+    """
+    data = []
+    for line in lines:
+        if not line:
+            if data:
+                yield '\n'.join(data)
+                data = []
+            continue
+        if line.startswith(':'):
+            continue
+        name, _, value = line.partition(':')
+        if name == 'data':
+            data.append(value[1:] if value.startswith(' ') else value)
+    if data:
+        yield '\n'.join(data)
+
+
+class IncrementalJSONParser:
+    """Extracts the top-level fields of a JSON object from partial text.
+
+    Text before the opening brace, such as prose or a markdown fence, is
+    skipped, as ``extract_json_from_response`` does. A field is reported
+    once its value is complete: strings as soon as the closing quote
+    arrives, other values when the following comma or closing brace does.
+    Nested objects and arrays are reported whole. Values that are not valid
+    JSON are skipped; the full response is still parsed and validated once
+    complete, so nothing here needs to be authoritative.
+    """
+
+    def __init__(self):
+        self.document: dict = {}
+        self.finished = False
+        self._started = False
+        self._key = None
+        self._after_colon = False
+        self._token: list = []
+        self._in_string = False
+        self._escape = False
+        self._nesting = 0
+        self._emitted = False
+
+    def _emit(self, fields: list) -> None:
+        self._emitted = True
+        try:
+            value = json.loads(''.join(self._token))
+        except ValueError:
+            return
+        self.document[self._key] = value
+        fields.append((self._key, value))
+
+    def _end_field(self, fields: list) -> None:
+        if not self._emitted:
+            self._emit(fields)
+        self._key = None
+        self._after_colon = False
+        self._token = []
+        self._emitted = False
+
+    def feed(self, text: str) -> list[tuple[str, Any]]:
+        """Consume the next piece of text.
+
+        Returns:
+            (name, value) for every field completed by this piece
+        """
+        fields = []
+        for char in text:
+            if self.finished:
+                break
+            if not self._started:
+                self._started = char == '{'
+                continue
+
+            if self._in_string:
+                self._token.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._key is None:
+                        try:
+                            self._key = json.loads(''.join(self._token))
+                        except ValueError:
+                            self._key = ''.join(self._token)[1:-1]
+                        self._token = []
+                    elif self._nesting == 0:
+                        # A string value is complete without waiting for the comma
+                        self._emit(fields)
+                continue
+
+            if self._key is None:
+                if char == '"':
+                    self._in_string = True
+                    self._token = ['"']
+                elif char == '}':
+                    self.finished = True
+                continue
+            if not self._after_colon:
+                self._after_colon = char == ':'
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._token.append(char)
+            elif char in '{[':
+                self._nesting += 1
+                self._token.append(char)
+            elif char in '}]' and self._nesting:
+                self._nesting -= 1
+                self._token.append(char)
+            elif char == '}':
+                self._end_field(fields)
+                self.finished = True
+            elif char == ',' and self._nesting == 0:
+                self._end_field(fields)
+            else:
+                self._token.append(char)
+        return fields
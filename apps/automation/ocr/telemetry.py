@@ -0,0 +1,158 @@
+"""
+Per-call OCR telemetry.
+
+An OpenRouterClient given a ``recorder`` calls it with a ``CallRecord``
+after every model call, successful or not, and parsers report results
+answered from the result cache through ``OpenRouterClient.record_cache_hit``.
+What happens to the records is up to the recorder; the Django integration
+stores them and rolls them up into hourly buckets.
+
+Latency percentiles over many calls are estimated from fixed histogram
+bins (``LATENCY_BOUNDS_MS``), so buckets can be summed without keeping
+every sample.
+"""
+from bisect import bisect_left
+from dataclasses import asdict, dataclass
+from decimal import Decimal
+from typing import Optional
+
+# Upper bounds of the latency histogram bins in milliseconds; a last bin
+# counts everything slower
+LATENCY_BOUNDS_MS = (
+    250, 500, 750, 1000, 1500, 2000, 3000, 4000, 5000, 7500,
+    10000, 15000, 20000, 30000, 45000, 60000, 90000, 120000,
+)
+
+OUTCOMES = ('ok', 'cached', 'error', 'rate_limited', 'unavailable')
+
+
+@dataclass
+class CallRecord:
+    """One OCR model call, or a result served from the cache.
+
+    Attributes:
+        model: Model asked
+        parser: Parser class that made the call, e.g. 'LicenseParser'
+        outcome: One of OUTCOMES
+        input_bytes: Image bytes sent, after preprocessing
+        tokens_in: Prompt tokens reported by the API
+        tokens_cached: Prompt tokens the provider read from its prompt
+            cache, included in ``tokens_in``
+        tokens_out: Completion tokens reported by the API
+        cost_usd: Cost reported by the API, when it includes one
+        latency_ms: Time from sending the request to the full answer,
+            including retries
+        attempts: Requests made, retries included
+        error: Short description of the failure
+    """
+    model: str
+    parser: str = ''
+    outcome: str = 'ok'
+    input_bytes: int = 0
+    tokens_in: Optional[int] = None
+    tokens_cached: Optional[int] = None
+    tokens_out: Optional[int] = None
+    cost_usd: Optional[float] = None
+    latency_ms: Optional[float] = None
+    attempts: int = 0
+    error: str = ''
+
+    @property
+    def cache_hit(self) -> bool:
+        return self.outcome == 'cached'
+
+    @property
+    def failed(self) -> bool:
+        return self.outcome in ('error', 'rate_limited', 'unavailable')
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def cached_tokens(usage: dict) -> Optional[int]:
+    """Prompt tokens read from the provider's prompt cache.
+
+    OpenRouter reports them as ``prompt_tokens_details.cached_tokens``;
+    Anthropic-style ``cache_read_input_tokens`` is accepted as well.
+    """
+    details = usage.get('prompt_tokens_details') or {}
+    if details.get('cached_tokens') is not None:
+        return details['cached_tokens']
+    return usage.get('cache_read_input_tokens')
+
+
+def usage_fields(usage: Optional[dict]) -> dict:
+    """Token counts and cost from an API response's ``usage`` object."""
+    usage = usage or {}
+    return {
+        'tokens_in': usage.get('prompt_tokens'),
+        'tokens_cached': cached_tokens(usage),
+        'tokens_out': usage.get('completion_tokens'),
+        'cost_usd': usage.get('cost'),
+    }
+
+
+def estimate_cost(record: CallRecord, prices: dict) -> Optional[Decimal]:
+    """Cost of a call in USD.
+
+    Uses the cost the API reported when there is one, otherwise the
+    model's entry in ``prices``: (input, output) USD per million tokens,
+    optionally followed by the price of cached input tokens. Without a
+    cached price, cached tokens are charged as input.
+
+    Returns:
+        The cost, 0 for cache hits, or None when it cannot be worked out
+    """
+    if record.cache_hit:
+        return Decimal(0)
+    if record.cost_usd is not None:
+        return Decimal(str(record.cost_usd))
+    price = prices.get(record.model)
+    if price is None or record.tokens_in is None:
+        return None
+    per_input, per_output, *per_cached = (Decimal(str(value)) for value in price)
+    cached = min(record.tokens_cached or 0, record.tokens_in) if per_cached else 0
+    tokens = (
+        per_input * (record.tokens_in - cached)
+        + (per_cached[0] * cached if cached else 0)
+        + per_output * (record.tokens_out or 0)
+    )
+    return (tokens / 1_000_000).quantize(Decimal('0.000001'))
+
+
+def latency_bin(latency_ms: float) -> int:
+    """Index of the histogram bin a latency falls in."""
+    return bisect_left(LATENCY_BOUNDS_MS, latency_ms)
+
+
+def empty_histogram() -> list[int]:
+    return [0] * (len(LATENCY_BOUNDS_MS) + 1)
+
+
+def merge_histograms(histograms) -> list[int]:
+    """Sum histograms bin by bin."""
+    total = empty_histogram()
+    for histogram in histograms:
+        for index, count in enumerate(histogram or []):
+            if index < len(total):
+                total[index] += count
+    return total
+
+
+def histogram_percentile(histogram: list[int], fraction: float) -> Optional[int]:
+    """Estimate a latency percentile from a histogram.
+
+    Returns:
+        The upper bound of the bin holding the percentile, in ms; the
+        slowest bound for the overflow bin; None for an empty histogram
+    """
+    total = sum(histogram)
+    if not total:
+        return None
+    target = fraction * total
+    seen = 0
+    for index, count in enumerate(histogram):
+        seen += count
+        if count and seen >= target:
+            return LATENCY_BOUNDS_MS[min(index, len(LATENCY_BOUNDS_MS) - 1)]
+    return LATENCY_BOUNDS_MS[-1]
@@ -0,0 +1,380 @@
+"""
+Local stand-in for the OpenRouter chat completions API.
+
+Used by benchmarks, load tests and tests to exercise the real HTTP stack
+(connection pooling, keep-alive, timeouts, retries) without network access
+or API spend. ``canned_responder`` answers every parser in this package
+with a schema-valid result, and the server can inject upstream latency,
+errors and 429s at configurable rates.
+
+Request bodies are checked against the shape of a chat completions
+request (``payload_errors``) and answered with a 400 when they do not
+match. Prompt caching is modelled too: the text up to a message part's
+``cache_control`` breakpoint is remembered per model, and a later request
+repeating it reports those tokens as ``prompt_tokens_details.cached_tokens``.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+from .prompts.comparison import COMPARISON_SYSTEM_PROMPT
+from .prompts.damage import DAMAGE_DETECTION_SYSTEM_PROMPT
+from .prompts.dashboard import DASHBOARD_ANALYSIS_SYSTEM_PROMPT
+from .prompts.insurance import INSURANCE_OCR_SYSTEM_PROMPT
+from .prompts.license import LICENSE_OCR_SYSTEM_PROMPT
+from .schemas.comparison import DamageComparisonResponse
+from .schemas.damage import DamageDetectionResponse
+from .schemas.dashboard import DashboardAnalysisResponse
+from .schemas.insurance import InsuranceOCRResponse
+from .schemas.license import LicenseOCRResponse
+
+DEFAULT_STUB_CONTENT = '{"success": true}'
+
+# Prompt tokens reported for whatever is not a cacheable prefix
+UNCACHED_PROMPT_TOKENS = 10
+COMPLETION_TOKENS = 5
+
+ROLES = ('system', 'user', 'assistant')
+PART_TYPES = ('text', 'image_url')
+# Anthropic allows at most four cache breakpoints per request
+MAX_CACHE_BREAKPOINTS = 4
+
+# Parser system prompts and the response model each expects
+CANNED_RESPONSE_MODELS = [
+    (LICENSE_OCR_SYSTEM_PROMPT, LicenseOCRResponse),
+    (INSURANCE_OCR_SYSTEM_PROMPT, InsuranceOCRResponse),
+    (DAMAGE_DETECTION_SYSTEM_PROMPT, DamageDetectionResponse),
+    (DASHBOARD_ANALYSIS_SYSTEM_PROMPT, DashboardAnalysisResponse),
+    (COMPARISON_SYSTEM_PROMPT, DamageComparisonResponse),
+]
+
+
+def _text(content) -> str:
+    """The text of a message's content, whether a string or a list of parts."""
+    if isinstance(content, str):
+        return content
+    return '\n'.join(part.get('text', '') for part in content or [] if part.get('type') == 'text')
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a text, at four characters per token."""
+    return max(len(text) // 4, 1) if text else 0
+
+
+def payload_errors(payload: dict) -> list[str]:
+    """What is wrong with a chat completions request body; empty when valid.
+
+    Checks the model, the roles, that content is a string or a non-empty
+    list of text and image parts, and that ``cache_control`` breakpoints
+    are ephemeral, sit on text parts and number at most
+    ``MAX_CACHE_BREAKPOINTS``.
+    """
+    errors = []
+    if not isinstance(payload.get('model'), str) or not payload['model']:
+        errors.append('model is required')
+    messages = payload.get('messages')
+    if not isinstance(messages, list) or not messages:
+        return errors + ['messages must be a non-empty list']
+
+    breakpoints = 0
+    for index, message in enumerate(messages):
+        where = f'messages[{index}]'
+        if not isinstance(message, dict) or message.get('role') not in ROLES:
+            errors.append(f'{where}.role must be one of {", ".join(ROLES)}')
+            continue
+        content = message.get('content')
+        if isinstance(content, str):
+            continue
+        if not isinstance(content, list) or not content:
+            errors.append(f'{where}.content must be a string or a non-empty list of parts')
+            continue
+        for position, part in enumerate(content):
+            part_where = f'{where}.content[{position}]'
+            kind = part.get('type') if isinstance(part, dict) else None
+            if kind not in PART_TYPES:
+                errors.append(f'{part_where}.type must be one of {", ".join(PART_TYPES)}')
+                continue
+            if kind == 'text' and not isinstance(part.get('text'), str):
+                errors.append(f'{part_where}.text must be a string')
+            if kind == 'image_url' and not isinstance((part.get('image_url') or {}).get('url'), str):
+                errors.append(f'{part_where}.image_url.url must be a string')
+            if 'cache_control' in part:
+                breakpoints += 1
+                if kind != 'text':
+                    errors.append(f'{part_where}.cache_control is only allowed on text parts')
+                if part['cache_control'] != {'type': 'ephemeral'}:
+                    errors.append(f'{part_where}.cache_control must be {{"type": "ephemeral"}}')
+    if breakpoints > MAX_CACHE_BREAKPOINTS:
+        errors.append(f'at most {MAX_CACHE_BREAKPOINTS} cache_control breakpoints are allowed')
+    return errors
+
+
+def cacheable_prefix(payload: dict) -> str:
+    """The prompt text up to the last ``cache_control`` breakpoint, or ''."""
+    prefix, texts = '', []
+    for message in payload.get('messages') or []:
+        content = message.get('content')
+        for part in [{'type': 'text', 'text': content}] if isinstance(content, str) else content or []:
+            texts.append(part.get('text') or part.get('image_url', {}).get('url', ''))
+            if 'cache_control' in part:
+                prefix = '\n'.join(texts)
+    return prefix
+
+
+def canned_responder(payload: dict) -> str:
+    """Answer a request from any parser with its schema's example result.
+
+    The parser is recognised by its system prompt; packed damage requests
+    get one result per photo label. Unrecognised requests get
+    ``DEFAULT_STUB_CONTENT``.
+    """
+    messages = payload.get('messages') or [{}]
+    system = _text(messages[0].get('content'))
+    for prompt, response_model in CANNED_RESPONSE_MODELS:
+        if prompt in system:
+            example = response_model.model_config['json_schema_extra']['example']
+            break
+    else:
+        return DEFAULT_STUB_CONTENT
+
+    if response_model is DamageDetectionResponse:
+        content = messages[-1].get('content') or []
+        labels = [part['text'] for part in content[:-1] if part.get('type') == 'text']
+        if labels:
+            return json.dumps({'photos': [{'photo': label, **example} for label in labels]})
+    return json.dumps(example)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict, headers: Optional[dict] = None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        with self.server.stats_lock:
+            self.server.status_counts[status] = self.server.status_counts.get(status, 0) + 1
+
+    def do_GET(self):
+        # Key check used by the tenant settings page
+        if self.path.rstrip('/').endswith('/auth/key'):
+            self._send_json(200, {'data': {'label': 'stub', 'limit': None, 'usage': 0}})
+        else:
+            self._send_json(404, {'error': {'message': 'Not found', 'code': 404}})
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            payload = {}
+
+        with server.stats_lock:
+            server.request_count += 1
+            server.client_ports.add(self.client_address[1])
+            server.last_payload = payload
+            draw = server.rng.random()
+            latency = server.latency + server.rng.uniform(0, server.latency_jitter)
+
+        errors = payload_errors(payload)
+        if errors:
+            self._send_json(400, {'error': {'message': f'Invalid request: {"; ".join(errors)}', 'code': 400}})
+            return
+
+        # Rate limits are answered at once, like the real API; errors after the latency
+        if draw < server.rate_limit_rate:
+            self._send_json(
+                429, {'error': {'message': 'Rate limit exceeded', 'code': 429}},
+                {'Retry-After': f'{server.retry_after:g}'},
+            )
+            return
+        if latency:
+            time.sleep(latency)
+        if draw < server.rate_limit_rate + server.error_rate:
+            self._send_json(502, {'error': {'message': 'Upstream provider error', 'code': 502}})
+            return
+
+        content = server.responder(payload) if server.responder else server.content
+        usage = self._usage(payload)
+        if payload.get('stream'):
+            self._stream(payload, content, usage)
+            return
+
+        self._send_json(200, {
+            'id': f'stub-{server.request_count}',
+            'model': payload.get('model', 'stub/model'),
+            'choices': [{'message': {'role': 'assistant', 'content': content}}],
+            'usage': usage,
+        })
+
+    def _usage(self, payload):
+        """Token usage of a request, reading a repeated cacheable prefix from the cache."""
+        server = self.server
+        prefix = cacheable_prefix(payload)
+        prefix_tokens = estimate_tokens(prefix)
+        with server.stats_lock:
+            key = (payload.get('model'), prefix)
+            cached = prefix_tokens if prefix and key in server.prompt_cache else 0
+            if prefix:
+                server.prompt_cache.add(key)
+            server.cached_tokens += cached
+        prompt_tokens = UNCACHED_PROMPT_TOKENS + prefix_tokens
+        return {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': COMPLETION_TOKENS,
+            'total_tokens': prompt_tokens + COMPLETION_TOKENS,
+            'prompt_tokens_details': {'cached_tokens': cached},
+        }
+
+    def _stream(self, payload, content, usage):
+        """Answer as server-sent events, ``stream_chunk_size`` characters at a time."""
+        server = self.server
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        with server.stats_lock:
+            server.status_counts[200] = server.status_counts.get(200, 0) + 1
+
+        def send(data):
+            self.wfile.write(f'data: {data}\n\n'.encode())
+            self.wfile.flush()
+
+        self.wfile.write(b': OPENROUTER PROCESSING\n\n')
+        size = server.stream_chunk_size
+        for start in range(0, len(content), size):
+            if start and server.stream_delay:
+                time.sleep(server.stream_delay)
+            send(json.dumps({
+                'id': f'stub-{server.request_count}',
+                'model': payload.get('model', 'stub/model'),
+                'choices': [{'delta': {'content': content[start:start + size]}}],
+            }))
+        send(json.dumps({
+            'id': f'stub-{server.request_count}',
+            'model': payload.get('model', 'stub/model'),
+            'choices': [{'delta': {}, 'finish_reason': 'stop'}],
+            'usage': usage,
+        }))
+        send('[DONE]')
+
+
+class StubOpenRouterServer:
+    """Threaded HTTP server answering every POST with a canned completion.
+
+    Use as a context manager; ``url`` is the chat completions endpoint to
+    pass as ``OpenRouterClient(api_url=...)`` and ``base_url`` the value
+    for ``OPENROUTER_BASE_URL``. ``connection_count`` is the number of
+    distinct client connections seen, which shows whether connections are
+    being reused. Requests with ``"stream": true`` are answered with
+    server-sent events. Malformed requests get a 400, and
+    ``cached_tokens`` totals the prompt tokens served from the simulated
+    prompt cache.
+
+    Args:
+        content: Message content returned in every completion
+        latency: Seconds to sleep before answering, to model upstream time
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+        responder: Optional callable building the content from the request
+            payload, used instead of ``content``; it runs on the request's
+            thread and may sleep to model payload-dependent latency.
+            ``canned_responder`` answers every parser.
+        stream_chunk_size: Characters of content per streamed event
+        stream_delay: Seconds between streamed events
+        latency_jitter: Up to this many seconds are added to ``latency``
+            at random
+        error_rate: Share of requests answered with a 502
+        rate_limit_rate: Share of requests answered with a 429
+        retry_after: Retry-After seconds sent with a 429
+        seed: Seed for the random latency and faults, for repeatable runs
+    """
+
+    def __init__(self, content: str = DEFAULT_STUB_CONTENT, latency: float = 0.0,
+                 host: str = '127.0.0.1', port: int = 0,
+                 responder: Optional[Callable[[dict], str]] = None,
+                 stream_chunk_size: int = 16, stream_delay: float = 0.0,
+                 latency_jitter: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after: float = 1.0,
+                 seed: Optional[int] = None):
+        self._server = ThreadingHTTPServer((host, port), _StubHandler)
+        self._server.daemon_threads = True
+        self._server.content = content
+        self._server.responder = responder
+        self._server.latency = latency
+        self._server.latency_jitter = latency_jitter
+        self._server.error_rate = error_rate
+        self._server.rate_limit_rate = rate_limit_rate
+        self._server.retry_after = retry_after
+        self._server.rng = random.Random(seed)
+        self._server.stream_chunk_size = stream_chunk_size
+        self._server.stream_delay = stream_delay
+        self._server.stats_lock = threading.Lock()
+        self._server.request_count = 0
+        self._server.status_counts = {}
+        self._server.client_ports = set()
+        self._server.last_payload = None
+        self._server.prompt_cache = set()
+        self._server.cached_tokens = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/api/v1'
+
+    @property
+    def url(self) -> str:
+        return f'{self.base_url}/chat/completions'
+
+    @property
+    def request_count(self) -> int:
+        return self._server.request_count
+
+    @property
+    def status_counts(self) -> dict:
+        """Responses sent so far by HTTP status."""
+        with self._server.stats_lock:
+            return dict(self._server.status_counts)
+
+    @property
+    def connection_count(self) -> int:
+        return len(self._server.client_ports)
+
+    @property
+    def cached_tokens(self) -> int:
+        return self._server.cached_tokens
+
+    @property
+    def last_payload(self) -> Optional[dict]:
+        return self._server.last_payload
+
+    def start(self) -> 'StubOpenRouterServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'StubOpenRouterServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,154 @@
+"""
+Shared, pooled HTTP transports for the OpenRouter client.
+
+Opening a fresh ``httpx.Client`` per request pays TCP and TLS setup on every
+OCR call. Instead, every OpenRouterClient in the process sends through one
+long-lived connection pool (and one per event loop for async calls), so
+keep-alive connections are reused across requests and across tenants.
+
+Each request still goes through a short-lived ``httpx.Client`` wrapping the
+shared transport, so per-client settings such as the timeout keep working;
+closing that client leaves the pool open.
+"""
+import asyncio
+import logging
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TransportConfig:
+    """Connection pool settings for the shared transports.
+
+    Attributes:
+        max_connections: Maximum concurrent connections in the pool
+        max_keepalive_connections: Idle connections kept open for reuse
+        keepalive_expiry: Seconds an idle connection is kept open
+        connect_timeout: Seconds allowed to establish a connection
+        http2: Negotiate HTTP/2 when the optional ``h2`` package is installed
+        retries: Connection attempts retried on connect errors
+    """
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 10.0
+    http2: bool = False
+    retries: int = 0
+
+    @property
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeout(self, timeout: float) -> httpx.Timeout:
+        """Build a request timeout using this pool's connect timeout."""
+        return httpx.Timeout(timeout, connect=min(self.connect_timeout, timeout))
+
+
+_lock = threading.Lock()
+_config = TransportConfig()
+_sync_transport: Optional[httpx.HTTPTransport] = None
+_async_transports: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport]' = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _transport_kwargs(config: TransportConfig) -> dict:
+    http2 = config.http2
+    if http2 and not _http2_available():
+        logger.warning('HTTP/2 requested for OCR transport but h2 is not installed; using HTTP/1.1')
+        http2 = False
+    return {'limits': config.limits, 'http2': http2, 'retries': config.retries}
+
+
+def configure_transport(config: TransportConfig) -> None:
+    """Replace the pool settings; existing pools are closed and rebuilt lazily."""
+    global _config
+    with _lock:
+        _config = config
+    close_transports()
+
+
+def get_transport_config() -> TransportConfig:
+    return _config
+
+
+def get_shared_transport() -> httpx.BaseTransport:
+    """Return the process-wide sync transport, wrapped so clients cannot close it."""
+    global _sync_transport
+    with _lock:
+        if _sync_transport is None:
+            _sync_transport = httpx.HTTPTransport(**_transport_kwargs(_config))
+        return SharedTransport(_sync_transport)
+
+
+def get_shared_async_transport() -> httpx.AsyncBaseTransport:
+    """Return the async transport for the running event loop.
+
+    Async connection pools are bound to the loop that created them, so one
+    pool is kept per loop and dropped when the loop is garbage collected.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        transport = _async_transports.get(loop)
+        if transport is None:
+            transport = httpx.AsyncHTTPTransport(**_transport_kwargs(_config))
+            _async_transports[loop] = transport
+        return SharedAsyncTransport(transport)
+
+
+def close_transports() -> None:
+    """Close the shared sync pool and forget the async pools.
+
+    Async pools can only be closed from their own loop; they are released
+    when their loop goes away.
+    """
+    global _sync_transport
+    with _lock:
+        transport, _sync_transport = _sync_transport, None
+        _async_transports.clear()
+    if transport is not None:
+        transport.close()
+
+
+class SharedTransport(httpx.BaseTransport):
+    """Delegates to a shared transport and ignores ``close()``."""
+
+    def __init__(self, transport: httpx.BaseTransport):
+        self._transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self._transport.handle_request(request)
+
+    def close(self) -> None:
+        pass
+
+
+class SharedAsyncTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of SharedTransport."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        pass
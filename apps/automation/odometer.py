@@ -0,0 +1,238 @@
+"""
+Mileage and fuel from dashboard photos taken at checkout and checkin.
+
+Staff never wait on the model. ``record_dashboard_photo`` adds the photo to
+the checkout or checkin condition report straight away, with the mileage
+and fuel level staff entered. A report is only created when the handover
+has none yet, with provisional values for anything left blank
+(``mileage_source`` / ``fuel_level_source`` 'estimated'). The photo is then
+queued for dashboard analysis. When the analysis completes, ``apply_dashboard_reading``
+reconciles the reading with what is already known:
+
+- an estimated value is replaced by a confident reading;
+- an entered value within ``OCR_ODOMETER_TOLERANCE`` is confirmed, a
+  reading further away is flagged and the entered value kept;
+- an odometer below the mileage already on record, or further on than
+  ``OCR_ODOMETER_MAX_DAILY_MILES`` per rental day allows, is taken for a
+  misread and flagged.
+
+Applied mileage is copied to the reservation's checkout or checkin mileage
+and raises ``Vehicle.mileage``, which never goes down. Lit warning lights
+are stored on the report.
+"""
+import logging
+import math
+from fractions import Fraction
+
+from django.conf import settings
+from django.db import transaction
+
+from .comparisons import latest_report
+from .integration.feature_check import check_inspection_access
+
+logger = logging.getLogger(__name__)
+
+MILES_PER_KM = 0.621371
+
+# ConditionReport fuel levels as percentages of a full tank
+FUEL_LEVEL_PERCENT = {'empty': 0, '1/4': 25, '1/2': 50, '3/4': 75, 'full': 100}
+
+WARNING_LIGHT_STATES = ('on', 'blinking')
+
+
+def provisional_mileage(reservation, report_type):
+    """Mileage to show until the dashboard has been read.
+
+    The checkout mileage at checkin, otherwise the vehicle's recorded mileage.
+    """
+    if report_type == 'checkin' and reservation.checkout_mileage:
+        return reservation.checkout_mileage
+    return reservation.vehicle.mileage
+
+
+def provisional_fuel_level(contract, report_type):
+    """Fuel level to show until the dashboard has been read.
+
+    The checkout report's level at checkin, otherwise a full tank.
+    """
+    checkout = latest_report(contract, 'checkout') if report_type == 'checkin' else None
+    return checkout.fuel_level if checkout else 'full'
+
+
+def record_dashboard_photo(reservation, report_type, image, mileage=None, fuel_level=None, **report_fields):
+    """Add a dashboard photo to a reservation's checkout or checkin report.
+
+    The photo joins the latest report of that type, so the inspection report
+    with the exterior photos stays the one damage comparisons use; entered
+    mileage and fuel level replace the report's. Only when there is no report
+    yet is one created, with provisional values for anything left blank, and
+    the reservation's contract with it if needed. The photo is queued for
+    dashboard analysis when the tenant can use inspection AI; otherwise the
+    report keeps the entered or provisional values.
+
+    Args:
+        reservation: Reservation being checked out or in
+        report_type: 'checkout' or 'checkin'
+        image: Uploaded dashboard photo
+        mileage: Mileage entered by staff, if any
+        fuel_level: Fuel level entered by staff, if any
+        **report_fields: Other ConditionReport fields for a new report, e.g.
+            inspector_name
+
+    Returns:
+        (ConditionReport, pending InspectionAnalysis or None)
+    """
+    from apps.contracts.models import ConditionReport, ConditionReportPhoto, Contract
+    from .dedup import create_photo
+    from .jobs import enqueue_inspection_analysis
+
+    contract, _ = Contract.objects.get_or_create(
+        reservation=reservation, defaults={'tenant': reservation.tenant}
+    )
+    report = latest_report(contract, report_type)
+    if report is None:
+        report = ConditionReport.objects.create(
+            contract=contract,
+            report_type=report_type,
+            mileage=mileage or provisional_mileage(reservation, report_type),
+            mileage_source='entered' if mileage else 'estimated',
+            fuel_level=fuel_level or provisional_fuel_level(contract, report_type),
+            fuel_level_source='entered' if fuel_level else 'estimated',
+            **{'exterior_condition': 'good', 'interior_condition': 'good', **report_fields},
+        )
+    elif mileage or fuel_level:
+        if mileage:
+            report.mileage, report.mileage_source = mileage, 'entered'
+        if fuel_level:
+            report.fuel_level, report.fuel_level_source = fuel_level, 'entered'
+        report.save(update_fields=['mileage', 'mileage_source', 'fuel_level', 'fuel_level_source'])
+    photo = create_photo(ConditionReportPhoto, image, {'condition_report': report, 'location': 'dashboard'})
+
+    if not check_inspection_access(reservation.tenant):
+        return report, None
+    return report, enqueue_inspection_analysis(photo, 'dashboard_analysis')
+
+
+def odometer_miles(odometer):
+    """An odometer reading in miles, or None when missing or unsure."""
+    if odometer is None or odometer.confidence < settings.OCR_ODOMETER_MIN_CONFIDENCE:
+        return None
+    if odometer.unit.lower().startswith('k'):
+        return round(odometer.reading * MILES_PER_KM)
+    return odometer.reading
+
+
+def fuel_level_choice(gauge):
+    """The nearest ConditionReport fuel level to a gauge reading, rounding down on ties."""
+    if gauge is None or gauge.confidence < settings.OCR_ODOMETER_MIN_CONFIDENCE:
+        return None
+    level = gauge.level.strip().lower()
+    if level in FUEL_LEVEL_PERCENT:
+        percent = FUEL_LEVEL_PERCENT[level]
+    else:
+        try:
+            percent = float(Fraction(level)) * 100
+        except (ValueError, ZeroDivisionError):
+            percent = gauge.percentage
+    return min(FUEL_LEVEL_PERCENT, key=lambda choice: abs(FUEL_LEVEL_PERCENT[choice] - percent))
+
+
+def lit_warning_lights(result):
+    return [
+        light.model_dump(mode='json') for light in result.warning_lights
+        if light.status.lower() in WARNING_LIGHT_STATES
+    ]
+
+
+def _rental_days(reservation):
+    if reservation.actual_checkout_at and reservation.actual_checkin_at:
+        elapsed = reservation.actual_checkin_at - reservation.actual_checkout_at
+        return max(math.ceil(elapsed.total_seconds() / 86400), 1)
+    return max(reservation.duration_days, 1)
+
+
+def _mileage_bounds(report, reservation):
+    """(lowest, highest) plausible odometer reading for a report; highest may be None."""
+    if report.report_type == 'checkin' and reservation.checkout_mileage:
+        lowest = reservation.checkout_mileage
+        return lowest, lowest + settings.OCR_ODOMETER_MAX_DAILY_MILES * _rental_days(reservation)
+    return reservation.vehicle.mileage, None
+
+
+def _reconcile_mileage(report, reservation, reading, flags):
+    """Apply an odometer reading to the report; returns the mileage applied or None."""
+    if reading is None:
+        if report.mileage_source == 'estimated':
+            flags.append('The odometer could not be read; the mileage is an estimate.')
+        return None
+
+    lowest, highest = _mileage_bounds(report, reservation)
+    if reading < lowest:
+        flags.append(f'The dashboard reads {reading:,} mi, below the {lowest:,} mi already recorded.')
+        return None
+    if highest is not None and reading > highest:
+        flags.append(f'The dashboard reads {reading:,} mi, more than the rental could have covered since checkout.')
+        return None
+    if report.mileage_source == 'entered' and abs(reading - report.mileage) > settings.OCR_ODOMETER_TOLERANCE:
+        flags.append(f'The dashboard reads {reading:,} mi but {report.mileage:,} mi was entered.')
+        return None
+
+    report.mileage = reading
+    report.mileage_source = 'dashboard'
+    return reading
+
+
+def _reconcile_fuel_level(report, level, flags):
+    if level is None:
+        if report.fuel_level_source == 'estimated':
+            flags.append('The fuel gauge could not be read; the fuel level is an estimate.')
+        return
+    if report.fuel_level_source == 'entered' and level != report.fuel_level:
+        flags.append(f'The fuel gauge reads {level} but {report.fuel_level} was entered.')
+        return
+    report.fuel_level = level
+    report.fuel_level_source = 'dashboard'
+
+
+def apply_dashboard_reading(analysis):
+    """Reconcile a completed dashboard analysis with its condition report.
+
+    Updates the report's mileage, fuel level, warning lights and flags, the
+    reservation's checkout or checkin mileage and the vehicle's mileage.
+    Applying the same analysis twice changes nothing further.
+
+    Returns:
+        The updated ConditionReport
+    """
+    from apps.automation.ocr.schemas.dashboard import DashboardAnalysisResponse
+    from apps.contracts.models import ConditionReport
+
+    result = DashboardAnalysisResponse.model_validate(analysis.result)
+    with transaction.atomic():
+        report = (
+            ConditionReport.objects.select_for_update()
+            .select_related('contract__reservation__vehicle')
+            .get(pk=analysis.condition_report_id)
+        )
+        reservation = report.contract.reservation
+        flags = []
+        mileage = _reconcile_mileage(report, reservation, odometer_miles(result.odometer), flags)
+        _reconcile_fuel_level(report, fuel_level_choice(result.fuel_gauge), flags)
+        report.warning_lights = lit_warning_lights(result)
+        report.reading_flags = flags
+        report.save(update_fields=[
+            'mileage', 'mileage_source', 'fuel_level', 'fuel_level_source', 'warning_lights', 'reading_flags',
+        ])
+
+        if mileage is not None:
+            field = 'checkin_mileage' if report.report_type == 'checkin' else 'checkout_mileage'
+            setattr(reservation, field, mileage)
+            reservation.save(update_fields=[field, 'updated_at'])
+            vehicle = reservation.vehicle
+            if mileage > vehicle.mileage:
+                vehicle.mileage = mileage
+                vehicle.save(update_fields=['mileage'])
+
+    if flags:
+        logger.info('Dashboard reading for condition report %s needs review: %s', report.pk, ' '.join(flags))
+    return report
@@ -0,0 +1,69 @@
+from celery import shared_task
+
+
+@shared_task(ignore_result=True, acks_late=True)
+def process_ocr_job(job_id):
+    """Run a queued OCRJob through its document parser."""
+    from .jobs import run_ocr_job
+
+    job = run_ocr_job(job_id)
+    return job.status if job else None
+
+
+@shared_task(ignore_result=True, acks_late=True)
+def process_inspection_analysis(analysis_id):
+    """Run a queued InspectionAnalysis through the damage or dashboard parser."""
+    from .jobs import run_inspection_analysis
+
+    analysis = run_inspection_analysis(analysis_id)
+    return analysis.status if analysis else None
+
+
+@shared_task(ignore_result=True, acks_late=True)
+def process_report_analysis(analysis_ids):
+    """Analyse every queued photo of a condition report concurrently."""
+    from .batch import run_report_analysis
+
+    return len(run_report_analysis(analysis_ids))
+
+
+@shared_task(ignore_result=True, acks_late=True)
+def process_damage_comparison(comparison_id):
+    """Compare a contract's checkout and checkin photos location by location."""
+    from .comparisons import run_damage_comparison
+
+    comparison = run_damage_comparison(comparison_id)
+    return comparison.status if comparison else None
+
+
+@shared_task(ignore_result=True, acks_late=True)
+def process_license_backfill(backfill_id):
+    """Parse stored customer licenses for a while, then queue the rest of the backfill."""
+    from .backfill import continue_license_backfill
+
+    backfill = continue_license_backfill(backfill_id)
+    return backfill.status if backfill else None
+
+
+@shared_task(ignore_result=True)
+def flush_ocr_usage():
+    """Copy the rate limiter's billed OCR usage counters to TenantSettings."""
+    from .integration.rate_limit import flush_usage
+
+    return flush_usage()
+
+
+@shared_task(ignore_result=True)
+def store_ocr_call_records(rows):
+    """Store a batch of OCR call records and add them to the hourly usage buckets."""
+    from .integration.telemetry import write_call_records
+
+    return write_call_records(rows)
+
+
+@shared_task(ignore_result=True)
+def prune_ocr_call_records():
+    """Delete OCR call records past their retention; the hourly buckets are kept."""
+    from .integration.telemetry import prune_call_records
+
+    return prune_call_records()
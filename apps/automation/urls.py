@@ -4,6 +4,14 @@ from .views import (
     ParseInsuranceView,
     ApplyLicenseDataView,
     ApplyInsuranceDataView,
+    OCRJobView,
+    AnalyzePhotoView,
+    InspectionAnalysisView,
+    ReportAnalysisView,
+    CompareContractView,
+    DamageComparisonView,
+    OCRHealthView,
+    OCRUsageView,
 )
 
 app_name = 'automation'
@@ -15,4 +23,12 @@ urlpatterns = [
     path('parse-insurance/<int:customer_id>/', ParseInsuranceView.as_view(), name='parse-insurance-customer'),
     path('apply-license/<int:customer_id>/', ApplyLicenseDataView.as_view(), name='apply-license'),
     path('apply-insurance/<int:customer_id>/', ApplyInsuranceDataView.as_view(), name='apply-insurance'),
+    path('jobs/<int:job_id>/', OCRJobView.as_view(), name='ocr-job'),
+    path('analyze-photo/<int:photo_id>/', AnalyzePhotoView.as_view(), name='analyze-photo'),
+    path('condition-reports/<int:report_id>/analyze/', ReportAnalysisView.as_view(), name='analyze-report'),
+    path('analyses/<int:analysis_id>/', InspectionAnalysisView.as_view(), name='inspection-analysis'),
+    path('contracts/<int:contract_id>/compare/', CompareContractView.as_view(), name='compare-contract'),
+    path('comparisons/<int:comparison_id>/', DamageComparisonView.as_view(), name='damage-comparison'),
+    path('health/', OCRHealthView.as_view(), name='ocr-health'),
+    path('usage/', OCRUsageView.as_view(), name='ocr-usage'),
 ]
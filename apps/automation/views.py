@@ -1,15 +1,45 @@
+import json
+import math
+
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import BasePermission, IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.reverse import reverse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 
 from apps.tenants.mixins import TenantViewMixin
 from apps.tenants.models import TenantSettings
 from apps.customers.models import Customer, CustomerInsurance
+from apps.contracts.models import (
+    ConditionReport,
+    ConditionReportPhoto,
+    Contract,
+    DamageComparison,
+    InspectionAnalysis,
+)
 from apps.automation.integration.feature_check import check_ocr_access, tenant_has_feature
+from apps.automation.integration.resilience import get_circuit_breaker, get_metrics
+from apps.automation.ocr.barcode import BARCODE_METRIC_NAMES
+from apps.automation.ocr.parsers.base import CASCADE_METRIC_NAMES, cascade_metrics_key
+from .batch import enqueue_report_analysis
+from .comparisons import enqueue_damage_comparison, latest_report
+from .jobs import (
+    LICENSE_BARCODE_METRICS,
+    LICENSE_FIELD_MAPPING,
+    POLL_INTERVAL,
+    apply_license_data,
+    create_ocr_job,
+    enqueue_inspection_analysis,
+    enqueue_ocr_job,
+    get_tenant_client,
+    stream_ocr_job,
+)
+from .models import OCRJob
 from .serializers import (
     LicenseDataSerializer,
     InsuranceDataSerializer,
@@ -45,7 +75,16 @@ class OCRAccessMixin:
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if not settings.can_make_ocr_request():
+        decision = settings.check_ocr_rate_limit()
+        if not decision.allowed and decision.reason == 'rate':
+            retry_after = math.ceil(decision.retry_after or 1)
+            response = Response(
+                {'error': f'Too many OCR requests. Please try again in {retry_after} seconds.'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+            response['Retry-After'] = str(retry_after)
+            return False, response
+        if not decision.allowed:
             return False, Response(
                 {'error': 'Daily OCR request limit reached. Please try again tomorrow.'},
                 status=status.HTTP_429_TOO_MANY_REQUESTS
@@ -55,16 +94,44 @@ class OCRAccessMixin:
 
     def get_parser_client(self, tenant):
         """Get a configured parser for the tenant."""
-        settings = tenant.settings
-        api_key = settings.get_api_key()
-        model = settings.openrouter_model
+        return get_tenant_client(tenant)
 
-        from apps.automation.ocr.client import OpenRouterClient
-        return OpenRouterClient(api_key=api_key, model=model)
+
+def job_accepted_response(request, job):
+    """202 response pointing the client at an OCR job's status endpoint."""
+    status_url = reverse('automation:ocr-job', args=[job.pk], request=request)
+    response = Response({
+        'success': True,
+        'job_id': job.pk,
+        'status': job.status,
+        'status_url': status_url,
+        'customer_id': job.customer_id,
+    }, status=status.HTTP_202_ACCEPTED)
+    response['Location'] = status_url
+    return response
+
+
+def event_stream_response(events):
+    """Stream (event, data) pairs to the client as server-sent events."""
+    def encode():
+        for event, data in events:
+            yield f'event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
+
+    response = StreamingHttpResponse(encode(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Keep nginx from buffering the events until the stream ends
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 class ParseLicenseView(TenantViewMixin, OCRAccessMixin, APIView):
-    """Parse a driver's license image using OCR."""
+    """Queue a driver's license image for OCR.
+
+    Returns 202 with a job id; poll ``OCRJobView`` for the parsed fields.
+    With ``?stream=1`` the license is parsed during the request instead and
+    the fields are sent as server-sent events while the model reads them:
+    a ``job`` event, ``field`` events, then ``completed`` or ``failed``.
+    """
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser, JSONParser]
 
@@ -81,73 +148,33 @@ class ParseLicenseView(TenantViewMixin, OCRAccessMixin, APIView):
             return error_response
 
         image_file = request.FILES.get('image')
+        customer = None
         if customer_id:
             customer = get_object_or_404(Customer, pk=customer_id, tenant=tenant)
-            if not image_file and customer.license_image_front:
-                image_file = customer.license_image_front
 
-        if not image_file:
+        if not image_file and not (customer and (customer.license_image_front or customer.license_image_back)):
             return Response(
                 {'error': 'No image provided. Please upload a license image.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            image_data = image_file.read()
-            image_file.seek(0)
-
-            content_type = getattr(image_file, 'content_type', 'image/jpeg')
-
-            from apps.automation.ocr.parsers import LicenseParser
-            client = self.get_parser_client(tenant)
-            parser = LicenseParser(client)
-
-            result = parser.parse(image_data, image_media_type=content_type)
-
-            tenant.settings.increment_ocr_requests()
-
-            response_data = {
-                'success': True,
-                'data': {
-                    'country': result.country,
-                    'issuing_authority': result.issuing_authority,
-                    'license_number': result.license_number,
-                    'license_class': result.license_class,
-                    'issue_date': result.issue_date.isoformat() if result.issue_date else None,
-                    'expiration_date': result.expiration_date.isoformat() if result.expiration_date else None,
-                    'first_name': result.first_name,
-                    'middle_name': result.middle_name,
-                    'last_name': result.last_name,
-                    'date_of_birth': result.date_of_birth.isoformat() if result.date_of_birth else None,
-                    'address_street': result.address.street,
-                    'address_city': result.address.city,
-                    'address_state': result.address.state,
-                    'address_zip': result.address.zip_code,
-                    'gender': result.gender,
-                    'height': result.height,
-                    'weight': result.weight,
-                    'eye_color': result.eye_color,
-                    'hair_color': result.hair_color,
-                    'restrictions': result.restrictions,
-                    'endorsements': result.endorsements,
-                    'donor_status': result.donor_status,
-                    'confidence': result.confidence,
-                    'has_photo': result.has_photo,
-                },
-                'customer_id': customer_id,
-            }
+        if request.query_params.get('stream'):
+            job = create_ocr_job(tenant, 'license', image_file=image_file, customer=customer, user=request.user)
+            return event_stream_response(self.stream_job(job))
 
-            return Response(response_data)
+        job = enqueue_ocr_job(tenant, 'license', image_file=image_file, customer=customer, user=request.user)
+        return job_accepted_response(request, job)
 
-        except Exception as e:
-            return Response(
-                {'error': f'OCR processing failed: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+    def stream_job(self, job):
+        yield 'job', {'job_id': job.pk, 'customer_id': job.customer_id}
+        yield from stream_ocr_job(job)
 
 
 class ParseInsuranceView(TenantViewMixin, OCRAccessMixin, APIView):
-    """Parse an insurance card image using OCR."""
+    """Queue an insurance card image for OCR.
+
+    Returns 202 with a job id; poll ``OCRJobView`` for the parsed fields.
+    """
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser, JSONParser]
 
@@ -171,82 +198,363 @@ class ParseInsuranceView(TenantViewMixin, OCRAccessMixin, APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            image_data = image_file.read()
-            image_file.seek(0)
-
-            content_type = getattr(image_file, 'content_type', 'image/jpeg')
-
-            from apps.automation.ocr.parsers import InsuranceParser
-            client = self.get_parser_client(tenant)
-            parser = InsuranceParser(client)
-
-            result = parser.parse(image_data, image_media_type=content_type)
-
-            tenant.settings.increment_ocr_requests()
-
-            response_data = {
-                'success': True,
-                'data': {
-                    'company_name': result.company_name,
-                    'policy_number': result.policy_number,
-                    'group_number': result.group_number,
-                    'effective_date': result.effective_date.isoformat() if result.effective_date else None,
-                    'expiration_date': result.expiration_date.isoformat() if result.expiration_date else None,
-                    'policyholder_name': result.policyholder_name,
-                    'policyholder_relationship': result.policyholder_relationship,
-                    'coverage_type': result.coverage_type,
-                    'covered_vehicles': [
-                        {
-                            'year': v.year,
-                            'make': v.make,
-                            'model': v.model,
-                            'vin': v.vin
-                        } for v in result.covered_vehicles
-                    ],
-                    'agent_name': result.agent_name,
-                    'agent_phone': result.agent_phone,
-                    'confidence': result.confidence,
-                },
-                'customer_id': customer_id,
+        customer = None
+        if customer_id:
+            customer = get_object_or_404(Customer, pk=customer_id, tenant=tenant)
+
+        job = enqueue_ocr_job(tenant, 'insurance', image_file=image_file, customer=customer, user=request.user)
+        return job_accepted_response(request, job)
+
+
+class OCRJobView(TenantViewMixin, APIView):
+    """Report the status of an OCR job, with the parsed data once completed."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        tenant = self.get_tenant()
+        if not tenant:
+            return Response(
+                {'error': 'No tenant found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        job = get_object_or_404(OCRJob, pk=job_id, tenant=tenant)
+        response_data = {
+            'job_id': job.pk,
+            'status': job.status,
+            'document_type': job.document_type,
+            'customer_id': job.customer_id,
+        }
+        if job.status == 'completed':
+            response_data['success'] = True
+            response_data['data'] = job.result
+        elif job.status == 'failed':
+            response_data['success'] = False
+            response_data['error'] = f'OCR processing failed: {job.error_message}'
+
+        response = Response(response_data)
+        if not job.is_finished:
+            response['Retry-After'] = str(POLL_INTERVAL)
+        return response
+
+
+class AnalyzePhotoView(TenantViewMixin, OCRAccessMixin, APIView):
+    """Queue a condition report photo for damage or dashboard analysis."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, photo_id):
+        tenant = self.get_tenant()
+        if not tenant:
+            return Response(
+                {'error': 'No tenant found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        has_access, error_response = self.check_ocr_permission(tenant, 'inspection_ai')
+        if not has_access:
+            return error_response
+
+        photo = get_object_or_404(
+            ConditionReportPhoto, pk=photo_id, condition_report__contract__tenant=tenant
+        )
+        analysis_type = request.data.get('analysis_type') or None
+        if analysis_type not in (None, 'damage_detection', 'dashboard_analysis'):
+            return Response(
+                {'error': 'analysis_type must be damage_detection or dashboard_analysis.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        analysis = enqueue_inspection_analysis(photo, analysis_type)
+        response = Response({
+            'success': True,
+            'analysis_id': analysis.pk,
+            'status': analysis.status,
+            'analysis_type': analysis.analysis_type,
+            'status_url': reverse('automation:inspection-analysis', args=[analysis.pk], request=request),
+        }, status=status.HTTP_202_ACCEPTED)
+        response['Location'] = response.data['status_url']
+        return response
+
+
+class ReportAnalysisView(TenantViewMixin, OCRAccessMixin, APIView):
+    """Analyse every photo of a condition report, or report batch progress.
+
+    POST queues all photos not yet analysed and returns 202; GET returns
+    each analysis with its status.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get_report(self, tenant, report_id):
+        return get_object_or_404(ConditionReport, pk=report_id, contract__tenant=tenant)
+
+    def post(self, request, report_id):
+        tenant = self.get_tenant()
+        if not tenant:
+            return Response(
+                {'error': 'No tenant found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        has_access, error_response = self.check_ocr_permission(tenant, 'inspection_ai')
+        if not has_access:
+            return error_response
+
+        report = self.get_report(tenant, report_id)
+        analyses = enqueue_report_analysis(report)
+        status_url = reverse('automation:analyze-report', args=[report.pk], request=request)
+        response = Response({
+            'success': True,
+            'report_id': report.pk,
+            'queued': sum(analysis.status == 'pending' for analysis in analyses),
+            'reused': sum(analysis.status == 'completed' for analysis in analyses),
+            'analysis_ids': [analysis.pk for analysis in analyses],
+            'status_url': status_url,
+        }, status=status.HTTP_202_ACCEPTED)
+        response['Location'] = status_url
+        return response
+
+    def get(self, request, report_id):
+        tenant = self.get_tenant()
+        if not tenant:
+            return Response(
+                {'error': 'No tenant found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        report = self.get_report(tenant, report_id)
+        analyses = list(report.analyses.order_by('pk'))
+        counts = {key: 0 for key, _ in InspectionAnalysis.STATUS_CHOICES}
+        for analysis in analyses:
+            counts[analysis.status] += 1
+
+        response = Response({
+            'report_id': report.pk,
+            'counts': counts,
+            'finished': counts['pending'] == 0 and counts['processing'] == 0,
+            'analyses': [
+                {
+                    'analysis_id': analysis.pk,
+                    'photo_id': analysis.photo_id,
+                    'analysis_type': analysis.analysis_type,
+                    'status': analysis.status,
+                    'confidence': analysis.confidence,
+                    'processing_time_ms': analysis.processing_time_ms,
+                    'data': analysis.result if analysis.status == 'completed' else None,
+                    'error': analysis.error_message or None,
+                }
+                for analysis in analyses
+            ],
+        })
+        if not response.data['finished']:
+            response['Retry-After'] = str(POLL_INTERVAL)
+        return response
+
+
+class InspectionAnalysisView(TenantViewMixin, APIView):
+    """Report the status of an inspection analysis, with its result once completed."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, analysis_id):
+        tenant = self.get_tenant()
+        if not tenant:
+            return Response(
+                {'error': 'No tenant found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        analysis = get_object_or_404(
+            InspectionAnalysis, pk=analysis_id, condition_report__contract__tenant=tenant
+        )
+        response_data = {
+            'analysis_id': analysis.pk,
+            'status': analysis.status,
+            'analysis_type': analysis.analysis_type,
+            'photo_id': analysis.photo_id,
+        }
+        if analysis.status == 'completed':
+            response_data['success'] = True
+            response_data['data'] = analysis.result
+            response_data['confidence'] = analysis.confidence
+        elif analysis.status == 'failed':
+            response_data['success'] = False
+            response_data['error'] = f'Analysis failed: {analysis.error_message}'
+
+        response = Response(response_data)
+        if analysis.status in ('pending', 'processing'):
+            response['Retry-After'] = str(POLL_INTERVAL)
+        return response
+
+
+class CompareContractView(TenantViewMixin, OCRAccessMixin, APIView):
+    """Compare a contract's checkout and checkin photos.
+
+    Comparisons start automatically at check-in; this endpoint starts one
+    by hand, e.g. when the checkin report was completed afterwards. Returns
+    202 pointing at ``DamageComparisonView``.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, contract_id):
+        tenant = self.get_tenant()
+        if not tenant:
+            return Response(
+                {'error': 'No tenant found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        has_access, error_response = self.check_ocr_permission(tenant, 'inspection_ai')
+        if not has_access:
+            return error_response
+
+        contract = get_object_or_404(Contract, pk=contract_id, tenant=tenant)
+        checkout_report = latest_report(contract, 'checkout')
+        checkin_report = latest_report(contract, 'checkin')
+        if checkout_report is None or checkin_report is None:
+            return Response(
+                {'error': 'The contract needs both a checkout and a checkin condition report.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        comparison = enqueue_damage_comparison(checkout_report, checkin_report)
+        status_url = reverse('automation:damage-comparison', args=[comparison.pk], request=request)
+        response = Response({
+            'success': True,
+            'comparison_id': comparison.pk,
+            'status': comparison.status,
+            'status_url': status_url,
+        }, status=status.HTTP_202_ACCEPTED)
+        response['Location'] = status_url
+        return response
+
+
+class DamageComparisonView(TenantViewMixin, APIView):
+    """Report a damage comparison's progress, with its findings once completed."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, comparison_id):
+        tenant = self.get_tenant()
+        if not tenant:
+            return Response(
+                {'error': 'No tenant found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        comparison = get_object_or_404(
+            DamageComparison, pk=comparison_id, checkin_report__contract__tenant=tenant
+        )
+        response_data = {
+            'comparison_id': comparison.pk,
+            'status': comparison.status,
+            'pairs_total': comparison.pairs_total,
+            'pairs_completed': comparison.pairs_completed,
+            'progress': comparison.progress,
+            'unmatched_locations': comparison.unmatched_locations,
+        }
+        if comparison.status == 'completed':
+            response_data['success'] = True
+            response_data['data'] = {
+                'new_damages': comparison.new_damages,
+                'resolved_damages': comparison.resolved_damages,
+                'total_new_damage_count': comparison.total_new_damage_count,
+                'estimated_repair_cost': comparison.estimated_repair_cost,
+                'summary': comparison.summary,
+                'pairs': comparison.pair_results,
             }
+        elif comparison.status == 'failed':
+            response_data['success'] = False
+            response_data['error'] = f'Comparison failed: {comparison.error_message}'
+
+        response = Response(response_data)
+        if not comparison.is_finished:
+            response['Retry-After'] = str(POLL_INTERVAL)
+        return response
+
+
+class IsSuperuser(BasePermission):
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and request.user.is_superuser)
+
+
+class OCRHealthView(APIView):
+    """Circuit breaker state and retry counters per OpenRouter model (platform admins).
+
+    Covers the platform default model and every model a tenant has chosen,
+    plus how many license parses the barcode fast path served and how many
+    document parses the cascade's fast model answered.
+    """
+    permission_classes = [IsSuperuser]
+
+    def get(self, request):
+        from django.conf import settings
+
+        models = {settings.OPENROUTER_DEFAULT_MODEL}
+        models.update(
+            TenantSettings.objects.exclude(openrouter_model='')
+            .values_list('openrouter_model', flat=True).distinct()
+        )
+        breaker, metrics = get_circuit_breaker(), get_metrics()
+        barcode = metrics.snapshot(LICENSE_BARCODE_METRICS, BARCODE_METRIC_NAMES)
+        barcode['served_share'] = (
+            round(barcode['barcode_served'] / barcode['parses'], 3) if barcode['parses'] else None
+        )
+        cascade = {}
+        for parser_name in ('LicenseParser', 'InsuranceParser'):
+            counters = metrics.snapshot(cascade_metrics_key(parser_name), CASCADE_METRIC_NAMES)
+            counters['fast_share'] = (
+                round(counters['fast_served'] / counters['parses'], 3) if counters['parses'] else None
+            )
+            cascade[parser_name] = counters
+        return Response({
+            'models': {
+                model: {'circuit': breaker.status(model), 'counters': metrics.snapshot(model)}
+                for model in sorted(models)
+            },
+            'license_barcode': barcode,
+            'cascade': {'fast_model': settings.OCR_CASCADE_MODEL or None, 'parsers': cascade},
+        })
+
 
-            return Response(response_data)
+def usage_report_params(query_params):
+    """Validated (days, interval) for a usage report from query parameters."""
+    try:
+        days = min(max(int(query_params.get('days', 7)), 1), 90)
+    except ValueError:
+        days = 7
+    interval = query_params.get('interval') or ('hour' if days <= 2 else 'day')
+    return days, interval if interval in ('hour', 'day') else 'day'
 
-        except Exception as e:
+
+class OCRUsageView(TenantViewMixin, APIView):
+    """OCR calls, spend, error rate and p50/p95 latency over time for the tenant.
+
+    Query parameters: ``days`` (1-90, default 7) and ``interval`` ('hour' or
+    'day'). Owners and managers only.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        from .integration.telemetry import usage_report
+        from .models import OCRUsageBucket
+
+        tenant = self.get_tenant()
+        if not tenant:
+            return Response({'error': 'No tenant found'}, status=status.HTTP_404_NOT_FOUND)
+        tenant_user = self.get_tenant_user()
+        if not tenant_user or tenant_user.role not in ('owner', 'manager'):
             return Response(
-                {'error': f'OCR processing failed: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': 'Only owners and managers can view OCR usage'},
+                status=status.HTTP_403_FORBIDDEN
             )
 
+        days, interval = usage_report_params(request.query_params)
+        return Response(usage_report(OCRUsageBucket.objects.filter(tenant=tenant), days=days, interval=interval))
+
 
 class ApplyLicenseDataView(TenantViewMixin, APIView):
     """Apply parsed license data to a customer record."""
     permission_classes = [IsAuthenticated]
 
-    FIELD_MAPPING = {
-        'first_name': 'first_name',
-        'middle_name': 'middle_name',
-        'last_name': 'last_name',
-        'date_of_birth': 'date_of_birth',
-        'license_number': 'license_number',
-        'license_class': 'license_class',
-        'issuing_authority': 'license_state',
-        'issue_date': 'license_issue_date',
-        'expiration_date': 'license_expiry',
-        'restrictions': 'license_restrictions',
-        'endorsements': 'license_endorsements',
-        'donor_status': 'license_donor_status',
-        'address_street': 'address',
-        'address_city': 'city',
-        'address_state': 'state',
-        'address_zip': 'zip_code',
-        'gender': 'gender',
-        'height': 'height',
-        'weight': 'weight',
-        'eye_color': 'eye_color',
-        'hair_color': 'hair_color',
-    }
+    FIELD_MAPPING = LICENSE_FIELD_MAPPING
 
     def post(self, request, customer_id):
         tenant = self.get_tenant()
@@ -262,34 +570,9 @@ class ApplyLicenseDataView(TenantViewMixin, APIView):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        fields_to_apply = serializer.validated_data['fields']
-        data = serializer.validated_data['data']
-
-        applied_fields = []
-        skipped_fields = []
-
-        for field in fields_to_apply:
-            if field not in self.FIELD_MAPPING:
-                continue
-
-            customer_field = self.FIELD_MAPPING[field]
-            value = data.get(field)
-
-            if value is None or value == '':
-                skipped_fields.append(field)
-                continue
-
-            current_value = getattr(customer, customer_field, None)
-            if current_value and current_value != '':
-                skipped_fields.append(field)
-                continue
-
-            setattr(customer, customer_field, value)
-            applied_fields.append(field)
-
-        if 'confidence' in data:
-            customer.license_ocr_confidence = data['confidence']
-        customer.license_ocr_parsed_at = timezone.now()
+        applied_fields, skipped_fields = apply_license_data(
+            customer, serializer.validated_data['data'], serializer.validated_data['fields']
+        )
         customer.save()
 
         return Response({
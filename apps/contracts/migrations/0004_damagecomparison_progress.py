@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contracts", "0003_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="damagecomparison",
+            name="pair_results",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name="damagecomparison",
+            name="pairs_completed",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="damagecomparison",
+            name="pairs_total",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="damagecomparison",
+            name="started_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="damagecomparison",
+            name="unmatched_locations",
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contracts", "0004_damagecomparison_progress"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="conditionreport",
+            name="fuel_level_source",
+            field=models.CharField(
+                choices=[
+                    ("entered", "Entered by staff"),
+                    ("estimated", "Estimated"),
+                    ("dashboard", "Read from dashboard"),
+                ],
+                default="entered",
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="conditionreport",
+            name="mileage_source",
+            field=models.CharField(
+                choices=[
+                    ("entered", "Entered by staff"),
+                    ("estimated", "Estimated"),
+                    ("dashboard", "Read from dashboard"),
+                ],
+                default="entered",
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="conditionreport",
+            name="reading_flags",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name="conditionreport",
+            name="warning_lights",
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contracts", "0005_condition_report_dashboard_readings"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="conditionreportphoto",
+            name="ahash",
+            field=models.CharField(blank=True, max_length=16),
+        ),
+        migrations.AddField(
+            model_name="conditionreportphoto",
+            name="duplicate_of",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="duplicates",
+                to="contracts.conditionreportphoto",
+            ),
+        ),
+        migrations.AddField(
+            model_name="conditionreportphoto",
+            name="phash",
+            field=models.CharField(blank=True, max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name="conditionreportphoto",
+            index=models.Index(
+                fields=["condition_report", "phash"], name="reportphoto_report_phash"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contracts", "0006_condition_report_photo_hashes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="conditionreportphoto",
+            name="derivatives",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
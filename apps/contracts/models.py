@@ -2,7 +2,7 @@ from django.db import models
 from django.utils import timezone
 from io import BytesIO
 
-from apps.tenants.models import TenantModel
+from apps.tenants.models import ImageDerivativesMixin, TenantModel
 from apps.reservations.models import Reservation
 
 
@@ -222,6 +222,14 @@ class ConditionReport(models.Model):
         ('damaged', 'Damaged'),
     ]
 
+    # Where the mileage and fuel level came from; estimated values wait for
+    # the dashboard photo to be read (see apps.automation.odometer)
+    READING_SOURCE_CHOICES = [
+        ('entered', 'Entered by staff'),
+        ('estimated', 'Estimated'),
+        ('dashboard', 'Read from dashboard'),
+    ]
+
     contract = models.ForeignKey(
         Contract,
         on_delete=models.CASCADE,
@@ -231,6 +239,12 @@ class ConditionReport(models.Model):
 
     fuel_level = models.CharField(max_length=10, choices=FUEL_LEVEL_CHOICES)
     mileage = models.PositiveIntegerField()
+    fuel_level_source = models.CharField(max_length=10, choices=READING_SOURCE_CHOICES, default='entered')
+    mileage_source = models.CharField(max_length=10, choices=READING_SOURCE_CHOICES, default='entered')
+
+    # Lit dashboard warning lights and readings that need a second look
+    warning_lights = models.JSONField(default=list, blank=True)
+    reading_flags = models.JSONField(default=list, blank=True)
 
     exterior_condition = models.CharField(max_length=20, choices=CONDITION_CHOICES)
     interior_condition = models.CharField(max_length=20, choices=CONDITION_CHOICES)
@@ -251,7 +265,7 @@ class ConditionReport(models.Model):
         return f'{self.get_report_type_display()} - {self.contract}'
 
 
-class ConditionReportPhoto(models.Model):
+class ConditionReportPhoto(ImageDerivativesMixin, models.Model):
     """
     Photo attached to a condition report.
 
@@ -284,6 +298,7 @@ class ConditionReportPhoto(models.Model):
         related_name='photos'
     )
     image = models.ImageField(upload_to='condition_reports/')
+    derivative_fields = {'image': ('thumb', 'card', 'full')}
     location = models.CharField(max_length=20, choices=LOCATION_CHOICES)
     submitted_by = models.CharField(
         max_length=10,
@@ -291,10 +306,23 @@ class ConditionReportPhoto(models.Model):
         default='staff'
     )
     description = models.CharField(max_length=255, blank=True)
+    # Perceptual hashes for spotting re-uploads, see apps.automation.dedup
+    ahash = models.CharField(max_length=16, blank=True)
+    phash = models.CharField(max_length=16, blank=True)
+    duplicate_of = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='duplicates'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['location', 'created_at']
+        indexes = [
+            models.Index(fields=['condition_report', 'phash'], name='reportphoto_report_phash'),
+        ]
 
     def __str__(self):
         return f'{self.get_location_display()} - {self.condition_report}'
@@ -417,10 +445,17 @@ class DamageComparison(models.Model):
         blank=True
     )
 
+    # Progress: one photo pair is compared per location found in both reports
+    pairs_total = models.PositiveIntegerField(default=0)
+    pairs_completed = models.PositiveIntegerField(default=0)
+    pair_results = models.JSONField(default=list, blank=True)
+    unmatched_locations = models.JSONField(default=list, blank=True)
+
     error_message = models.TextField(blank=True)
     model_used = models.CharField(max_length=100, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
@@ -430,9 +465,35 @@ class DamageComparison(models.Model):
     def __str__(self):
         return f'Comparison: {self.checkout_report} vs {self.checkin_report}'
 
-    def mark_completed(self, new_damages, summary, total_count=None, estimated_cost=None):
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+
+    @property
+    def progress(self):
+        """Fraction of photo pairs compared, from 0 to 1."""
+        if self.is_finished:
+            return 1.0
+        if not self.pairs_total:
+            return 0.0
+        return self.pairs_completed / self.pairs_total
+
+    def mark_processing(self, pairs_total, unmatched_locations=None):
+        self.status = 'processing'
+        self.pairs_total = pairs_total
+        self.pairs_completed = 0
+        self.unmatched_locations = unmatched_locations or []
+        self.started_at = timezone.now()
+        self.save(update_fields=[
+            'status', 'pairs_total', 'pairs_completed', 'unmatched_locations', 'started_at',
+        ])
+
+    def mark_completed(self, new_damages, summary, total_count=None, estimated_cost=None,
+                       resolved_damages=None):
         self.status = 'completed'
         self.new_damages = new_damages
+        if resolved_damages is not None:
+            self.resolved_damages = resolved_damages
         self.summary = summary
         self.total_new_damage_count = total_count or len(new_damages)
         self.estimated_repair_cost = estimated_cost
@@ -1,13 +1,16 @@
 from rest_framework import serializers
+from apps.tenants.serializers import ImageDerivativesField
 from apps.tenants.utils import get_tenant_from_request
 from .models import Contract, ConditionReport, ConditionReportPhoto
 
 
 class ConditionReportPhotoSerializer(serializers.ModelSerializer):
+    derivatives = ImageDerivativesField()
+
     class Meta:
         model = ConditionReportPhoto
-        fields = ['id', 'image', 'location', 'description', 'created_at']
-        read_only_fields = ['id', 'created_at']
+        fields = ['id', 'image', 'derivatives', 'location', 'description', 'duplicate_of', 'created_at']
+        read_only_fields = ['id', 'duplicate_of', 'created_at']
 
 
 class ConditionReportSerializer(serializers.ModelSerializer):
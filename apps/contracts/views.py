@@ -103,6 +103,8 @@ class ConditionReportViewSet(TenantViewMixin, viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'], parser_classes=[MultiPartParser, FormParser])
     def upload_photo(self, request, pk=None):
+        from apps.automation.dedup import DuplicatePhotoError, create_photo
+
         report = self.get_object()
         image = request.FILES.get('image')
         if not image:
@@ -114,11 +116,15 @@ class ConditionReportViewSet(TenantViewMixin, viewsets.ModelViewSet):
         location = request.data.get('location', 'other')
         description = request.data.get('description', '')
 
-        photo = ConditionReportPhoto.objects.create(
-            condition_report=report,
-            image=image,
-            location=location,
-            description=description
-        )
+        try:
+            photo = create_photo(
+                ConditionReportPhoto, image, {'condition_report': report, 'location': location},
+                description=description
+            )
+        except DuplicatePhotoError as e:
+            return Response(
+                {'error': str(e), 'duplicate_of': e.original.pk},
+                status=status.HTTP_409_CONFLICT
+            )
         serializer = ConditionReportPhotoSerializer(photo)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
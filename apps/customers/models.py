@@ -3,10 +3,10 @@ from django.conf import settings
 from django.core.validators import EmailValidator
 from datetime import date
 
-from apps.tenants.models import TenantModel, AuditMixin
+from apps.tenants.models import TenantModel, AuditMixin, ImageDerivativesMixin
 
 
-class Customer(TenantModel, AuditMixin):
+class Customer(ImageDerivativesMixin, TenantModel, AuditMixin):
     PHOTO_SOURCE_CHOICES = [
         ('license', 'From License'),
         ('upload', 'Manual Upload'),
@@ -47,6 +47,7 @@ class Customer(TenantModel, AuditMixin):
     license_donor_status = models.BooleanField(null=True, blank=True, help_text='Organ donor status')
     license_image_front = models.ImageField(upload_to='customer_licenses/', blank=True, null=True)
     license_image_back = models.ImageField(upload_to='customer_licenses/', blank=True, null=True)
+    derivative_fields = {'license_image_front': ('thumb', 'card'), 'license_image_back': ('thumb', 'card')}
 
     # Physical characteristics (from license)
     gender = models.CharField(max_length=20, blank=True)
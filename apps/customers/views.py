@@ -6,12 +6,14 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from django_filters.rest_framework import DjangoFilterBackend
 
 from apps.tenants.mixins import TenantViewMixin
+from apps.tenants.pagination import OptionalCursorPagination
 from .models import Customer, CustomerDocument
 from .serializers import CustomerSerializer, CustomerListSerializer, CustomerDocumentSerializer
 
 
 class CustomerViewSet(TenantViewMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalCursorPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['is_blacklisted']
     search_fields = ['first_name', 'last_name', 'email', 'phone', 'license_number']
@@ -5,6 +5,7 @@ from django.views.generic import ListView, DetailView, CreateView, UpdateView, D
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.http import HttpResponse, JsonResponse
+from django.db import transaction
 from django.db.models import Sum, Count, Q
 from django.utils import timezone
 from datetime import date, timedelta
@@ -19,6 +20,7 @@ from apps.fleet.models import Vehicle
 from apps.customers.models import Customer
 from apps.reservations.models import Reservation
 from apps.contracts.models import Contract
+from apps.tenants.pagination import KeysetPaginationMixin
 from apps.tenants.utils import get_tenant_from_request
 
 
@@ -149,7 +151,12 @@ class VehicleDeleteView(LoginRequiredMixin, TenantMixin, DeleteView):
 
 @login_required
 def vehicle_photo_upload(request, pk):
-    """Upload photos for a vehicle."""
+    """Upload photos for a vehicle.
+
+    Near-duplicates of the vehicle's photos are handled per
+    ``PHOTO_DUPLICATE_POLICY``; rejected ones are listed in ``duplicates``.
+    """
+    from apps.automation.dedup import DuplicatePhotoError, create_photo
     from apps.fleet.models import VehiclePhoto
     from apps.tenants.models import log_activity
 
@@ -164,14 +171,14 @@ def vehicle_photo_upload(request, pk):
     if not photos:
         return JsonResponse({'error': 'No photos provided'}, status=400)
 
-    created_photos = []
+    created_photos, duplicates = [], []
     for i, photo_file in enumerate(photos):
         is_primary = set_primary and i == 0 and not vehicle.photos.filter(is_primary=True).exists()
-        photo = VehiclePhoto.objects.create(
-            vehicle=vehicle,
-            image=photo_file,
-            is_primary=is_primary
-        )
+        try:
+            photo = create_photo(VehiclePhoto, photo_file, {'vehicle': vehicle}, is_primary=is_primary)
+        except DuplicatePhotoError as e:
+            duplicates.append({'name': photo_file.name, 'duplicate_of': e.original.pk})
+            continue
         created_photos.append(photo.pk)
 
         log_activity(
@@ -181,7 +188,7 @@ def vehicle_photo_upload(request, pk):
             instance=photo,
         )
 
-    return JsonResponse({'success': True, 'photos': created_photos})
+    return JsonResponse({'success': True, 'photos': created_photos, 'duplicates': duplicates})
 
 
 @login_required
@@ -237,11 +244,12 @@ def vehicle_photo_primary(request, pk, photo_pk):
     return JsonResponse({'success': True})
 
 
-class CustomerListView(LoginRequiredMixin, TenantMixin, ListView):
+class CustomerListView(LoginRequiredMixin, TenantMixin, KeysetPaginationMixin, ListView):
     model = Customer
     template_name = 'dashboard/customers/list.html'
     context_object_name = 'customers'
     paginate_by = 20
+    keyset_ordering = ('last_name', 'first_name', 'id')
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -334,11 +342,12 @@ class CustomerDeleteView(LoginRequiredMixin, TenantMixin, DeleteView):
         return '/dashboard/customers/'
 
 
-class ReservationListView(LoginRequiredMixin, TenantMixin, ListView):
+class ReservationListView(LoginRequiredMixin, TenantMixin, KeysetPaginationMixin, ListView):
     model = Reservation
     template_name = 'dashboard/reservations/list.html'
     context_object_name = 'reservations'
     paginate_by = 20
+    keyset_ordering = ('-start_date', '-id')
 
     def get_queryset(self):
         qs = super().get_queryset().select_related('vehicle', 'customer')
@@ -353,6 +362,16 @@ class ReservationDetailView(LoginRequiredMixin, TenantMixin, DetailView):
     template_name = 'dashboard/reservations/detail.html'
     context_object_name = 'reservation'
 
+    def get_context_data(self, **kwargs):
+        from apps.automation.comparisons import latest_report
+
+        context = super().get_context_data(**kwargs)
+        contract = Contract.objects.filter(reservation=self.object).first()
+        if contract:
+            reports = [latest_report(contract, 'checkout'), latest_report(contract, 'checkin')]
+            context['handover_reports'] = [report for report in reports if report]
+        return context
+
 
 class ReservationCreateView(LoginRequiredMixin, TenantMixin, CreateView):
     model = Reservation
@@ -418,6 +437,42 @@ def reservation_calendar(request):
     return render(request, 'dashboard/reservations/calendar.html')
 
 
+def _complete_handover(request, reservation, report_type):
+    """Check a reservation out or in from the posted form.
+
+    A posted dashboard photo is added to the handover's condition report,
+    or starts one, with the entered mileage and fuel level, or provisional
+    ones while the photo is read in the background (see
+    apps.automation.odometer).
+    """
+    from apps.automation.odometer import record_dashboard_photo
+    from apps.contracts.models import ConditionReport
+
+    mileage = request.POST.get('mileage')
+    mileage = int(mileage) if mileage else None
+    fuel_level = request.POST.get('fuel_level')
+    if fuel_level not in dict(ConditionReport.FUEL_LEVEL_CHOICES):
+        fuel_level = None
+    dashboard_photo = request.FILES.get('dashboard_photo')
+
+    analysis = None
+    with transaction.atomic():
+        if dashboard_photo:
+            report, analysis = record_dashboard_photo(
+                reservation, report_type, dashboard_photo, mileage=mileage, fuel_level=fuel_level,
+                inspector_name=request.user.get_full_name(),
+            )
+            mileage = report.mileage
+        elif mileage is None and report_type == 'checkout':
+            mileage = reservation.vehicle.mileage
+        if report_type == 'checkin':
+            reservation.checkin(mileage=mileage)
+        else:
+            reservation.checkout(mileage=mileage)
+    if analysis is not None:
+        messages.info(request, 'The dashboard photo is being read; mileage and fuel level will be confirmed shortly.')
+
+
 @login_required
 def reservation_checkout(request, pk):
     if not hasattr(request, 'tenant') or not request.tenant:
@@ -428,9 +483,8 @@ def reservation_checkout(request, pk):
     )
 
     if request.method == 'POST':
-        mileage = request.POST.get('mileage')
         try:
-            reservation.checkout(mileage=int(mileage) if mileage else None)
+            _complete_handover(request, reservation, 'checkout')
             return redirect(f'/dashboard/reservations/{pk}/')
         except Exception as e:
             context = {'reservation': reservation, 'error': str(e)}
@@ -449,9 +503,8 @@ def reservation_checkin(request, pk):
     )
 
     if request.method == 'POST':
-        mileage = request.POST.get('mileage')
         try:
-            reservation.checkin(mileage=int(mileage) if mileage else None)
+            _complete_handover(request, reservation, 'checkin')
             return redirect(f'/dashboard/reservations/{pk}/')
         except Exception as e:
             context = {'reservation': reservation, 'error': str(e)}
@@ -784,10 +837,17 @@ def automation_settings(request):
     from apps.automation.integration.feature_check import tenant_has_feature
     has_ocr_feature = tenant_has_feature(tenant, 'license_ocr')
 
+    from apps.automation.integration.rate_limit import get_usage
+    from apps.automation.integration.telemetry import usage_report
+    from apps.automation.models import OCRUsageBucket
+
     context = {
         'settings': settings,
         'tenant': tenant,
         'has_ocr_feature': has_ocr_feature,
+        'ocr_usage': get_usage(settings),
+        'ocr_report': usage_report(OCRUsageBucket.objects.filter(tenant=tenant), days=14),
+        'ocr_report_days': 14,
         'available_models': [
             ('anthropic/claude-3.5-sonnet', 'Claude 3.5 Sonnet (Recommended)'),
             ('anthropic/claude-3-haiku', 'Claude 3 Haiku (Faster, cheaper)'),
@@ -831,16 +891,31 @@ def activity_log(request):
         logs = logs.filter(model_name=model_filter)
     if user_filter:
         logs = logs.filter(user_id=user_filter)
-    if date_from:
-        logs = logs.filter(timestamp__date__gte=date_from)
-    if date_to:
-        logs = logs.filter(timestamp__date__lte=date_to)
-
-    # Pagination
-    from django.core.paginator import Paginator
-    paginator = Paginator(logs, 50)
-    page = request.GET.get('page', 1)
-    logs_page = paginator.get_page(page)
+
+    # Half-open timestamp range in the tenant's timezone keeps the
+    # (tenant, timestamp, id) index usable, unlike timestamp__date lookups.
+    from apps.tenants.utils import get_tenant_day_range
+    range_start, range_end = get_tenant_day_range(tenant, date_from, date_to)
+    if range_start:
+        logs = logs.filter(timestamp__gte=range_start)
+    if range_end:
+        logs = logs.filter(timestamp__lt=range_end)
+
+    # Months past retention live in the cold archive; read them back only
+    # when the user asks for a date range.
+    archived = []
+    if range_start or range_end:
+        from apps.tenants.archive import read_archived_logs
+        archived = read_archived_logs(
+            ActivityLog, range_start, range_end, tenant=tenant,
+            filters={'action': action_filter, 'model_name': model_filter, 'user_id': user_filter},
+            select_related=('user',),
+        )
+
+    # Keyset pagination avoids a COUNT(*) and OFFSET scan over the whole log
+    from apps.tenants.pagination import KeysetPaginator
+    paginator = KeysetPaginator(logs, 50, ordering=('-timestamp', '-id'), extra_rows=archived)
+    logs_page = paginator.get_page(request.GET.get('cursor'))
 
     # Get available filter options
     from django.contrib.auth import get_user_model
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fleet", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="vehiclephoto",
+            name="ahash",
+            field=models.CharField(blank=True, max_length=16),
+        ),
+        migrations.AddField(
+            model_name="vehiclephoto",
+            name="duplicate_of",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="duplicates",
+                to="fleet.vehiclephoto",
+            ),
+        ),
+        migrations.AddField(
+            model_name="vehiclephoto",
+            name="phash",
+            field=models.CharField(blank=True, max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name="vehiclephoto",
+            index=models.Index(fields=["vehicle", "phash"], name="vehiclephoto_vehicle_phash"),
+        ),
+    ]
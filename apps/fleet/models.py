@@ -3,7 +3,7 @@ from django.conf import settings
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 
-from apps.tenants.models import TenantModel, AuditMixin
+from apps.tenants.models import TenantModel, AuditMixin, ImageDerivativesMixin
 
 
 class VehicleCategory(TenantModel):
@@ -98,6 +98,12 @@ class Vehicle(TenantModel, AuditMixin):
     def __str__(self):
         return f'{self.year} {self.make} {self.model} ({self.license_plate})'
 
+    @property
+    def primary_photo(self):
+        """The primary photo, else the newest one; uses prefetched photos."""
+        photos = self.photos.all()
+        return photos[0] if photos else None
+
     def is_available(self):
         return self.status == 'available'
 
@@ -114,15 +120,29 @@ class Vehicle(TenantModel, AuditMixin):
         self.save(update_fields=['status'])
 
 
-class VehiclePhoto(models.Model):
+class VehiclePhoto(ImageDerivativesMixin, models.Model):
     vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='photos')
     image = models.ImageField(upload_to='vehicle_photos/')
+    derivative_fields = {'image': ('thumb', 'card', 'full')}
     is_primary = models.BooleanField(default=False)
     caption = models.CharField(max_length=200, blank=True)
+    # Perceptual hashes for spotting re-uploads, see apps.automation.dedup
+    ahash = models.CharField(max_length=16, blank=True)
+    phash = models.CharField(max_length=16, blank=True)
+    duplicate_of = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='duplicates'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-is_primary', '-created_at']
+        indexes = [
+            models.Index(fields=['vehicle', 'phash'], name='vehiclephoto_vehicle_phash'),
+        ]
 
     def save(self, *args, **kwargs):
         if self.is_primary:
@@ -1,13 +1,42 @@
 from rest_framework import serializers
+from apps.tenants.images import image_sources
+from apps.tenants.serializers import ImageDerivativesField
 from apps.tenants.utils import get_tenant_from_request
 from .models import Vehicle, VehicleCategory, VehiclePhoto
 
 
+class PrimaryPhotoMixin:
+    """``primary_photo`` and ``primary_photo_srcset`` fields for vehicle serializers.
+
+    ``primary_photo`` is the card-sized copy of the primary photo (the
+    original until it is generated); ``primary_photo_srcset`` maps media
+    types to srcsets of every size.
+    """
+
+    def _primary_photo_sources(self, obj):
+        photo = next((photo for photo in obj.photos.all() if photo.is_primary), None)
+        if photo is None:
+            return None
+        return image_sources(photo, 'image', 'card', self.context['request'].build_absolute_uri)
+
+    def get_primary_photo(self, obj):
+        sources = self._primary_photo_sources(obj)
+        return sources.src if sources else None
+
+    def get_primary_photo_srcset(self, obj):
+        sources = self._primary_photo_sources(obj)
+        if not sources or not sources.srcset:
+            return None
+        return {'image/webp': sources.webp_srcset, sources.fallback_type: sources.srcset}
+
+
 class VehiclePhotoSerializer(serializers.ModelSerializer):
+    derivatives = ImageDerivativesField()
+
     class Meta:
         model = VehiclePhoto
-        fields = ['id', 'image', 'is_primary', 'caption', 'created_at']
-        read_only_fields = ['id', 'created_at']
+        fields = ['id', 'image', 'derivatives', 'is_primary', 'caption', 'duplicate_of', 'created_at']
+        read_only_fields = ['id', 'duplicate_of', 'created_at']
 
 
 class VehicleCategorySerializer(serializers.ModelSerializer):
@@ -22,10 +51,11 @@ class VehicleCategorySerializer(serializers.ModelSerializer):
         return obj.vehicles.count()
 
 
-class VehicleSerializer(serializers.ModelSerializer):
+class VehicleSerializer(PrimaryPhotoMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     photos = VehiclePhotoSerializer(many=True, read_only=True)
     primary_photo = serializers.SerializerMethodField()
+    primary_photo_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Vehicle
@@ -35,16 +65,10 @@ class VehicleSerializer(serializers.ModelSerializer):
             'weekly_rate', 'monthly_rate', 'mileage', 'seats', 'doors',
             'transmission', 'fuel_type', 'features', 'notes',
             'insurance_policy', 'insurance_expiry', 'registration_expiry',
-            'photos', 'primary_photo', 'created_at', 'updated_at',
+            'photos', 'primary_photo', 'primary_photo_srcset', 'created_at', 'updated_at',
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
-    def get_primary_photo(self, obj):
-        photo = obj.photos.filter(is_primary=True).first()
-        if photo and photo.image:
-            return self.context['request'].build_absolute_uri(photo.image.url)
-        return None
-
     def create(self, validated_data):
         tenant = get_tenant_from_request(self.context['request'])
         if not tenant:
@@ -54,19 +78,14 @@ class VehicleSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class VehicleListSerializer(serializers.ModelSerializer):
+class VehicleListSerializer(PrimaryPhotoMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     primary_photo = serializers.SerializerMethodField()
+    primary_photo_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Vehicle
         fields = [
             'id', 'make', 'model', 'year', 'license_plate', 'status',
-            'daily_rate', 'category_name', 'primary_photo',
+            'daily_rate', 'category_name', 'primary_photo', 'primary_photo_srcset',
         ]
-
-    def get_primary_photo(self, obj):
-        photo = obj.photos.filter(is_primary=True).first()
-        if photo and photo.image:
-            return self.context['request'].build_absolute_uri(photo.image.url)
-        return None
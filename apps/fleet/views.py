@@ -6,6 +6,7 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from django_filters.rest_framework import DjangoFilterBackend
 
 from apps.tenants.mixins import TenantViewMixin
+from apps.tenants.pagination import OptionalCursorPagination
 from .models import Vehicle, VehicleCategory, VehiclePhoto
 from .serializers import (
     VehicleSerializer, VehicleListSerializer,
@@ -33,6 +34,7 @@ class VehicleCategoryViewSet(TenantViewMixin, viewsets.ModelViewSet):
 
 class VehicleViewSet(TenantViewMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalCursorPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'category', 'make', 'transmission', 'fuel_type']
     search_fields = ['make', 'model', 'license_plate', 'vin']
@@ -80,6 +82,8 @@ class VehicleViewSet(TenantViewMixin, viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'], parser_classes=[MultiPartParser, FormParser])
     def upload_photo(self, request, pk=None):
+        from apps.automation.dedup import DuplicatePhotoError, create_photo
+
         vehicle = self.get_object()
         image = request.FILES.get('image')
         if not image:
@@ -91,12 +95,17 @@ class VehicleViewSet(TenantViewMixin, viewsets.ModelViewSet):
         is_primary = request.data.get('is_primary', 'false').lower() == 'true'
         caption = request.data.get('caption', '')
 
-        photo = VehiclePhoto.objects.create(
-            vehicle=vehicle,
-            image=image,
-            is_primary=is_primary,
-            caption=caption
-        )
+        try:
+            photo = create_photo(
+                VehiclePhoto, image, {'vehicle': vehicle},
+                is_primary=is_primary,
+                caption=caption
+            )
+        except DuplicatePhotoError as e:
+            return Response(
+                {'error': str(e), 'duplicate_of': e.original.pk},
+                status=status.HTTP_409_CONFLICT
+            )
         serializer = VehiclePhotoSerializer(photo)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
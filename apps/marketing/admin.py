@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import LeadCapture, ReferralCredit
+from .models import LeadCapture, ReferralCredit, RentalDirectoryEntry
 
 
 @admin.register(LeadCapture)
@@ -21,3 +21,11 @@ class ReferralCreditAdmin(admin.ModelAdmin):
     search_fields = ['referrer_email', 'referred_email']
     readonly_fields = ['created_at']
     ordering = ['-created_at']
+
+
+@admin.register(RentalDirectoryEntry)
+class RentalDirectoryEntryAdmin(admin.ModelAdmin):
+    list_display = ['display_name', 'location', 'vehicle_count', 'is_listed', 'refreshed_at']
+    list_filter = ['is_listed']
+    search_fields = ['display_name', 'search_text']
+    readonly_fields = ['tenant', 'display_name', 'location', 'search_text', 'vehicle_count', 'is_listed', 'refreshed_at']
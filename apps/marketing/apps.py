@@ -5,3 +5,6 @@ class MarketingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.marketing'
     verbose_name = 'Marketing'
+
+    def ready(self):
+        from . import signals  # noqa: F401
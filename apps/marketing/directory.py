@@ -0,0 +1,218 @@
+"""
+Public rental directory index.
+
+RentalDirectoryEntry holds one row per tenant with normalized search tokens
+and its vehicle count; RentalDirectoryAvailability holds how many vehicles
+each tenant has free per day for the next ``AVAILABILITY_DAYS`` days. Both are
+refreshed per tenant whenever the tenant, one of its vehicles or one of its
+reservations changes (see ``signals``), and rebuilt nightly to roll the
+availability window forward.
+
+On PostgreSQL the search_text column carries a pg_trgm GIN index, which
+serves the substring filters used by ``search_directory``.
+"""
+import re
+import unicodedata
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import RentalDirectoryAvailability, RentalDirectoryEntry
+
+AVAILABILITY_DAYS = 90
+
+# Vehicles in these states cannot be booked at all
+UNRENTABLE_VEHICLE_STATUSES = ('maintenance', 'unavailable')
+
+# Reservations in these states hold their vehicle (see Reservation.has_conflict)
+BLOCKING_RESERVATION_STATUSES = ('pending', 'confirmed', 'checked_out')
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize_tokens(*values):
+    """Lowercase, strip accents and split values into unique word tokens."""
+    tokens = []
+    for value in values:
+        if not value:
+            continue
+        text = unicodedata.normalize('NFKD', str(value))
+        text = text.encode('ascii', 'ignore').decode().lower()
+        for token in _TOKEN_RE.findall(text):
+            if token not in tokens:
+                tokens.append(token)
+    return tokens
+
+
+def build_search_text(tenant):
+    tokens = normalize_tokens(
+        tenant.business_name, tenant.name, tenant.slug, tenant.business_address,
+    )
+    return f' {" ".join(tokens)} ' if tokens else ''
+
+
+def _rental_days(start, end):
+    """Days a vehicle is held by a reservation: ``start`` up to ``end``."""
+    day = start
+    while day < end:
+        yield day
+        day += timedelta(days=1)
+
+
+def refresh_directory_entries(tenant_ids=None, today=None):
+    """Rebuild directory entries and availability for the given tenants.
+
+    Runs a fixed number of queries regardless of how many tenants are
+    refreshed. Pass None to rebuild every tenant; ids of tenants that no
+    longer exist are ignored.
+
+    Returns:
+        Number of entries written
+    """
+    from apps.fleet.models import Vehicle
+    from apps.reservations.models import Reservation
+    from apps.tenants.models import Tenant
+
+    now = timezone.now()
+    today = today or timezone.localdate()
+    horizon = [today + timedelta(days=offset) for offset in range(AVAILABILITY_DAYS)]
+    horizon_end = horizon[-1] + timedelta(days=1)
+
+    tenants = Tenant.objects.only(
+        'id', 'name', 'slug', 'business_name', 'business_address', 'is_active',
+    )
+    if tenant_ids is not None:
+        tenants = tenants.filter(pk__in=tenant_ids)
+    tenants = list(tenants)
+    ids = [tenant.pk for tenant in tenants]
+
+    vehicle_counts = dict(
+        Vehicle.objects.filter(tenant_id__in=ids)
+        .values('tenant_id').annotate(n=Count('id')).order_by()
+        .values_list('tenant_id', 'n')
+    )
+    rentable = defaultdict(int)
+    rentable_vehicles = Vehicle.objects.filter(tenant_id__in=ids).exclude(
+        status__in=UNRENTABLE_VEHICLE_STATUSES
+    )
+    for tenant_id in rentable_vehicles.values_list('tenant_id', flat=True):
+        rentable[tenant_id] += 1
+
+    # tenant -> day -> vehicles held that day
+    booked = defaultdict(lambda: defaultdict(set))
+    reservations = Reservation.objects.filter(
+        tenant_id__in=ids,
+        vehicle__in=rentable_vehicles,
+        status__in=BLOCKING_RESERVATION_STATUSES,
+        start_date__lt=horizon_end,
+        end_date__gt=today,
+    ).values_list('tenant_id', 'vehicle_id', 'start_date', 'end_date')
+    for tenant_id, vehicle_id, start, end in reservations:
+        for day in _rental_days(max(start, today), min(end, horizon_end)):
+            booked[tenant_id][day].add(vehicle_id)
+
+    entries = []
+    availability = []
+    for tenant in tenants:
+        entry = RentalDirectoryEntry(
+            tenant=tenant,
+            display_name=tenant.business_name or tenant.name,
+            location=(tenant.business_address or '').replace('\n', ', ')[:255],
+            search_text=build_search_text(tenant),
+            vehicle_count=vehicle_counts.get(tenant.pk, 0),
+            is_listed=tenant.is_active,
+            refreshed_at=now,
+        )
+        entries.append(entry)
+        for day in horizon:
+            availability.append(RentalDirectoryAvailability(
+                entry_id=tenant.pk,
+                date=day,
+                available_count=max(rentable[tenant.pk] - len(booked[tenant.pk][day]), 0),
+            ))
+
+    with transaction.atomic():
+        RentalDirectoryEntry.objects.bulk_create(
+            entries,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['tenant'],
+            update_fields=[
+                'display_name', 'location', 'search_text', 'vehicle_count',
+                'is_listed', 'refreshed_at',
+            ],
+        )
+        RentalDirectoryAvailability.objects.filter(entry_id__in=ids).delete()
+        RentalDirectoryAvailability.objects.bulk_create(availability, batch_size=1000)
+
+    return len(entries)
+
+
+def build_missing_entries():
+    """Index every tenant that has no directory entry yet.
+
+    Run after migrations so tenants created before the directory existed
+    are searchable as soon as it is deployed, without waiting for the
+    nightly rebuild.
+
+    Returns:
+        Number of entries written
+    """
+    from apps.tenants.models import Tenant
+
+    ids = list(Tenant.objects.filter(directory_entry__isnull=True).values_list('pk', flat=True))
+    return refresh_directory_entries(ids) if ids else 0
+
+
+def schedule_directory_refresh(tenant_id):
+    """Refresh one tenant's directory entry once the current transaction commits.
+
+    The rebuild never runs inside the transaction that changed the tenant,
+    so saving a vehicle or reservation doesn't also rewrite the tenant's
+    availability rows, and a rolled-back change leaves the entry alone. It
+    runs in this process by default, or in Celery with
+    ``RENTAL_DIRECTORY_ASYNC_REFRESH``. A tenant deleted in the meantime is
+    skipped.
+    """
+    if getattr(settings, 'RENTAL_DIRECTORY_ASYNC_REFRESH', False):
+        from .tasks import refresh_rental_directory
+        transaction.on_commit(lambda: refresh_rental_directory.delay([tenant_id]), robust=True)
+    else:
+        transaction.on_commit(lambda: refresh_directory_entries([tenant_id]), robust=True)
+
+
+def search_directory(location='', pickup_date=None, return_date=None):
+    """Return listed directory entries matching a location and date range.
+
+    Every location token must start a word in the tenant's name, slug or
+    address. With a pickup date, only tenants with at least one vehicle
+    free on each day of the rental are returned, annotated with
+    ``available_count``; days past the availability window count as fully
+    available.
+    """
+    entries = RentalDirectoryEntry.objects.filter(is_listed=True).select_related('tenant')
+
+    for token in normalize_tokens(location):
+        entries = entries.filter(search_text__contains=f' {token}')
+
+    if pickup_date:
+        end = return_date if return_date and return_date > pickup_date else pickup_date + timedelta(days=1)
+        tightest_day = (
+            RentalDirectoryAvailability.objects
+            .filter(entry=OuterRef('pk'), date__gte=pickup_date, date__lt=end)
+            .values('entry')
+            .annotate(lowest=Min('available_count'))
+            .values('lowest')
+        )
+        entries = entries.annotate(
+            available_count=Coalesce(Subquery(tightest_day), F('vehicle_count'))
+        ).filter(available_count__gt=0).order_by('-available_count', '-vehicle_count', 'pk')
+    else:
+        entries = entries.order_by('-vehicle_count', 'pk')
+
+    return entries
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the public rental directory index and availability'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tenant',
+            type=int,
+            action='append',
+            dest='tenant_ids',
+            help='Only rebuild this tenant id (may be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        from apps.marketing.directory import refresh_directory_entries
+
+        count = refresh_directory_entries(options['tenant_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} directory entries'))
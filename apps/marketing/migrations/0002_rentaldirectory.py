@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS marketing_directory_search_trgm "
+        "ON marketing_rentaldirectoryentry USING gin (search_text gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS marketing_directory_search_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("marketing", "0001_initial"),
+        ("tenants", "0007_auditlogarchive"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RentalDirectoryEntry",
+            fields=[
+                (
+                    "tenant",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="directory_entry",
+                        serialize=False,
+                        to="tenants.tenant",
+                    ),
+                ),
+                ("display_name", models.CharField(max_length=200)),
+                ("location", models.CharField(blank=True, max_length=255)),
+                ("search_text", models.TextField(blank=True)),
+                ("vehicle_count", models.PositiveIntegerField(db_index=True, default=0)),
+                ("is_listed", models.BooleanField(default=True)),
+                ("refreshed_at", models.DateTimeField()),
+            ],
+            options={
+                "verbose_name": "Rental Directory Entry",
+                "verbose_name_plural": "Rental Directory Entries",
+                "ordering": ["-vehicle_count"],
+            },
+        ),
+        migrations.CreateModel(
+            name="RentalDirectoryAvailability",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("available_count", models.PositiveIntegerField(default=0)),
+                (
+                    "entry",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="availability",
+                        to="marketing.rentaldirectoryentry",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Rental Directory Availability",
+                "verbose_name_plural": "Rental Directory Availability",
+                "ordering": ["date"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("entry", "date"), name="directory_availability_unique_day"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -52,3 +52,58 @@ class ReferralCredit(models.Model):
 
     def __str__(self):
         return f"{self.referrer_email} → {self.referred_email} (${self.credit_amount})"
+
+
+class RentalDirectoryEntry(models.Model):
+    """
+    Denormalized public directory listing for one tenant.
+
+    Maintained by ``apps.marketing.directory`` so the public rental search
+    can filter and sort without scanning tenants or counting vehicles on
+    each anonymous request.
+    """
+    tenant = models.OneToOneField(
+        'tenants.Tenant',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='directory_entry'
+    )
+    display_name = models.CharField(max_length=200)
+    location = models.CharField(max_length=255, blank=True)
+    # Normalized, space-delimited name and location tokens with a leading
+    # and trailing space so word-prefix matches are plain substring matches.
+    search_text = models.TextField(blank=True)
+    vehicle_count = models.PositiveIntegerField(default=0, db_index=True)
+    is_listed = models.BooleanField(default=True)
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-vehicle_count']
+        verbose_name = 'Rental Directory Entry'
+        verbose_name_plural = 'Rental Directory Entries'
+
+    def __str__(self):
+        return self.display_name
+
+
+class RentalDirectoryAvailability(models.Model):
+    """Number of vehicles a directory entry has free on a given day."""
+
+    entry = models.ForeignKey(
+        RentalDirectoryEntry,
+        on_delete=models.CASCADE,
+        related_name='availability'
+    )
+    date = models.DateField()
+    available_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['entry', 'date'], name='directory_availability_unique_day'),
+        ]
+        verbose_name = 'Rental Directory Availability'
+        verbose_name_plural = 'Rental Directory Availability'
+
+    def __str__(self):
+        return f'{self.entry_id} {self.date}: {self.available_count}'
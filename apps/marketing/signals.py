@@ -0,0 +1,44 @@
+"""Keep the public rental directory in step with tenant, fleet and booking changes."""
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from apps.fleet.models import Vehicle
+from apps.reservations.models import Reservation
+from apps.tenants.models import Tenant
+
+from .directory import build_missing_entries, schedule_directory_refresh
+from .models import RentalDirectoryEntry
+
+
+@receiver(post_save, sender=Tenant, dispatch_uid='directory_tenant_saved')
+def tenant_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_directory_refresh(instance.pk)
+
+
+@receiver(post_save, sender=Vehicle, dispatch_uid='directory_vehicle_saved')
+@receiver(post_save, sender=Reservation, dispatch_uid='directory_reservation_saved')
+def fleet_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_directory_refresh(instance.tenant_id)
+
+
+@receiver(post_delete, sender=Vehicle, dispatch_uid='directory_vehicle_deleted')
+@receiver(post_delete, sender=Reservation, dispatch_uid='directory_reservation_deleted')
+def fleet_deleted(sender, instance, origin=None, **kwargs):
+    # Deleting a tenant cascades to its entry too; there is nothing to refresh
+    if isinstance(origin, QuerySet):
+        origin = origin.model
+    if not (origin is Tenant or isinstance(origin, Tenant)):
+        schedule_directory_refresh(instance.tenant_id)
+
+
+@receiver(post_migrate, dispatch_uid='directory_build_missing')
+def index_existing_tenants(sender, app_config=None, using=DEFAULT_DB_ALIAS, **kwargs):
+    # Fills the directory on the deploy that adds it; a no-op afterwards
+    if app_config is None or app_config.label != 'marketing' or using != DEFAULT_DB_ALIAS:
+        return
+    if RentalDirectoryEntry._meta.db_table in connections[using].introspection.table_names():
+        build_missing_entries()
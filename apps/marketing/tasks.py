@@ -0,0 +1,8 @@
+from celery import shared_task
+
+
+@shared_task(ignore_result=True)
+def refresh_rental_directory(tenant_ids=None):
+    """Rebuild public directory entries for the given tenants, or all of them."""
+    from .directory import refresh_directory_entries
+    return refresh_directory_entries(tenant_ids)
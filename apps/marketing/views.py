@@ -1,6 +1,5 @@
 from django.views.generic import TemplateView, FormView, ListView
 from django.http import JsonResponse
-from django.db.models import Q, Count
 from django.urls import reverse_lazy
 
 from apps.tenants.models import Tenant
@@ -106,30 +105,35 @@ class ReferralView(FormView):
 
 
 class RentalSearchView(ListView):
-    """Search for rental companies by location."""
-    model = Tenant
+    """Search for rental companies by location and availability.
+
+    Reads the precomputed RentalDirectoryEntry index, so each search runs a
+    fixed number of queries however many tenants and vehicles exist.
+    """
     template_name = 'marketing/search_results.html'
     context_object_name = 'tenants'
     paginate_by = 12
 
-    def get_queryset(self):
-        queryset = Tenant.objects.filter(is_active=True)
-        location = self.request.GET.get('location', '').strip()
+    def get_form(self):
+        if not hasattr(self, '_form'):
+            self._form = RentalSearchForm(self.request.GET or None)
+            self._form.is_valid()
+        return self._form
 
-        if location:
-            queryset = queryset.filter(
-                Q(business_name__icontains=location) |
-                Q(name__icontains=location) |
-                Q(slug__icontains=location)
-            )
+    def get_queryset(self):
+        from .directory import search_directory
 
-        return queryset.annotate(
-            vehicle_count=Count('vehicle')
-        ).order_by('-vehicle_count')
+        form = self.get_form()
+        data = getattr(form, 'cleaned_data', {}) if not form.non_field_errors() else {}
+        return search_directory(
+            location=self.request.GET.get('location', '').strip(),
+            pickup_date=data.get('pickup_date'),
+            return_date=data.get('return_date'),
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['search_form'] = RentalSearchForm(self.request.GET)
+        context['search_form'] = self.get_form()
         context['location'] = self.request.GET.get('location', '')
         context['pickup_date'] = self.request.GET.get('pickup_date', '')
         context['return_date'] = self.request.GET.get('return_date', '')
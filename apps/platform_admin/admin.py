@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import PlatformSettings, ImpersonationLog, PlatformAuditLog
+from .models import PlatformSettings, ImpersonationLog, PlatformAuditLog, TenantUsageSnapshot
 
 
 @admin.register(PlatformSettings)
@@ -43,3 +43,13 @@ class PlatformAuditLogAdmin(admin.ModelAdmin):
 
     def has_change_permission(self, request, obj=None):
         return False
+
+
+@admin.register(TenantUsageSnapshot)
+class TenantUsageSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['tenant', 'user_count', 'vehicle_count', 'reservation_count', 'mrr', 'last_activity_at', 'refreshed_at']
+    search_fields = ['tenant__name', 'tenant__slug']
+    readonly_fields = [field.name for field in TenantUsageSnapshot._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
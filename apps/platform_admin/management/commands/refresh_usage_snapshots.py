@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Recompute tenant usage snapshots for the platform admin pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tenant',
+            type=int,
+            action='append',
+            dest='tenant_ids',
+            help='Only refresh this tenant id (may be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        from apps.platform_admin.usage import refresh_usage_snapshots
+
+        count = refresh_usage_snapshots(options['tenant_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {count} tenant usage snapshots'))
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("platform_admin", "0001_initial"),
+        ("tenants", "0007_auditlogarchive"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="platformauditlog",
+            index=models.Index(fields=["timestamp", "id"], name="platformauditlog_ts_id"),
+        ),
+    ]
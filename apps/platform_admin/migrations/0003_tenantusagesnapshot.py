@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("platform_admin", "0002_platformauditlog_timestamp_index"),
+        ("tenants", "0007_auditlogarchive"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TenantUsageSnapshot",
+            fields=[
+                (
+                    "tenant",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="usage_snapshot",
+                        serialize=False,
+                        to="tenants.tenant",
+                    ),
+                ),
+                ("user_count", models.PositiveIntegerField(db_index=True, default=0)),
+                ("vehicle_count", models.PositiveIntegerField(db_index=True, default=0)),
+                ("customer_count", models.PositiveIntegerField(default=0)),
+                ("reservation_count", models.PositiveIntegerField(db_index=True, default=0)),
+                ("reservations_this_month", models.PositiveIntegerField(default=0)),
+                (
+                    "mrr",
+                    models.DecimalField(
+                        db_index=True,
+                        decimal_places=2,
+                        default=0,
+                        help_text="Monthly base price for paying tenants",
+                        max_digits=10,
+                    ),
+                ),
+                (
+                    "rental_fees_this_month",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Per-rental fees accrued by reservations created this month",
+                        max_digits=10,
+                    ),
+                ),
+                ("last_activity_at", models.DateTimeField(blank=True, db_index=True, null=True)),
+                ("refreshed_at", models.DateTimeField()),
+            ],
+            options={
+                "verbose_name": "Tenant Usage Snapshot",
+                "verbose_name_plural": "Tenant Usage Snapshots",
+            },
+        ),
+    ]
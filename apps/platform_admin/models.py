@@ -217,6 +217,9 @@ class PlatformAuditLog(models.Model):
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['timestamp', 'id'], name='platformauditlog_ts_id'),
+        ]
         verbose_name = 'Platform Audit Log'
         verbose_name_plural = 'Platform Audit Logs'
 
@@ -224,6 +227,54 @@ class PlatformAuditLog(models.Model):
         return f'{self.get_action_display()} by {self.admin_user} at {self.timestamp}'
 
 
+class TenantUsageSnapshot(models.Model):
+    """
+    Precomputed per-tenant usage figures for the platform admin pages.
+
+    Refreshed in bulk by the ``refresh_tenant_usage_snapshots`` Celery task so
+    tenant lists can sort and display usage without joining and counting
+    across every tenant's data on each request. Figures are only as fresh
+    as ``refreshed_at``.
+    """
+    tenant = models.OneToOneField(
+        'tenants.Tenant',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='usage_snapshot'
+    )
+
+    user_count = models.PositiveIntegerField(default=0, db_index=True)
+    vehicle_count = models.PositiveIntegerField(default=0, db_index=True)
+    customer_count = models.PositiveIntegerField(default=0)
+    reservation_count = models.PositiveIntegerField(default=0, db_index=True)
+    reservations_this_month = models.PositiveIntegerField(default=0)
+
+    # Revenue
+    mrr = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        db_index=True,
+        help_text='Monthly base price for paying tenants'
+    )
+    rental_fees_this_month = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        help_text='Per-rental fees accrued by reservations created this month'
+    )
+
+    last_activity_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Tenant Usage Snapshot'
+        verbose_name_plural = 'Tenant Usage Snapshots'
+
+    def __str__(self):
+        return f'Usage for {self.tenant_id} at {self.refreshed_at}'
+
+
 def log_platform_action(
     admin_user,
     action,
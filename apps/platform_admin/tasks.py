@@ -0,0 +1,8 @@
+from celery import shared_task
+
+
+@shared_task(ignore_result=True)
+def refresh_tenant_usage_snapshots():
+    """Recompute TenantUsageSnapshot rows for every tenant."""
+    from .usage import refresh_usage_snapshots
+    return refresh_usage_snapshots()
@@ -25,4 +25,7 @@ urlpatterns = [
 
     # Audit logs
     path('audit-logs/', views.AuditLogListView.as_view(), name='audit_logs'),
+
+    # OCR usage and latency
+    path('ocr-usage/', views.OCRUsageView.as_view(), name='ocr_usage'),
 ]
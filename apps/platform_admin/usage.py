@@ -0,0 +1,107 @@
+"""
+Tenant usage snapshots.
+
+Computes per-tenant counts, revenue and last activity with one GROUP BY
+query per source table and upserts the results into TenantUsageSnapshot,
+so the cost of a refresh grows with the number of tables, not tenants.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from apps.tenants.models import ActivityLog, Tenant, TenantUser
+
+from .models import TenantUsageSnapshot
+
+# Subscription states that are billed the plan's base price
+BILLABLE_STATUSES = ('active', 'past_due')
+
+# Reservations in these states never accrue a per-rental fee
+UNBILLED_RESERVATION_STATUSES = ('cancelled', 'no_show')
+
+SNAPSHOT_FIELDS = [
+    'user_count', 'vehicle_count', 'customer_count', 'reservation_count',
+    'reservations_this_month', 'mrr', 'rental_fees_this_month',
+    'last_activity_at', 'refreshed_at',
+]
+
+
+def _grouped(queryset, **aggregates):
+    """Return {tenant_id: {name: value}} for aggregates grouped by tenant."""
+    rows = queryset.values('tenant_id').annotate(**aggregates).order_by()
+    return {row.pop('tenant_id'): row for row in rows}
+
+
+def get_monthly_recurring_revenue(tenant):
+    """Return the base price the tenant is billed each month."""
+    if tenant.is_active and tenant.subscription_status in BILLABLE_STATUSES:
+        return Decimal(str(tenant.get_base_price()))
+    return Decimal('0')
+
+
+def refresh_usage_snapshots(tenant_ids=None, now=None):
+    """Recompute usage snapshots for all tenants or the given tenant ids.
+
+    Returns:
+        Number of snapshots written
+    """
+    from apps.customers.models import Customer
+    from apps.fleet.models import Vehicle
+    from apps.reservations.models import Reservation
+
+    now = now or timezone.now()
+    month_start = timezone.localtime(now).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    tenants = Tenant.objects.only('id', 'plan', 'is_active', 'subscription_status', 'rental_fee')
+    if tenant_ids is not None:
+        tenants = tenants.filter(pk__in=tenant_ids)
+    tenants = list(tenants)
+    ids = [tenant.pk for tenant in tenants]
+
+    users = _grouped(TenantUser.objects.filter(tenant_id__in=ids), n=Count('id'))
+    vehicles = _grouped(Vehicle.objects.filter(tenant_id__in=ids), n=Count('id'))
+    customers = _grouped(Customer.objects.filter(tenant_id__in=ids), n=Count('id'))
+    reservations = _grouped(
+        Reservation.objects.filter(tenant_id__in=ids),
+        n=Count('id'),
+        this_month=Count('id', filter=Q(created_at__gte=month_start) & ~Q(
+            status__in=UNBILLED_RESERVATION_STATUSES
+        )),
+    )
+    activity = _grouped(ActivityLog.objects.filter(tenant_id__in=ids), last=Max('timestamp'))
+
+    snapshots = []
+    for tenant in tenants:
+        reservation_stats = reservations.get(tenant.pk, {})
+        this_month = reservation_stats.get('this_month', 0)
+        snapshots.append(TenantUsageSnapshot(
+            tenant=tenant,
+            user_count=users.get(tenant.pk, {}).get('n', 0),
+            vehicle_count=vehicles.get(tenant.pk, {}).get('n', 0),
+            customer_count=customers.get(tenant.pk, {}).get('n', 0),
+            reservation_count=reservation_stats.get('n', 0),
+            reservations_this_month=this_month,
+            mrr=get_monthly_recurring_revenue(tenant),
+            rental_fees_this_month=Decimal(str(tenant.rental_fee)) * this_month,
+            last_activity_at=activity.get(tenant.pk, {}).get('last'),
+            refreshed_at=now,
+        ))
+
+    TenantUsageSnapshot.objects.bulk_create(
+        snapshots,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['tenant'],
+        update_fields=SNAPSHOT_FIELDS,
+    )
+    return len(snapshots)
+
+
+def get_usage_snapshot(tenant):
+    """Return the tenant's snapshot, computing it on the spot if missing."""
+    try:
+        return tenant.usage_snapshot
+    except TenantUsageSnapshot.DoesNotExist:
+        refresh_usage_snapshots([tenant.pk])
+        return TenantUsageSnapshot.objects.get(tenant=tenant)
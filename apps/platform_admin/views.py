@@ -8,13 +8,14 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.views import View
 from django.views.generic import ListView, DetailView, UpdateView
 from django.contrib import messages
-from django.db.models import Count, Sum, Q
+from django.db.models import Count, F, Min, Sum, Q
 from django.db.models.functions import TruncDate
 from django.utils import timezone
 from datetime import timedelta
 
 from apps.tenants.models import Tenant, TenantUser, User
-from .models import PlatformSettings, ImpersonationLog, PlatformAuditLog, log_platform_action
+from apps.tenants.pagination import KeysetPaginationMixin
+from .models import PlatformSettings, ImpersonationLog, PlatformAuditLog, TenantUsageSnapshot, log_platform_action
 from .decorators import SuperuserRequiredMixin
 
 
@@ -65,6 +66,14 @@ class PlatformDashboardView(SuperuserRequiredMixin, View):
             verified=Count('id', filter=Q(email_verified=True)),
         )
 
+        # Revenue and usage totals from the precomputed snapshots
+        usage_totals = TenantUsageSnapshot.objects.filter(tenant__is_active=True).aggregate(
+            mrr=Sum('mrr'),
+            rental_fees=Sum('rental_fees_this_month'),
+            vehicles=Sum('vehicle_count'),
+            refreshed_at=Min('refreshed_at'),
+        )
+
         # Recent platform activity
         recent_activity = PlatformAuditLog.objects.select_related(
             'admin_user', 'tenant', 'target_user'
@@ -81,6 +90,7 @@ class PlatformDashboardView(SuperuserRequiredMixin, View):
             'recent_signups': recent_signups,
             'trials_ending': trials_ending,
             'user_stats': user_stats,
+            'usage_totals': usage_totals,
             'recent_activity': recent_activity,
             'active_impersonations': active_impersonations,
         }
@@ -88,6 +98,29 @@ class PlatformDashboardView(SuperuserRequiredMixin, View):
         return render(request, self.template_name, context)
 
 
+class OCRUsageView(SuperuserRequiredMixin, View):
+    """
+    OCR calls, spend, error rate and p50/p95 latency across all tenants.
+
+    Reads the hourly OCR usage buckets; ``?days=`` picks the period (default
+    7, at most 90) and ``?interval=hour`` shows hourly rows.
+    """
+    template_name = 'platform_admin/ocr_usage.html'
+
+    def get(self, request):
+        from apps.automation.integration.telemetry import spend_by_tenant, usage_report
+        from apps.automation.models import OCRUsageBucket
+        from apps.automation.views import usage_report_params
+
+        days, interval = usage_report_params(request.GET)
+        context = {
+            'days': days,
+            'report': usage_report(OCRUsageBucket.objects.all(), days=days, interval=interval),
+            'top_tenants': spend_by_tenant(OCRUsageBucket.objects.all(), days=days),
+        }
+        return render(request, self.template_name, context)
+
+
 class TenantListView(SuperuserRequiredMixin, ListView):
     """
     List all tenants with search and filters.
@@ -97,10 +130,36 @@ class TenantListView(SuperuserRequiredMixin, ListView):
     context_object_name = 'tenants'
     paginate_by = 20
 
+    # ?sort= values -> indexed columns; usage figures come from
+    # TenantUsageSnapshot instead of counting across every tenant per request.
+    SORT_FIELDS = {
+        'created': 'created_at',
+        'name': 'name',
+        'users': 'usage_snapshot__user_count',
+        'vehicles': 'usage_snapshot__vehicle_count',
+        'reservations': 'usage_snapshot__reservation_count',
+        'mrr': 'usage_snapshot__mrr',
+        'activity': 'usage_snapshot__last_activity_at',
+    }
+    default_sort = '-created'
+
+    def get_sort(self):
+        sort = self.request.GET.get('sort', '') or self.default_sort
+        if sort.lstrip('-') not in self.SORT_FIELDS:
+            sort = self.default_sort
+        return sort
+
     def get_queryset(self):
+        sort = self.get_sort()
+        field = F(self.SORT_FIELDS[sort.lstrip('-')])
+        order = field.desc(nulls_last=True) if sort.startswith('-') else field.asc(nulls_last=True)
+
         queryset = Tenant.objects.select_related('owner').annotate(
-            user_count=Count('users'),
-        ).order_by('-created_at')
+            user_count=F('usage_snapshot__user_count'),
+            vehicle_count=F('usage_snapshot__vehicle_count'),
+            mrr=F('usage_snapshot__mrr'),
+            last_activity_at=F('usage_snapshot__last_activity_at'),
+        ).order_by(order, '-pk')
 
         # Search
         search = self.request.GET.get('search', '').strip()
@@ -135,6 +194,7 @@ class TenantListView(SuperuserRequiredMixin, ListView):
         context['search'] = self.request.GET.get('search', '')
         context['plan_filter'] = self.request.GET.get('plan', '')
         context['status_filter'] = self.request.GET.get('status', '')
+        context['sort'] = self.get_sort()
         context['plan_choices'] = Tenant.PLAN_CHOICES
         return context
 
@@ -163,16 +223,16 @@ class TenantDetailView(SuperuserRequiredMixin, DetailView):
             tenant=tenant
         ).select_related('admin_user')[:20]
 
-        # Usage statistics
-        from apps.fleet.models import Vehicle
-        from apps.customers.models import Customer
-        from apps.reservations.models import Reservation
+        # Usage statistics from the precomputed snapshot
+        from .usage import get_usage_snapshot
+        usage = get_usage_snapshot(tenant)
 
         context['tenant_users'] = tenant_users
         context['activity_logs'] = activity_logs
-        context['vehicle_count'] = Vehicle.objects.filter(tenant=tenant).count()
-        context['customer_count'] = Customer.objects.filter(tenant=tenant).count()
-        context['reservation_count'] = Reservation.objects.filter(tenant=tenant).count()
+        context['usage'] = usage
+        context['vehicle_count'] = usage.vehicle_count
+        context['customer_count'] = usage.customer_count
+        context['reservation_count'] = usage.reservation_count
         context['plan_choices'] = Tenant.PLAN_CHOICES
         context['status_choices'] = Tenant.SUBSCRIPTION_STATUS_CHOICES
 
@@ -321,19 +381,31 @@ class PlatformSettingsView(SuperuserRequiredMixin, View):
         return redirect('platform_admin:settings')
 
 
-class AuditLogListView(SuperuserRequiredMixin, ListView):
+class AuditLogListView(SuperuserRequiredMixin, KeysetPaginationMixin, ListView):
     """
     View all platform audit logs.
+
+    Filtering by date also reads months that have been moved to the
+    audit log archive.
     """
     model = PlatformAuditLog
     template_name = 'platform_admin/audit_logs.html'
     context_object_name = 'logs'
     paginate_by = 50
+    keyset_ordering = ('-timestamp', '-id')
+
+    def get_date_range(self):
+        from apps.tenants.utils import get_tenant_day_range
+        return get_tenant_day_range(
+            None,
+            self.request.GET.get('date_from', ''),
+            self.request.GET.get('date_to', ''),
+        )
 
     def get_queryset(self):
         queryset = PlatformAuditLog.objects.select_related(
             'admin_user', 'tenant', 'target_user'
-        ).order_by('-timestamp')
+        )
 
         # Filter by action type
         action = self.request.GET.get('action', '')
@@ -345,12 +417,34 @@ class AuditLogListView(SuperuserRequiredMixin, ListView):
         if admin_id:
             queryset = queryset.filter(admin_user_id=admin_id)
 
+        start, end = self.get_date_range()
+        if start:
+            queryset = queryset.filter(timestamp__gte=start)
+        if end:
+            queryset = queryset.filter(timestamp__lt=end)
+
         return queryset
 
+    def get_keyset_extra_rows(self):
+        start, end = self.get_date_range()
+        if not (start or end):
+            return None
+        from apps.tenants.archive import read_archived_logs
+        return read_archived_logs(
+            PlatformAuditLog, start, end,
+            filters={
+                'action': self.request.GET.get('action', ''),
+                'admin_user_id': self.request.GET.get('admin', ''),
+            },
+            select_related=('admin_user', 'tenant', 'target_user'),
+        )
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['action_choices'] = PlatformAuditLog.ACTION_CHOICES
         context['action_filter'] = self.request.GET.get('action', '')
+        context['date_from'] = self.request.GET.get('date_from', '')
+        context['date_to'] = self.request.GET.get('date_to', '')
         return context
 
 
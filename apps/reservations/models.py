@@ -194,6 +194,9 @@ class Reservation(TenantModel, AuditMixin):
 
         self.vehicle.set_available()
 
+        from apps.automation.comparisons import schedule_checkin_comparison
+        schedule_checkin_comparison(self)
+
     def cancel(self):
         if not self.can_cancel():
             raise ValidationError('Cannot cancel this reservation.')
@@ -7,6 +7,7 @@ from django.db.models import Q
 from datetime import date, timedelta
 
 from apps.tenants.mixins import TenantViewMixin
+from apps.tenants.pagination import OptionalCursorPagination
 from apps.fleet.models import Vehicle
 from .models import Reservation, ReservationExtra
 from .serializers import (
@@ -32,6 +33,7 @@ class ReservationExtraViewSet(TenantViewMixin, viewsets.ModelViewSet):
 
 class ReservationViewSet(TenantViewMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalCursorPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'vehicle', 'customer']
     search_fields = ['customer__first_name', 'customer__last_name', 'vehicle__license_plate']
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
-from .models import Tenant, TenantUser, User, TenantSettings, ActivityLog
+from .models import Tenant, TenantUser, User, TenantSettings, ActivityLog, AuditLogArchive
 
 
 @admin.register(User)
@@ -68,3 +68,14 @@ class ActivityLogAdmin(admin.ModelAdmin):
 
     def has_change_permission(self, request, obj=None):
         return False
+
+
+@admin.register(AuditLogArchive)
+class AuditLogArchiveAdmin(admin.ModelAdmin):
+    list_display = ['model_label', 'month', 'tenant', 'row_count', 'file_path', 'created_at']
+    list_filter = ['model_label']
+    search_fields = ['tenant__name', 'file_path']
+    readonly_fields = ['model_label', 'month', 'tenant', 'file_path', 'row_count', 'created_at']
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,429 @@
+"""
+Time-partitioned audit logs with a cold archive.
+
+ActivityLog and PlatformAuditLog only ever grow. On PostgreSQL both tables
+can be converted to monthly RANGE partitions on ``timestamp`` (see
+``convert_to_partitioned``), so date-bounded queries only touch the months
+they need and old months can be dropped without a long DELETE. Other
+backends keep a single table and fall back to deleting archived months.
+
+Months older than ``AUDIT_LOG_RETENTION_MONTHS`` are exported to
+gzip-compressed JSONL in default storage, indexed by AuditLogArchive, and
+removed from the live table. ``read_archived_logs`` reads them back as
+unsaved model instances so views can page through old date ranges as if the
+rows were still in the database.
+
+Partition and archive months are UTC calendar months.
+"""
+import gzip
+import io
+import json
+import logging
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_ROOT = 'audit_archive'
+
+# model label -> whether the archive is split per tenant
+ARCHIVED_MODELS = {
+    'tenants.ActivityLog': True,
+    'platform_admin.PlatformAuditLog': False,
+}
+
+
+def month_start(value):
+    """Return the first day of the UTC month containing ``value``."""
+    if isinstance(value, datetime):
+        value = value.astimezone(dt_timezone.utc).date()
+    return value.replace(day=1)
+
+
+def add_months(month, count):
+    """Shift a first-of-month date by ``count`` months."""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_bounds(month):
+    """Return the half-open UTC datetime range covering ``month``."""
+    start = datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc)
+    end_month = add_months(month, 1)
+    end = datetime(end_month.year, end_month.month, 1, tzinfo=dt_timezone.utc)
+    return start, end
+
+
+def retention_cutoff(months=None, now=None):
+    """Return the first month that must stay in the live table."""
+    if months is None:
+        months = settings.AUDIT_LOG_RETENTION_MONTHS
+    return add_months(month_start(now or timezone.now()), -months)
+
+
+# ---------------------------------------------------------------------------
+# PostgreSQL partitions
+# ---------------------------------------------------------------------------
+
+def supports_partitioning():
+    return connection.vendor == 'postgresql'
+
+
+def partition_name(model, month):
+    return f'{model._meta.db_table}_p{month:%Y%m}'
+
+
+def is_partitioned(model):
+    """Return True if ``model``'s table is a PostgreSQL partitioned table."""
+    if not supports_partitioning():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table p '
+            'JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s',
+            [model._meta.db_table],
+        )
+        return cursor.fetchone() is not None
+
+
+def create_partition(model, month):
+    """Create the partition holding ``month`` if it does not exist yet."""
+    qn = connection.ops.quote_name
+    start, end = month_bounds(month)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {qn(partition_name(model, month))} '
+            f'PARTITION OF {qn(model._meta.db_table)} '
+            f'FOR VALUES FROM (%s) TO (%s)',
+            [start, end],
+        )
+
+
+def ensure_partitions(model, months_ahead=3, now=None):
+    """Create partitions from the current month to ``months_ahead`` months out.
+
+    Returns the list of months checked; a no-op on unpartitioned tables.
+    """
+    if not is_partitioned(model):
+        return []
+    current = month_start(now or timezone.now())
+    months = [add_months(current, offset) for offset in range(months_ahead + 1)]
+    for month in months:
+        create_partition(model, month)
+    return months
+
+
+def drop_partition(model, month):
+    """Detach and drop the partition for ``month``. Returns True if it existed."""
+    qn = connection.ops.quote_name
+    name = partition_name(model, month)
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s)', [name])
+        if cursor.fetchone()[0] is None:
+            return False
+        cursor.execute(f'ALTER TABLE {qn(model._meta.db_table)} DETACH PARTITION {qn(name)}')
+        cursor.execute(f'DROP TABLE {qn(name)}')
+    return True
+
+
+def convert_to_partitioned(model):
+    """Rebuild ``model``'s table as monthly RANGE partitions on timestamp.
+
+    PostgreSQL requires the partition key in every unique constraint, so the
+    primary key becomes (id, timestamp); ids still come from a sequence and
+    stay unique in practice. Existing rows are copied into per-month
+    partitions, and a default partition catches rows for months that have
+    not been created yet. Run inside a maintenance window: the table is
+    locked while rows are copied.
+
+    Raises:
+        RuntimeError: If the database is not PostgreSQL or already partitioned
+    """
+    if not supports_partitioning():
+        raise RuntimeError('Audit log partitioning requires PostgreSQL')
+    if is_partitioned(model):
+        raise RuntimeError(f'{model._meta.label} is already partitioned')
+
+    qn = connection.ops.quote_name
+    table = model._meta.db_table
+    legacy = f'{table}_legacy'
+    sequence = f'{table}_id_seq'
+    timestamp = model._meta.get_field('timestamp').column
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}')
+            cursor.execute(
+                f'CREATE TABLE {qn(table)} (LIKE {qn(legacy)} INCLUDING DEFAULTS) '
+                f'PARTITION BY RANGE ({qn(timestamp)})'
+            )
+            cursor.execute(f'ALTER TABLE {qn(table)} ADD PRIMARY KEY (id, {qn(timestamp)})')
+            cursor.execute(f'CREATE TABLE {qn(table + "_default")} PARTITION OF {qn(table)} DEFAULT')
+
+            cursor.execute(f'SELECT MIN({qn(timestamp)}), MAX({qn(timestamp)}) FROM {qn(legacy)}')
+            oldest, newest = cursor.fetchone()
+
+        if oldest is not None:
+            month = month_start(oldest)
+            while month <= month_start(newest):
+                create_partition(model, month)
+                month = add_months(month, 1)
+        ensure_partitions(model)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'INSERT INTO {qn(table)} SELECT * FROM {qn(legacy)}')
+            cursor.execute(f'DROP TABLE {qn(legacy)}')
+
+            # Identity columns are not supported on partitioned tables before
+            # PostgreSQL 17, so ids come from a plain owned sequence instead.
+            cursor.execute(f'CREATE SEQUENCE IF NOT EXISTS {qn(sequence)} OWNED BY {qn(table)}.id')
+            cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+            cursor.execute(
+                f"SELECT setval('{sequence}', COALESCE(MAX(id), 0) + 1, false) FROM {qn(table)}"
+            )
+
+            for field in model._meta.concrete_fields:
+                if not field.is_relation:
+                    continue
+                column = qn(field.column)
+                cursor.execute(f'CREATE INDEX {qn(f"{table}_{field.column}_idx")} ON {qn(table)} ({column})')
+                target = field.target_field
+                cursor.execute(
+                    f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(f"{table}_{field.column}_fk")} '
+                    f'FOREIGN KEY ({column}) REFERENCES {qn(target.model._meta.db_table)} '
+                    f'({qn(target.column)}) DEFERRABLE INITIALLY DEFERRED'
+                )
+
+        with connection.schema_editor() as schema_editor:
+            for index in model._meta.indexes:
+                schema_editor.add_index(model, index)
+
+
+# ---------------------------------------------------------------------------
+# Cold archive
+# ---------------------------------------------------------------------------
+
+def archive_path(model, month, tenant_id=None):
+    scope = f'tenant_{tenant_id}' if tenant_id is not None else 'platform'
+    return f'{ARCHIVE_ROOT}/{model._meta.label_lower}/{month:%Y-%m}/{scope}.jsonl.gz'
+
+
+def _read_archive_lines(path):
+    with default_storage.open(path, 'rb') as fh:
+        with gzip.GzipFile(fileobj=fh) as gz:
+            return gz.read().decode().splitlines()
+
+
+def _write_archive(model, month, tenant_id, lines):
+    """Write ``lines`` to the month's archive, merged with any existing one.
+
+    Rows reach an archived month late, e.g. buffered activity flushed after
+    the month was archived or backdated imports. They are merged into the
+    existing file, keyed by id so rows exported by an interrupted earlier
+    run are not written twice. The merged file is saved under a new name and
+    indexed before the old one is deleted.
+    """
+    from .models import AuditLogArchive
+
+    archive = AuditLogArchive.objects.filter(
+        model_label=model._meta.label, month=month, tenant_id=tenant_id,
+    ).first()
+    merged = {}
+    if archive is not None:
+        for line in _read_archive_lines(archive.file_path):
+            merged[json.loads(line)['id']] = line
+    for line in lines:
+        merged[json.loads(line)['id']] = line
+
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as gz:
+        for line in merged.values():
+            gz.write(line.encode())
+            gz.write(b'\n')
+
+    saved_path = default_storage.save(archive_path(model, month, tenant_id), ContentFile(buffer.getvalue()))
+    old_path = archive.file_path if archive is not None else None
+
+    archive, _ = AuditLogArchive.objects.update_or_create(
+        model_label=model._meta.label,
+        month=month,
+        tenant_id=tenant_id,
+        defaults={'file_path': saved_path, 'row_count': len(merged)},
+    )
+    if old_path and old_path != saved_path:
+        default_storage.delete(old_path)
+    return archive
+
+
+def _partition_is_exported(model, month, ids):
+    """Lock the month's partition and return True if it holds only ``ids``."""
+    qn = connection.ops.quote_name
+    name = partition_name(model, month)
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s)', [name])
+        if cursor.fetchone()[0] is None:
+            return False
+        cursor.execute(f'LOCK TABLE {qn(name)} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {qn(name)} WHERE NOT (id = ANY(%s)))', [list(ids)])
+        return not cursor.fetchone()[0]
+
+
+def archive_month(model, month):
+    """Export one month of ``model`` to cold storage and drop it from the table.
+
+    The export is written and indexed before any rows are removed, so a
+    failure part-way leaves the live rows in place; re-running merges them
+    into the archive again. Only the exported rows are removed: rows written
+    to the month meanwhile stay live until the next run.
+
+    Returns:
+        Number of rows archived
+    """
+    per_tenant = ARCHIVED_MODELS[model._meta.label]
+    start, end = month_bounds(month)
+    rows = (
+        model.objects.filter(timestamp__gte=start, timestamp__lt=end)
+        .order_by('timestamp', 'id')
+        .values(*[field.attname for field in model._meta.concrete_fields])
+    )
+
+    groups = {}
+    ids = []
+    for row in rows.iterator(chunk_size=2000):
+        key = row['tenant_id'] if per_tenant else None
+        groups.setdefault(key, []).append(json.dumps(row, cls=DjangoJSONEncoder))
+        ids.append(row['id'])
+
+    total = 0
+    for tenant_id, lines in groups.items():
+        _write_archive(model, month, tenant_id, lines)
+        total += len(lines)
+
+    with transaction.atomic():
+        # Dropping the partition is only safe when nothing unexported has
+        # arrived since; otherwise the exported rows are deleted one by one.
+        if is_partitioned(model) and _partition_is_exported(model, month, ids):
+            drop_partition(model, month)
+        # Also clears rows that landed in the default partition, and is the
+        # whole removal step on unpartitioned tables.
+        for offset in range(0, len(ids), 2000):
+            model.objects.filter(pk__in=ids[offset:offset + 2000]).delete()
+
+    logger.info('Archived %d %s rows for %s', total, model._meta.label, f'{month:%Y-%m}')
+    return total
+
+
+def months_to_archive(model, cutoff):
+    """Return the months of ``model`` still in the live table before ``cutoff``."""
+    start, _ = month_bounds(cutoff)
+    oldest = (
+        model.objects.filter(timestamp__lt=start)
+        .order_by('timestamp')
+        .values_list('timestamp', flat=True)
+        .first()
+    )
+    if oldest is None:
+        return []
+    months = []
+    month = month_start(oldest)
+    while month < cutoff:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def archive_old_logs(retention_months=None, now=None, dry_run=False):
+    """Archive every audit log month older than the retention window.
+
+    Returns:
+        Dict mapping model label to a list of (month, rows archived) tuples
+    """
+    cutoff = retention_cutoff(retention_months, now)
+    summary = {}
+    for label in ARCHIVED_MODELS:
+        model = apps.get_model(label)
+        results = []
+        for month in months_to_archive(model, cutoff):
+            if dry_run:
+                start, end = month_bounds(month)
+                count = model.objects.filter(timestamp__gte=start, timestamp__lt=end).count()
+            else:
+                count = archive_month(model, month)
+            results.append((month, count))
+        summary[label] = results
+    return summary
+
+
+def _row_to_instance(model, row):
+    values = {}
+    for field in model._meta.concrete_fields:
+        if field.attname in row:
+            values[field.attname] = field.to_python(row[field.attname])
+    instance = model(**values)
+    instance._state.adding = False
+    instance._from_archive = True
+    return instance
+
+
+def read_archived_logs(model, start=None, end=None, tenant=None, filters=None, select_related=()):
+    """Read archived entries of ``model`` in ``[start, end)`` as unsaved instances.
+
+    Args:
+        model: ActivityLog or PlatformAuditLog
+        start: Inclusive aware datetime lower bound, or None
+        end: Exclusive aware datetime upper bound, or None
+        tenant: Restrict to one tenant's archive (ActivityLog only)
+        filters: Dict of attname -> value that rows must match exactly
+        select_related: Foreign key names to load in bulk for the results
+
+    Returns:
+        List of instances in no particular order. Empty when no archived
+        month overlaps the range.
+    """
+    from .models import AuditLogArchive
+
+    archives = AuditLogArchive.objects.filter(model_label=model._meta.label)
+    if tenant is not None and ARCHIVED_MODELS[model._meta.label]:
+        archives = archives.filter(tenant=tenant)
+    if start is not None:
+        archives = archives.filter(month__gte=month_start(start))
+    if end is not None:
+        archives = archives.filter(month__lte=month_start(end))
+
+    filters = {key: str(value) for key, value in (filters or {}).items() if value not in (None, '')}
+    instances = []
+    for archive in archives:
+        try:
+            lines = _read_archive_lines(archive.file_path)
+        except (OSError, EOFError):
+            logger.exception('Could not read audit log archive %s', archive.file_path)
+            continue
+
+        for line in lines:
+            row = json.loads(line)
+            if any(str(row.get(key)) != value for key, value in filters.items()):
+                continue
+            instance = _row_to_instance(model, row)
+            if start is not None and instance.timestamp < start:
+                continue
+            if end is not None and instance.timestamp >= end:
+                continue
+            instances.append(instance)
+
+    for name in select_related:
+        field = model._meta.get_field(name)
+        ids = {getattr(obj, field.attname) for obj in instances} - {None}
+        related = field.related_model._default_manager.in_bulk(ids)
+        for obj in instances:
+            target = related.get(getattr(obj, field.attname))
+            if target is not None:
+                field.set_cached_value(obj, target)
+
+    return instances
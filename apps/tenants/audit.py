@@ -0,0 +1,109 @@
+"""
+Buffered activity log writer.
+
+Inside a request, ``log_activity()`` does not insert immediately. Each entry
+is queued with ``transaction.on_commit`` so it only reaches the buffer once
+the transaction that produced it has committed; entries from rolled-back
+work are discarded along with the savepoint. At the end of the request the
+buffer is flushed with a single ``bulk_create``, or handed to a Celery task
+when ``ACTIVITY_LOG_ASYNC_WRITES`` is enabled.
+
+Outside a buffer (management commands, shell, direct calls) entries are
+written synchronously, exactly as before.
+"""
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+_current_buffer = ContextVar('activity_log_buffer', default=None)
+
+SERIALIZED_FIELDS = [
+    'tenant_id', 'user_id', 'action', 'model_name', 'object_id',
+    'object_repr', 'changes', 'ip_address',
+]
+
+
+class ActivityLogBuffer:
+    """Collects committed ActivityLog entries and writes them in one batch."""
+
+    def __init__(self):
+        self.entries = []
+        self.closed = False
+
+    def add(self, entry):
+        """Queue a committed entry, writing it directly if the buffer is closed.
+
+        A callback can fire after the buffer has been flushed when the
+        request ran inside an outer transaction that commits later.
+        """
+        if self.closed:
+            write_activity_logs([entry])
+        else:
+            self.entries.append(entry)
+
+    def flush(self):
+        """Write all queued entries and close the buffer."""
+        self.closed = True
+        entries, self.entries = self.entries, []
+        if entries:
+            write_activity_logs(entries)
+        return entries
+
+
+def get_current_buffer():
+    """Return the active ActivityLogBuffer, or None outside a buffered block."""
+    return _current_buffer.get()
+
+
+@contextmanager
+def buffered_activity_log():
+    """Buffer ``log_activity()`` calls made inside the block.
+
+    Nested blocks share the outermost buffer, which is flushed once when
+    the outermost block exits.
+    """
+    existing = _current_buffer.get()
+    if existing is not None:
+        yield existing
+        return
+
+    buffer = ActivityLogBuffer()
+    token = _current_buffer.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _current_buffer.reset(token)
+        pending = len(buffer.entries)
+        try:
+            buffer.flush()
+        except Exception:
+            logger.exception('Failed to flush %d activity log entries', pending)
+
+
+def enqueue_activity_log(entry):
+    """Queue an unsaved ActivityLog for the current buffer once committed."""
+    buffer = _current_buffer.get()
+    transaction.on_commit(lambda: buffer.add(entry), robust=True)
+
+
+def serialize_activity_log(entry):
+    """Convert an unsaved ActivityLog into a JSON-safe dict for Celery."""
+    data = {field: getattr(entry, field) for field in SERIALIZED_FIELDS}
+    data['timestamp'] = entry.timestamp.isoformat() if entry.timestamp else None
+    return data
+
+
+def write_activity_logs(entries):
+    """Persist ActivityLog entries in one insert or ship them to Celery."""
+    if getattr(settings, 'ACTIVITY_LOG_ASYNC_WRITES', False):
+        from .tasks import write_activity_log_batch
+        write_activity_log_batch.delay([serialize_activity_log(e) for e in entries])
+        return
+
+    from .models import ActivityLog
+    ActivityLog.objects.bulk_create(entries)
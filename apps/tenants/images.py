@@ -0,0 +1,392 @@
+"""
+Upload-time normalization and resized derivatives of stored images.
+
+Vehicle and condition report photos, branding logos and license scans are
+uploaded straight from phones: 4000+ pixels wide, rotated by an EXIF tag
+and carrying the GPS position where they were taken. Models using
+``ImageDerivativesMixin`` list their image fields in ``derivative_fields``,
+and on save:
+
+1. A newly uploaded file is normalized before it is stored: the EXIF
+   orientation is applied, metadata is dropped and the longest side is
+   capped at ``IMAGE_UPLOAD_MAX_DIMENSION``. Files Pillow cannot decode,
+   animations and files that need none of this are stored as uploaded.
+2. Resized copies of the stored file are rendered for the sizes listed for
+   the field (``IMAGE_DERIVATIVE_SIZES``, longest side in pixels), as WebP
+   plus JPEG, or PNG for images with transparency. This runs in a Celery
+   task once the transaction commits, or inline when
+   ``IMAGE_DERIVATIVES_ASYNC`` is off.
+
+The model's ``derivatives`` field records, per image field, the file the
+derivatives were made from and each size's dimensions and files. Derivative
+names follow from the source name, so generating them again (a retried
+task, a photo linked to another photo's file, a save from an instance that
+was loaded before the task finished) reuses the files already stored.
+Templates render them with the ``responsive_image`` tag; until they exist
+the original is served.
+"""
+import io
+import logging
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = {
+    'WEBP': 'image/webp',
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+}
+EXTENSIONS = {
+    'WEBP': 'webp',
+    'JPEG': 'jpg',
+    'PNG': 'png',
+}
+
+# Formats normalized on upload; MPO is the multi-picture JPEG some phones save
+NORMALIZED_FORMATS = {'JPEG', 'MPO', 'PNG', 'WEBP'}
+# Metadata dropped on upload besides EXIF; the ICC profile is kept for colour
+STRIPPED_INFO = ('exif', 'xmp', 'XML:com.adobe.xmp', 'comment', 'photoshop')
+
+_DECODE_ERRORS = (UnidentifiedImageError, OSError, ValueError, Image.DecompressionBombError)
+
+
+@dataclass(frozen=True)
+class EncodedImage:
+    data: bytes
+    format: str
+    width: int
+    height: int
+
+
+def _encode(image: Image.Image, format: str, quality: int, icc_profile=None) -> EncodedImage:
+    if format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    options = {'optimize': True}
+    if format in ('JPEG', 'WEBP'):
+        options['quality'] = quality
+    if format == 'JPEG':
+        options['progressive'] = True
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+    buffer = io.BytesIO()
+    image.save(buffer, format, **options)
+    return EncodedImage(buffer.getvalue(), format, image.width, image.height)
+
+
+def _has_alpha(image: Image.Image) -> bool:
+    return image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def normalize_image(data: bytes, max_dimension: int, quality: int = 90) -> Optional[EncodedImage]:
+    """Orient, strip and downsize an uploaded image.
+
+    Args:
+        data: Uploaded file contents
+        max_dimension: Longest side in pixels after downsizing
+        quality: Encoder quality for JPEG/WebP
+
+    Returns:
+        The re-encoded image in its own format (JPEG for MPO), or None if the
+        data should be stored as uploaded
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.format not in NORMALIZED_FORMATS:
+                return None
+            if image.format != 'MPO' and getattr(image, 'n_frames', 1) > 1:
+                return None
+            needs_work = (
+                image.format == 'MPO'
+                or max(image.size) > max_dimension
+                or len(image.getexif()) > 0
+                or any(key in image.info for key in STRIPPED_INFO)
+            )
+            if not needs_work:
+                return None
+            format = 'JPEG' if image.format == 'MPO' else image.format
+            icc_profile = image.info.get('icc_profile')
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+            return _encode(image, format, quality, icc_profile)
+    except _DECODE_ERRORS:
+        return None
+
+
+def render_derivatives(data: bytes, sizes: dict[str, int], quality: int = 82) -> dict[str, list[EncodedImage]]:
+    """Resized copies of an image.
+
+    Args:
+        data: Image file contents
+        sizes: Size name to longest side in pixels
+        quality: Encoder quality for JPEG/WebP
+
+    Returns:
+        Size name to encodings (WebP first, then JPEG or PNG). Images are not
+        enlarged, so a size that would come out the same as a smaller one is
+        left out. Empty if Pillow cannot decode the data.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as source:
+            source = ImageOps.exif_transpose(source)
+            source.load()
+    except _DECODE_ERRORS:
+        return {}
+
+    fallback = 'PNG' if _has_alpha(source) else 'JPEG'
+    if source.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        source = source.convert('RGBA' if fallback == 'PNG' else 'RGB')
+
+    rendered = {}
+    previous = None
+    for name, dimension in sorted(sizes.items(), key=lambda item: item[1]):
+        image = source.copy()
+        image.thumbnail((dimension, dimension), Image.Resampling.LANCZOS)
+        if image.size == previous:
+            continue
+        previous = image.size
+        rendered[name] = [_encode(image, 'WEBP', quality), _encode(image, fallback, quality)]
+    return rendered
+
+
+def derivative_name(source_name: str, size: str, format: str) -> str:
+    """Storage name of a derivative, e.g. ``vehicle_photos/derivatives/car_card.webp``."""
+    directory, filename = os.path.split(source_name)
+    stem = os.path.splitext(filename)[0]
+    return f'{directory}/derivatives/{stem}_{size}.{EXTENSIONS[format]}'
+
+
+def _current_sizes(instance, field_name):
+    """Recorded derivatives of the field's current file, or an empty dict."""
+    recorded = instance.derivatives.get(field_name, {})
+    if recorded.get('source') != getattr(instance, field_name).name:
+        return {}
+    return recorded.get('sizes') or {}
+
+
+def derivative_urls(instance, field_name, build_url=None) -> dict:
+    """Size name to the dimensions and per-media-type URLs of an image field's derivatives."""
+    file = getattr(instance, field_name)
+    if not file:
+        return {}
+    build_url = build_url or (lambda url: url)
+    return {
+        name: {
+            key: value if key in ('width', 'height') else build_url(file.storage.url(value))
+            for key, value in entry.items()
+        }
+        for name, entry in _current_sizes(instance, field_name).items()
+    }
+
+
+@dataclass(frozen=True)
+class ImageSources:
+    """What an ``<img>``/``<picture>`` needs to show an image field.
+
+    Attributes:
+        src: URL of the requested size in the fallback format, or of the
+            original while there are no derivatives
+        srcset: Every size in the fallback format, as ``url 800w, ...``
+        webp_srcset: Every size as WebP
+        fallback_type: Media type of ``srcset``: JPEG, or PNG for images
+            with transparency
+        width: Width of ``src`` in pixels, if known
+        height: Height of ``src`` in pixels, if known
+    """
+    src: str
+    srcset: str = ''
+    webp_srcset: str = ''
+    fallback_type: str = ''
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+def image_sources(instance, field_name, size, build_url=None) -> Optional[ImageSources]:
+    """The URLs to show an image field at a size, e.g. 'card'.
+
+    If the image was smaller than the requested size, the largest derivative
+    made of it is used.
+
+    Args:
+        instance: Model instance using ImageDerivativesMixin
+        field_name: Image field, e.g. 'image'
+        size: Size name from the field's ``derivative_fields`` entry
+        build_url: Optional callable applied to every URL, e.g.
+            ``request.build_absolute_uri``
+
+    Returns:
+        ImageSources, or None if the field is empty
+    """
+    file = getattr(instance, field_name)
+    if not file:
+        return None
+    build_url = build_url or (lambda url: url)
+    sizes = _current_sizes(instance, field_name)
+    if not sizes:
+        return ImageSources(src=build_url(file.url))
+
+    storage = file.storage
+    order = [name for name in instance.derivative_fields[field_name] if name in sizes]
+    order.sort(key=lambda name: sizes[name]['width'])
+    chosen = size if size in sizes else order[-1]
+    fallback_type = next(media_type for media_type in sizes[chosen] if media_type not in ('width', 'height', 'image/webp'))
+
+    def srcset(media_type):
+        return ', '.join(
+            f'{build_url(storage.url(sizes[name][media_type]))} {sizes[name]["width"]}w' for name in order
+        )
+
+    return ImageSources(
+        src=build_url(storage.url(sizes[chosen][fallback_type])),
+        srcset=srcset(fallback_type),
+        webp_srcset=srcset('image/webp'),
+        fallback_type=fallback_type,
+        width=sizes[chosen]['width'],
+        height=sizes[chosen]['height'],
+    )
+
+
+def normalize_uploads(instance) -> None:
+    """Normalize the instance's image fields that hold a new, unsaved upload."""
+    for field_name in instance.derivative_fields:
+        file = getattr(instance, field_name)
+        if not file or file._committed:
+            continue
+        file.seek(0)
+        normalized = normalize_image(
+            file.read(), settings.IMAGE_UPLOAD_MAX_DIMENSION, settings.IMAGE_UPLOAD_QUALITY,
+        )
+        file.seek(0)
+        if normalized is None:
+            continue
+        name = os.path.basename(file.name)
+        if normalized.format == 'JPEG' and os.path.splitext(name)[1].lower() not in ('.jpg', '.jpeg'):
+            name = f'{os.path.splitext(name)[0]}.jpg'
+        setattr(instance, field_name, ContentFile(normalized.data, name=name))
+
+
+def stale_fields(instance) -> list[str]:
+    """Image fields whose recorded derivatives were not made from the current file."""
+    return [
+        field_name for field_name in instance.derivative_fields
+        if (getattr(instance, field_name).name or None)
+        != instance.derivatives.get(field_name, {}).get('source')
+    ]
+
+
+def schedule_derivatives(instance) -> None:
+    """Bring the instance's derivatives up to date after a save."""
+    field_names = stale_fields(instance)
+    if not field_names:
+        return
+    if not settings.IMAGE_DERIVATIVES_ASYNC:
+        generate_derivatives(instance, field_names)
+        return
+
+    from .tasks import generate_image_derivatives
+
+    label = instance._meta.label
+    transaction.on_commit(
+        lambda: generate_image_derivatives.delay(label, instance.pk, field_names), robust=True
+    )
+
+
+def _stored_dimensions(storage, name):
+    try:
+        with storage.open(name, 'rb') as stored, Image.open(stored) as image:
+            return image.size
+    except _DECODE_ERRORS:
+        return None
+
+
+def generate_derivatives(instance, field_names=None) -> dict:
+    """Render and store the derivatives of the instance's image fields.
+
+    Derivatives already stored under the expected names are reused. Only
+    the ``derivatives`` column is written, so a concurrent save of other
+    fields is not overwritten.
+
+    Args:
+        instance: Model instance using ImageDerivativesMixin
+        field_names: Fields to process; defaults to the stale ones
+
+    Returns:
+        The instance's updated ``derivatives``
+    """
+    derivatives = dict(instance.derivatives)
+    for field_name in field_names or stale_fields(instance):
+        file = getattr(instance, field_name)
+        if not file:
+            derivatives.pop(field_name, None)
+            continue
+        sizes = {name: settings.IMAGE_DERIVATIVE_SIZES[name] for name in instance.derivative_fields[field_name]}
+        derivatives[field_name] = {'source': file.name, 'sizes': _store_derivatives(file, sizes)}
+
+    instance.derivatives = derivatives
+    type(instance)._default_manager.filter(pk=instance.pk).update(derivatives=derivatives)
+    return derivatives
+
+
+def _kept_sizes(sizes, source_size):
+    """Sizes render_derivatives keeps for a source of the given dimensions."""
+    kept = []
+    previous = None
+    for name, dimension in sorted(sizes.items(), key=lambda item: item[1]):
+        if previous is not None and previous >= max(source_size):
+            break
+        kept.append(name)
+        previous = dimension
+    return kept
+
+
+def _media_type(name):
+    extension = os.path.splitext(name)[1][1:]
+    return next(MEDIA_TYPES[format] for format, ext in EXTENSIONS.items() if ext == extension)
+
+
+def _stored_derivatives(storage, source_name, size_names):
+    """The recorded form of derivatives already stored, or None if any is missing."""
+    recorded = {}
+    for name in size_names:
+        stored = [
+            candidate for candidate in (derivative_name(source_name, name, format) for format in EXTENSIONS)
+            if storage.exists(candidate)
+        ]
+        dimensions = _stored_dimensions(storage, stored[0]) if len(stored) == 2 else None
+        if dimensions is None:
+            return None
+        recorded[name] = {'width': dimensions[0], 'height': dimensions[1]}
+        recorded[name].update({_media_type(candidate): candidate for candidate in stored})
+    return recorded
+
+
+def _store_derivatives(file, sizes):
+    storage = file.storage
+    try:
+        with file.open('rb') as source:
+            data = source.read()
+        with Image.open(io.BytesIO(data)) as image:
+            source_size = image.size
+    except _DECODE_ERRORS:
+        logger.warning('Could not read %s to render its derivatives', file.name)
+        return {}
+
+    stored = _stored_derivatives(storage, file.name, _kept_sizes(sizes, source_size))
+    if stored is not None:
+        return stored
+
+    recorded = {}
+    for name, encodings in render_derivatives(data, sizes, settings.IMAGE_DERIVATIVE_QUALITY).items():
+        recorded[name] = {'width': encodings[0].width, 'height': encodings[0].height}
+        for encoded in encodings:
+            target = derivative_name(file.name, name, encoded.format)
+            if storage.exists(target):
+                storage.delete(target)
+            recorded[name][MEDIA_TYPES[encoded.format]] = storage.save(target, ContentFile(encoded.data))
+    return recorded
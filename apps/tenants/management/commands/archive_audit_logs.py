@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Export audit log months older than the retention window to cold storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=None,
+            help='Months of audit logs to keep live (default: AUDIT_LOG_RETENTION_MONTHS)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show which months would be archived without changing anything',
+        )
+
+    def handle(self, *args, **options):
+        from apps.tenants.archive import archive_old_logs
+
+        months = options['months']
+        if months is None:
+            months = settings.AUDIT_LOG_RETENTION_MONTHS
+        if months < 1:
+            self.stderr.write(self.style.ERROR('--months must be at least 1'))
+            return
+
+        summary = archive_old_logs(months, dry_run=options['dry_run'])
+        verb = 'Would archive' if options['dry_run'] else 'Archived'
+        for label, results in summary.items():
+            if not results:
+                self.stdout.write(f'{label}: nothing older than {months} months')
+                continue
+            for month, count in results:
+                self.stdout.write(f'{label}: {verb} {count} rows for {month:%Y-%m}')
+
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Render the resized copies of vehicle and condition report photos, branding logos and '
+        'license scans stored before derivatives were generated, or whose file has changed since.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', action='store_true',
+                            help='Queue a Celery task per image instead of rendering in this process')
+
+    def handle(self, *args, **options):
+        from django.apps import apps
+        from apps.tenants.images import generate_derivatives, stale_fields
+        from apps.tenants.models import ImageDerivativesMixin
+        from apps.tenants.tasks import generate_image_derivatives
+
+        for model in apps.get_models():
+            if not issubclass(model, ImageDerivativesMixin):
+                continue
+            updated = 0
+            for instance in model._default_manager.order_by('pk').iterator():
+                field_names = stale_fields(instance)
+                if not field_names:
+                    continue
+                if options['queue']:
+                    generate_image_derivatives.delay(model._meta.label, instance.pk, field_names)
+                else:
+                    generate_derivatives(instance, field_names)
+                updated += 1
+            verb = 'queued' if options['queue'] else 'updated'
+            self.stdout.write(f'{model.__name__}: {updated} {verb}')
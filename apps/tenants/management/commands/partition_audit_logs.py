@@ -0,0 +1,47 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Manage monthly PostgreSQL partitions for the audit log tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='Rebuild unpartitioned audit log tables as partitioned tables (locks the tables)',
+        )
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=3,
+            help='Number of future months to pre-create partitions for',
+        )
+
+    def handle(self, *args, **options):
+        from apps.tenants.archive import (
+            ARCHIVED_MODELS, convert_to_partitioned, ensure_partitions,
+            is_partitioned, supports_partitioning,
+        )
+
+        if not supports_partitioning():
+            raise CommandError(
+                'Partitioning requires PostgreSQL; on this database old months '
+                'are archived by archive_audit_logs with a plain DELETE.'
+            )
+
+        for label in ARCHIVED_MODELS:
+            model = apps.get_model(label)
+            if not is_partitioned(model):
+                if not options['convert']:
+                    self.stdout.write(f'{label}: not partitioned (run with --convert)')
+                    continue
+                self.stdout.write(f'{label}: converting to partitioned table...')
+                convert_to_partitioned(model)
+
+            months = ensure_partitions(model, months_ahead=options['ahead'])
+            self.stdout.write(
+                f'{label}: partitions ready through {months[-1]:%Y-%m}'
+            )
+
+        self.stdout.write(self.style.SUCCESS('Done'))
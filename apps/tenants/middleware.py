@@ -3,6 +3,7 @@ from django.http import HttpResponseRedirect, Http404
 from django.shortcuts import redirect, render
 from django.urls import reverse
 
+from .audit import buffered_activity_log
 from .models import Tenant, TenantUser, TenantDomain
 
 
@@ -182,3 +183,20 @@ class TenantRequiredMiddleware:
 
         response = self.get_response(request)
         return response
+
+
+class ActivityLogBufferMiddleware:
+    """
+    Batch activity log writes for the duration of a request.
+
+    log_activity() calls made while handling the request are collected once
+    their transaction commits and written with a single bulk insert after
+    the response is produced.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with buffered_activity_log():
+            return self.get_response(request)
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tenants", "0004_add_personal_plan_and_rental_fee"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="activitylog",
+            index=models.Index(
+                fields=["tenant", "timestamp", "id"], name="activitylog_tenant_ts_id"
+            ),
+        ),
+    ]
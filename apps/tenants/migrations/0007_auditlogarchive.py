@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tenants", "0006_activitylog_timestamp_default"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuditLogArchive",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("model_label", models.CharField(max_length=100)),
+                ("month", models.DateField(help_text="First day of the archived month (UTC)")),
+                ("file_path", models.CharField(max_length=255)),
+                ("row_count", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="audit_log_archives",
+                        to="tenants.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Audit Log Archive",
+                "verbose_name_plural": "Audit Log Archives",
+                "ordering": ["model_label", "-month"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("model_label", "month", "tenant"),
+                        name="auditlogarchive_unique_month",
+                    )
+                ],
+            },
+        ),
+    ]
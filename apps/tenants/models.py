@@ -211,7 +211,29 @@ class Tenant(models.Model):
             self.rental_fee = limits.get('rental_fee', self.rental_fee)
 
 
-class TenantBranding(models.Model):
+class ImageDerivativesMixin(models.Model):
+    """Normalize uploaded images and keep resized copies, see apps.tenants.images.
+
+    Subclasses map each image field to the derivative sizes it needs, e.g.
+    ``derivative_fields = {'image': ('thumb', 'card', 'full')}``.
+    """
+
+    derivative_fields = {}
+
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        from .images import normalize_uploads, schedule_derivatives
+
+        normalize_uploads(self)
+        super().save(*args, **kwargs)
+        schedule_derivatives(self)
+
+
+class TenantBranding(ImageDerivativesMixin, models.Model):
     """
     Tenant branding settings for customizable appearance.
 
@@ -262,6 +284,7 @@ class TenantBranding(models.Model):
         null=True,
         help_text='Logo for dark backgrounds'
     )
+    derivative_fields = {'logo': ('thumb', 'card'), 'logo_dark': ('thumb', 'card')}
     favicon = models.ImageField(
         upload_to='tenant_branding/favicons/',
         blank=True,
@@ -535,24 +558,28 @@ class TenantSettings(models.Model):
             from apps.automation.ocr.utils.encryption import encrypt_api_key
             self.openrouter_api_key_encrypted = encrypt_api_key(api_key)
 
+    def check_ocr_rate_limit(self, cost=1):
+        """Take a token from the tenant's OCR rate limit.
+
+        Returns a RateLimitDecision (see apps.automation.integration.rate_limit).
+        """
+        from apps.automation.integration.rate_limit import acquire
+        return acquire(self, cost)
+
     def can_make_ocr_request(self):
         """Check if tenant can make another OCR request (rate limiting)."""
-        from datetime import date
-        today = date.today()
-
-        # Reset counter if it's a new day
-        if self.ocr_requests_reset_at != today:
-            self.ocr_requests_today = 0
-            self.ocr_requests_reset_at = today
-            self.save(update_fields=['ocr_requests_today', 'ocr_requests_reset_at'])
+        return self.check_ocr_rate_limit().allowed
 
-        # Limit: 100 requests per day
-        return self.ocr_requests_today < 100
+    def increment_ocr_requests(self, count=1):
+        """Count billed OCR requests.
 
-    def increment_ocr_requests(self):
-        """Increment the OCR request counter."""
-        self.ocr_requests_today += 1
-        self.save(update_fields=['ocr_requests_today'])
+        The counter lives in the rate limiter; ``ocr_requests_today`` is
+        updated from it periodically by the flush_ocr_usage task.
+        """
+        from apps.automation.integration.rate_limit import record_usage
+        from datetime import date
+        self.ocr_requests_today = record_usage(self, count)
+        self.ocr_requests_reset_at = date.today()
 
 
 class AuditMixin(models.Model):
@@ -608,10 +635,14 @@ class ActivityLog(models.Model):
     object_repr = models.CharField(max_length=255)
     changes = models.JSONField(blank=True, null=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the action happens, not when a buffered batch is inserted
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['tenant', 'timestamp', 'id'], name='activitylog_tenant_ts_id'),
+        ]
         verbose_name = 'Activity Log'
         verbose_name_plural = 'Activity Logs'
 
@@ -619,9 +650,52 @@ class ActivityLog(models.Model):
         return f'{self.action} {self.model_name} #{self.object_id} by {self.user}'
 
 
+class AuditLogArchive(models.Model):
+    """
+    Index of audit log months exported to cold storage.
+
+    Each row points at a gzip-compressed JSONL file in default storage holding
+    one month of ActivityLog (per tenant) or PlatformAuditLog (platform-wide)
+    entries that have been removed from the live table.
+    """
+    model_label = models.CharField(max_length=100)
+    month = models.DateField(help_text='First day of the archived month (UTC)')
+    tenant = models.ForeignKey(
+        Tenant,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='audit_log_archives'
+    )
+    file_path = models.CharField(max_length=255)
+    row_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['model_label', '-month']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['model_label', 'month', 'tenant'],
+                name='auditlogarchive_unique_month',
+            ),
+        ]
+        verbose_name = 'Audit Log Archive'
+        verbose_name_plural = 'Audit Log Archives'
+
+    def __str__(self):
+        return f'{self.model_label} {self.month:%Y-%m} ({self.row_count} rows)'
+
+
 def log_activity(tenant, user, action, instance, changes=None, ip_address=None):
-    """Helper function to create an activity log entry."""
-    return ActivityLog.objects.create(
+    """Helper function to create an activity log entry.
+
+    Inside a buffered block (every request, via ActivityLogBufferMiddleware)
+    the entry is written in a batch once its transaction commits and the
+    returned instance is unsaved. Otherwise it is written immediately.
+    """
+    from .audit import get_current_buffer, enqueue_activity_log
+
+    entry = ActivityLog(
         tenant=tenant,
         user=user,
         action=action,
@@ -630,4 +704,11 @@ def log_activity(tenant, user, action, instance, changes=None, ip_address=None):
         object_repr=str(instance)[:255],
         changes=changes,
         ip_address=ip_address,
+        timestamp=timezone.now(),
     )
+
+    if get_current_buffer() is None:
+        entry.save()
+    else:
+        enqueue_activity_log(entry)
+    return entry
@@ -0,0 +1,267 @@
+"""
+Keyset (cursor) pagination.
+
+Offset pagination runs a COUNT(*) over the whole filtered set and then scans
+past OFFSET rows, so both costs grow with the table. Keyset pagination seeks
+straight to the row after the last one shown using the ordering columns, so
+every page costs the same index range scan regardless of how deep it is.
+
+The ordering used for a keyset must be total: always end it with the primary
+key so rows that share a timestamp or name still have a stable position.
+Ordering fields must be non-null local fields of the model.
+"""
+import base64
+import json
+from functools import cmp_to_key, reduce
+from operator import and_, or_
+
+from django.db.models import Q
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded for the current ordering."""
+    pass
+
+
+class KeysetPage:
+    """A single page of keyset-paginated results.
+
+    Mirrors the parts of ``django.core.paginator.Page`` that templates use,
+    without page numbers (keyset pages have no absolute position).
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} objects>'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Paginate a queryset by seeking on its ordering columns.
+
+    Args:
+        queryset: Queryset to paginate (any existing ordering is replaced)
+        per_page: Number of rows per page
+        ordering: Tuple of field names, '-' prefixed for descending. The last
+            field should be the primary key to make the ordering total.
+        extra_rows: Optional in-memory model instances (e.g. rows read from
+            the audit log archive) that sort after every queryset row. They
+            are paged through once the queryset is exhausted.
+    """
+
+    NEXT = 'n'
+    PREVIOUS = 'p'
+
+    def __init__(self, queryset, per_page, ordering=('-pk',), extra_rows=None):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [
+            (self._get_field(name.lstrip('-')), name.startswith('-'))
+            for name in self.ordering
+        ]
+        self.extra_rows = sorted(extra_rows or [], key=cmp_to_key(self._compare))
+
+    def _get_field(self, name):
+        opts = self.queryset.model._meta
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+    def encode_cursor(self, obj, direction):
+        """Encode the ordering values of ``obj`` into an opaque cursor string."""
+        payload = {
+            'd': direction,
+            'v': [field.value_to_string(obj) for field, _ in self.fields],
+        }
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Decode a cursor into ``(direction, values)``.
+
+        Raises:
+            InvalidCursor: If the cursor is malformed or does not match the ordering
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            direction = payload['d']
+            raw_values = payload['v']
+        except (ValueError, TypeError, KeyError) as e:
+            raise InvalidCursor(f'Malformed cursor: {e}') from e
+
+        if direction not in (self.NEXT, self.PREVIOUS) or len(raw_values) != len(self.fields):
+            raise InvalidCursor('Cursor does not match this ordering')
+
+        try:
+            values = [field.to_python(value) for (field, _), value in zip(self.fields, raw_values)]
+        except Exception as e:
+            raise InvalidCursor(f'Invalid cursor value: {e}') from e
+
+        return direction, values
+
+    def _seek_filter(self, values, forward):
+        """Build the lexicographic "row comes after values" filter."""
+        clauses = []
+        for i, (field, descending) in enumerate(self.fields):
+            lookup = 'lt' if descending == forward else 'gt'
+            equal_prefix = [
+                Q(**{prev_field.attname: values[j]})
+                for j, (prev_field, _) in enumerate(self.fields[:i])
+            ]
+            clauses.append(reduce(and_, equal_prefix + [Q(**{f'{field.attname}__{lookup}': values[i]})]))
+        return reduce(or_, clauses)
+
+    def _compare(self, a, b):
+        """Compare two objects by the ordering, for sorting extra rows."""
+        for field, descending in self.fields:
+            left, right = field.value_from_object(a), field.value_from_object(b)
+            if left != right:
+                result = -1 if left < right else 1
+                return -result if descending else result
+        return 0
+
+    def _follows(self, obj, values, forward):
+        """Python equivalent of ``_seek_filter`` for a single object."""
+        for (field, descending), value in zip(self.fields, values):
+            current = field.value_from_object(obj)
+            if current != value:
+                return current < value if descending == forward else current > value
+        return False
+
+    def _fetch_queryset(self, values, forward, limit):
+        queryset = self.queryset.order_by(*self._order_by(forward))
+        if values is not None:
+            queryset = queryset.filter(self._seek_filter(values, forward))
+        return list(queryset[:limit])
+
+    def _fetch_extra(self, values, forward, limit):
+        rows = self.extra_rows if forward else reversed(self.extra_rows)
+        if values is not None:
+            rows = (obj for obj in rows if self._follows(obj, values, forward))
+        result = []
+        for obj in rows:
+            if len(result) >= limit:
+                break
+            result.append(obj)
+        return result
+
+    def _order_by(self, forward):
+        if forward:
+            return self.ordering
+        return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering)
+
+    def get_page(self, cursor=None):
+        """Return the page identified by ``cursor``, or the first page.
+
+        Invalid or stale cursors fall back to the first page, matching how
+        ``Paginator.get_page`` treats out-of-range page numbers.
+        """
+        direction, values = self.NEXT, None
+        if cursor:
+            try:
+                direction, values = self.decode_cursor(cursor)
+            except InvalidCursor:
+                direction, values = self.NEXT, None
+
+        forward = direction == self.NEXT
+        limit = self.per_page + 1
+        # Extra rows sort after the queryset, so walking forward reads the
+        # queryset first and walking backward reads the extra rows first.
+        if forward:
+            rows = self._fetch_queryset(values, forward, limit)
+            if len(rows) < limit and self.extra_rows:
+                rows += self._fetch_extra(values, forward, limit - len(rows))
+        else:
+            rows = self._fetch_extra(values, forward, limit) if self.extra_rows else []
+            if len(rows) < limit:
+                rows += self._fetch_queryset(values, forward, limit - len(rows))
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if not forward:
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage([])
+
+        if forward:
+            has_next, has_previous = has_more, values is not None
+        else:
+            has_next, has_previous = True, has_more
+
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1], self.NEXT) if has_next else None,
+            previous_cursor=self.encode_cursor(rows[0], self.PREVIOUS) if has_previous else None,
+        )
+
+
+class KeysetPaginationMixin:
+    """ListView mixin that swaps offset pagination for keyset pagination.
+
+    Set ``keyset_ordering`` on the view; the current page is read from the
+    ``cursor`` query parameter. ``page_obj`` in the template is a KeysetPage.
+    """
+    keyset_ordering = ('-pk',)
+    cursor_kwarg = 'cursor'
+
+    def get_keyset_extra_rows(self):
+        """Return in-memory rows to page through after the queryset."""
+        return None
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(
+            queryset, page_size,
+            ordering=self.keyset_ordering,
+            extra_rows=self.get_keyset_extra_rows(),
+        )
+        page = paginator.get_page(self.request.GET.get(self.cursor_kwarg))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+
+class TenantCursorPagination(CursorPagination):
+    """DRF cursor pagination over ``-created_at`` with a stable id tiebreak."""
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class OptionalCursorPagination(PageNumberPagination):
+    """Page-number pagination that switches to cursor pagination on request.
+
+    Clients opt in by sending a ``cursor`` query parameter (empty for the
+    first page), so existing API consumers that rely on ``count`` and
+    ``?page=`` keep working.
+    """
+    cursor_pagination_class = TenantCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_pagination_class.cursor_query_param in request.query_params:
+            self._cursor_paginator = self.cursor_pagination_class()
+            return self._cursor_paginator.paginate_queryset(queryset, request, view)
+        self._cursor_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self._cursor_paginator is not None:
+            return self._cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -2,6 +2,26 @@ from rest_framework import serializers
 from .models import Tenant, TenantUser, TenantSettings
 
 
+class ImageDerivativesField(serializers.Field):
+    """Read-only URLs and dimensions of an image field's resized copies.
+
+    Renders ``{size: {'width', 'height', media type: url}}``, with absolute
+    URLs when the serializer has a request; empty until they are generated.
+    """
+
+    def __init__(self, image_field='image', **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+        self.image_field = image_field
+
+    def to_representation(self, instance):
+        from .images import derivative_urls
+
+        request = self.context.get('request')
+        return derivative_urls(instance, self.image_field, request.build_absolute_uri if request else None)
+
+
 class TenantSerializer(serializers.ModelSerializer):
     vehicle_count = serializers.SerializerMethodField()
     user_count = serializers.SerializerMethodField()
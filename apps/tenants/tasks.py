@@ -0,0 +1,43 @@
+from celery import shared_task
+from django.utils.dateparse import parse_datetime
+
+
+@shared_task(ignore_result=True)
+def write_activity_log_batch(entries):
+    """Insert a batch of serialized ActivityLog entries in one query."""
+    from .models import ActivityLog
+
+    logs = []
+    for data in entries:
+        data = dict(data)
+        timestamp = data.pop('timestamp', None)
+        log = ActivityLog(**data)
+        if timestamp:
+            log.timestamp = parse_datetime(timestamp)
+        logs.append(log)
+
+    ActivityLog.objects.bulk_create(logs)
+    return len(logs)
+
+
+@shared_task(ignore_result=True)
+def archive_audit_logs(retention_months=None):
+    """Pre-create upcoming partitions and archive months past retention."""
+    from django.apps import apps
+    from .archive import ARCHIVED_MODELS, archive_old_logs, ensure_partitions
+
+    for label in ARCHIVED_MODELS:
+        ensure_partitions(apps.get_model(label))
+    summary = archive_old_logs(retention_months)
+    return {label: sum(count for _, count in months) for label, months in summary.items()}
+
+
+@shared_task(ignore_result=True)
+def generate_image_derivatives(model_label, pk, field_names=None):
+    """Render the resized copies of a saved instance's image fields."""
+    from django.apps import apps
+    from .images import generate_derivatives
+
+    instance = apps.get_model(model_label)._default_manager.filter(pk=pk).first()
+    if instance is not None:
+        generate_derivatives(instance, field_names)
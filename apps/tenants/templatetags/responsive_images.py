@@ -0,0 +1,51 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from apps.tenants.images import image_sources
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(instance, field_name, size, sizes='100vw', **attrs):
+    """Render an image field as a ``<picture>`` with WebP and JPEG/PNG srcsets.
+
+    Usage::
+
+        {% load responsive_images %}
+        {% responsive_image photo 'image' 'card' sizes='(min-width: 768px) 33vw, 100vw' alt=vehicle class='w-full' %}
+
+    ``size`` picks the ``src`` for browsers without srcset support. Other
+    keyword arguments become attributes of the ``<img>``, which is lazy
+    loaded unless ``loading`` is given. Renders nothing for an empty field
+    and a plain ``<img>`` of the original until the derivatives exist.
+    """
+    sources = image_sources(instance, field_name, size) if instance else None
+    if sources is None:
+        return ''
+
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    if sources.width:
+        attrs.update(width=sources.width, height=sources.height, srcset=sources.srcset, sizes=sizes)
+    img = format_html(
+        '<img src="{}" {}>',
+        sources.src,
+        format_html_join(' ', '{}="{}"', ((name.replace('_', '-'), value) for name, value in attrs.items())),
+    )
+    if not sources.webp_srcset:
+        return img
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">{}</picture>',
+        sources.webp_srcset, sizes, img,
+    )
+
+
+@register.simple_tag
+def image_urls(instance, field_name, size):
+    """The ImageSources of an image field, for markup the tag can't produce.
+
+    Usage: ``{% image_urls photo 'image' 'full' as urls %}`` then
+    ``{{ urls.src }}``, ``{{ urls.srcset }}`` and ``{{ urls.webp_srcset }}``.
+    """
+    return image_sources(instance, field_name, size) if instance else None
@@ -17,3 +17,36 @@ def get_tenant_from_request(request):
             return tenant_user.tenant
 
     return None
+
+
+def get_tenant_day_range(tenant, date_from=None, date_to=None):
+    """
+    Convert an inclusive local date range into a half-open datetime range.
+
+    Dates are interpreted in the tenant's timezone. Returns (start, end) where
+    start is midnight of date_from and end is midnight of the day after
+    date_to, so callers can filter with ``__gte=start`` and ``__lt=end``
+    instead of ``__date`` lookups, which wrap the column in a function and
+    prevent index use. Either bound is None when the input is missing or
+    not a valid ISO date.
+    """
+    from datetime import datetime, time, timedelta
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+    from django.utils import timezone
+    from django.utils.dateparse import parse_date
+
+    try:
+        tz = ZoneInfo(tenant.timezone) if tenant and tenant.timezone else timezone.get_current_timezone()
+    except (ZoneInfoNotFoundError, ValueError):
+        tz = timezone.get_current_timezone()
+
+    def local_midnight(value, offset_days=0):
+        try:
+            day = parse_date(value) if isinstance(value, str) else value
+        except ValueError:
+            return None
+        if not day:
+            return None
+        return datetime.combine(day + timedelta(days=offset_days), time.min, tzinfo=tz)
+
+    return local_midnight(date_from), local_midnight(date_to, offset_days=1)
@@ -4,6 +4,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
+from django.conf import settings as django_settings
 from django.db.models import Sum
 from django.utils import timezone
 from django.views.generic import TemplateView
@@ -159,51 +160,64 @@ class TestAPIKeyView(TenantViewMixin, APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        from apps.automation.integration.clients import get_client_factory
+        from apps.automation.ocr.client import (
+            OpenRouterAPIError,
+            OpenRouterAuthError,
+            OpenRouterClient,
+            OpenRouterConnectionError,
+            chat_completions_url,
+        )
+
         api_key = request.data.get('api_key')
 
-        if not api_key:
+        if api_key:
+            client = OpenRouterClient(
+                api_key=api_key,
+                api_url=chat_completions_url(django_settings.OPENROUTER_BASE_URL),
+            )
+        else:
             settings, _ = TenantSettings.objects.get_or_create(tenant=tenant)
-            api_key = settings.get_api_key()
+            client = get_client_factory().get(settings) if settings.has_api_key else None
 
-        if not api_key:
+        if client is None or not client.api_key:
             return Response(
                 {'valid': False, 'error': 'No API key provided or stored'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
         try:
-            with httpx.Client(timeout=10.0) as client:
-                response = client.get(
-                    'https://openrouter.ai/api/v1/auth/key',
-                    headers={'Authorization': f'Bearer {api_key}'}
-                )
-
-            if response.status_code == 200:
-                data = response.json().get('data', {})
-                return Response({
-                    'valid': True,
-                    'message': 'API key is valid',
-                    'label': data.get('label', ''),
-                    'limit': data.get('limit'),
-                    'usage': data.get('usage'),
-                })
-            elif response.status_code == 401:
-                return Response({
-                    'valid': False,
-                    'error': 'Invalid API key - authentication failed'
-                })
-            else:
+            data = client.get_key_info(timeout=10.0)
+        except OpenRouterAuthError:
+            return Response({
+                'valid': False,
+                'error': 'Invalid API key - authentication failed'
+            })
+        except OpenRouterConnectionError as e:
+            if isinstance(e.__cause__, httpx.TimeoutException):
                 return Response({
                     'valid': False,
-                    'error': f'API error: {response.status_code}'
+                    'error': 'Connection timeout - please try again'
                 })
-        except httpx.TimeoutException:
             return Response({
                 'valid': False,
-                'error': 'Connection timeout - please try again'
+                'error': f'Connection error: {str(e.__cause__ or e)}'
+            })
+        except OpenRouterAPIError as e:
+            return Response({
+                'valid': False,
+                'error': f'API error: {e.status_code}'
             })
         except Exception as e:
             return Response({
                 'valid': False,
                 'error': f'Connection error: {str(e)}'
             })
+
+        return Response({
+            'valid': True,
+            'message': 'API key is valid',
+            'label': data.get('label', ''),
+            'limit': data.get('limit'),
+            'usage': data.get('usage'),
+        })
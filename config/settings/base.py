@@ -55,6 +55,7 @@ MIDDLEWARE = [
     'apps.platform_admin.middleware.ImpersonationMiddleware',
     'apps.tenants.middleware.SubdomainTenantMiddleware',
     'apps.tenants.middleware.TenantMiddleware',
+    'apps.tenants.middleware.ActivityLogBufferMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -136,6 +137,37 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    'refresh-tenant-usage-snapshots': {
+        'task': 'apps.platform_admin.tasks.refresh_tenant_usage_snapshots',
+        'schedule': 15 * 60,
+    },
+    'archive-audit-logs': {
+        'task': 'apps.tenants.tasks.archive_audit_logs',
+        'schedule': 24 * 60 * 60,
+    },
+    'rebuild-rental-directory': {
+        'task': 'apps.marketing.tasks.refresh_rental_directory',
+        'schedule': 24 * 60 * 60,
+    },
+    'flush-ocr-usage': {
+        'task': 'apps.automation.tasks.flush_ocr_usage',
+        'schedule': 60,
+    },
+    'prune-ocr-call-records': {
+        'task': 'apps.automation.tasks.prune_ocr_call_records',
+        'schedule': 24 * 60 * 60,
+    },
+}
+
+# Ship buffered ActivityLog batches to Celery instead of inserting at response end
+ACTIVITY_LOG_ASYNC_WRITES = config('ACTIVITY_LOG_ASYNC_WRITES', default=False, cast=bool)
+
+# Audit log months older than this are exported to cold storage (apps.tenants.archive)
+AUDIT_LOG_RETENTION_MONTHS = config('AUDIT_LOG_RETENTION_MONTHS', default=12, cast=int)
+
+# Refresh public rental directory entries in Celery instead of in-process; either way after commit
+RENTAL_DIRECTORY_ASYNC_REFRESH = config('RENTAL_DIRECTORY_ASYNC_REFRESH', default=False, cast=bool)
 
 STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY', default='')
 STRIPE_PUBLISHABLE_KEY = config('STRIPE_PUBLISHABLE_KEY', default='')
@@ -150,14 +182,172 @@ PLAN_LIMITS = {
 
 PLAN_FEATURES = {
     'starter': ['fleet', 'customers', 'reservations', 'contracts', 'dashboard'],
-    'professional': ['fleet', 'customers', 'reservations', 'contracts', 'dashboard', 'online_booking', 'payments', 'esignatures', 'license_ocr', 'insurance_ocr'],
-    'business': ['fleet', 'customers', 'reservations', 'contracts', 'dashboard', 'online_booking', 'payments', 'esignatures', 'gps', 'analytics', 'api', 'license_ocr', 'insurance_ocr'],
-    'enterprise': ['fleet', 'customers', 'reservations', 'contracts', 'dashboard', 'online_booking', 'payments', 'esignatures', 'gps', 'analytics', 'api', 'whitelabel', 'license_ocr', 'insurance_ocr'],
+    'professional': ['fleet', 'customers', 'reservations', 'contracts', 'dashboard', 'online_booking', 'payments', 'esignatures', 'license_ocr', 'insurance_ocr', 'inspection_ai'],
+    'business': ['fleet', 'customers', 'reservations', 'contracts', 'dashboard', 'online_booking', 'payments', 'esignatures', 'gps', 'analytics', 'api', 'license_ocr', 'insurance_ocr', 'inspection_ai'],
+    'enterprise': ['fleet', 'customers', 'reservations', 'contracts', 'dashboard', 'online_booking', 'payments', 'esignatures', 'gps', 'analytics', 'api', 'whitelabel', 'license_ocr', 'insurance_ocr', 'inspection_ai'],
 }
 
 FIELD_ENCRYPTION_KEY = config('FIELD_ENCRYPTION_KEY', default='')
 
 OPENROUTER_DEFAULT_MODEL = 'anthropic/claude-3.5-sonnet'
+# OpenRouter-compatible API the OCR clients talk to; point it at
+# `manage.py run_openrouter_stub` to develop or load test without API spend
+OPENROUTER_BASE_URL = config('OPENROUTER_BASE_URL', default='https://openrouter.ai/api/v1')
+
+# Shared connection pool for OpenRouter requests (apps.automation.ocr.transport)
+OCR_HTTP_MAX_CONNECTIONS = config('OCR_HTTP_MAX_CONNECTIONS', default=20, cast=int)
+OCR_HTTP_MAX_KEEPALIVE_CONNECTIONS = config('OCR_HTTP_MAX_KEEPALIVE_CONNECTIONS', default=10, cast=int)
+OCR_HTTP_KEEPALIVE_EXPIRY = config('OCR_HTTP_KEEPALIVE_EXPIRY', default=30.0, cast=float)
+OCR_HTTP_CONNECT_TIMEOUT = config('OCR_HTTP_CONNECT_TIMEOUT', default=10.0, cast=float)
+OCR_HTTP2 = config('OCR_HTTP2', default=False, cast=bool)
+
+# Vision model calls a tenant may have in flight across all its condition
+# report analyses and damage comparisons (apps.automation.batch). The slots
+# are shared through OCR_RATE_LIMIT_URL; a slot a killed worker never
+# released is freed after OCR_BATCH_SLOT_TTL seconds
+OCR_BATCH_CONCURRENCY = config('OCR_BATCH_CONCURRENCY', default=4, cast=int)
+OCR_BATCH_SLOT_TTL = config('OCR_BATCH_SLOT_TTL', default=300, cast=int)
+# Damage photos sent together in one request when analysing a report; 1 sends
+# each photo on its own (see the benchmark_damage_packing command)
+OCR_DAMAGE_PACK_SIZE = config('OCR_DAMAGE_PACK_SIZE', default=1, cast=int)
+
+# Backfilling license OCR for existing customers (apps.automation.backfill):
+# customers per checkpointed batch, model calls in flight, how long one
+# Celery task works before queueing the rest, and how long a runner's claim
+# on a backfill lasts without being renewed (it is renewed every batch, so
+# it must outlast the slowest batch)
+OCR_BACKFILL_BATCH_SIZE = config('OCR_BACKFILL_BATCH_SIZE', default=25, cast=int)
+OCR_BACKFILL_CONCURRENCY = config('OCR_BACKFILL_CONCURRENCY', default=4, cast=int)
+OCR_BACKFILL_TASK_SECONDS = config('OCR_BACKFILL_TASK_SECONDS', default=240, cast=int)
+OCR_BACKFILL_LEASE_SECONDS = config('OCR_BACKFILL_LEASE_SECONDS', default=600, cast=int)
+
+# Dashboard photos taken at checkout and checkin (apps.automation.odometer):
+# readings below this confidence are ignored, a reading further than the
+# tolerance (miles) from the mileage staff entered is flagged rather than
+# applied, and so is a trip longer than the daily limit times rental days
+OCR_ODOMETER_MIN_CONFIDENCE = 0.8
+OCR_ODOMETER_TOLERANCE = 10
+OCR_ODOMETER_MAX_DAILY_MILES = 1000
+
+# Read the PDF417 barcode on the back of licenses before asking the model
+# (apps.automation.ocr.barcode); needs the optional zxing-cpp package
+OCR_LICENSE_BARCODE = config('OCR_LICENSE_BARCODE', default=True, cast=bool)
+
+# Fast, cheap vision model asked before the tenant's model for document OCR.
+# Its answer is kept when it validates and its confidence reaches the
+# parser's threshold, overridable here per document type, e.g.
+# {'license': 0.95}. Empty disables the cascade.
+OCR_CASCADE_MODEL = config('OCR_CASCADE_MODEL', default='anthropic/claude-3-haiku')
+OCR_CASCADE_THRESHOLDS = {}
+
+# Per-parser image preprocessing overrides: PreprocessConfig fields
+# (apps.automation.ocr.preprocess) keyed by license, insurance, damage or
+# dashboard, e.g. {'damage': {'max_dimension': 2560}}
+OCR_PREPROCESS = {}
+
+# Parsed OCR results keyed by image hash, parser, prompts and model
+# (apps.automation.integration.result_cache). Set OCR_RESULT_CACHE_URL to a
+# Redis URL to share the cache between web and Celery processes; Redis then
+# bounds its size through maxmemory with an LRU eviction policy.
+OCR_RESULT_CACHE_TTL = config('OCR_RESULT_CACHE_TTL', default=7 * 24 * 60 * 60, cast=int)
+OCR_RESULT_CACHE_MAX_ENTRIES = config('OCR_RESULT_CACHE_MAX_ENTRIES', default=1000, cast=int)
+OCR_RESULT_CACHE_URL = config('OCR_RESULT_CACHE_URL', default='')
+
+# Re-uploaded photos (apps.automation.dedup): a vehicle photo, condition
+# report photo of the same location or customer document whose perceptual
+# hashes differ from an earlier one's in at most
+# PHOTO_DUPLICATE_MAX_DISTANCE of 64 bits is a near-duplicate. 'keep'
+# stores it and notes the original, 'link' points a vehicle photo at the
+# original's file instead of storing another copy (condition report photos
+# always keep theirs), 'reject' refuses it.
+# Near-duplicates reuse the original's analysis or OCR result unless
+# PHOTO_DUPLICATE_REUSE_RESULTS is off.
+PHOTO_DUPLICATE_MAX_DISTANCE = config('PHOTO_DUPLICATE_MAX_DISTANCE', default=6, cast=int)
+PHOTO_DUPLICATE_POLICY = config('PHOTO_DUPLICATE_POLICY', default='keep')
+PHOTO_DUPLICATE_REUSE_RESULTS = config('PHOTO_DUPLICATE_REUSE_RESULTS', default=True, cast=bool)
+
+# Stored images (apps.tenants.images): uploads are auto-oriented, stripped
+# of EXIF/GPS metadata and capped at IMAGE_UPLOAD_MAX_DIMENSION pixels.
+# Resized WebP and JPEG/PNG copies are rendered at IMAGE_DERIVATIVE_SIZES
+# (longest side in pixels) for srcset, by a Celery task when
+# IMAGE_DERIVATIVES_ASYNC is on and inline otherwise.
+IMAGE_UPLOAD_MAX_DIMENSION = config('IMAGE_UPLOAD_MAX_DIMENSION', default=2560, cast=int)
+IMAGE_UPLOAD_QUALITY = config('IMAGE_UPLOAD_QUALITY', default=90, cast=int)
+IMAGE_DERIVATIVE_SIZES = {
+    'thumb': 320,
+    'card': 800,
+    'full': 1600,
+}
+IMAGE_DERIVATIVE_QUALITY = config('IMAGE_DERIVATIVE_QUALITY', default=82, cast=int)
+IMAGE_DERIVATIVES_ASYNC = config('IMAGE_DERIVATIVES_ASYNC', default=True, cast=bool)
+
+# Retries and circuit breaker for OpenRouter calls
+# (apps.automation.integration.resilience). Breaker state is kept in the
+# 'ocr' cache below and is shared by all processes when it is Redis.
+OCR_RETRY_ATTEMPTS = config('OCR_RETRY_ATTEMPTS', default=3, cast=int)
+OCR_RETRY_BASE_DELAY = config('OCR_RETRY_BASE_DELAY', default=1.0, cast=float)
+OCR_RETRY_MAX_DELAY = config('OCR_RETRY_MAX_DELAY', default=30.0, cast=float)
+OCR_BREAKER_FAILURE_THRESHOLD = config('OCR_BREAKER_FAILURE_THRESHOLD', default=5, cast=int)
+OCR_BREAKER_WINDOW = config('OCR_BREAKER_WINDOW', default=60.0, cast=float)
+OCR_BREAKER_RESET_TIMEOUT = config('OCR_BREAKER_RESET_TIMEOUT', default=30.0, cast=float)
+
+# Configured OpenRouter clients cached per tenant, key and model
+# (apps.automation.integration.clients); saving TenantSettings drops the
+# tenant's entries. A TTL of 0 builds a fresh client for every call.
+OCR_CLIENT_CACHE_SIZE = config('OCR_CLIENT_CACHE_SIZE', default=256, cast=int)
+OCR_CLIENT_CACHE_TTL = config('OCR_CLIENT_CACHE_TTL', default=300, cast=int)
+
+# Mark the static parser system prompts as cacheable prompt prefixes, so
+# providers that cache prompts bill repeated prefixes as cache reads
+# (tracked as tokens_cached in the OCR telemetry)
+OCR_PROMPT_CACHE = config('OCR_PROMPT_CACHE', default=True, cast=bool)
+
+# Per-call OCR telemetry (apps.automation.integration.telemetry): tokens,
+# cost, latency and outcome of every model call, rolled up into hourly
+# buckets for the tenant and platform usage dashboards. Records are written
+# by a Celery task when OCR_TELEMETRY_ASYNC_WRITES is on; the buckets are
+# kept after the records are pruned.
+OCR_TELEMETRY_ENABLED = config('OCR_TELEMETRY_ENABLED', default=True, cast=bool)
+OCR_TELEMETRY_ASYNC_WRITES = config('OCR_TELEMETRY_ASYNC_WRITES', default=True, cast=bool)
+OCR_CALL_RECORD_RETENTION_DAYS = config('OCR_CALL_RECORD_RETENTION_DAYS', default=30, cast=int)
+
+# USD per million (input, output[, cached input]) tokens, for estimating
+# spend when the API response carries no cost
+OCR_MODEL_PRICES = {
+    'anthropic/claude-3.5-sonnet': (3.0, 15.0, 0.3),
+    'anthropic/claude-3-opus': (15.0, 75.0, 1.5),
+    'anthropic/claude-3-haiku': (0.25, 1.25, 0.03),
+    'openai/gpt-4o-mini': (0.15, 0.6, 0.075),
+    'openai/gpt-4-vision-preview': (10.0, 30.0),
+    'google/gemini-flash-1.5': (0.075, 0.3),
+    'google/gemini-pro-vision': (0.5, 1.5),
+}
+
+# Per-tenant OCR rate limits by plan (apps.automation.integration.rate_limit):
+# a token bucket of `burst` requests refilled at `per_minute`, plus a cap on
+# billed requests per day (None for no cap). Buckets and usage counters live
+# in Redis at OCR_RATE_LIMIT_URL, or in process memory when it is empty.
+OCR_RATE_LIMIT_URL = config('OCR_RATE_LIMIT_URL', default=OCR_RESULT_CACHE_URL)
+OCR_RATE_LIMITS = {
+    'default': {'burst': 10, 'per_minute': 30, 'daily_cap': 100},
+    'professional': {'burst': 10, 'per_minute': 30, 'daily_cap': 100},
+    'business': {'burst': 20, 'per_minute': 60, 'daily_cap': 500},
+    'enterprise': {'burst': 40, 'per_minute': 120, 'daily_cap': None},
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'ocr': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': OCR_RESULT_CACHE_URL,
+    } if OCR_RESULT_CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ocr-results',
+        'OPTIONS': {'MAX_ENTRIES': OCR_RESULT_CACHE_MAX_ENTRIES},
+    },
+}
 
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'
@@ -19,6 +19,44 @@ def temp_media_root(settings, tmp_path):
         shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
 
 
+@pytest.fixture(autouse=True)
+def ocr_rate_limiter(settings):
+    """Give each test fresh in-memory OCR rate limit buckets."""
+    from apps.automation.integration.rate_limit import get_rate_limiter, reset_rate_limiter
+
+    settings.OCR_RATE_LIMIT_URL = ''
+    reset_rate_limiter()
+    yield get_rate_limiter()
+    reset_rate_limiter()
+
+
+@pytest.fixture(autouse=True)
+def ocr_client_factory():
+    """Don't carry cached tenant OpenRouter clients between tests."""
+    from apps.automation.integration.clients import get_client_factory, reset_client_factory
+
+    reset_client_factory()
+    yield get_client_factory()
+    reset_client_factory()
+
+
+@pytest.fixture(autouse=True)
+def ocr_telemetry(settings):
+    """Store OCR call records in place instead of through Celery."""
+    from apps.automation.integration import telemetry
+
+    settings.OCR_TELEMETRY_ASYNC_WRITES = False
+    telemetry._buffer.clear()
+    yield
+    telemetry._buffer.clear()
+
+
+@pytest.fixture(autouse=True)
+def image_derivatives_inline(settings):
+    """Render image derivatives in place instead of through Celery."""
+    settings.IMAGE_DERIVATIVES_ASYNC = False
+
+
 class TenantAPIClient(APIClient):
     def __init__(self, tenant=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -136,3 +174,30 @@ def reservation(db, tenant, vehicle, customer):
         daily_rate=Decimal('50.00'),
         total_amount=Decimal('100.00'),
     )
+
+
+@pytest.fixture
+def scene_jpeg():
+    """Build JPEGs of a simple scene; variants are different pictures."""
+    def make(size=(1200, 800), variant=0, orientation=None, quality=90):
+        import io
+        from PIL import Image, ImageDraw
+
+        image = Image.new('RGB', (1200, 800), 'white')
+        draw = ImageDraw.Draw(image)
+        if variant == 0:
+            draw.rectangle((100, 100, 600, 500), fill='red')
+            draw.ellipse((700, 200, 1100, 700), fill='blue')
+        else:
+            draw.rectangle((600, 300, 1100, 700), fill='green')
+        image = image.resize(size)
+        exif = Image.Exif()
+        if orientation == 6:
+            # Stored rotated, displayed upright
+            image = image.rotate(90, expand=True)
+            exif[0x0112] = orientation
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=quality, exif=exif.tobytes())
+        return buffer.getvalue()
+
+    return make
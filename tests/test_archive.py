@@ -0,0 +1,222 @@
+"""Tests for audit log partitioning helpers and the cold archive."""
+import pytest
+from datetime import date, datetime, timezone as dt_timezone
+
+
+NOW = datetime(2025, 6, 15, 12, tzinfo=dt_timezone.utc)
+
+
+def create_log(tenant, user, timestamp, action='create', object_id=1):
+    from apps.tenants.models import ActivityLog
+    log = ActivityLog.objects.create(
+        tenant=tenant, user=user, action=action,
+        model_name='Vehicle', object_id=object_id, object_repr=f'Vehicle {object_id}',
+    )
+    ActivityLog.objects.filter(pk=log.pk).update(timestamp=timestamp)
+    log.refresh_from_db()
+    return log
+
+
+class TestMonthHelpers:
+    def test_add_months_crosses_years(self):
+        from apps.tenants.archive import add_months
+        assert add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+        assert add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+
+    def test_month_bounds_are_half_open_utc(self):
+        from apps.tenants.archive import month_bounds
+        start, end = month_bounds(date(2024, 12, 1))
+        assert start == datetime(2024, 12, 1, tzinfo=dt_timezone.utc)
+        assert end == datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+    def test_retention_cutoff(self):
+        from apps.tenants.archive import retention_cutoff
+        assert retention_cutoff(3, now=NOW) == date(2025, 3, 1)
+
+
+@pytest.mark.django_db
+class TestArchiveOldLogs:
+    def test_old_months_move_to_archive(self, tenant, user, temp_media_root):
+        from apps.tenants.archive import archive_old_logs
+        from apps.tenants.models import ActivityLog, AuditLogArchive
+
+        old = create_log(tenant, user, datetime(2025, 1, 20, tzinfo=dt_timezone.utc))
+        recent = create_log(tenant, user, datetime(2025, 5, 2, tzinfo=dt_timezone.utc))
+
+        summary = archive_old_logs(3, now=NOW)
+
+        assert summary['tenants.ActivityLog'] == [(date(2025, 1, 1), 1), (date(2025, 2, 1), 0)]
+        assert list(ActivityLog.objects.values_list('pk', flat=True)) == [recent.pk]
+
+        archive = AuditLogArchive.objects.get(model_label='tenants.ActivityLog')
+        assert archive.tenant == tenant
+        assert archive.month == date(2025, 1, 1)
+        assert archive.row_count == 1
+        assert (temp_media_root / archive.file_path).exists()
+        assert old.pk not in ActivityLog.objects.values_list('pk', flat=True)
+
+    def test_late_rows_are_merged_into_archived_month(self, tenant, user, temp_media_root):
+        from apps.tenants.archive import archive_old_logs, read_archived_logs
+        from apps.tenants.models import ActivityLog, AuditLogArchive
+
+        first = create_log(tenant, user, datetime(2025, 1, 20, tzinfo=dt_timezone.utc))
+        archive_old_logs(3, now=NOW)
+        old_path = AuditLogArchive.objects.get().file_path
+
+        late = create_log(tenant, user, datetime(2025, 1, 25, tzinfo=dt_timezone.utc), object_id=2)
+        archive_old_logs(3, now=NOW)
+
+        archive = AuditLogArchive.objects.get()
+        assert archive.row_count == 2
+        assert not (temp_media_root / old_path).exists()
+        assert sorted(a.pk for a in read_archived_logs(ActivityLog)) == [first.pk, late.pk]
+
+    def test_rows_written_during_export_stay_live(self, tenant, user, temp_media_root):
+        from unittest.mock import patch
+        from apps.tenants import archive
+        from apps.tenants.models import ActivityLog
+
+        exported = create_log(tenant, user, datetime(2025, 1, 20, tzinfo=dt_timezone.utc))
+        write_archive = archive._write_archive
+
+        def write_then_log(*args):
+            result = write_archive(*args)
+            create_log(tenant, user, datetime(2025, 1, 21, tzinfo=dt_timezone.utc), object_id=2)
+            return result
+
+        with patch('apps.tenants.archive._write_archive', side_effect=write_then_log):
+            assert archive.archive_month(ActivityLog, date(2025, 1, 1)) == 1
+
+        assert exported.pk not in ActivityLog.objects.values_list('pk', flat=True)
+        assert ActivityLog.objects.filter(object_id=2).exists()
+
+    def test_dry_run_changes_nothing(self, tenant, user, temp_media_root):
+        from apps.tenants.archive import archive_old_logs
+        from apps.tenants.models import ActivityLog, AuditLogArchive
+
+        create_log(tenant, user, datetime(2025, 1, 20, tzinfo=dt_timezone.utc))
+
+        summary = archive_old_logs(3, now=NOW, dry_run=True)
+
+        assert summary['tenants.ActivityLog'][0] == (date(2025, 1, 1), 1)
+        assert ActivityLog.objects.count() == 1
+        assert not AuditLogArchive.objects.exists()
+
+    def test_platform_logs_are_archived(self, user, temp_media_root):
+        from apps.platform_admin.models import PlatformAuditLog
+        from apps.tenants.archive import archive_old_logs, read_archived_logs
+
+        log = PlatformAuditLog.objects.create(
+            admin_user=user, action='settings_update', description='Changed',
+        )
+        PlatformAuditLog.objects.filter(pk=log.pk).update(
+            timestamp=datetime(2024, 11, 3, tzinfo=dt_timezone.utc)
+        )
+
+        archive_old_logs(3, now=NOW)
+
+        assert not PlatformAuditLog.objects.exists()
+        archived = read_archived_logs(PlatformAuditLog, select_related=('admin_user',))
+        assert [(a.pk, a.description, a.admin_user) for a in archived] == [(log.pk, 'Changed', user)]
+
+
+@pytest.mark.django_db
+class TestReadArchivedLogs:
+    def test_reads_range_and_filters(self, tenant, user, temp_media_root):
+        from apps.tenants.archive import archive_old_logs, read_archived_logs
+        from apps.tenants.models import ActivityLog
+
+        first = create_log(tenant, user, datetime(2025, 1, 5, tzinfo=dt_timezone.utc))
+        create_log(tenant, user, datetime(2025, 1, 25, tzinfo=dt_timezone.utc), action='delete')
+        create_log(tenant, user, datetime(2025, 2, 10, tzinfo=dt_timezone.utc))
+        archive_old_logs(3, now=NOW)
+
+        archived = read_archived_logs(
+            ActivityLog,
+            datetime(2025, 1, 1, tzinfo=dt_timezone.utc),
+            datetime(2025, 2, 1, tzinfo=dt_timezone.utc),
+            tenant=tenant,
+            filters={'action': 'create'},
+            select_related=('user',),
+        )
+
+        assert [log.pk for log in archived] == [first.pk]
+        assert archived[0].user == user
+        assert archived[0].timestamp == first.timestamp
+
+    def test_other_tenants_archive_is_not_read(self, tenant, user, temp_media_root):
+        from apps.tenants.archive import archive_old_logs, read_archived_logs
+        from apps.tenants.models import ActivityLog, Tenant
+
+        other = Tenant.objects.create(name='Other', slug='other', owner=user, business_name='Other')
+        create_log(other, user, datetime(2025, 1, 5, tzinfo=dt_timezone.utc))
+        archive_old_logs(3, now=NOW)
+
+        assert read_archived_logs(ActivityLog, tenant=tenant) == []
+        assert len(read_archived_logs(ActivityLog, tenant=other)) == 1
+
+
+@pytest.mark.django_db
+class TestArchiveAwarePagination:
+    def test_pages_continue_from_live_rows_into_archive(self, tenant, user, temp_media_root):
+        from apps.tenants.archive import archive_old_logs, read_archived_logs
+        from apps.tenants.models import ActivityLog
+        from apps.tenants.pagination import KeysetPaginator
+
+        for day in range(1, 4):
+            create_log(tenant, user, datetime(2025, 1, day, tzinfo=dt_timezone.utc), object_id=day)
+        archive_old_logs(3, now=NOW)
+        for day in range(1, 4):
+            create_log(tenant, user, datetime(2025, 5, day, tzinfo=dt_timezone.utc), object_id=10 + day)
+
+        paginator = KeysetPaginator(
+            ActivityLog.objects.filter(tenant=tenant), 2,
+            ordering=('-timestamp', '-id'),
+            extra_rows=read_archived_logs(ActivityLog, tenant=tenant),
+        )
+
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+
+        assert [[log.object_id for log in page] for page in pages] == [[13, 12], [11, 3], [2, 1]]
+
+        back = paginator.get_page(pages[-1].previous_cursor)
+        assert [log.object_id for log in back] == [11, 3]
+
+    def test_activity_view_reads_archive_for_old_range(self, client, tenant_user, temp_media_root):
+        from apps.tenants.archive import archive_old_logs
+
+        old = create_log(
+            tenant_user.tenant, tenant_user.user, datetime(2024, 1, 10, 18, tzinfo=dt_timezone.utc)
+        )
+        archive_old_logs(3)
+
+        client.force_login(tenant_user.user)
+        response = client.get('/dashboard/activity/', {'date_from': '2024-01-10', 'date_to': '2024-01-10'})
+
+        assert response.status_code == 200
+        assert [log.pk for log in response.context['logs']] == [old.pk]
+
+        response = client.get('/dashboard/activity/')
+        assert len(response.context['logs']) == 0
+
+
+@pytest.mark.django_db
+class TestArchiveCommands:
+    def test_archive_command_reports_months(self, tenant, user, temp_media_root):
+        from io import StringIO
+        from django.core.management import call_command
+
+        create_log(tenant, user, datetime(2020, 3, 5, tzinfo=dt_timezone.utc))
+        out = StringIO()
+        call_command('archive_audit_logs', '--months', '12', '--dry-run', stdout=out)
+
+        assert 'tenants.ActivityLog: Would archive 1 rows for 2020-03' in out.getvalue()
+
+    def test_partition_command_requires_postgres(self):
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        with pytest.raises(CommandError):
+            call_command('partition_audit_logs')
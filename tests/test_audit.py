@@ -465,3 +465,83 @@ class TestPhotoUploadAuditLogging:
         assert log is not None, "Photo delete should create an ActivityLog entry"
         assert log.user == user
         assert log.action == 'delete'
+
+
+@pytest.mark.django_db
+class TestBufferedActivityLog:
+    """Tests for request-scoped batching of activity log writes."""
+
+    def test_buffered_entries_written_in_one_query(
+        self, tenant, user, vehicle, django_capture_on_commit_callbacks, django_assert_num_queries
+    ):
+        from apps.tenants.models import ActivityLog, log_activity
+        from apps.tenants.audit import buffered_activity_log
+
+        with django_capture_on_commit_callbacks(execute=True):
+            with buffered_activity_log() as buffer:
+                for _ in range(3):
+                    log_activity(tenant=tenant, user=user, action='upload', instance=vehicle)
+                assert ActivityLog.objects.count() == 0
+
+        # Callbacks ran after the buffer closed, so entries were written then
+        assert ActivityLog.objects.filter(action='upload').count() == 3
+
+        with buffered_activity_log() as buffer:
+            for _ in range(3):
+                buffer.add(ActivityLog(
+                    tenant=tenant, user=user, action='create', model_name='Vehicle',
+                    object_id=vehicle.pk, object_repr=str(vehicle),
+                ))
+            with django_assert_num_queries(1):
+                buffer.flush()
+
+        assert ActivityLog.objects.filter(action='create').count() == 3
+
+    def test_rolled_back_entries_are_discarded(
+        self, tenant, user, vehicle, django_capture_on_commit_callbacks
+    ):
+        from django.db import transaction
+        from apps.tenants.models import ActivityLog, log_activity
+        from apps.tenants.audit import buffered_activity_log
+
+        with django_capture_on_commit_callbacks(execute=True):
+            with buffered_activity_log():
+                log_activity(tenant=tenant, user=user, action='create', instance=vehicle)
+                try:
+                    with transaction.atomic():
+                        log_activity(tenant=tenant, user=user, action='delete', instance=vehicle)
+                        raise RuntimeError('rollback')
+                except RuntimeError:
+                    pass
+
+        actions = list(ActivityLog.objects.values_list('action', flat=True))
+        assert actions == ['create']
+
+    def test_log_activity_without_buffer_writes_immediately(self, tenant, user, vehicle):
+        from apps.tenants.models import log_activity
+
+        log = log_activity(tenant=tenant, user=user, action='create', instance=vehicle)
+        assert log.pk is not None
+
+    def test_async_mode_sends_batch_to_celery(self, settings, tenant, user, vehicle):
+        from unittest.mock import patch
+        from apps.tenants.models import ActivityLog
+        from apps.tenants.audit import ActivityLogBuffer
+        from apps.tenants.tasks import write_activity_log_batch
+
+        settings.ACTIVITY_LOG_ASYNC_WRITES = True
+        buffer = ActivityLogBuffer()
+        buffer.add(ActivityLog(
+            tenant=tenant, user=user, action='update', model_name='Vehicle',
+            object_id=vehicle.pk, object_repr=str(vehicle), timestamp=timezone.now(),
+        ))
+
+        with patch.object(write_activity_log_batch, 'delay') as mock_delay:
+            buffer.flush()
+
+        payload = mock_delay.call_args[0][0]
+        assert payload[0]['action'] == 'update'
+        assert payload[0]['tenant_id'] == tenant.pk
+
+        assert write_activity_log_batch(payload) == 1
+        assert ActivityLog.objects.filter(action='update').count() == 1
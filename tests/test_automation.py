@@ -6,6 +6,7 @@ from apps.automation.ocr.utils.encryption import (
     encrypt_api_key, decrypt_api_key, reset_encryption_key_cache
 )
 from apps.automation.integration.feature_check import tenant_has_feature, check_ocr_access
+from apps.automation.integration.rate_limit import flush_usage
 
 
 @pytest.fixture(autouse=True)
@@ -170,6 +171,7 @@ class TestTenantSettings:
             ocr_requests_reset_at=date.today() - timedelta(days=1)
         )
         assert tenant_settings.can_make_ocr_request()
+        flush_usage()
         tenant_settings.refresh_from_db()
         assert tenant_settings.ocr_requests_today == 0
         assert tenant_settings.ocr_requests_reset_at == date.today()
@@ -195,6 +197,7 @@ class TestTenantSettings:
             ocr_requests_reset_at=date.today()
         )
         tenant_settings.increment_ocr_requests()
+        flush_usage()
         tenant_settings.refresh_from_db()
         assert tenant_settings.ocr_requests_today == 1
 
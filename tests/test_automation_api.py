@@ -106,6 +106,27 @@ def mock_insurance_result():
     )
 
 
+@pytest.fixture
+def run_jobs_inline(temp_media_root, django_capture_on_commit_callbacks):
+    """Return a context manager running queued jobs when the request commits."""
+    from contextlib import contextmanager
+    from apps.automation.tasks import process_inspection_analysis, process_ocr_job
+
+    @contextmanager
+    def inline():
+        with patch.object(process_ocr_job, 'delay', side_effect=process_ocr_job), \
+                patch.object(process_inspection_analysis, 'delay', side_effect=process_inspection_analysis), \
+                django_capture_on_commit_callbacks(execute=True):
+            yield
+
+    return inline
+
+
+def poll_job(client, response):
+    assert response.status_code == 202
+    return client.get(response.data['status_url'])
+
+
 @pytest.fixture
 def test_image():
     image = io.BytesIO()
@@ -140,17 +161,20 @@ class TestParseLicenseView:
 
     def test_parse_license_success(
         self, authenticated_client, professional_tenant,
-        test_image, mock_license_result
+        test_image, mock_license_result, run_jobs_inline
     ):
-        mock_parser = MagicMock()
+        mock_parser = MagicMock(last_model=None, last_tier=None)
         mock_parser.parse.return_value = mock_license_result
 
         with patch('apps.automation.ocr.parsers.LicenseParser') as mock_parser_class:
             mock_parser_class.return_value = mock_parser
             url = reverse('automation:parse-license')
-            response = authenticated_client.post(url, {'image': test_image}, format='multipart')
+            with run_jobs_inline():
+                response = authenticated_client.post(url, {'image': test_image}, format='multipart')
 
+        response = poll_job(authenticated_client, response)
         assert response.status_code == 200
+        assert response.data['status'] == 'completed'
         assert response.data['success'] is True
         assert response.data['data']['first_name'] == 'John'
         assert response.data['data']['last_name'] == 'Smith'
@@ -159,33 +183,64 @@ class TestParseLicenseView:
 
     def test_parse_license_with_customer_id(
         self, authenticated_client, professional_tenant,
-        customer, test_image, mock_license_result
+        customer, test_image, mock_license_result, run_jobs_inline
     ):
-        mock_parser = MagicMock()
+        mock_parser = MagicMock(last_model=None, last_tier=None)
         mock_parser.parse.return_value = mock_license_result
 
         with patch('apps.automation.ocr.parsers.LicenseParser') as mock_parser_class:
             mock_parser_class.return_value = mock_parser
             url = reverse('automation:parse-license-customer', args=[customer.id])
-            response = authenticated_client.post(url, {'image': test_image}, format='multipart')
+            with run_jobs_inline():
+                response = authenticated_client.post(url, {'image': test_image}, format='multipart')
 
-        assert response.status_code == 200
+        assert response.status_code == 202
         assert response.data['customer_id'] == customer.id
+        assert poll_job(authenticated_client, response).data['customer_id'] == customer.id
 
     def test_parse_license_ocr_failure(
-        self, authenticated_client, professional_tenant, test_image
+        self, authenticated_client, professional_tenant, test_image, run_jobs_inline
     ):
-        mock_parser = MagicMock()
+        mock_parser = MagicMock(last_model=None, last_tier=None)
         mock_parser.parse.side_effect = Exception('OCR service error')
 
         with patch('apps.automation.ocr.parsers.LicenseParser') as mock_parser_class:
             mock_parser_class.return_value = mock_parser
             url = reverse('automation:parse-license')
-            response = authenticated_client.post(url, {'image': test_image}, format='multipart')
+            with run_jobs_inline():
+                response = authenticated_client.post(url, {'image': test_image}, format='multipart')
 
-        assert response.status_code == 500
+        response = poll_job(authenticated_client, response)
+        assert response.data['status'] == 'failed'
+        assert response.data['success'] is False
         assert 'OCR processing failed' in response.data['error']
 
+    def test_parse_license_queues_job_without_calling_model(
+        self, authenticated_client, professional_tenant, test_image,
+        temp_media_root, django_capture_on_commit_callbacks
+    ):
+        from apps.automation.models import OCRJob
+        from apps.automation.tasks import process_ocr_job
+
+        with patch('apps.automation.ocr.parsers.LicenseParser') as mock_parser_class, \
+                patch.object(process_ocr_job, 'delay') as mock_delay:
+            url = reverse('automation:parse-license')
+            with django_capture_on_commit_callbacks(execute=True):
+                response = authenticated_client.post(url, {'image': test_image}, format='multipart')
+
+        assert response.status_code == 202
+        assert response['Location'].endswith(f"/jobs/{response.data['job_id']}/")
+        mock_parser_class.assert_not_called()
+        mock_delay.assert_called_once_with(response.data['job_id'])
+
+        job = OCRJob.objects.get(pk=response.data['job_id'])
+        assert job.status == 'pending'
+        assert job.image_media_type == 'image/png'
+
+        response = authenticated_client.get(response.data['status_url'])
+        assert response.data['status'] == 'pending'
+        assert response['Retry-After'] == '2'
+
     def test_parse_license_rate_limited(
         self, authenticated_client, professional_tenant, test_image
     ):
@@ -227,16 +282,18 @@ class TestParseInsuranceView:
 
     def test_parse_insurance_success(
         self, authenticated_client, professional_tenant,
-        test_image, mock_insurance_result
+        test_image, mock_insurance_result, run_jobs_inline
     ):
-        mock_parser = MagicMock()
+        mock_parser = MagicMock(last_model=None, last_tier=None)
         mock_parser.parse.return_value = mock_insurance_result
 
         with patch('apps.automation.ocr.parsers.InsuranceParser') as mock_parser_class:
             mock_parser_class.return_value = mock_parser
             url = reverse('automation:parse-insurance')
-            response = authenticated_client.post(url, {'image': test_image}, format='multipart')
+            with run_jobs_inline():
+                response = authenticated_client.post(url, {'image': test_image}, format='multipart')
 
+        response = poll_job(authenticated_client, response)
         assert response.status_code == 200
         assert response.data['success'] is True
         assert response.data['data']['company_name'] == 'State Farm'
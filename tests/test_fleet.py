@@ -320,3 +320,126 @@ class TestVehicleCategoryAPI:
         }
         response = client.post('/api/fleet/categories/', data)
         assert response.status_code == 201
+
+
+class TestVehiclePhotoDuplicates:
+    def _upload(self, client, vehicle, data, name='photo.jpg'):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        return client.post(
+            f'/api/fleet/vehicles/{vehicle.pk}/upload_photo/',
+            {'image': SimpleUploadedFile(name, data, content_type='image/jpeg')},
+            format='multipart',
+        )
+
+    def test_near_duplicates_are_linked_to_the_original_file(
+        self, tenant_client, vehicle, temp_media_root, settings, scene_jpeg
+    ):
+        from apps.fleet.models import VehiclePhoto
+
+        settings.PHOTO_DUPLICATE_POLICY = 'link'
+        client, tenant = tenant_client
+        first = self._upload(client, vehicle, scene_jpeg())
+        second = self._upload(client, vehicle, scene_jpeg(size=(600, 400), quality=60), name='resent.jpg')
+        other = self._upload(client, vehicle, scene_jpeg(variant=1))
+
+        assert [r.status_code for r in (first, second, other)] == [201, 201, 201]
+        original, duplicate, unrelated = (VehiclePhoto.objects.get(pk=r.data['id']) for r in (first, second, other))
+        assert duplicate.duplicate_of == original
+        assert duplicate.image.name == original.image.name
+        assert second.data['duplicate_of'] == original.pk
+        assert unrelated.duplicate_of is None
+        assert original.phash and VehiclePhoto.objects.filter(vehicle=vehicle, phash=original.phash).count() == 2
+
+    def test_policies_keep_or_reject_near_duplicates(
+        self, tenant_client, vehicle, temp_media_root, settings, scene_jpeg
+    ):
+        from apps.fleet.models import VehiclePhoto
+
+        client, tenant = tenant_client
+        original = self._upload(client, vehicle, scene_jpeg()).data['id']
+
+        settings.PHOTO_DUPLICATE_POLICY = 'keep'
+        kept = VehiclePhoto.objects.get(pk=self._upload(client, vehicle, scene_jpeg(quality=70)).data['id'])
+        assert kept.duplicate_of_id == original
+        assert kept.image.name != VehiclePhoto.objects.get(pk=original).image.name
+
+        settings.PHOTO_DUPLICATE_POLICY = 'reject'
+        response = self._upload(client, vehicle, scene_jpeg(quality=60))
+        assert response.status_code == 409
+        assert response.data['duplicate_of'] == original
+        assert VehiclePhoto.objects.filter(vehicle=vehicle).count() == 2
+
+
+@pytest.mark.django_db
+class TestVehiclePhotoDerivatives:
+    def _upload(self, client, vehicle, data, **fields):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        return client.post(
+            f'/api/fleet/vehicles/{vehicle.pk}/upload_photo/',
+            {'image': SimpleUploadedFile('photo.jpg', data, content_type='image/jpeg'), **fields},
+            format='multipart',
+        )
+
+    def test_upload_is_normalized_and_resized(self, tenant_client, vehicle, temp_media_root, settings, scene_jpeg):
+        from PIL import Image
+        from apps.fleet.models import VehiclePhoto
+
+        settings.IMAGE_UPLOAD_MAX_DIMENSION = 1000
+        client, tenant = tenant_client
+        response = self._upload(client, vehicle, scene_jpeg(size=(1500, 1000), orientation=6))
+
+        assert response.status_code == 201
+        photo = VehiclePhoto.objects.get(pk=response.data['id'])
+        with Image.open(photo.image.path) as stored:
+            # Rotated upright, capped and without the EXIF block
+            assert stored.size == (1000, 667)
+            assert len(stored.getexif()) == 0
+
+        derivatives = photo.derivatives['image']
+        assert derivatives['source'] == photo.image.name
+        assert {name: (size['width'], size['height']) for name, size in derivatives['sizes'].items()} == {
+            'thumb': (320, 213), 'card': (800, 534), 'full': (1000, 667),
+        }
+        for size in derivatives['sizes'].values():
+            assert (temp_media_root / size['image/webp']).exists()
+            assert (temp_media_root / size['image/jpeg']).exists()
+        assert response.data['derivatives']['card']['image/webp'].endswith('_card.webp')
+
+    def test_list_serves_card_with_srcset(self, tenant_client, vehicle, temp_media_root, scene_jpeg):
+        client, tenant = tenant_client
+        self._upload(client, vehicle, scene_jpeg(), is_primary='true')
+
+        [listed] = client.get('/api/fleet/vehicles/').data['results']
+        assert listed['primary_photo'].startswith('http://')
+        assert listed['primary_photo'].endswith('_card.jpg')
+        srcset = listed['primary_photo_srcset']
+        assert set(srcset) == {'image/webp', 'image/jpeg'}
+        assert [candidate.split()[-1] for candidate in srcset['image/webp'].split(', ')] == ['320w', '800w', '1200w']
+
+    def test_derivatives_are_generated_after_commit(
+        self, vehicle, temp_media_root, settings, scene_jpeg, django_capture_on_commit_callbacks
+    ):
+        from unittest.mock import patch
+        from django.core.files.base import ContentFile
+        from apps.fleet.models import VehiclePhoto
+        from apps.tenants.tasks import generate_image_derivatives
+
+        settings.IMAGE_DERIVATIVES_ASYNC = True
+        with patch('apps.tenants.tasks.generate_image_derivatives.delay') as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                photo = VehiclePhoto.objects.create(vehicle=vehicle, image=ContentFile(scene_jpeg(), name='car.jpg'))
+        delay.assert_called_once_with('fleet.VehiclePhoto', photo.pk, ['image'])
+        assert photo.derivatives == {}
+
+        generate_image_derivatives('fleet.VehiclePhoto', photo.pk, ['image'])
+        photo.refresh_from_db()
+        assert set(photo.derivatives['image']['sizes']) == {'thumb', 'card', 'full'}
+
+        # A photo sharing the file reuses the stored derivatives
+        linked = VehiclePhoto.objects.create(vehicle=vehicle, image=photo.image.name)
+        generate_image_derivatives('fleet.VehiclePhoto', linked.pk, ['image'])
+        linked.refresh_from_db()
+        assert linked.derivatives == photo.derivatives
+
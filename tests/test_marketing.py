@@ -18,14 +18,16 @@ def owner(db):
 
 
 @pytest.fixture
-def tenant(db, owner):
-    return Tenant.objects.create(
-        name='Test Tenant',
-        slug='test-tenant',
-        owner=owner,
-        business_name='Austin Car Rentals',
-        business_email='test@business.com',
-    )
+def tenant(db, owner, django_capture_on_commit_callbacks):
+    # Index the tenant in the rental directory, which happens on commit
+    with django_capture_on_commit_callbacks(execute=True):
+        return Tenant.objects.create(
+            name='Test Tenant',
+            slug='test-tenant',
+            owner=owner,
+            business_name='Austin Car Rentals',
+            business_email='test@business.com',
+        )
 
 
 @pytest.mark.django_db
@@ -93,10 +93,19 @@ class TestOpenRouterClient:
         assert payload['temperature'] == 0.1
         assert len(payload['messages']) == 2
         assert payload['messages'][0]['role'] == 'system'
-        assert payload['messages'][0]['content'] == 'You are an OCR expert.'
+        assert payload['messages'][0]['content'] == [
+            {'type': 'text', 'text': 'You are an OCR expert.', 'cache_control': {'type': 'ephemeral'}},
+        ]
         assert payload['messages'][1]['role'] == 'user'
         assert len(payload['messages'][1]['content']) == 2
 
+    def test_system_prompt_caching_can_be_turned_off(self):
+        client = OpenRouterClient(api_key='test-api-key', prompt_cache=False)
+        request = VisionRequest(system_prompt='System', user_prompt='User', image_data=b'image')
+        assert client._build_vision_payload(request)['messages'][0]['content'] == 'System'
+        payload = client._build_multi_image_payload('System', 'User', [{'data': b'image'}], model='m')
+        assert payload['messages'][0]['content'] == 'System'
+
     @patch('apps.automation.ocr.client.httpx.Client')
     def test_send_vision_request_success(self, mock_client_class):
         mock_response = Mock()
@@ -387,6 +396,7 @@ class TestMultiImageSupport:
         assert payload['temperature'] == 0.1
         assert len(payload['messages']) == 2
         assert payload['messages'][0]['role'] == 'system'
+        assert payload['messages'][0]['content'][0]['cache_control'] == {'type': 'ephemeral'}
         assert payload['messages'][1]['role'] == 'user'
         content = payload['messages'][1]['content']
         assert len(content) == 3
@@ -871,3 +881,1134 @@ class TestComparisonSchemaValidation:
 
         with pytest.raises(Exception):
             DamageDetectionResponse(confidence=-0.1)
+
+
+class TestImageHashes:
+    """Perceptual hashes used to spot re-uploaded photos."""
+
+    def test_resized_recompressed_and_rotated_copies_match(self, scene_jpeg):
+        from apps.automation.ocr.imagehash import compute_image_hashes
+
+        original = compute_image_hashes(scene_jpeg())
+        assert len(original.average) == len(original.perceptual) == 16
+        for copy in (scene_jpeg(size=(600, 400), quality=50), scene_jpeg(orientation=6)):
+            assert original.matches(compute_image_hashes(copy))
+        assert not original.matches(compute_image_hashes(scene_jpeg(variant=1)))
+
+    def test_distance_and_undecodable_data(self):
+        from apps.automation.ocr.imagehash import ImageHashes, compute_image_hashes, hamming_distance
+
+        assert hamming_distance('ff00', 'f00f') == 8
+        first = ImageHashes(average='0' * 16, perceptual='0' * 16)
+        second = ImageHashes(average='0' * 15 + '1', perceptual='0' * 14 + '77')
+        assert first.distance(second) == 6
+        assert first.matches(second, max_distance=6)
+        assert not first.matches(second, max_distance=5)
+        assert compute_image_hashes(b'not an image') is None
+
+
+class TestSharedTransport:
+    """Connection reuse through the process-wide pooled transport."""
+
+    def _request(self):
+        return VisionRequest(system_prompt='System', user_prompt='User', image_data=b'image')
+
+    def test_clients_share_connections(self):
+        from apps.automation.ocr.testing import StubOpenRouterServer
+
+        with StubOpenRouterServer() as stub:
+            first = OpenRouterClient(api_key='tenant-a', api_url=stub.url)
+            second = OpenRouterClient(api_key='tenant-b', api_url=stub.url)
+            for _ in range(3):
+                first.send_vision_request(self._request())
+                second.send_vision_request(self._request())
+
+            assert stub.request_count == 6
+            assert stub.connection_count == 1
+
+    def test_async_requests_reuse_connections_within_a_loop(self):
+        import asyncio
+        from apps.automation.ocr.testing import StubOpenRouterServer
+
+        async def run(client):
+            for _ in range(3):
+                response = await client.send_vision_request_async(self._request())
+                assert response.content == '{"success": true}'
+
+        with StubOpenRouterServer() as stub:
+            asyncio.run(run(OpenRouterClient(api_key='key', api_url=stub.url)))
+            assert stub.request_count == 3
+            assert stub.connection_count == 1
+
+    def test_configure_transport_rebuilds_pool(self):
+        from apps.automation.ocr.testing import StubOpenRouterServer
+        from apps.automation.ocr.transport import (
+            TransportConfig, configure_transport, get_transport_config,
+        )
+
+        original = get_transport_config()
+        try:
+            with StubOpenRouterServer() as stub:
+                client = OpenRouterClient(api_key='key', api_url=stub.url)
+                client.send_vision_request(self._request())
+                configure_transport(TransportConfig(max_connections=2, keepalive_expiry=5.0))
+                client.send_vision_request(self._request())
+
+                assert get_transport_config().max_connections == 2
+                assert stub.connection_count == 2
+        finally:
+            configure_transport(original)
+
+    def test_http2_without_h2_falls_back(self):
+        from apps.automation.ocr.transport import TransportConfig, _transport_kwargs
+
+        with patch('apps.automation.ocr.transport._http2_available', return_value=False):
+            assert _transport_kwargs(TransportConfig(http2=True))['http2'] is False
+
+    def test_connect_timeout_is_capped_by_request_timeout(self):
+        from apps.automation.ocr.transport import TransportConfig
+
+        timeout = TransportConfig(connect_timeout=10.0).timeout(5.0)
+        assert timeout.connect == 5.0
+        assert timeout.read == 5.0
+
+
+class TestResultCache:
+    """Content-addressed caching of parsed results."""
+
+    def _client(self, content):
+        client = Mock(model='anthropic/claude-3.5-sonnet')
+        client.send_vision_request.return_value = VisionResponse(
+            content=content, model=client.model, usage={}, raw_response={},
+        )
+        client.send_multi_image_request.return_value = client.send_vision_request.return_value
+        client.extract_json_from_response.side_effect = json.loads
+        return client
+
+    def test_lru_evicts_oldest_and_expires_entries(self):
+        from apps.automation.ocr.cache import InMemoryResultCache
+
+        cache = InMemoryResultCache(max_entries=2, ttl=60)
+        cache.set('a', {'n': 1})
+        cache.set('b', {'n': 2})
+        cache.get('a')
+        cache.set('c', {'n': 3})
+        assert cache.get('b') is None
+        assert cache.get('a') == {'n': 1}
+        assert len(cache) == 2
+
+        with patch('apps.automation.ocr.cache.time.monotonic', return_value=10 ** 9):
+            assert cache.get('a') is None
+
+    def test_repeat_parse_hits_cache(self):
+        from apps.automation.ocr.cache import InMemoryResultCache
+
+        client = self._client('{"company_name": "State Farm", "confidence": 0.9}')
+        parser = InsuranceParser(client, cache=InMemoryResultCache())
+
+        first = parser.parse(b'card')
+        assert parser.last_cache_hit is False
+        second = parser.parse(b'card')
+        assert parser.last_cache_hit is True
+        assert second == first
+        assert client.send_vision_request.call_count == 1
+
+        parser.parse(b'other card')
+        parser.parse(b'card', model='openai/gpt-4o')
+        assert client.send_vision_request.call_count == 3
+
+    def test_prompt_changes_and_namespaces_miss(self):
+        from apps.automation.ocr.cache import InMemoryResultCache
+
+        store = InMemoryResultCache()
+        client = self._client('{"damages": [], "confidence": 0.8}')
+        DamageParser(client, location='front', cache=store).parse(b'photo')
+        DamageParser(client, location='back', cache=store).parse(b'photo')
+        DamageParser(client, location='front', cache=store.for_namespace('tenant-2')).parse(b'photo')
+        assert client.send_vision_request.call_count == 3
+
+        DamageParser(client, location='front', cache=store).parse(b'photo')
+        assert client.send_vision_request.call_count == 3
+
+    def test_comparison_is_keyed_on_both_images(self):
+        from apps.automation.ocr.cache import InMemoryResultCache
+
+        client = self._client('{"new_damages": [], "confidence": 0.7}')
+        parser = ComparisonParser(client, cache=InMemoryResultCache())
+        parser.compare(b'before', b'after')
+        parser.compare(b'before', b'after')
+        assert parser.last_cache_hit is True
+        parser.compare(b'after', b'before')
+        assert parser.last_cache_hit is False
+        assert client.send_multi_image_request.call_count == 2
+
+    def test_async_parse_uses_cache(self):
+        import asyncio
+        from apps.automation.ocr.cache import InMemoryResultCache
+
+        client = self._client('{"company_name": "Geico", "confidence": 0.9}')
+        client.send_vision_request_async = AsyncMock(return_value=client.send_vision_request.return_value)
+        parser = InsuranceParser(client, cache=InMemoryResultCache())
+        parser.parse(b'card')
+
+        result = asyncio.run(parser.parse_async(b'card'))
+        assert result.company_name == 'Geico'
+        client.send_vision_request_async.assert_not_called()
+
+
+class TestImagePreprocessing:
+    """Pillow preprocessing before images are sent."""
+
+    def _jpeg(self, size=(4000, 3000), orientation=None, color=(200, 40, 40)):
+        import io
+        from PIL import Image
+
+        image = Image.new('RGB', size, color)
+        exif = Image.Exif()
+        exif[0x010F] = 'PhoneMaker'
+        if orientation:
+            exif[0x0112] = orientation
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', exif=exif.tobytes(), quality=95)
+        return buffer.getvalue()
+
+    def test_downsamples_orients_and_strips_metadata(self):
+        import io
+        from PIL import Image
+        from apps.automation.ocr.preprocess import PreprocessConfig, preprocess_image
+
+        # Orientation 6: stored landscape, displayed rotated 90 degrees
+        result = preprocess_image(self._jpeg(orientation=6), config=PreprocessConfig(max_dimension=1000))
+
+        assert result.processed
+        assert result.original_size == (4000, 3000)
+        assert result.size == (750, 1000)
+        assert len(result.data) < result.original_bytes
+        image = Image.open(io.BytesIO(result.data))
+        assert image.size == (750, 1000)
+        assert not image.getexif()
+
+    def test_converts_format(self):
+        from apps.automation.ocr.preprocess import PreprocessConfig, preprocess_image
+
+        result = preprocess_image(self._jpeg(size=(800, 600)), config=PreprocessConfig(format='webp'))
+        assert result.media_type == 'image/webp'
+        assert result.data[8:12] == b'WEBP'
+
+    def test_trims_uniform_borders(self):
+        import io
+        from PIL import Image
+        from apps.automation.ocr.preprocess import PreprocessConfig, preprocess_image
+
+        image = Image.new('RGB', (1000, 800), (255, 255, 255))
+        image.paste(Image.new('RGB', (600, 400), (20, 20, 120)), (200, 200))
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+
+        result = preprocess_image(buffer.getvalue(), 'image/png', PreprocessConfig(trim_borders=True))
+        assert result.size == (600, 400)
+        assert result.media_type == 'image/jpeg'
+
+    def test_undecodable_data_passes_through(self):
+        from apps.automation.ocr.preprocess import preprocess_image
+
+        result = preprocess_image(b'not an image', 'image/png')
+        assert result.data == b'not an image'
+        assert result.media_type == 'image/png'
+        assert not result.processed
+
+    def test_rejects_unknown_format(self):
+        from apps.automation.ocr.preprocess import PreprocessConfig
+
+        with pytest.raises(ValueError):
+            PreprocessConfig(format='bmp')
+
+    def test_parser_reports_payload_and_latency(self):
+        from apps.automation.ocr.preprocess import LICENSE_PREPROCESS
+        from apps.automation.ocr.testing import StubOpenRouterServer
+
+        content = json.dumps({'license_number': 'D1', 'confidence': 0.9})
+        with StubOpenRouterServer(content=content) as stub:
+            client = OpenRouterClient(api_key='key', api_url=stub.url)
+            parser = LicenseParser(client)
+            assert parser.preprocess is LICENSE_PREPROCESS
+            result = parser.parse(self._jpeg())
+
+            sent_url = stub.last_payload['messages'][1]['content'][0]['image_url']['url']
+
+        assert result.license_number == 'D1'
+        metadata = parser.last_metadata
+        assert metadata['image_size'] == [1600, 1200]
+        assert metadata['image_bytes'] < metadata['image_original_bytes']
+        assert metadata['payload_bytes'] > metadata['image_bytes']
+        assert metadata['latency_ms'] > 0
+        assert sent_url.startswith('data:image/jpeg;base64,')
+
+    def test_preprocessing_can_be_disabled(self):
+        from apps.automation.ocr.preprocess import PreprocessConfig
+
+        client = Mock(model='m')
+        client.send_vision_request.return_value = VisionResponse(
+            content='{}', model='m', usage={}, raw_response={},
+        )
+        client.extract_json_from_response.side_effect = json.loads
+        data = self._jpeg(size=(3000, 2000))
+
+        DamageParser(client, preprocess=PreprocessConfig(enabled=False)).parse(data)
+        assert client.send_vision_request.call_args[0][0].image_data == data
+
+
+class TestDamagePacking:
+    """Several damage photos per request, with single-photo fallback."""
+
+    def _client(self, packed_content, single_content='{"damages": [], "confidence": 0.5}'):
+        client = Mock(model='m')
+        client.send_multi_image_request.return_value = VisionResponse(
+            content=packed_content, model='m', usage={}, raw_response={},
+        )
+        client.send_vision_request.return_value = VisionResponse(
+            content=single_content, model='m', usage={}, raw_response={},
+        )
+        client.extract_json_from_response.side_effect = json.loads
+        return client
+
+    def _photos(self, count):
+        from apps.automation.ocr.parsers import PackedPhoto
+
+        locations = ['front', 'back', 'driver_side', 'passenger_side', 'trunk']
+        return [PackedPhoto(f'photo-{i}'.encode(), 'image/jpeg', locations[i]) for i in range(count)]
+
+    def _packed(self, *labels):
+        return json.dumps({'photos': [
+            {'photo': label, 'damages': [], 'overall_condition': 'good', 'confidence': 0.9}
+            for label in labels
+        ]})
+
+    def test_multi_image_payload_labels_each_image(self):
+        client = OpenRouterClient(api_key='key')
+        payload = client._build_multi_image_payload(
+            system_prompt='s', user_prompt='u', model='m',
+            images=[{'data': b'a', 'label': 'Photo 1'}, {'data': b'b'}],
+        )
+        content = payload['messages'][1]['content']
+        assert [part['type'] for part in content] == ['text', 'image_url', 'image_url', 'text']
+        assert content[0]['text'] == 'Photo 1'
+
+    def test_photos_are_packed_into_one_request(self):
+        client = self._client(self._packed('Photo 2', 'Photo 1', 'Photo 3'))
+        parser = DamageParser(client)
+
+        results = parser.parse_many(self._photos(3), pack_size=4)
+
+        assert client.send_multi_image_request.call_count == 1
+        client.send_vision_request.assert_not_called()
+        kwargs = client.send_multi_image_request.call_args.kwargs
+        assert [image['label'] for image in kwargs['images']] == ['Photo 1', 'Photo 2', 'Photo 3']
+        assert '- Photo 2: back' in kwargs['user_prompt']
+        assert [r.confidence for r in results] == [0.9, 0.9, 0.9]
+        assert parser.last_pack_stats == {'photos': 3, 'requests': 1, 'fallbacks': 0, 'cache_hits': 0}
+
+    def test_missing_results_fall_back_to_single_requests(self):
+        client = self._client(self._packed('Photo 1'))
+        parser = DamageParser(client)
+
+        results = parser.parse_many(self._photos(2), pack_size=2)
+
+        assert [r.confidence for r in results] == [0.9, 0.5]
+        assert 'back' in client.send_vision_request.call_args[0][0].user_prompt
+        assert parser.last_pack_stats['requests'] == 2
+        assert parser.last_pack_stats['fallbacks'] == 1
+
+    def test_invalid_response_falls_back_for_every_photo(self):
+        client = self._client('{"photos": [{"photo": "Photo 1", "confidence": 7}]}')
+        client.send_vision_request.side_effect = [
+            client.send_vision_request.return_value, ValueError('unreadable'),
+        ]
+        parser = DamageParser(client)
+
+        results = parser.parse_many(self._photos(2), pack_size=2)
+
+        assert results[0].confidence == 0.5
+        assert isinstance(results[1], ValueError)
+        assert parser.last_pack_stats['fallbacks'] == 2
+
+    def test_async_packing_chunks_and_caches(self):
+        import asyncio
+        from apps.automation.ocr.cache import InMemoryResultCache
+
+        client = self._client(self._packed('Photo 1', 'Photo 2'))
+        client.send_multi_image_request_async = AsyncMock(return_value=client.send_multi_image_request.return_value)
+        client.send_vision_request_async = AsyncMock(return_value=client.send_vision_request.return_value)
+        cache = InMemoryResultCache()
+        parser = DamageParser(client, cache=cache)
+
+        results = asyncio.run(parser.parse_many_async(self._photos(5), pack_size=2))
+
+        assert len(results) == 5
+        assert client.send_multi_image_request_async.call_count == 2
+        assert client.send_vision_request_async.call_count == 1
+        assert parser.last_pack_stats['requests'] == 3
+        assert parser.last_pack_stats['fallbacks'] == 0
+
+        again = asyncio.run(parser.parse_many_async(self._photos(5), pack_size=2))
+        assert again == results
+        assert parser.last_pack_stats['cache_hits'] == 5
+        assert parser.last_cache_hit is True
+
+
+class TestRetryAndCircuitBreaker:
+    """Retries with backoff and the per-model circuit breaker."""
+
+    OK = {'choices': [{'message': {'content': '{}'}}], 'model': 'm'}
+
+    def _response(self, status_code, headers=None):
+        import httpx
+
+        body = self.OK if status_code == 200 else {'error': {'message': 'upstream'}}
+        return httpx.Response(status_code, json=body, headers=headers or {})
+
+    def _client(self, responses, **kwargs):
+        client = OpenRouterClient(api_key='key', model='m', **kwargs)
+        client._post = Mock(side_effect=[
+            r if isinstance(r, Exception) else (r, {'latency_ms': 1.0}) for r in responses
+        ])
+        return client
+
+    def _request(self):
+        return VisionRequest(system_prompt='s', user_prompt='u', image_data=b'img', model='m')
+
+    def test_rate_limit_waits_for_retry_after(self):
+        from apps.automation.ocr.resilience import Metrics, RetryPolicy
+
+        metrics = Metrics()
+        client = self._client(
+            [self._response(429, {'Retry-After': '2'}), self._response(200)],
+            retry=RetryPolicy(), metrics=metrics,
+        )
+        with patch('apps.automation.ocr.client.time.sleep') as sleep:
+            response = client.send_vision_request(self._request())
+
+        sleep.assert_called_once_with(2.0)
+        assert response.metadata['attempts'] == 2
+        assert metrics.snapshot('m') == {
+            'attempts': 2, 'retries': 1, 'failures': 1, 'short_circuited': 0, 'breaker_opened': 0,
+        }
+
+    def test_long_retry_after_is_not_waited_for(self):
+        from apps.automation.ocr.resilience import RetryPolicy
+
+        client = self._client([self._response(429, {'Retry-After': '600'})], retry=RetryPolicy(max_delay=30))
+        with patch('apps.automation.ocr.client.time.sleep') as sleep:
+            with pytest.raises(OpenRouterRateLimitError) as excinfo:
+                client.send_vision_request(self._request())
+
+        sleep.assert_not_called()
+        assert excinfo.value.retry_after == 600
+
+    def test_server_errors_back_off_with_jitter_then_raise(self):
+        from apps.automation.ocr.resilience import RetryPolicy
+
+        client = self._client([self._response(503)] * 3, retry=RetryPolicy(base_delay=1, max_attempts=3))
+        with patch('apps.automation.ocr.client.time.sleep') as sleep, \
+                patch('apps.automation.ocr.resilience.random.uniform', side_effect=lambda a, b: b) as uniform:
+            with pytest.raises(OpenRouterAPIError) as excinfo:
+                client.send_vision_request(self._request())
+
+        assert excinfo.value.status_code == 503
+        assert [c.args for c in uniform.call_args_list] == [(0, 1), (0, 2)]
+        assert [c.args[0] for c in sleep.call_args_list] == [1, 2]
+
+    def test_client_errors_and_unconfigured_clients_do_not_retry(self):
+        from apps.automation.ocr.resilience import RetryPolicy
+
+        client = self._client([self._response(400)], retry=RetryPolicy())
+        with pytest.raises(OpenRouterAPIError):
+            client.send_vision_request(self._request())
+        assert client._post.call_count == 1
+
+        client = self._client([self._response(503)])
+        with pytest.raises(OpenRouterAPIError):
+            client.send_vision_request(self._request())
+        assert client._post.call_count == 1
+
+    def test_connection_errors_are_retried_and_wrapped(self):
+        import httpx
+        from apps.automation.ocr.client import OpenRouterConnectionError
+        from apps.automation.ocr.resilience import RetryPolicy
+
+        client = self._client([httpx.ConnectError('refused')] * 2, retry=RetryPolicy(max_attempts=2, base_delay=0))
+        with pytest.raises(OpenRouterConnectionError):
+            client.send_vision_request(self._request())
+        assert client._post.call_count == 2
+
+    def test_breaker_opens_probes_and_closes(self):
+        import time
+        from apps.automation.ocr.client import OpenRouterUnavailableError
+        from apps.automation.ocr.resilience import CircuitBreaker, InMemoryStore, Metrics
+
+        store = InMemoryStore()
+        metrics = Metrics(store)
+        breaker = CircuitBreaker(store, failure_threshold=2, reset_timeout=30, metrics=metrics)
+        failing = self._client([self._response(502)] * 2, breaker=breaker)
+        for _ in range(2):
+            with pytest.raises(OpenRouterAPIError):
+                failing.send_vision_request(self._request())
+
+        # Another worker sharing the store fails fast without calling upstream
+        other = self._client([self._response(200)] * 2, breaker=CircuitBreaker(store, failure_threshold=2))
+        with pytest.raises(OpenRouterUnavailableError) as excinfo:
+            other.send_vision_request(self._request())
+        assert excinfo.value.retry_after > 0
+        other._post.assert_not_called()
+        assert breaker.status('m')['state'] == 'open'
+        assert breaker.status('other-model')['state'] == 'closed'
+
+        later = time.time() + 31
+        with patch('apps.automation.ocr.resilience.time.time', return_value=later):
+            assert breaker.status('m')['state'] == 'half_open'
+            other.send_vision_request(self._request())
+        assert breaker.status('m')['state'] == 'closed'
+        assert metrics.snapshot('m')['breaker_opened'] == 1
+
+    def test_async_requests_retry(self):
+        import asyncio
+        from apps.automation.ocr.resilience import RetryPolicy
+
+        client = OpenRouterClient(api_key='key', model='m', retry=RetryPolicy(base_delay=0))
+        client._post_async = AsyncMock(side_effect=[
+            (self._response(500), {}), (self._response(200), {}),
+        ])
+        response = asyncio.run(client.send_vision_request_async(self._request()))
+        assert response.metadata['attempts'] == 2
+
+    def test_parse_retry_after_accepts_http_dates(self):
+        import time
+        from email.utils import formatdate
+        from apps.automation.ocr.resilience import parse_retry_after
+
+        assert parse_retry_after('3') == 3.0
+        assert 55 < parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+        assert parse_retry_after('soon') is None
+        assert parse_retry_after(None) is None
+
+
+class TestTokenBucket:
+    """Tests for the OCR rate limiter backends."""
+
+    def test_burst_then_sustained_rate(self):
+        from apps.automation.ocr.ratelimit import LocalTokenBucket, RateLimit
+
+        now = [0.0]
+        bucket = LocalTokenBucket(clock=lambda: now[0])
+        limit = RateLimit(burst=3, per_minute=60)
+        assert all(bucket.acquire('t1', limit, '2026-01-01').allowed for _ in range(3))
+
+        refused = bucket.acquire('t1', limit, '2026-01-01')
+        assert not refused.allowed
+        assert refused.reason == 'rate'
+        assert refused.retry_after == pytest.approx(1.0)
+        assert bucket.acquire('t2', limit, '2026-01-01').allowed
+
+        now[0] = 1.5
+        assert bucket.acquire('t1', limit, '2026-01-01').allowed
+        assert not bucket.acquire('t1', limit, '2026-01-01').allowed
+
+    def test_daily_cap_counts_recorded_usage(self):
+        from apps.automation.ocr.ratelimit import LocalTokenBucket, RateLimit
+
+        bucket = LocalTokenBucket()
+        limit = RateLimit(burst=100, per_minute=100, daily_cap=5)
+        assert bucket.record('t1', '2026-01-01', 2, seed=3) == 5
+
+        refused = bucket.acquire('t1', limit, '2026-01-01')
+        assert (refused.allowed, refused.reason, refused.used_today) == (False, 'daily_cap', 5)
+        assert bucket.acquire('t1', limit, '2026-01-02').allowed
+        assert bucket.acquire('t1', RateLimit(burst=1, per_minute=1), '2026-01-01').allowed
+
+    def test_drain_hands_out_changed_counters_once(self):
+        from apps.automation.ocr.ratelimit import LocalTokenBucket
+
+        bucket = LocalTokenBucket()
+        bucket.record('t1', '2026-01-01')
+        bucket.record('t1', '2026-01-01', 2)
+        bucket.record('t2', '2026-01-01')
+        assert bucket.drain() == [('t1', '2026-01-01', 3), ('t2', '2026-01-01', 1)]
+        assert bucket.drain() == []
+        assert bucket.usage('t1', '2026-01-01') == 3
+
+    def test_slots_cap_holders_until_released_or_expired(self):
+        from apps.automation.ocr.ratelimit import LocalSlots
+
+        now = [0.0]
+        slots = LocalSlots(clock=lambda: now[0])
+        assert slots.take('t1', 2, 'a', ttl=10)
+        assert slots.take('t1', 2, 'b', ttl=10)
+        assert not slots.take('t1', 2, 'c', ttl=10)
+        assert slots.take('t2', 2, 'c', ttl=10)
+
+        slots.release('t1', 'a')
+        assert slots.take('t1', 2, 'c', ttl=10)
+        now[0] = 11
+        assert slots.take('t1', 2, 'd', ttl=10)
+
+    def test_redis_bucket_runs_scripts_and_decodes_replies(self):
+        from apps.automation.ocr.ratelimit import RateLimit, RedisTokenBucket
+
+        client = Mock()
+        acquire_script, record_script = Mock(), Mock()
+        client.register_script.side_effect = [acquire_script, record_script]
+        bucket = RedisTokenBucket(client)
+
+        acquire_script.return_value = [0, 'rate', '0.5', 7]
+        decision = bucket.acquire('t1', RateLimit(burst=2, per_minute=120), '2026-01-01', seed=7)
+        assert (decision.allowed, decision.reason, decision.retry_after, decision.used_today) == (False, 'rate', 0.5, 7)
+        kwargs = acquire_script.call_args.kwargs
+        assert kwargs['keys'] == ['ocr:ratelimit:bucket:t1', 'ocr:ratelimit:usage:t1:2026-01-01']
+        assert kwargs['args'][:5] == [2, 2.0, -1, 1, 7]
+
+        record_script.return_value = 8
+        assert bucket.record('t1', '2026-01-01', seed=7) == 8
+        assert record_script.call_args.kwargs['args'][-1] == '2026-01-01:t1'
+
+        client.spop.side_effect = [['2026-01-01:t1'], []]
+        client.get.return_value = '8'
+        assert bucket.drain() == [('t1', '2026-01-01', 8)]
+
+
+class TestStreaming:
+    """Tests for streamed completions and incremental field extraction."""
+
+    LICENSE_JSON = json.dumps({
+        'first_name': 'JOHN', 'last_name': 'DOE', 'license_number': 'D1234567',
+        'issue_date': '2020-01-15', 'address': {'city': 'Austin', 'state': 'TX'},
+        'confidence': 0.92, 'unknown': 'ignored',
+    })
+
+    def test_fields_complete_at_any_chunk_boundary(self):
+        from apps.automation.ocr.streaming import IncrementalJSONParser
+
+        text = 'Sure:\n```json\n{"name": "A \\"B\\", C", "n": 12, "nested": {"k": [1, "}"]}, "ok": true}\n```'
+        expected = [('name', 'A "B", C'), ('n', 12), ('nested', {'k': [1, '}']}), ('ok', True)]
+        for size in (1, 2, 5, len(text)):
+            parser = IncrementalJSONParser()
+            fields = []
+            for start in range(0, len(text), size):
+                fields += parser.feed(text[start:start + size])
+            assert fields == expected
+            assert parser.finished
+
+    def test_string_fields_are_reported_before_the_comma(self):
+        from apps.automation.ocr.streaming import IncrementalJSONParser
+
+        parser = IncrementalJSONParser()
+        assert parser.feed('{"first_name": "JO') == []
+        assert parser.feed('HN"') == [('first_name', 'JOHN')]
+        assert parser.feed(', "age": 4') == []
+        assert parser.feed('1}') == [('age', 41)]
+
+    def test_sse_data_skips_comments(self):
+        from apps.automation.ocr.streaming import iter_sse_data
+
+        lines = [': OPENROUTER PROCESSING', '', 'data: {"a": 1}', '', 'event: x', 'data:[DONE]', '']
+        assert list(iter_sse_data(lines)) == ['{"a": 1}', '[DONE]']
+
+    def test_stream_over_http_yields_fields_then_validated_result(self):
+        from apps.automation.ocr.testing import StubOpenRouterServer
+
+        with StubOpenRouterServer(content=self.LICENSE_JSON, stream_chunk_size=5) as stub:
+            client = OpenRouterClient(api_key='key', api_url=stub.url)
+            parser = LicenseParser(client)
+            events = list(parser.parse_stream(b'license-bytes', image_media_type='image/png'))
+            assert stub.last_payload['stream'] is True
+
+        fields = [event.data for event in events if event.event == 'field']
+        assert fields[:3] == [('first_name', 'JOHN'), ('last_name', 'DOE'), ('license_number', 'D1234567')]
+        assert ('issue_date', '2020-01-15') in fields
+        assert 'unknown' not in dict(fields)
+        assert events[-1].event == 'result'
+        assert isinstance(events[-1].data, LicenseOCRResponse)
+        assert events[-1].data.address.city == 'Austin'
+        assert parser.last_metadata['first_token_ms'] >= 0
+        assert parser.last_metadata['attempts'] == 1
+
+    def test_invalid_fields_are_held_back_and_final_result_is_validated(self):
+        client = OpenRouterClient(api_key='key')
+        content = '{"first_name": "JOHN", "confidence": 7}'
+        client._stream_chunks = Mock(return_value=iter([
+            {'choices': [{'delta': {'content': content[:20]}}]},
+            {'choices': [{'delta': {'content': content[20:]}}]},
+        ]))
+        events = LicenseParser(client).parse_stream(b'img')
+
+        assert next(events).data == ('first_name', 'JOHN')
+        with pytest.raises(ValueError, match='validation failed'):
+            next(events)
+
+    def test_error_event_in_stream_raises(self):
+        from apps.automation.ocr.client import VisionStream
+
+        stream = VisionStream(iter([
+            {'choices': [{'delta': {'content': '{"a"'}}]},
+            {'error': {'code': 502, 'message': 'provider went away'}},
+        ]), 'm', {})
+        with pytest.raises(OpenRouterAPIError) as excinfo:
+            list(stream)
+        assert excinfo.value.status_code == 502
+        assert stream.response is None
+
+    def test_stream_open_is_retried(self):
+        from apps.automation.ocr.resilience import RetryPolicy
+
+        client = OpenRouterClient(api_key='key', model='m', retry=RetryPolicy(base_delay=0))
+        ok = Mock(status_code=200)
+        ok.iter_lines.return_value = iter([
+            'data: {"choices": [{"delta": {"content": "{}"}}]}', '', 'data: [DONE]', '',
+        ])
+        client._post_stream = Mock(side_effect=[
+            Mock(status_code=503, text='busy', headers={}, json=Mock(return_value={})), ok,
+        ])
+        stream = client.stream_vision_request(VisionRequest(
+            system_prompt='s', user_prompt='u', image_data=b'img', model='m',
+        ))
+        assert list(stream) == ['{}']
+        assert stream.response.metadata['attempts'] == 2
+
+
+AAMVA_LICENSE = (
+    '@\n\x1e\rANSI 636015080002DL00410280ZT03210009DLDAQ12345678\nDCSDOE\nDDEN\nDACJOHN\nDDFN\n'
+    'DADROBERT\nDDGN\nDCAC\nDCBNONE\nDCDNONE\nDBD01152020\nDBB05151985\nDBA01152028\nDBC1\n'
+    'DAU070 IN\nDAYBRO\nDAG123 MAIN ST\nDAIAUSTIN\nDAJTX\nDAK787010000  \nDCGUSA\nDAZBLK\n'
+    'DAW180\nDDK1\r\nZTZTAX\r'
+)
+
+
+class TestLicenseBarcode:
+    """Tests for offline AAMVA barcode parsing."""
+
+    def test_parses_current_aamva_version(self):
+        from datetime import date
+        from apps.automation.ocr.barcode import missing_fields, parse_aamva
+
+        result = parse_aamva(AAMVA_LICENSE)
+        assert (result.first_name, result.middle_name, result.last_name) == ('JOHN', 'ROBERT', 'DOE')
+        assert result.license_number == '12345678'
+        assert result.date_of_birth == date(1985, 5, 15)
+        assert result.expiration_date == date(2028, 1, 15)
+        assert result.address.zip_code == '78701'
+        assert (result.gender, result.height, result.weight) == ('M', '5\'10"', '180 lbs')
+        assert result.restrictions == ''
+        assert result.donor_status is True
+        assert missing_fields(result) == []
+
+    def test_parses_aamva_2000_names_and_dates(self):
+        from datetime import date
+        from apps.automation.ocr.barcode import parse_aamva
+
+        result = parse_aamva(
+            '@\n\x1e\rANSI 6360100102DL00390188DLDAQ0123456789\nDAALAST,FIRST,MID\nDAJFL\n'
+            'DARE\nDBA20280115\nDBB19800102\nDBCF\nDAU510\n\r'
+        )
+        assert (result.first_name, result.middle_name, result.last_name) == ('FIRST', 'MID', 'LAST')
+        assert result.expiration_date == date(2028, 1, 15)
+        assert (result.license_class, result.gender, result.height) == ('E', 'F', '5\'10"')
+
+    def test_rejects_other_barcodes(self):
+        from apps.automation.ocr.barcode import parse_aamva, read_license_barcode
+
+        with pytest.raises(ValueError):
+            parse_aamva('https://example.com/not-a-license')
+        with patch('apps.automation.ocr.barcode.decode_pdf417', return_value='hello'):
+            assert read_license_barcode(b'image') is None
+
+    def test_decoding_without_zxing_returns_none(self):
+        from apps.automation.ocr.barcode import decode_pdf417
+
+        with patch.dict('sys.modules', {'zxingcpp': None}):
+            assert decode_pdf417(b'image') is None
+
+    def test_decoding_uses_first_pdf417_result(self):
+        import io
+        import types
+        from PIL import Image
+        from apps.automation.ocr.barcode import decode_pdf417
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (4000, 2000), 'white').save(buffer, format='PNG')
+        zxing = types.SimpleNamespace(
+            BarcodeFormat=types.SimpleNamespace(PDF417='pdf417'),
+            read_barcodes=Mock(return_value=[Mock(text=''), Mock(text=AAMVA_LICENSE)]),
+        )
+        with patch.dict('sys.modules', {'zxingcpp': zxing}):
+            assert decode_pdf417(buffer.getvalue()) == AAMVA_LICENSE
+        image = zxing.read_barcodes.call_args.args[0]
+        assert image.mode == 'L' and max(image.size) == 2400
+        assert zxing.read_barcodes.call_args.kwargs['formats'] == 'pdf417'
+
+    def test_barcode_fields_override_model_result(self):
+        from apps.automation.ocr.barcode import merge_barcode_result
+
+        barcode = LicenseOCRResponse(license_number='D1', address={'city': 'AUSTIN'}, confidence=0.99)
+        model = LicenseOCRResponse(
+            license_number='DL', first_name='JOHN', address={'street': '1 MAIN', 'city': 'AUST1N'},
+            confidence=0.7, has_photo=True,
+        )
+        merged = merge_barcode_result(barcode, model)
+        assert (merged.license_number, merged.first_name) == ('D1', 'JOHN')
+        assert (merged.address.street, merged.address.city) == ('1 MAIN', 'AUSTIN')
+        assert (merged.confidence, merged.has_photo) == (0.7, True)
+
+
+class TestModelCascade:
+    """Fast model first, escalating to the client's model when unsure."""
+
+    FAST = 'anthropic/claude-3-haiku'
+    FULL = 'anthropic/claude-3.5-sonnet'
+
+    def _client(self, answers):
+        from apps.automation.ocr.resilience import Metrics
+
+        def send(request):
+            answer = answers[request.model]
+            if isinstance(answer, Exception):
+                raise answer
+            return VisionResponse(content=answer, model=request.model, usage={}, raw_response={})
+
+        client = Mock(model=self.FULL, metrics=Metrics())
+        client.send_vision_request.side_effect = send
+        client.send_vision_request_async = AsyncMock(side_effect=send)
+        client.extract_json_from_response.side_effect = json.loads
+        return client
+
+    def _models(self, client):
+        return [call.args[0].model for call in client.send_vision_request.call_args_list]
+
+    def _counters(self, client, parser_name='InsuranceParser'):
+        from apps.automation.ocr.parsers.base import CASCADE_METRIC_NAMES, cascade_metrics_key
+
+        return client.metrics.snapshot(cascade_metrics_key(parser_name), CASCADE_METRIC_NAMES)
+
+    def test_confident_fast_answer_is_kept(self):
+        client = self._client({self.FAST: '{"company_name": "State Farm", "confidence": 0.9}'})
+        parser = InsuranceParser(client, fast_model=self.FAST)
+
+        result = parser.parse(b'card')
+
+        assert result.company_name == 'State Farm'
+        assert self._models(client) == [self.FAST]
+        assert (parser.last_tier, parser.last_model) == ('fast', self.FAST)
+        assert self._counters(client)['fast_served'] == 1
+
+    def test_low_confidence_escalates_to_client_model(self):
+        client = self._client({
+            self.FAST: '{"company_name": "Stale Farm", "confidence": 0.5}',
+            self.FULL: '{"company_name": "State Farm", "confidence": 0.95}',
+        })
+        parser = InsuranceParser(client, fast_model=self.FAST)
+
+        result = parser.parse(b'card')
+
+        assert result.company_name == 'State Farm'
+        assert self._models(client) == [self.FAST, self.FULL]
+        assert (parser.last_tier, parser.last_model) == ('full', self.FULL)
+        assert parser.last_cache_hit is False
+        counters = self._counters(client)
+        assert counters['parses'] == 1
+        assert counters['escalated_confidence'] == 1
+        assert counters['fast_served'] == 0
+
+    def test_threshold_is_per_parser(self):
+        answers = {
+            self.FAST: '{"license_number": "D1", "confidence": 0.87}',
+            self.FULL: '{"license_number": "D1", "confidence": 0.97}',
+        }
+        client = self._client(answers)
+        InsuranceParser(client, fast_model=self.FAST).parse(b'card')
+        assert self._models(client) == [self.FAST]
+
+        client = self._client(answers)
+        LicenseParser(client, fast_model=self.FAST).parse(b'license')
+        assert self._models(client) == [self.FAST, self.FULL]
+
+        client = self._client(answers)
+        LicenseParser(client, fast_model=self.FAST, cascade_threshold=0.8).parse(b'license')
+        assert self._models(client) == [self.FAST]
+
+    def test_invalid_or_failed_fast_answer_escalates(self):
+        client = self._client({
+            self.FAST: 'I cannot read this card',
+            self.FULL: '{"company_name": "State Farm", "confidence": 0.95}',
+        })
+        parser = InsuranceParser(client, fast_model=self.FAST)
+        assert parser.parse(b'card').company_name == 'State Farm'
+        assert self._counters(client)['escalated_invalid'] == 1
+
+        client = self._client({
+            self.FAST: OpenRouterAPIError('Bad gateway', status_code=502),
+            self.FULL: '{"company_name": "State Farm", "confidence": 0.95}',
+        })
+        parser = InsuranceParser(client, fast_model=self.FAST)
+        assert parser.parse(b'card').company_name == 'State Farm'
+        assert self._counters(client)['escalated_error'] == 1
+
+    def test_auth_errors_and_explicit_models_skip_the_cascade(self):
+        client = self._client({self.FAST: OpenRouterAuthError('Invalid API key', status_code=401)})
+        with pytest.raises(OpenRouterAuthError):
+            InsuranceParser(client, fast_model=self.FAST).parse(b'card')
+        assert self._models(client) == [self.FAST]
+
+        client = self._client({'openai/gpt-4o': '{"company_name": "State Farm", "confidence": 0.2}'})
+        parser = InsuranceParser(client, fast_model=self.FAST)
+        parser.parse(b'card', model='openai/gpt-4o')
+        assert self._models(client) == ['openai/gpt-4o']
+        assert parser.last_tier == 'full'
+
+    def test_cached_escalation_is_not_a_request(self):
+        from apps.automation.ocr.cache import InMemoryResultCache
+
+        client = self._client({
+            self.FAST: '{"company_name": "Stale Farm", "confidence": 0.5}',
+            self.FULL: '{"company_name": "State Farm", "confidence": 0.95}',
+        })
+        parser = InsuranceParser(client, cache=InMemoryResultCache(), fast_model=self.FAST)
+        parser.parse(b'card')
+        result = parser.parse(b'card')
+
+        assert result.company_name == 'State Farm'
+        assert parser.last_cache_hit is True
+        assert client.send_vision_request.call_count == 2
+
+    def test_async_parse_escalates(self):
+        import asyncio
+
+        client = self._client({
+            self.FAST: '{"company_name": "Stale Farm", "confidence": 0.5}',
+            self.FULL: '{"company_name": "State Farm", "confidence": 0.95}',
+        })
+        parser = InsuranceParser(client, fast_model=self.FAST)
+
+        result = asyncio.run(parser.parse_async(b'card'))
+
+        assert result.company_name == 'State Farm'
+        assert parser.last_tier == 'full'
+        assert client.send_vision_request_async.await_count == 2
+
+    def test_stream_repeats_fields_from_the_escalated_model(self):
+        answers = {
+            self.FAST: '{"company_name": "Stale Farm", "confidence": 0.5}',
+            self.FULL: '{"company_name": "State Farm", "confidence": 0.95}',
+        }
+
+        class Stream:
+            def __init__(self, request):
+                self.content = answers[request.model]
+                self.response = VisionResponse(
+                    content=self.content, model=request.model, usage={}, raw_response={},
+                )
+
+            def __iter__(self):
+                yield self.content
+
+        client = self._client(answers)
+        client.stream_vision_request.side_effect = Stream
+        parser = InsuranceParser(client, fast_model=self.FAST)
+
+        events = list(parser.parse_stream(b'card'))
+
+        names = [event.data for event in events if event.event == 'field' and event.data[0] == 'company_name']
+        assert names == [('company_name', 'Stale Farm'), ('company_name', 'State Farm')]
+        assert events[-1].event == 'result'
+        assert events[-1].data.company_name == 'State Farm'
+        assert parser.last_model == self.FULL
+
+
+class TestStubServer:
+    """The local OpenRouter stand-in used for development and load tests."""
+
+    def test_canned_responses_validate_for_every_parser(self):
+        from apps.automation.ocr.parsers import PackedPhoto
+        from apps.automation.ocr.testing import StubOpenRouterServer, canned_responder
+
+        with StubOpenRouterServer(responder=canned_responder) as stub:
+            client = OpenRouterClient(api_key='key', api_url=stub.url)
+            assert LicenseParser(client).parse(b'license').license_number
+            assert InsuranceParser(client).parse(b'card').policy_number
+            assert DashboardParser(client).parse(b'dash').odometer is not None
+            assert DamageParser(client).parse(b'photo').confidence > 0
+            assert ComparisonParser(client).compare(b'before', b'after').confidence > 0
+            packed = DamageParser(client).parse_many(
+                [PackedPhoto(b'one', location='front'), PackedPhoto(b'two', location='back')], pack_size=2,
+            )
+            assert all(isinstance(result, DamageDetectionResponse) for result in packed)
+        assert stub.request_count == 6
+
+    def test_checks_the_payload_shape(self):
+        from apps.automation.ocr.testing import StubOpenRouterServer, payload_errors
+
+        client = OpenRouterClient(api_key='key', model='m')
+        request = VisionRequest(system_prompt='system', user_prompt='user', image_data=b'image', model='m')
+        assert payload_errors(client._build_vision_payload(request)) == []
+        assert payload_errors(client._build_multi_image_payload('system', 'user', [{'data': b'a'}], model='m')) == []
+
+        payload = client._build_vision_payload(request)
+        payload['messages'][1]['content'][0]['cache_control'] = {'type': 'persistent'}
+        assert payload_errors(payload) == [
+            'messages[1].content[0].cache_control is only allowed on text parts',
+            'messages[1].content[0].cache_control must be {"type": "ephemeral"}',
+        ]
+        assert payload_errors({'model': 'm', 'messages': [{'role': 'tool', 'content': 'x'}]}) == [
+            'messages[0].role must be one of system, user, assistant',
+        ]
+
+        with StubOpenRouterServer() as stub:
+            with pytest.raises(OpenRouterAPIError) as error:
+                OpenRouterClient(api_key='key', api_url=stub.url)._send(payload)
+        assert error.value.status_code == 400
+        assert 'cache_control' in str(error.value)
+
+    def test_injects_rate_limits_and_errors(self):
+        from apps.automation.ocr.testing import StubOpenRouterServer
+
+        request = VisionRequest(system_prompt='system', user_prompt='user', image_data=b'image')
+        with StubOpenRouterServer(rate_limit_rate=1.0, retry_after=7) as stub:
+            with pytest.raises(OpenRouterRateLimitError) as error:
+                OpenRouterClient(api_key='key', api_url=stub.url).send_vision_request(request)
+        assert error.value.retry_after == 7
+        assert stub.status_counts == {429: 1}
+
+        with StubOpenRouterServer(error_rate=1.0) as stub:
+            with pytest.raises(OpenRouterAPIError) as error:
+                OpenRouterClient(api_key='key', api_url=stub.url).send_vision_request(request)
+        assert error.value.status_code == 502
+
+    def test_base_url_setting_reaches_tenant_clients(self, settings):
+        from apps.automation.jobs import get_tenant_client
+
+        settings.OPENROUTER_BASE_URL = 'http://127.0.0.1:8089/api/v1/'
+        tenant = Mock()
+        tenant.settings.get_api_key.return_value = 'key'
+        tenant.settings.openrouter_api_key_encrypted = b'encrypted-key'
+        tenant.settings.openrouter_model = 'anthropic/claude-3.5-sonnet'
+        assert get_tenant_client(tenant).api_url == 'http://127.0.0.1:8089/api/v1/chat/completions'
+
+    def test_key_info_uses_the_api_base_url(self):
+        from apps.automation.ocr.testing import StubOpenRouterServer
+
+        with StubOpenRouterServer() as stub:
+            assert OpenRouterClient(api_key='key', api_url=stub.url).get_key_info()['label'] == 'stub'
+
+
+class TestCallTelemetry:
+    """Per-call records handed to the client's recorder."""
+
+    def test_successful_call_is_recorded_with_usage(self):
+        from apps.automation.ocr.testing import StubOpenRouterServer, canned_responder
+
+        records = []
+        with StubOpenRouterServer(responder=canned_responder) as stub:
+            client = OpenRouterClient(api_key='key', model='m', api_url=stub.url, recorder=records.append)
+            LicenseParser(client).parse(b'license')
+
+        from apps.automation.ocr.prompts.license import LICENSE_OCR_SYSTEM_PROMPT
+        from apps.automation.ocr.testing import estimate_tokens
+
+        [record] = records
+        assert (record.parser, record.model, record.outcome) == ('LicenseParser', 'm', 'ok')
+        assert (record.tokens_in, record.tokens_out, record.attempts) == (
+            10 + estimate_tokens(LICENSE_OCR_SYSTEM_PROMPT), 5, 1,
+        )
+        assert record.tokens_cached == 0
+        assert record.input_bytes > 0
+        assert record.latency_ms is not None
+
+    def test_failures_and_cache_hits_are_recorded(self):
+        from apps.automation.ocr.cache import InMemoryResultCache
+        from apps.automation.ocr.resilience import RetryPolicy
+        from apps.automation.ocr.testing import StubOpenRouterServer, canned_responder
+
+        records = []
+        request = VisionRequest(system_prompt='system', user_prompt='user', image_data=b'image', model='m')
+        with StubOpenRouterServer(error_rate=1.0) as stub:
+            client = OpenRouterClient(api_key='key', api_url=stub.url, recorder=records.append,
+                                      retry=RetryPolicy(max_attempts=2, base_delay=0))
+            with pytest.raises(OpenRouterAPIError):
+                client.send_vision_request(request)
+        assert (records[0].outcome, records[0].attempts) == ('error', 2)
+        assert records[0].error
+
+        with StubOpenRouterServer(responder=canned_responder) as stub:
+            client = OpenRouterClient(api_key='key', model='m', api_url=stub.url, recorder=records.append)
+            parser = InsuranceParser(client, cache=InMemoryResultCache())
+            parser.parse(b'card')
+            parser.parse(b'card')
+        assert [record.outcome for record in records[1:]] == ['ok', 'cached']
+        assert records[2].input_bytes == len(b'card')
+
+    def test_repeated_system_prompts_are_read_from_the_prompt_cache(self):
+        from apps.automation.ocr.prompts.dashboard import DASHBOARD_ANALYSIS_SYSTEM_PROMPT
+        from apps.automation.ocr.testing import StubOpenRouterServer, canned_responder, estimate_tokens
+
+        records = []
+        with StubOpenRouterServer(responder=canned_responder) as stub:
+            client = OpenRouterClient(api_key='key', model='m', api_url=stub.url, recorder=records.append)
+            DashboardParser(client).parse(b'first dashboard')
+            DashboardParser(client).parse(b'second dashboard')
+            OpenRouterClient(api_key='key', model='other', api_url=stub.url,
+                             recorder=records.append).send_vision_request(VisionRequest(
+                                 system_prompt=DASHBOARD_ANALYSIS_SYSTEM_PROMPT, user_prompt='user',
+                                 image_data=b'image', model='other'))
+
+        prompt_tokens = estimate_tokens(DASHBOARD_ANALYSIS_SYSTEM_PROMPT)
+        # The first call writes the prefix; the cache is per model
+        assert [record.tokens_cached for record in records] == [0, prompt_tokens, 0]
+        assert stub.cached_tokens == prompt_tokens
+
+        with StubOpenRouterServer(responder=canned_responder) as stub:
+            client = OpenRouterClient(api_key='key', model='m', api_url=stub.url, prompt_cache=False,
+                                      recorder=records.append)
+            DashboardParser(client).parse(b'first dashboard')
+            DashboardParser(client).parse(b'second dashboard')
+        assert records[-1].tokens_cached == 0
+        assert stub.cached_tokens == 0
+
+    def test_recorder_errors_do_not_fail_the_call(self):
+        from apps.automation.ocr.testing import StubOpenRouterServer, canned_responder
+
+        def broken(record):
+            raise RuntimeError('telemetry down')
+
+        with StubOpenRouterServer(responder=canned_responder) as stub:
+            client = OpenRouterClient(api_key='key', api_url=stub.url, recorder=broken)
+            assert LicenseParser(client).parse(b'license').license_number
+
+    def test_histogram_percentiles_and_cost(self):
+        from decimal import Decimal
+        from apps.automation.ocr.telemetry import (
+            CallRecord, empty_histogram, estimate_cost, histogram_percentile, latency_bin,
+        )
+
+        histogram = empty_histogram()
+        for latency in [400] * 90 + [9000] * 10:
+            histogram[latency_bin(latency)] += 1
+        assert histogram_percentile(histogram, 0.5) == 500
+        assert histogram_percentile(histogram, 0.95) == 10000
+        assert histogram_percentile(empty_histogram(), 0.5) is None
+
+        prices = {'m': (3.0, 15.0)}
+        assert estimate_cost(CallRecord(model='m', tokens_in=1000, tokens_out=100), prices) == Decimal('0.004500')
+        assert estimate_cost(CallRecord(model='m', cost_usd=0.01), prices) == Decimal('0.01')
+        assert estimate_cost(CallRecord(model='other', tokens_in=10), prices) is None
+        assert estimate_cost(CallRecord(model='m', outcome='cached'), prices) == 0
+
+        # Cached prompt tokens are charged at the cached price when there is one
+        prices = {'m': (3.0, 15.0, 0.3)}
+        record = CallRecord(model='m', tokens_in=1000, tokens_cached=800, tokens_out=100)
+        assert estimate_cost(record, prices) == Decimal('0.002340')
+        assert estimate_cost(record, {'m': (3.0, 15.0)}) == Decimal('0.004500')
+
+    def test_cached_tokens_are_read_from_usage(self):
+        from apps.automation.ocr.telemetry import usage_fields
+
+        usage = {'prompt_tokens': 100, 'prompt_tokens_details': {'cached_tokens': 80}}
+        assert usage_fields(usage)['tokens_cached'] == 80
+        assert usage_fields({'prompt_tokens': 100, 'cache_read_input_tokens': 60})['tokens_cached'] == 60
+        assert usage_fields({'prompt_tokens': 100})['tokens_cached'] is None
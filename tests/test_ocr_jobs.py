@@ -0,0 +1,1395 @@
+"""Tests for the background OCR and inspection analysis jobs."""
+import pytest
+from unittest.mock import MagicMock, patch
+
+from django.core.files.base import ContentFile
+from rest_framework.test import APIClient
+
+from apps.automation.integration.rate_limit import flush_usage
+from apps.automation.ocr.schemas.damage import DamageDetectionResponse
+from apps.automation.ocr.schemas.insurance import InsuranceOCRResponse
+from apps.automation.ocr.schemas.license import LicenseOCRResponse
+from apps.automation.ocr.utils.encryption import reset_encryption_key_cache
+
+
+@pytest.fixture
+def ocr_tenant(tenant, settings):
+    from apps.tenants.models import TenantSettings
+
+    settings.FIELD_ENCRYPTION_KEY = 'test-encryption-key-secret'
+    reset_encryption_key_cache()
+    tenant_settings = TenantSettings.objects.create(tenant=tenant, openrouter_enabled=True)
+    tenant_settings.set_api_key('sk-or-test-api-key')
+    tenant_settings.save()
+    yield tenant
+    reset_encryption_key_cache()
+
+
+@pytest.fixture
+def photo(ocr_tenant, reservation, temp_media_root):
+    from apps.contracts.models import ConditionReport, ConditionReportPhoto, Contract
+
+    contract = Contract.objects.create(tenant=ocr_tenant, reservation=reservation)
+    report = ConditionReport.objects.create(
+        contract=contract, report_type='checkout', fuel_level='full', mileage=15000,
+        exterior_condition='good', interior_condition='good',
+    )
+    return ConditionReportPhoto.objects.create(
+        condition_report=report,
+        image=ContentFile(b'photo-bytes', name='front.jpg'),
+        location='front',
+    )
+
+
+def make_job(tenant, document_type='insurance', **kwargs):
+    from apps.automation.models import OCRJob
+
+    job = OCRJob(tenant=tenant, document_type=document_type, image_media_type='image/png', **kwargs)
+    job.image.save('card.png', ContentFile(b'card-bytes'), save=False)
+    job.save()
+    return job
+
+
+@pytest.mark.django_db
+class TestRunOCRJob:
+    def test_completed_job_stores_result_and_discards_image(self, ocr_tenant, temp_media_root):
+        from apps.automation.jobs import run_ocr_job
+
+        job = make_job(ocr_tenant)
+        image_path = job.image.path
+        parser = MagicMock(last_cache_hit=False, last_model=None, last_tier=None)
+        parser.parse.return_value = InsuranceOCRResponse(company_name='State Farm', confidence=0.9)
+
+        with patch('apps.automation.ocr.parsers.InsuranceParser', return_value=parser):
+            job = run_ocr_job(job.pk)
+
+        parser.parse.assert_called_once_with(b'card-bytes', image_media_type='image/png')
+        job.refresh_from_db()
+        assert job.status == 'completed'
+        assert job.result['company_name'] == 'State Farm'
+        assert job.confidence == 0.9
+        assert job.model_used == ocr_tenant.settings.openrouter_model
+        assert job.processing_time_ms is not None
+        assert not job.image
+        assert not temp_media_root.joinpath(image_path).exists()
+        flush_usage()
+        ocr_tenant.settings.refresh_from_db()
+        assert ocr_tenant.settings.ocr_requests_today == 1
+
+    def test_failed_job_records_error_without_counting(self, ocr_tenant, temp_media_root):
+        from apps.automation.jobs import run_ocr_job
+
+        job = make_job(ocr_tenant)
+        parser = MagicMock(last_model=None, last_tier=None)
+        parser.parse.side_effect = ValueError('unreadable card')
+
+        with patch('apps.automation.ocr.parsers.InsuranceParser', return_value=parser):
+            run_ocr_job(job.pk)
+
+        job.refresh_from_db()
+        assert job.status == 'failed'
+        assert job.error_message == 'unreadable card'
+        assert not job.image
+        flush_usage()
+        ocr_tenant.settings.refresh_from_db()
+        assert ocr_tenant.settings.ocr_requests_today == 0
+
+    def test_finished_job_is_not_rerun(self, ocr_tenant, temp_media_root):
+        from apps.automation.jobs import run_ocr_job
+
+        job = make_job(ocr_tenant)
+        job.mark_failed('already done')
+
+        with patch('apps.automation.ocr.parsers.InsuranceParser') as parser_class:
+            run_ocr_job(job.pk)
+
+        parser_class.assert_not_called()
+
+    def test_repeat_image_is_served_from_cache_without_counting(self, ocr_tenant, temp_media_root):
+        from django.core.cache import caches
+        from apps.automation.jobs import run_ocr_job
+        from apps.automation.ocr.client import VisionResponse
+
+        caches['ocr'].clear()
+        response = VisionResponse(
+            content='{"company_name": "State Farm", "confidence": 0.9}', model='m', usage={}, raw_response={},
+        )
+        with patch('apps.automation.ocr.client.OpenRouterClient.send_vision_request',
+                   return_value=response) as send:
+            first = run_ocr_job(make_job(ocr_tenant).pk)
+            second = run_ocr_job(make_job(ocr_tenant).pk)
+
+        assert send.call_count == 1
+        assert second.status == 'completed'
+        assert second.result == first.result
+        flush_usage()
+        ocr_tenant.settings.refresh_from_db()
+        assert ocr_tenant.settings.ocr_requests_today == 1
+
+    def test_preprocess_overrides_come_from_settings(self, settings):
+        from apps.automation.jobs import get_document_parser
+
+        settings.OCR_PREPROCESS = {'insurance': {'max_dimension': 800, 'format': 'WEBP'}}
+        parser, _ = get_document_parser('insurance', MagicMock())
+        assert parser.preprocess.max_dimension == 800
+        assert parser.preprocess.format == 'WEBP'
+        assert parser.preprocess.trim_borders is True
+
+        parser, _ = get_document_parser('license', MagicMock())
+        assert parser.preprocess is parser.default_preprocess
+
+    def test_cascade_records_the_tier_that_answered(self, user, ocr_tenant, settings, temp_media_root):
+        from django.core.cache import caches
+        from apps.automation.jobs import run_ocr_job
+        from apps.automation.ocr.client import VisionResponse
+
+        caches['ocr'].clear()
+        settings.OCR_CASCADE_MODEL = 'anthropic/claude-3-haiku'
+        confidence = {'anthropic/claude-3-haiku': 0.6, ocr_tenant.settings.openrouter_model: 0.95}
+
+        def send(request):
+            return VisionResponse(
+                content=f'{{"company_name": "State Farm", "confidence": {confidence[request.model]}}}',
+                model=request.model, usage={}, raw_response={},
+            )
+
+        with patch('apps.automation.ocr.client.OpenRouterClient.send_vision_request', side_effect=send) as sent:
+            escalated = run_ocr_job(make_job(ocr_tenant).pk)
+        assert sent.call_count == 2
+        assert escalated.model_used == ocr_tenant.settings.openrouter_model
+        assert escalated.model_tier == 'full'
+        assert escalated.confidence == 0.95
+
+        user.is_superuser = True
+        user.save()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        counters = client.get('/api/automation/health/').data['cascade']['parsers']['InsuranceParser']
+        assert counters['parses'] == 1
+        assert counters['escalated_confidence'] == 1
+        assert counters['fast_share'] == 0.0
+
+        caches['ocr'].clear()
+        settings.OCR_CASCADE_THRESHOLDS = {'insurance': 0.5}
+        with patch('apps.automation.ocr.client.OpenRouterClient.send_vision_request', side_effect=send) as sent:
+            fast = run_ocr_job(make_job(ocr_tenant).pk)
+        assert sent.call_count == 1
+        assert fast.model_used == 'anthropic/claude-3-haiku'
+        assert fast.model_tier == 'fast'
+        flush_usage()
+        ocr_tenant.settings.refresh_from_db()
+        assert ocr_tenant.settings.ocr_requests_today == 2
+        caches['ocr'].clear()
+
+    def test_license_job_falls_back_to_stored_customer_image(self, ocr_tenant, customer, temp_media_root):
+        from apps.automation.jobs import _read_job_image
+        from apps.automation.models import OCRJob
+
+        customer.license_image_front.save('license.jpg', ContentFile(b'license-bytes'))
+        job = OCRJob.objects.create(tenant=ocr_tenant, customer=customer, document_type='license')
+
+        assert _read_job_image(job) == (b'license-bytes', 'image/jpeg')
+
+
+@pytest.mark.django_db
+class TestInspectionAnalysisJobs:
+    def test_damage_photo_is_analysed_in_background(
+        self, user, tenant_user, photo, django_capture_on_commit_callbacks
+    ):
+        from apps.automation.tasks import process_inspection_analysis
+        from apps.contracts.models import InspectionAnalysis
+
+        client = APIClient()
+        client.force_authenticate(user=user)
+        parser = MagicMock(last_cache_hit=False)
+        parser.parse.return_value = DamageDetectionResponse(overall_condition='good', confidence=0.8)
+
+        with patch.object(process_inspection_analysis, 'delay', side_effect=process_inspection_analysis), \
+                patch('apps.automation.ocr.parsers.DamageParser', return_value=parser) as parser_class:
+            with django_capture_on_commit_callbacks(execute=True):
+                response = client.post(f'/api/automation/analyze-photo/{photo.pk}/')
+
+        assert response.status_code == 202
+        assert response.data['analysis_type'] == 'damage_detection'
+        assert parser_class.call_args.kwargs['location'] == 'front'
+
+        analysis = InspectionAnalysis.objects.get(pk=response.data['analysis_id'])
+        assert analysis.status == 'completed'
+        assert analysis.result['overall_condition'] == 'good'
+
+        response = client.get(response.data['status_url'])
+        assert response.data['success'] is True
+        assert response.data['confidence'] == 0.8
+
+    def test_dashboard_photos_get_dashboard_analysis(self, photo):
+        from apps.automation.jobs import default_analysis_type
+
+        photo.location = 'dashboard'
+        assert default_analysis_type(photo) == 'dashboard_analysis'
+
+    def test_other_tenants_cannot_see_jobs(self, ocr_tenant, temp_media_root):
+        from apps.tenants.models import Tenant, TenantUser, User
+
+        job = make_job(ocr_tenant)
+        outsider = User.objects.create_user(email='outsider@example.com', password='pass12345')
+        other = Tenant.objects.create(
+            name='Other', slug='other', owner=outsider, business_name='Other',
+            business_email='other@example.com',
+        )
+        TenantUser.objects.create(tenant=other, user=outsider, role='owner')
+
+        client = APIClient()
+        client.force_authenticate(user=outsider)
+        response = client.get(f'/api/automation/jobs/{job.pk}/')
+        assert response.status_code == 404
+
+
+def dashboard_reading(reading=15320, unit='miles', confidence=0.95, fuel='3/4', lights=()):
+    from apps.automation.ocr.schemas.dashboard import (
+        DashboardAnalysisResponse, FuelGaugeReading, OdometerReading, WarningLight,
+    )
+
+    return DashboardAnalysisResponse(
+        odometer=OdometerReading(reading=reading, unit=unit, confidence=confidence) if reading else None,
+        fuel_gauge=FuelGaugeReading(level=fuel, confidence=0.9) if fuel else None,
+        warning_lights=[WarningLight(indicator=name, status='on', color='amber') for name in lights],
+        confidence=0.9,
+    )
+
+
+def completed_dashboard_analysis(report, result):
+    from apps.contracts.models import InspectionAnalysis
+
+    return InspectionAnalysis.objects.create(
+        condition_report=report, photo=report.photos.first(), analysis_type='dashboard_analysis',
+        status='completed', result=result.model_dump(mode='json'),
+    )
+
+
+@pytest.mark.django_db
+class TestDashboardReadings:
+    def test_checkin_is_provisional_until_the_photo_is_read(
+        self, user, tenant_user, ocr_tenant, reservation, temp_media_root, django_capture_on_commit_callbacks
+    ):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from django.test import Client
+        from apps.automation.jobs import run_inspection_analysis
+        from apps.contracts.models import InspectionAnalysis
+
+        reservation.status = 'checked_out'
+        reservation.checkout_mileage = 15000
+        reservation.save()
+        client = Client()
+        client.force_login(user)
+
+        with patch('apps.automation.tasks.process_inspection_analysis.delay') as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                response = client.post(f'/dashboard/reservations/{reservation.pk}/checkin/', {
+                    'dashboard_photo': SimpleUploadedFile('dash.jpg', b'dash-bytes', content_type='image/jpeg'),
+                })
+
+        assert response.status_code == 302
+        analysis = InspectionAnalysis.objects.get(analysis_type='dashboard_analysis')
+        delay.assert_called_once_with(analysis.pk)
+        report = analysis.condition_report
+        assert (report.report_type, report.mileage, report.mileage_source) == ('checkin', 15000, 'estimated')
+        reservation.refresh_from_db()
+        assert (reservation.status, reservation.checkin_mileage) == ('completed', 15000)
+
+        parser = MagicMock(last_cache_hit=False)
+        parser.parse.return_value = dashboard_reading(lights=['tire_pressure'])
+        with patch('apps.automation.ocr.parsers.DashboardParser', return_value=parser):
+            run_inspection_analysis(analysis.pk)
+
+        report.refresh_from_db()
+        assert (report.mileage, report.mileage_source) == (15320, 'dashboard')
+        assert (report.fuel_level, report.fuel_level_source) == ('3/4', 'dashboard')
+        assert [light['indicator'] for light in report.warning_lights] == ['tire_pressure']
+        assert report.reading_flags == []
+        reservation.refresh_from_db()
+        assert reservation.checkin_mileage == 15320
+        assert reservation.vehicle.mileage == 15320
+
+        response = client.get(f'/dashboard/reservations/{reservation.pk}/')
+        assert b'tire_pressure' in response.content
+
+    def test_entered_values_are_confirmed_or_flagged(self, ocr_tenant, reservation, temp_media_root):
+        from apps.automation.odometer import apply_dashboard_reading, record_dashboard_photo
+
+        with patch('apps.automation.tasks.process_inspection_analysis.delay'):
+            report, analysis = record_dashboard_photo(
+                reservation, 'checkout', ContentFile(b'dash', name='dash.jpg'), mileage=15005, fuel_level='full',
+            )
+        assert analysis is not None
+
+        report = apply_dashboard_reading(completed_dashboard_analysis(report, dashboard_reading(15008, fuel='full')))
+        assert (report.mileage, report.mileage_source, report.fuel_level_source) == (15008, 'dashboard', 'dashboard')
+
+        report.mileage, report.mileage_source = 15005, 'entered'
+        report.fuel_level_source = 'entered'
+        report.save()
+        report = apply_dashboard_reading(completed_dashboard_analysis(report, dashboard_reading(15900, fuel='1/4')))
+        assert (report.mileage, report.mileage_source, report.fuel_level) == (15005, 'entered', 'full')
+        assert len(report.reading_flags) == 2
+        reservation.refresh_from_db()
+        assert reservation.checkout_mileage == 15008
+
+    def test_implausible_readings_are_not_applied(self, reservation, temp_media_root):
+        from apps.automation.odometer import apply_dashboard_reading, record_dashboard_photo
+
+        report, analysis = record_dashboard_photo(reservation, 'checkout', ContentFile(b'dash', name='dash.jpg'))
+        # No inspection AI configured: the provisional values stay until read
+        assert analysis is None
+        assert (report.mileage, report.fuel_level, report.mileage_source) == (15000, 'full', 'estimated')
+
+        report = apply_dashboard_reading(completed_dashboard_analysis(report, dashboard_reading(14000)))
+        assert report.mileage_source == 'estimated'
+        assert 'below' in report.reading_flags[0]
+
+        report = apply_dashboard_reading(completed_dashboard_analysis(report, dashboard_reading(0, fuel=None)))
+        assert (report.mileage_source, report.fuel_level_source) == ('estimated', 'dashboard')
+        assert report.reading_flags == ['The odometer could not be read; the mileage is an estimate.']
+
+        reservation.status = 'checked_out'
+        reservation.checkout_mileage = 15000
+        reservation.save()
+        checkin, _ = record_dashboard_photo(reservation, 'checkin', ContentFile(b'dash', name='dash.jpg'))
+        assert checkin.fuel_level == '3/4'
+        checkin = apply_dashboard_reading(completed_dashboard_analysis(checkin, dashboard_reading(40000)))
+        assert checkin.mileage == 15000
+        checkin = apply_dashboard_reading(completed_dashboard_analysis(checkin, dashboard_reading(24500, unit='km')))
+        assert (checkin.mileage, checkin.mileage_source) == (15224, 'dashboard')
+
+
+@pytest.fixture
+def report_photos(photo):
+    from apps.contracts.models import ConditionReportPhoto
+
+    photos = [photo]
+    for location in ('back', 'driver_side', 'passenger_side'):
+        photos.append(ConditionReportPhoto.objects.create(
+            condition_report=photo.condition_report,
+            image=ContentFile(f'{location}-bytes'.encode(), name=f'{location}.jpg'),
+            location=location,
+        ))
+    return photos
+
+
+@pytest.mark.django_db
+class TestReportBatchAnalysis:
+    def _fake_model(self, delay=0.2):
+        import asyncio
+        from apps.automation.ocr.client import VisionResponse
+
+        state = {'in_flight': 0, 'peak': 0, 'calls': 0}
+
+        async def send(client, request):
+            state['calls'] += 1
+            state['in_flight'] += 1
+            state['peak'] = max(state['peak'], state['in_flight'])
+            await asyncio.sleep(delay)
+            state['in_flight'] -= 1
+            return VisionResponse(
+                content='{"damages": [], "overall_condition": "good", "confidence": 0.7}',
+                model=request.model, usage={}, raw_response={},
+            )
+
+        return send, state
+
+    def test_photos_run_concurrently_and_are_written_in_bulk(
+        self, ocr_tenant, report_photos, django_assert_max_num_queries
+    ):
+        import time
+        from django.core.cache import caches
+        from apps.automation.batch import enqueue_report_analysis, run_report_analysis
+
+        caches['ocr'].clear()
+        report = report_photos[0].condition_report
+        analyses = enqueue_report_analysis(report)
+        assert len(analyses) == 4
+
+        send, state = self._fake_model()
+        started = time.monotonic()
+        with patch('apps.automation.ocr.client.OpenRouterClient.send_vision_request_async', send):
+            with django_assert_max_num_queries(8):
+                run_report_analysis([a.pk for a in analyses])
+        elapsed = time.monotonic() - started
+
+        assert state['calls'] == 4
+        assert state['peak'] == 4
+        assert elapsed < 0.6
+        rows = list(report.analyses.all())
+        assert {a.status for a in rows} == {'completed'}
+        assert all(a.processing_time_ms >= 200 for a in rows)
+        flush_usage()
+        ocr_tenant.settings.refresh_from_db()
+        assert ocr_tenant.settings.ocr_requests_today == 4
+
+    def test_concurrency_is_capped_per_tenant(self, ocr_tenant, report_photos, settings):
+        from django.core.cache import caches
+        from apps.automation.batch import enqueue_report_analysis, run_report_analysis
+
+        caches['ocr'].clear()
+        settings.OCR_BATCH_CONCURRENCY = 2
+        analyses = enqueue_report_analysis(report_photos[0].condition_report)
+
+        send, state = self._fake_model(delay=0.05)
+        with patch('apps.automation.ocr.client.OpenRouterClient.send_vision_request_async', send):
+            run_report_analysis([a.pk for a in analyses])
+
+        assert state['calls'] == 4
+        assert state['peak'] == 2
+
+    def test_concurrency_cap_spans_reports(self, settings):
+        import asyncio
+        import threading
+        from apps.automation.batch import _analyze_all
+
+        settings.OCR_BATCH_CONCURRENCY = 2
+        state = {'in_flight': 0, 'peak': 0}
+        lock = threading.Lock()
+
+        async def call():
+            with lock:
+                state['in_flight'] += 1
+                state['peak'] = max(state['peak'], state['in_flight'])
+            await asyncio.sleep(0.05)
+            with lock:
+                state['in_flight'] -= 1
+
+        # Each report analysis runs its own event loop
+        workers = [
+            threading.Thread(target=asyncio.run, args=(_analyze_all('tenant', [call, call, call]),))
+            for _ in range(3)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        assert state['peak'] == 2
+
+    def test_damage_photos_can_be_packed(self, ocr_tenant, report_photos, settings):
+        import json
+        from django.core.cache import caches
+        from apps.automation.batch import enqueue_report_analysis, run_report_analysis
+        from apps.automation.ocr.client import VisionResponse
+
+        caches['ocr'].clear()
+        settings.OCR_DAMAGE_PACK_SIZE = 4
+        analyses = enqueue_report_analysis(report_photos[0].condition_report)
+
+        async def send(client, system_prompt, user_prompt, images, model=None, **kwargs):
+            return VisionResponse(
+                content=json.dumps({'photos': [
+                    {'photo': image['label'], 'overall_condition': 'good', 'confidence': 0.6}
+                    for image in images
+                ]}),
+                model=model, usage={}, raw_response={},
+            )
+
+        with patch('apps.automation.ocr.client.OpenRouterClient.send_multi_image_request_async',
+                   side_effect=send, autospec=True) as packed:
+            run_report_analysis([a.pk for a in analyses])
+
+        assert packed.call_count == 1
+        rows = list(report_photos[0].condition_report.analyses.all())
+        assert {(a.status, a.confidence) for a in rows} == {('completed', 0.6)}
+        flush_usage()
+        ocr_tenant.settings.refresh_from_db()
+        assert ocr_tenant.settings.ocr_requests_today == 1
+
+    def test_report_endpoint_queues_unanalysed_photos_once(
+        self, user, tenant_user, report_photos, django_capture_on_commit_callbacks
+    ):
+        from apps.automation.tasks import process_report_analysis
+
+        client = APIClient()
+        client.force_authenticate(user=user)
+        url = f'/api/automation/condition-reports/{report_photos[0].condition_report_id}/analyze/'
+
+        with patch.object(process_report_analysis, 'delay') as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                response = client.post(url)
+            assert response.status_code == 202
+            assert response.data['queued'] == 4
+            delay.assert_called_once_with(response.data['analysis_ids'])
+
+            assert client.post(url).data['queued'] == 0
+
+        response = client.get(url)
+        assert response.data['counts']['pending'] == 4
+        assert response.data['finished'] is False
+        assert response['Retry-After'] == '2'
+
+
+@pytest.fixture
+def checkin_report(photo):
+    from apps.contracts.models import ConditionReport, ConditionReportPhoto
+
+    checkout = photo.condition_report
+    ConditionReportPhoto.objects.create(
+        condition_report=checkout, image=ContentFile(b'back-before', name='back.jpg'), location='back',
+    )
+    report = ConditionReport.objects.create(
+        contract=checkout.contract, report_type='checkin', fuel_level='half', mileage=15400,
+        exterior_condition='fair', interior_condition='good',
+    )
+    for location in ('front', 'back', 'driver_side'):
+        ConditionReportPhoto.objects.create(
+            condition_report=report,
+            image=ContentFile(f'{location}-after'.encode(), name=f'{location}.jpg'),
+            location=location,
+        )
+    return report
+
+
+COMPARISON_ANSWERS = {
+    b'photo-bytes': {
+        'new_damages': [{
+            'type': 'dent', 'severity': 'moderate', 'location': {'zone': 'front', 'area': 'bumper'},
+            'description': 'New dent', 'confidence': 0.9, 'estimated_repair_cost': 250.0,
+        }],
+        'resolved_count': 1, 'summary': 'Dent on the bumper.', 'confidence': 0.85,
+    },
+    b'back-before': {
+        'new_damages': [{
+            'type': 'scratch', 'severity': 'minor', 'location': {'zone': 'back', 'area': 'trunk lid'},
+            'description': 'New scratch', 'confidence': 0.8, 'estimated_repair_cost': 100.5,
+        }],
+        'summary': 'Scratch on the trunk lid.', 'confidence': 0.8,
+    },
+}
+
+
+def fake_comparison_model(fail_on=()):
+    import asyncio
+    import json
+    from apps.automation.ocr.client import OpenRouterAPIError, VisionResponse
+
+    calls = []
+
+    async def send(client, system_prompt, user_prompt, images, model=None, **kwargs):
+        before = images[0]['data']
+        calls.append(before)
+        await asyncio.sleep(0.01)
+        if before in fail_on:
+            raise OpenRouterAPIError('upstream error', status_code=502)
+        return VisionResponse(
+            content=json.dumps(COMPARISON_ANSWERS[before]), model=model, usage={}, raw_response={},
+        )
+
+    return send, calls
+
+
+@pytest.mark.django_db
+class TestDamageComparisonPipeline:
+    def test_checkin_compares_matching_locations(
+        self, ocr_tenant, reservation, checkin_report, django_capture_on_commit_callbacks
+    ):
+        from decimal import Decimal
+        from django.core.cache import caches
+        from apps.automation.tasks import process_damage_comparison
+        from apps.contracts.models import DamageComparison
+
+        caches['ocr'].clear()
+        reservation.status = 'checked_out'
+        reservation.save()
+
+        send, calls = fake_comparison_model()
+        with patch.object(process_damage_comparison, 'delay', side_effect=process_damage_comparison), \
+                patch('apps.automation.ocr.client.OpenRouterClient.send_multi_image_request_async', send):
+            with django_capture_on_commit_callbacks(execute=True):
+                reservation.checkin(mileage=15400)
+
+        assert sorted(calls) == [b'back-before', b'photo-bytes']
+        comparison = DamageComparison.objects.get(checkin_report=checkin_report)
+        assert comparison.status == 'completed'
+        assert comparison.pairs_total == comparison.pairs_completed == 2
+        assert comparison.unmatched_locations == ['driver_side']
+        assert comparison.total_new_damage_count == 2
+        assert {d['photo_location'] for d in comparison.new_damages} == {'front', 'back'}
+        assert comparison.resolved_damages == [{'photo_location': 'front', 'count': 1}]
+        assert comparison.estimated_repair_cost == Decimal('350.50')
+        assert 'driver_side' in comparison.summary
+        flush_usage()
+        ocr_tenant.settings.refresh_from_db()
+        assert ocr_tenant.settings.ocr_requests_today == 2
+
+    def test_dashboard_photos_join_the_inspection_reports(
+        self, user, tenant_user, ocr_tenant, reservation, checkin_report, django_capture_on_commit_callbacks
+    ):
+        from django.core.cache import caches
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from django.test import Client
+        from apps.automation.tasks import process_damage_comparison
+        from apps.contracts.models import DamageComparison
+
+        caches['ocr'].clear()
+        contract = checkin_report.contract
+        checkout_report = contract.condition_reports.get(report_type='checkout')
+        client = Client()
+        client.force_login(user)
+
+        send, calls = fake_comparison_model()
+        with patch('apps.automation.tasks.process_inspection_analysis.delay'), \
+                patch.object(process_damage_comparison, 'delay', side_effect=process_damage_comparison), \
+                patch('apps.automation.ocr.client.OpenRouterClient.send_multi_image_request_async', send):
+            for step in ('checkout', 'checkin'):
+                with django_capture_on_commit_callbacks(execute=True):
+                    response = client.post(f'/dashboard/reservations/{reservation.pk}/{step}/', {
+                        'dashboard_photo': SimpleUploadedFile(
+                            f'{step}-dash.jpg', f'{step}-dash'.encode(), content_type='image/jpeg',
+                        ),
+                    })
+                assert response.status_code == 302
+
+        assert contract.condition_reports.count() == 2
+        assert checkout_report.photos.filter(location='dashboard').exists()
+        assert checkin_report.photos.filter(location='dashboard').exists()
+        comparison = DamageComparison.objects.get()
+        assert (comparison.checkout_report, comparison.checkin_report) == (checkout_report, checkin_report)
+        assert comparison.status == 'completed'
+        assert sorted(calls) == [b'back-before', b'photo-bytes']
+
+    def test_failed_pair_is_recorded_without_failing_comparison(self, ocr_tenant, photo, checkin_report):
+        from django.core.cache import caches
+        from apps.automation.comparisons import enqueue_damage_comparison, run_damage_comparison
+
+        caches['ocr'].clear()
+        comparison = enqueue_damage_comparison(photo.condition_report, checkin_report)
+        send, _ = fake_comparison_model(fail_on=(b'back-before',))
+        with patch('apps.automation.ocr.client.OpenRouterClient.send_multi_image_request_async', send):
+            comparison = run_damage_comparison(comparison.pk)
+
+        assert comparison.status == 'completed'
+        assert comparison.total_new_damage_count == 1
+        failed = [pair for pair in comparison.pair_results if pair['status'] == 'failed']
+        assert [pair['location'] for pair in failed] == ['back']
+        flush_usage()
+        ocr_tenant.settings.refresh_from_db()
+        assert ocr_tenant.settings.ocr_requests_today == 1
+
+    def test_checkin_without_inspection_ai_queues_nothing(self, ocr_tenant, reservation, checkin_report):
+        from apps.contracts.models import DamageComparison
+
+        ocr_tenant.plan = 'starter'
+        ocr_tenant.save()
+        reservation.status = 'checked_out'
+        reservation.save()
+
+        reservation.checkin()
+
+        assert not DamageComparison.objects.exists()
+
+    def test_compare_endpoint_reuses_comparison_and_reports_progress(
+        self, user, tenant_user, checkin_report, django_capture_on_commit_callbacks
+    ):
+        from apps.automation.tasks import process_damage_comparison
+
+        client = APIClient()
+        client.force_authenticate(user=user)
+        url = f'/api/automation/contracts/{checkin_report.contract_id}/compare/'
+
+        with patch.object(process_damage_comparison, 'delay') as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                response = client.post(url)
+            assert response.status_code == 202
+            assert client.post(url).data['comparison_id'] == response.data['comparison_id']
+        delay.assert_called_once_with(response.data['comparison_id'])
+
+        status_response = client.get(response.data['status_url'])
+        assert status_response.data['status'] == 'pending'
+        assert status_response.data['progress'] == 0.0
+        assert status_response['Retry-After'] == '2'
+
+
+@pytest.mark.django_db
+class TestOCRHealth:
+    def test_health_reports_breaker_and_counters_to_superusers(self, user, ocr_tenant):
+        from django.core.cache import caches
+        from apps.automation.integration.resilience import get_circuit_breaker, get_metrics
+
+        caches['ocr'].clear()
+        model = ocr_tenant.settings.openrouter_model
+        get_metrics().incr('retries', model)
+        breaker = get_circuit_breaker()
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure(model)
+
+        client = APIClient()
+        client.force_authenticate(user=user)
+        assert client.get('/api/automation/health/').status_code == 403
+
+        user.is_superuser = True
+        user.save()
+        response = client.get('/api/automation/health/')
+        assert response.status_code == 200
+        assert response.data['models'][model]['circuit']['state'] == 'open'
+        assert response.data['models'][model]['counters']['retries'] == 1
+        caches['ocr'].clear()
+
+    def test_tenant_client_is_resilient(self, ocr_tenant, settings):
+        from apps.automation.jobs import get_tenant_client
+
+        settings.OCR_RETRY_ATTEMPTS = 5
+        client = get_tenant_client(ocr_tenant)
+        assert client.retry.max_attempts == 5
+        assert client.breaker is not None
+
+
+@pytest.mark.django_db
+class TestTenantClientFactory:
+    def test_client_is_reused_and_key_decrypted_once(self, ocr_tenant):
+        from apps.automation.jobs import get_tenant_client
+        from apps.automation.ocr.utils import encryption
+
+        with patch.object(encryption, 'decrypt_api_key', wraps=encryption.decrypt_api_key) as decrypt:
+            first = get_tenant_client(ocr_tenant)
+            second = get_tenant_client(ocr_tenant)
+        assert first is second
+        assert first.api_key == 'sk-or-test-api-key'
+        assert decrypt.call_count == 1
+
+    def test_saving_settings_drops_the_cached_client(self, ocr_tenant):
+        from apps.automation.integration.clients import get_client_factory
+        from apps.automation.jobs import get_tenant_client
+
+        first = get_tenant_client(ocr_tenant)
+        tenant_settings = ocr_tenant.settings
+        tenant_settings.set_api_key('sk-or-rotated-key')
+        tenant_settings.openrouter_model = 'anthropic/claude-3-opus'
+        tenant_settings.save()
+
+        second = get_tenant_client(ocr_tenant)
+        assert second is not first
+        assert (second.api_key, second.model) == ('sk-or-rotated-key', 'anthropic/claude-3-opus')
+        assert len(get_client_factory()) == 1
+
+    def test_entries_expire_and_are_bounded(self, ocr_tenant):
+        from apps.automation.integration.clients import ClientFactory
+
+        now = [0.0]
+        factory = ClientFactory(max_size=1, ttl=60, clock=lambda: now[0])
+        tenant_settings = ocr_tenant.settings
+        client = factory.get(tenant_settings)
+        assert factory.get(tenant_settings) is client
+
+        now[0] = 61.0
+        assert factory.get(tenant_settings) is not client
+        assert (factory.hits, factory.misses) == (1, 2)
+
+        other = MagicMock(tenant_id=-1, openrouter_api_key_encrypted=b'other', openrouter_model='m')
+        factory.get(other)
+        assert len(factory) == 1
+
+    def test_key_check_uses_the_cached_client(self, user, tenant_user, ocr_tenant):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        with patch('apps.automation.ocr.client.OpenRouterClient.get_key_info',
+                   return_value={'label': 'fleet'}) as key_info:
+            response = client.post('/api/tenants/settings/test-api-key/', {}, format='json')
+        assert response.data['valid'] is True
+        assert response.data['label'] == 'fleet'
+        assert key_info.call_count == 1
+
+
+def call_row(tenant, **kwargs):
+    from django.utils import timezone
+
+    row = {
+        'model': 'anthropic/claude-3.5-sonnet', 'parser': 'InsuranceParser', 'outcome': 'ok',
+        'input_bytes': 1000, 'tokens_in': 1000, 'tokens_out': 100, 'cost_usd': None,
+        'latency_ms': 800.0, 'attempts': 1, 'error': '',
+        'tenant_id': tenant.pk, 'created_at': timezone.now().isoformat(),
+    }
+    row.update(kwargs)
+    return row
+
+
+@pytest.mark.django_db
+class TestOCRTelemetry:
+    def test_records_are_stored_and_rolled_up_hourly(self, ocr_tenant):
+        from decimal import Decimal
+        from apps.automation.integration.telemetry import write_call_records
+        from apps.automation.models import OCRCallRecord, OCRUsageBucket
+
+        write_call_records([
+            call_row(ocr_tenant),
+            call_row(ocr_tenant, latency_ms=9000.0, attempts=3),
+            call_row(ocr_tenant, outcome='error', tokens_in=None, tokens_out=None, error='HTTP 502'),
+            call_row(ocr_tenant, outcome='cached', tokens_in=None, tokens_out=None, latency_ms=None),
+        ])
+        write_call_records([call_row(ocr_tenant, cost_usd=0.01)])
+
+        assert OCRCallRecord.objects.filter(tenant=ocr_tenant).count() == 5
+        bucket = OCRUsageBucket.objects.get(tenant=ocr_tenant)
+        assert (bucket.calls, bucket.errors, bucket.cache_hits, bucket.retries) == (5, 1, 1, 2)
+        assert (bucket.tokens_in, bucket.tokens_out) == (3000, 300)
+        # Two calls priced from the table at $3/$15 per million tokens, one reported by the API
+        assert bucket.cost_usd == Decimal('0.019000')
+        assert sum(bucket.latency_histogram) == 4
+
+    def test_tenant_client_calls_are_recorded(self, ocr_tenant, settings):
+        from apps.automation.jobs import get_tenant_client
+        from apps.automation.models import OCRCallRecord
+        from apps.automation.ocr.parsers import LicenseParser
+        from apps.automation.ocr.testing import StubOpenRouterServer, canned_responder
+
+        with StubOpenRouterServer(responder=canned_responder) as stub:
+            settings.OPENROUTER_BASE_URL = stub.base_url
+            LicenseParser(get_tenant_client(ocr_tenant)).parse(b'license')
+
+        from apps.automation.ocr.prompts.license import LICENSE_OCR_SYSTEM_PROMPT
+        from apps.automation.ocr.testing import estimate_tokens
+
+        record = OCRCallRecord.objects.get(tenant=ocr_tenant)
+        assert (record.parser, record.outcome, record.tokens_in) == (
+            'LicenseParser', 'ok', 10 + estimate_tokens(LICENSE_OCR_SYSTEM_PROMPT),
+        )
+        assert record.cost_usd is not None
+
+    def test_cached_prompt_tokens_reach_the_usage_buckets(self, ocr_tenant, settings):
+        from apps.automation.jobs import get_tenant_client
+        from apps.automation.models import OCRUsageBucket
+        from apps.automation.ocr.parsers import InsuranceParser
+        from apps.automation.ocr.testing import StubOpenRouterServer, canned_responder
+
+        settings.OCR_RESULT_CACHE_TTL = 0
+        with StubOpenRouterServer(responder=canned_responder) as stub:
+            settings.OPENROUTER_BASE_URL = stub.base_url
+            InsuranceParser(get_tenant_client(ocr_tenant)).parse(b'first card')
+            InsuranceParser(get_tenant_client(ocr_tenant)).parse(b'second card')
+
+        bucket = OCRUsageBucket.objects.get(tenant=ocr_tenant)
+        assert bucket.calls == 2
+        assert bucket.tokens_cached == stub.cached_tokens > 0
+
+        settings.OCR_PROMPT_CACHE = False
+        with StubOpenRouterServer(responder=canned_responder) as stub:
+            settings.OPENROUTER_BASE_URL = stub.base_url
+            InsuranceParser(get_tenant_client(ocr_tenant)).parse(b'third card')
+            request_payload = stub.last_payload
+        assert isinstance(request_payload['messages'][0]['content'], str)
+
+    def test_records_are_shipped_to_celery(self, ocr_tenant, settings):
+        from apps.automation.integration.telemetry import get_call_recorder
+        from apps.automation.models import OCRCallRecord
+        from apps.automation.ocr.telemetry import CallRecord
+
+        settings.OCR_TELEMETRY_ASYNC_WRITES = True
+        with patch('apps.automation.tasks.store_ocr_call_records.delay') as delay:
+            get_call_recorder(ocr_tenant.pk)(CallRecord(model='m', parser='LicenseParser'))
+        [rows], _ = delay.call_args
+        assert rows[0]['tenant_id'] == ocr_tenant.pk
+        assert not OCRCallRecord.objects.exists()
+
+        settings.OCR_TELEMETRY_ENABLED = False
+        assert get_call_recorder(ocr_tenant.pk) is None
+
+    def test_usage_api_reports_spend_and_latency(self, user, tenant_user, ocr_tenant):
+        from apps.automation.integration.telemetry import write_call_records
+
+        write_call_records([call_row(ocr_tenant, latency_ms=400.0)] * 19 + [call_row(ocr_tenant, latency_ms=9000.0)])
+        client = APIClient()
+        client.force_authenticate(user=user)
+        response = client.get('/api/automation/usage/', {'days': 1})
+        assert response.status_code == 200
+        totals = response.data['totals']
+        assert (totals['calls'], totals['errors'], totals['p50_ms'], totals['p95_ms']) == (20, 0, 500, 500)
+        assert response.data['interval'] == 'hour'
+        assert response.data['models'][0]['model'] == 'anthropic/claude-3.5-sonnet'
+
+        tenant_user.role = 'staff'
+        tenant_user.save()
+        assert client.get('/api/automation/usage/').status_code == 403
+
+    def test_old_call_records_are_pruned(self, ocr_tenant):
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.automation.integration.telemetry import prune_call_records, write_call_records
+        from apps.automation.models import OCRCallRecord, OCRUsageBucket
+
+        old = (timezone.now() - timedelta(days=40)).isoformat()
+        write_call_records([call_row(ocr_tenant, created_at=old), call_row(ocr_tenant)])
+        assert prune_call_records() == 1
+        assert OCRCallRecord.objects.count() == 1
+        assert OCRUsageBucket.objects.count() == 2
+
+
+def license_customers(tenant, count):
+    from apps.customers.models import Customer
+
+    return [
+        Customer.objects.create(
+            tenant=tenant, first_name='', last_name=f'Backfill{index}', email=f'backfill{index}@example.com',
+            phone='555-0100', license_image_front=ContentFile(f'license-{index}'.encode(), name=f'license{index}.jpg'),
+        )
+        for index in range(count)
+    ]
+
+
+@pytest.mark.django_db
+class TestLicenseBackfill:
+    @pytest.fixture
+    def stub(self, ocr_tenant, settings, temp_media_root):
+        from apps.automation.ocr.testing import StubOpenRouterServer, canned_responder
+
+        settings.OCR_CASCADE_MODEL = ''
+        settings.OCR_RESULT_CACHE_TTL = 0
+        with StubOpenRouterServer(responder=canned_responder) as server:
+            settings.OPENROUTER_BASE_URL = server.base_url
+            yield server
+
+    def test_fills_empty_fields_and_resumes_from_checkpoint(self, ocr_tenant, stub):
+        from django.utils import timezone
+        from apps.automation.backfill import run_backfill_batch, run_license_backfill, start_license_backfill
+
+        customers = license_customers(ocr_tenant, 5)
+        already = customers[2]
+        already.license_ocr_parsed_at = timezone.now()
+        already.save()
+
+        backfill = start_license_backfill(ocr_tenant, batch_size=2, concurrency=2)
+        run_backfill_batch(backfill)
+        assert (backfill.processed, backfill.last_customer_id) == (2, customers[1].pk)
+
+        # A crash leaves the backfill running; starting again resumes it
+        assert start_license_backfill(ocr_tenant).pk == backfill.pk
+        backfill = run_license_backfill(backfill.pk)
+        assert (backfill.status, backfill.processed, backfill.applied) == ('completed', 4, 4)
+        assert stub.request_count == 4
+
+        customers[0].refresh_from_db()
+        assert customers[0].first_name == 'John'
+        assert customers[0].last_name == 'Backfill0'
+        assert customers[0].license_ocr_parsed_at is not None
+        already.refresh_from_db()
+        assert already.first_name == ''
+        flush_usage()
+        ocr_tenant.settings.refresh_from_db()
+        assert ocr_tenant.settings.ocr_requests_today == 4
+
+    def test_pauses_when_the_rate_limit_refuses(self, ocr_tenant, stub, settings):
+        from django.utils import timezone
+        from apps.automation.backfill import continue_license_backfill, start_license_backfill
+        from apps.automation.integration.rate_limit import reset_rate_limiter
+
+        limits = {'burst': 2, 'per_minute': 1, 'daily_cap': 100}
+        settings.OCR_RATE_LIMITS = {'default': limits, 'professional': limits}
+        license_customers(ocr_tenant, 3)
+        backfill = start_license_backfill(ocr_tenant, batch_size=10)
+
+        with patch('apps.automation.tasks.process_license_backfill.apply_async') as apply_async:
+            backfill = continue_license_backfill(backfill.pk)
+        assert (backfill.status, backfill.processed) == ('paused', 2)
+        assert backfill.resume_at > backfill.updated_at
+        apply_async.assert_called_once_with((backfill.pk,), eta=backfill.resume_at)
+
+        # The daily cap pauses it until midnight
+        flush_usage()
+        reset_rate_limiter()
+        limits['burst'], limits['daily_cap'] = 10, 2
+        with patch('apps.automation.tasks.process_license_backfill.apply_async'):
+            backfill = continue_license_backfill(backfill.pk)
+        assert backfill.status == 'paused'
+        assert timezone.localtime(backfill.resume_at).hour == 0
+        assert stub.request_count == 2
+
+    def test_only_the_lease_holder_runs(self, ocr_tenant, stub):
+        from datetime import timedelta
+        from django.core.management import CommandError, call_command
+        from django.utils import timezone
+        from apps.automation.backfill import (
+            BackfillInProgress,
+            continue_license_backfill,
+            run_license_backfill,
+            start_license_backfill,
+        )
+        from apps.automation.models import LicenseBackfill
+
+        license_customers(ocr_tenant, 2)
+        backfill = start_license_backfill(ocr_tenant)
+        assert LicenseBackfill.objects.get(pk=backfill.pk).take_lease(600)
+
+        with pytest.raises(BackfillInProgress):
+            run_license_backfill(backfill.pk)
+        with patch('apps.automation.tasks.process_license_backfill.apply_async') as apply_async:
+            assert continue_license_backfill(backfill.pk).processed == 0
+        apply_async.assert_not_called()
+        with pytest.raises(CommandError, match='another worker'):
+            call_command('backfill_license_ocr', '--tenant', ocr_tenant.slug)
+        assert stub.request_count == 0
+
+        # A crashed runner's lease expires and the backfill is taken over
+        LicenseBackfill.objects.filter(pk=backfill.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        backfill = run_license_backfill(backfill.pk)
+        assert (backfill.status, backfill.processed) == ('completed', 2)
+        assert LicenseBackfill.objects.get(pk=backfill.pk).lease_token == ''
+
+    def test_command_runs_and_queues_backfills(self, ocr_tenant, stub):
+        from io import StringIO
+        from django.core.management import call_command
+
+        license_customers(ocr_tenant, 2)
+        out = StringIO()
+        with patch('apps.automation.tasks.process_license_backfill.apply_async') as apply_async:
+            call_command('backfill_license_ocr', '--tenant', ocr_tenant.slug, '--queue', stdout=out)
+        apply_async.assert_called_once()
+        assert '2 customers to parse' in out.getvalue()
+
+        call_command('backfill_license_ocr', '--tenant', ocr_tenant.slug, stdout=out)
+        assert 'completed: 2 processed, 2 applied, 0 failed' in out.getvalue()
+        call_command('backfill_license_ocr', '--tenant', ocr_tenant.slug, '--status', stdout=out)
+        assert out.getvalue().count('completed: 2 processed') == 2
+
+
+@pytest.mark.django_db
+class TestOCRRateLimit:
+    def test_burst_is_refused_with_retry_after(self, user, tenant_user, ocr_tenant, settings):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        settings.OCR_RATE_LIMITS = {'default': {'burst': 2, 'per_minute': 6, 'daily_cap': 100}}
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        def upload():
+            image = SimpleUploadedFile('license.png', b'license-bytes', content_type='image/png')
+            return client.post('/api/automation/parse-license/', {'image': image}, format='multipart')
+
+        with patch('apps.automation.views.enqueue_ocr_job', return_value=make_job(ocr_tenant)):
+            statuses = [upload().status_code for _ in range(2)]
+            response = upload()
+
+        assert statuses == [202, 202]
+        assert response.status_code == 429
+        assert 1 <= int(response['Retry-After']) <= 10
+        assert 'Too many OCR requests' in response.data['error']
+
+    def test_daily_cap_follows_plan(self, ocr_tenant, settings):
+        settings.OCR_RATE_LIMITS = {
+            'default': {'burst': 100, 'per_minute': 100, 'daily_cap': 2},
+            'enterprise': {'burst': 100, 'per_minute': 100, 'daily_cap': None},
+        }
+        tenant_settings = ocr_tenant.settings
+        tenant_settings.increment_ocr_requests(2)
+        assert not tenant_settings.can_make_ocr_request()
+
+        ocr_tenant.plan = 'enterprise'
+        ocr_tenant.save()
+        assert tenant_settings.can_make_ocr_request()
+
+    def test_usage_reaches_database_only_on_flush(self, ocr_tenant):
+        from datetime import date
+        from apps.tenants.models import TenantSettings
+
+        ocr_tenant.settings.increment_ocr_requests()
+        TenantSettings.objects.get(tenant=ocr_tenant).increment_ocr_requests(2)
+        assert TenantSettings.objects.get(tenant=ocr_tenant).ocr_requests_today == 0
+
+        assert flush_usage() == 1
+        row = TenantSettings.objects.get(tenant=ocr_tenant)
+        assert (row.ocr_requests_today, row.ocr_requests_reset_at) == (3, date.today())
+        assert flush_usage() == 0
+
+    def test_missing_counter_is_seeded_from_database(self, ocr_tenant, ocr_rate_limiter):
+        from datetime import date
+        from apps.automation.integration.rate_limit import get_usage
+
+        tenant_settings = ocr_tenant.settings
+        tenant_settings.ocr_requests_today = 99
+        tenant_settings.ocr_requests_reset_at = date.today()
+        tenant_settings.save()
+
+        assert tenant_settings.can_make_ocr_request()
+        tenant_settings.increment_ocr_requests()
+        assert ocr_rate_limiter.usage(str(ocr_tenant.pk), date.today().isoformat()) == 100
+        assert get_usage(tenant_settings) == {'used': 100, 'daily_cap': 100, 'percent': 100}
+        assert not tenant_settings.can_make_ocr_request()
+
+
+def read_events(response):
+    """Decode a server-sent events response into (event, data) pairs."""
+    import json
+
+    events = []
+    for message in b''.join(response.streaming_content).decode().strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in message.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+@pytest.mark.django_db
+class TestStreamedLicenseParsing:
+    def test_fields_are_streamed_then_job_completes(self, user, tenant_user, ocr_tenant, temp_media_root):
+        import json
+        from django.core.cache import caches
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from apps.automation.models import OCRJob
+
+        caches['ocr'].clear()
+        content = json.dumps({
+            'first_name': 'JOHN', 'license_number': 'D1234567',
+            'address': {'street': '1 Main St', 'zip_code': '78701'}, 'confidence': 0.9,
+        })
+        chunks = [{'choices': [{'delta': {'content': content[i:i + 8]}}]} for i in range(0, len(content), 8)]
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        with patch('apps.automation.ocr.client.OpenRouterClient._stream_chunks', return_value=iter(chunks)):
+            response = client.post(
+                '/api/automation/parse-license/?stream=1',
+                {'image': SimpleUploadedFile('license.png', b'license-bytes', content_type='image/png')},
+                format='multipart',
+            )
+            assert response['Content-Type'] == 'text/event-stream'
+            events = read_events(response)
+
+        job = OCRJob.objects.get()
+        assert events[0] == ('job', {'job_id': job.pk, 'customer_id': None})
+        fields = [data['name'] for event, data in events if event == 'field']
+        assert fields == [
+            'first_name', 'license_number',
+            'address_street', 'address_city', 'address_state', 'address_zip', 'confidence',
+        ]
+        assert events[-1][0] == 'completed'
+        assert events[-1][1]['data']['address_zip'] == '78701'
+        job.refresh_from_db()
+        assert job.status == 'completed'
+        assert job.result['first_name'] == 'JOHN'
+        assert not job.image
+        flush_usage()
+        ocr_tenant.settings.refresh_from_db()
+        assert ocr_tenant.settings.ocr_requests_today == 1
+
+    def test_failure_is_reported_as_event(self, user, tenant_user, ocr_tenant, temp_media_root):
+        from django.core.cache import caches
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from apps.automation.models import OCRJob
+
+        caches['ocr'].clear()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        chunks = [{'choices': [{'delta': {'content': 'no json here'}}]}]
+
+        with patch('apps.automation.ocr.client.OpenRouterClient._stream_chunks', return_value=iter(chunks)):
+            response = client.post(
+                '/api/automation/parse-license/?stream=1',
+                {'image': SimpleUploadedFile('license.png', b'other-bytes', content_type='image/png')},
+                format='multipart',
+            )
+            events = read_events(response)
+
+        assert events[-1][0] == 'failed'
+        assert OCRJob.objects.get().status == 'failed'
+
+
+@pytest.mark.django_db
+class TestLicenseBarcodeFastPath:
+    AAMVA = (
+        '@\n\x1e\rANSI 636015080002DL00410280DLDAQ12345678\nDCSDOE\nDACJOHN\nDADROBERT\n'
+        'DBB05151985\nDBA01152028\nDAJTX\nDAK787010000\nDCGUSA\n\r'
+    )
+
+    @pytest.fixture
+    def license_customer(self, customer, temp_media_root):
+        customer.license_image_front.save('front.jpg', ContentFile(b'front-bytes'), save=False)
+        customer.license_image_back.save('back.jpg', ContentFile(b'back-bytes'), save=False)
+        customer.save()
+        return customer
+
+    def test_complete_barcode_skips_the_model(self, ocr_tenant, license_customer):
+        from django.core.cache import caches
+        from apps.automation.jobs import run_ocr_job
+        from apps.automation.ocr.barcode import BARCODE_MODEL
+
+        caches['ocr'].clear()
+        job = make_job(ocr_tenant, customer=license_customer, document_type='license')
+        with patch('apps.automation.ocr.barcode.decode_pdf417', return_value=self.AAMVA) as decode, \
+                patch('apps.automation.ocr.parsers.LicenseParser') as parser_class:
+            job = run_ocr_job(job.pk)
+
+        decode.assert_called_once_with(b'back-bytes')
+        parser_class.assert_not_called()
+        assert job.status == 'completed'
+        assert job.model_used == BARCODE_MODEL
+        assert job.result['license_number'] == '12345678'
+        assert job.result['address_zip'] == '78701'
+        flush_usage()
+        ocr_tenant.settings.refresh_from_db()
+        assert ocr_tenant.settings.ocr_requests_today == 0
+
+    def test_incomplete_barcode_is_merged_with_model_result(self, ocr_tenant, license_customer):
+        from django.core.cache import caches
+        from apps.automation.jobs import run_ocr_job
+        from apps.automation.ocr.schemas.license import LicenseOCRResponse
+
+        caches['ocr'].clear()
+        job = make_job(ocr_tenant, customer=license_customer, document_type='license')
+        parser = MagicMock(last_cache_hit=False, last_model=None, last_tier=None)
+        parser.parse.return_value = LicenseOCRResponse(
+            license_number='1234S678', first_name='JOHN', last_name='DOE', confidence=0.8,
+        )
+        partial = self.AAMVA.replace('DBA01152028\n', '')
+        with patch('apps.automation.ocr.barcode.decode_pdf417', return_value=partial), \
+                patch('apps.automation.ocr.parsers.LicenseParser', return_value=parser):
+            job = run_ocr_job(job.pk)
+
+        parser.parse.assert_called_once()
+        assert job.result['license_number'] == '12345678'
+        assert job.result['date_of_birth'] == '1985-05-15'
+        assert job.confidence == 0.8
+        assert job.model_used == ocr_tenant.settings.openrouter_model
+
+    def test_health_reports_share_served_by_barcode(self, user, ocr_tenant, license_customer):
+        from django.core.cache import caches
+        from apps.automation.jobs import run_ocr_job
+
+        caches['ocr'].clear()
+        parser = MagicMock(last_cache_hit=False, last_model=None, last_tier=None)
+        parser.parse.return_value = LicenseOCRResponse(first_name='JOHN')
+        with patch('apps.automation.ocr.barcode.decode_pdf417', side_effect=[self.AAMVA, None]), \
+                patch('apps.automation.ocr.parsers.LicenseParser', return_value=parser):
+            run_ocr_job(make_job(ocr_tenant, customer=license_customer, document_type='license').pk)
+            run_ocr_job(make_job(ocr_tenant, customer=license_customer, document_type='license').pk)
+
+        user.is_superuser = True
+        user.save()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        barcode = client.get('/api/automation/health/').data['license_barcode']
+        assert barcode == {
+            'parses': 2, 'barcode_served': 1, 'barcode_partial': 0, 'barcode_unreadable': 1,
+            'served_share': 0.5,
+        }
+        caches['ocr'].clear()
+
+
+@pytest.mark.django_db
+class TestDuplicateReuse:
+    def _upload(self, data, name='photo.jpg'):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        return SimpleUploadedFile(name, data, content_type='image/jpeg')
+
+    def test_near_duplicate_photos_reuse_completed_analyses(
+        self, photo, scene_jpeg, settings, django_capture_on_commit_callbacks
+    ):
+        from apps.automation.dedup import create_photo
+        from apps.automation.jobs import enqueue_inspection_analysis
+        from apps.automation.batch import enqueue_report_analysis
+        from apps.contracts.models import ConditionReportPhoto, InspectionAnalysis
+
+        report = photo.condition_report
+        scope = {'condition_report': report, 'location': 'front'}
+        original = create_photo(ConditionReportPhoto, self._upload(scene_jpeg()), scope)
+        InspectionAnalysis.objects.create(
+            condition_report=report, photo=original, analysis_type='damage_detection', status='completed',
+            result={'overall_condition': 'fair'}, confidence=0.7, model_used='m',
+        )
+        resent = create_photo(ConditionReportPhoto, self._upload(scene_jpeg(quality=60)), scope)
+        assert resent.duplicate_of == original
+
+        with patch('apps.automation.tasks.process_inspection_analysis.delay') as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                analysis = enqueue_inspection_analysis(resent)
+        delay.assert_not_called()
+        assert (analysis.status, analysis.result, analysis.model_used) == ('completed', {'overall_condition': 'fair'}, 'm')
+
+        # In a batch only the photo without a near-duplicate is queued
+        another = create_photo(ConditionReportPhoto, self._upload(scene_jpeg(size=(800, 533))), scope)
+        with patch('apps.automation.tasks.process_report_analysis.delay') as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                analyses = enqueue_report_analysis(report)
+        assert {a.photo_id: a.status for a in analyses} == {photo.pk: 'pending', another.pk: 'completed'}
+        [pending] = [a for a in analyses if a.status == 'pending']
+        delay.assert_called_once_with([pending.pk])
+
+        settings.PHOTO_DUPLICATE_REUSE_RESULTS = False
+        again = create_photo(ConditionReportPhoto, self._upload(scene_jpeg(quality=50)), scope)
+        with patch('apps.automation.tasks.process_inspection_analysis.delay'):
+            assert enqueue_inspection_analysis(again).status == 'pending'
+
+    def test_condition_photos_keep_their_files_and_locations(self, photo, scene_jpeg, settings):
+        from apps.automation.dedup import create_photo
+        from apps.contracts.models import ConditionReportPhoto
+
+        settings.PHOTO_DUPLICATE_POLICY = 'link'
+        report = photo.condition_report
+        left = create_photo(
+            ConditionReportPhoto, self._upload(scene_jpeg()), {'condition_report': report, 'location': 'driver_side'}
+        )
+        right = create_photo(
+            ConditionReportPhoto, self._upload(scene_jpeg(quality=60)),
+            {'condition_report': report, 'location': 'passenger_side'},
+        )
+        assert right.duplicate_of is None
+        assert right.image.name != left.image.name
+
+        # Even under 'link', a resent condition photo is stored as uploaded
+        resent = create_photo(
+            ConditionReportPhoto, self._upload(scene_jpeg(quality=70)),
+            {'condition_report': report, 'location': 'driver_side'},
+        )
+        assert resent.duplicate_of == left
+        assert resent.image.name != left.image.name
+
+    def test_customer_document_reuses_earlier_job(self, ocr_tenant, customer, temp_media_root, scene_jpeg):
+        from apps.automation.jobs import create_ocr_job, run_ocr_job
+
+        parser = MagicMock(last_cache_hit=False, last_model=None, last_tier=None)
+        parser.parse.return_value = InsuranceOCRResponse(company_name='State Farm', confidence=0.9)
+        with patch('apps.automation.ocr.parsers.InsuranceParser', return_value=parser):
+            first = create_ocr_job(ocr_tenant, 'insurance', image_file=self._upload(scene_jpeg()), customer=customer)
+            assert first.image_phash
+            first = run_ocr_job(first.pk)
+            resent = run_ocr_job(create_ocr_job(
+                ocr_tenant, 'insurance', image_file=self._upload(scene_jpeg(size=(600, 400))), customer=customer,
+            ).pk)
+            other = run_ocr_job(create_ocr_job(
+                ocr_tenant, 'insurance', image_file=self._upload(scene_jpeg(variant=1)), customer=customer,
+            ).pk)
+
+        assert parser.parse.call_count == 2
+        assert resent.status == 'completed'
+        assert resent.duplicate_of == first
+        assert resent.result == first.result
+        assert other.duplicate_of is None
+        assert not resent.image
+        flush_usage()
+        ocr_tenant.settings.refresh_from_db()
+        assert ocr_tenant.settings.ocr_requests_today == 2
+
+
+@pytest.mark.django_db(transaction=True)
+class TestLoadTestCommand:
+    def test_runs_every_scenario_against_the_stub_and_cleans_up(self, ocr_tenant, tenant_user, reservation,
+                                                                temp_media_root):
+        from io import StringIO
+        from django.core.management import call_command
+        from apps.automation.models import OCRJob
+        from apps.contracts.models import ConditionReport, Contract
+
+        Contract.objects.create(tenant=ocr_tenant, reservation=reservation)
+        out = StringIO()
+        call_command(
+            'load_test_ocr', tenant=ocr_tenant.slug, requests=3, concurrency=1, photos=2,
+            latency=0, latency_jitter=0, stdout=out,
+        )
+
+        output = out.getvalue()
+        for scenario in ('license', 'batch', 'comparison'):
+            line = next(line for line in output.splitlines() if line.strip().startswith(f'{scenario}:'))
+            assert 'p50' in line and 'p99' in line
+        assert output.count('    3 ok') == 3
+        assert not ConditionReport.objects.exists()
+        assert not OCRJob.objects.exists()
+
+    def test_percentile_uses_nearest_rank(self):
+        from apps.automation.management.commands.load_test_ocr import percentile
+
+        values = list(range(1, 101))
+        assert percentile(values, 0.5) == 50
+        assert percentile(values, 0.99) == 99
+        assert percentile([7], 0.95) == 7
+        assert percentile([], 0.5) is None
@@ -0,0 +1,161 @@
+"""Tests for keyset (cursor) pagination."""
+import pytest
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+
+def create_logs(tenant, user, count):
+    from apps.tenants.models import ActivityLog
+    return [
+        ActivityLog.objects.create(
+            tenant=tenant, user=user, action='create',
+            model_name='Vehicle', object_id=i, object_repr=f'Vehicle {i}',
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.mark.django_db
+class TestKeysetPaginator:
+    def test_walks_all_rows_forward_without_duplicates(self, tenant, user):
+        from apps.tenants.models import ActivityLog
+        from apps.tenants.pagination import KeysetPaginator
+
+        create_logs(tenant, user, 7)
+        paginator = KeysetPaginator(
+            ActivityLog.objects.filter(tenant=tenant), 3, ordering=('-timestamp', '-id')
+        )
+
+        seen = []
+        page = paginator.get_page()
+        assert not page.has_previous()
+        while True:
+            seen.extend(log.pk for log in page)
+            if not page.has_next():
+                break
+            page = paginator.get_page(page.next_cursor)
+
+        expected = list(
+            ActivityLog.objects.filter(tenant=tenant).order_by('-timestamp', '-id').values_list('pk', flat=True)
+        )
+        assert seen == expected
+
+    def test_previous_cursor_returns_prior_page(self, tenant, user):
+        from apps.tenants.models import ActivityLog
+        from apps.tenants.pagination import KeysetPaginator
+
+        create_logs(tenant, user, 5)
+        paginator = KeysetPaginator(
+            ActivityLog.objects.filter(tenant=tenant), 2, ordering=('-timestamp', '-id')
+        )
+
+        first = paginator.get_page()
+        second = paginator.get_page(first.next_cursor)
+        back = paginator.get_page(second.previous_cursor)
+
+        assert [log.pk for log in back] == [log.pk for log in first]
+        assert back.has_next()
+        assert not back.has_previous()
+
+    def test_invalid_cursor_falls_back_to_first_page(self, tenant, user):
+        from apps.tenants.models import ActivityLog
+        from apps.tenants.pagination import KeysetPaginator
+
+        create_logs(tenant, user, 3)
+        paginator = KeysetPaginator(
+            ActivityLog.objects.filter(tenant=tenant), 2, ordering=('-timestamp', '-id')
+        )
+
+        page = paginator.get_page('not-a-cursor')
+        assert len(page) == 2
+        assert not page.has_previous()
+
+    def test_mixed_direction_ordering(self, tenant):
+        from apps.customers.models import Customer
+        from apps.tenants.pagination import KeysetPaginator
+
+        for i, last_name in enumerate(['Adams', 'Adams', 'Baker', 'Clark']):
+            Customer.objects.create(
+                tenant=tenant, first_name=f'First{i}', last_name=last_name,
+                email=f'c{i}@example.com', phone='555-0000',
+            )
+
+        paginator = KeysetPaginator(
+            Customer.objects.filter(tenant=tenant), 1, ordering=('last_name', 'first_name', 'id')
+        )
+        names = []
+        page = paginator.get_page()
+        while True:
+            names.extend((c.last_name, c.first_name) for c in page)
+            if not page.has_next():
+                break
+            page = paginator.get_page(page.next_cursor)
+
+        assert names == sorted(names)
+        assert len(names) == 4
+
+
+class TestTenantDayRange:
+    def test_range_is_half_open_in_tenant_timezone(self):
+        from types import SimpleNamespace
+        from apps.tenants.utils import get_tenant_day_range
+
+        tenant = SimpleNamespace(timezone='America/Chicago')
+        start, end = get_tenant_day_range(tenant, '2025-03-01', '2025-03-02')
+
+        tz = ZoneInfo('America/Chicago')
+        assert start == datetime(2025, 3, 1, tzinfo=tz)
+        assert end == datetime(2025, 3, 3, tzinfo=tz)
+
+    def test_invalid_dates_are_ignored(self):
+        from types import SimpleNamespace
+        from apps.tenants.utils import get_tenant_day_range
+
+        tenant = SimpleNamespace(timezone='America/Chicago')
+        assert get_tenant_day_range(tenant, 'garbage', '') == (None, None)
+
+
+@pytest.mark.django_db
+class TestActivityLogView:
+    def test_activity_log_uses_cursor_links(self, client, tenant_user):
+        create_logs(tenant_user.tenant, tenant_user.user, 55)
+        client.force_login(tenant_user.user)
+
+        response = client.get('/dashboard/activity/')
+        assert response.status_code == 200
+        page = response.context['logs']
+        assert len(page) == 50
+        assert page.has_next()
+
+        response = client.get('/dashboard/activity/', {'cursor': page.next_cursor})
+        assert response.status_code == 200
+        assert len(response.context['logs']) == 5
+
+    def test_activity_log_date_filter(self, client, tenant_user):
+        from apps.tenants.models import ActivityLog
+
+        logs = create_logs(tenant_user.tenant, tenant_user.user, 2)
+        old = datetime(2024, 1, 10, 12, tzinfo=ZoneInfo('America/Chicago'))
+        ActivityLog.objects.filter(pk=logs[0].pk).update(timestamp=old)
+
+        client.force_login(tenant_user.user)
+        response = client.get('/dashboard/activity/', {'date_from': '2024-01-10', 'date_to': '2024-01-10'})
+
+        assert [log.pk for log in response.context['logs']] == [logs[0].pk]
+
+
+@pytest.mark.django_db
+class TestOptionalCursorPagination:
+    def test_page_number_pagination_by_default(self, tenant_client, customer):
+        client, tenant = tenant_client
+        response = client.get('/api/customers/')
+        assert response.status_code == 200
+        assert response.data['count'] == 1
+
+    def test_cursor_pagination_on_request(self, tenant_client, customer):
+        client, tenant = tenant_client
+        response = client.get('/api/customers/', {'cursor': ''})
+        assert response.status_code == 200
+        assert 'count' not in response.data
+        assert len(response.data['results']) == 1
+        assert response.data['next'] is None
@@ -123,6 +123,28 @@ class TestPlatformSettings:
         assert response.status_code in [200, 302]
 
 
+class TestOCRUsage:
+    """Tests for the platform OCR usage page."""
+
+    def test_usage_page_lists_tenant_spend(self, client, superuser, platform_tenant):
+        from django.utils import timezone
+        from apps.automation.models import OCRUsageBucket
+
+        OCRUsageBucket.objects.create(
+            tenant=platform_tenant, hour=timezone.now().replace(minute=0, second=0, microsecond=0),
+            parser='LicenseParser', model='anthropic/claude-3.5-sonnet', calls=3, cost_usd='0.120000',
+        )
+        client.force_login(superuser)
+        response = client.get('/admin-platform/ocr-usage/')
+        assert response.status_code == 200
+        assert response.context['top_tenants'][0]['tenant_id'] == platform_tenant.pk
+        assert platform_tenant.name.encode() in response.content
+
+    def test_regular_user_cannot_access_usage(self, client, regular_user):
+        client.force_login(regular_user)
+        response = client.get('/admin-platform/ocr-usage/')
+        assert response.status_code in [302, 403]
+
 class TestImpersonation:
     """Tests for user impersonation functionality."""
 
@@ -76,6 +76,24 @@ class TestPublicLandingPage:
         content = response.content.decode()
         assert 'Honda' in content or 'Accord' in content
 
+    def test_landing_page_serves_photo_derivatives(self, client, public_tenant, scene_jpeg):
+        from django.core.files.base import ContentFile
+        from apps.fleet.models import Vehicle, VehiclePhoto
+
+        vehicle = Vehicle.objects.create(
+            tenant=public_tenant, make='Honda', model='Civic', year=2024,
+            license_plate='PIC123', status='available', daily_rate=45.00,
+        )
+        photo = VehiclePhoto.objects.create(
+            vehicle=vehicle, image=ContentFile(scene_jpeg(), name='car.jpg'), is_primary=True
+        )
+        response = client.get('/public/', HTTP_HOST=f'{public_tenant.slug}.localhost')
+        content = response.content.decode()
+        card = photo.derivatives['image']['sizes']['card']
+        assert '<source type="image/webp"' in content
+        assert f'/media/{card["image/jpeg"]}' in content
+        assert f'/media/{card["image/webp"]} 800w' in content
+
 
 class TestVehicleGallery:
     """Tests for public vehicle gallery."""
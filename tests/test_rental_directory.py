@@ -0,0 +1,211 @@
+"""Tests for the public rental directory index."""
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+def make_tenant(owner, slug, business_name, address=''):
+    from apps.tenants.models import Tenant
+    return Tenant.objects.create(
+        name=slug.title(), slug=slug, owner=owner, business_name=business_name,
+        business_email=f'{slug}@example.com', business_address=address,
+    )
+
+
+def make_vehicle(tenant, plate, status='available'):
+    from apps.fleet.models import Vehicle
+    return Vehicle.objects.create(
+        tenant=tenant, make='Toyota', model='Corolla', year=2023,
+        license_plate=plate, vin=f'VIN{plate}', color='Blue',
+        status=status, daily_rate=Decimal('40.00'), mileage=1000,
+    )
+
+
+def book(vehicle, start, end, status='confirmed'):
+    from apps.customers.models import Customer
+    from apps.reservations.models import Reservation
+    customer = Customer.objects.create(
+        tenant=vehicle.tenant, first_name='Jane', last_name='Roe',
+        email=f'jane{vehicle.pk}@example.com', phone='555-0100',
+    )
+    return Reservation.objects.create(
+        tenant=vehicle.tenant, vehicle=vehicle, customer=customer,
+        start_date=start, end_date=end, status=status, daily_rate=Decimal('40.00'),
+    )
+
+
+class TestNormalizeTokens:
+    def test_lowercases_strips_accents_and_dedupes(self):
+        from apps.marketing.directory import normalize_tokens
+        assert normalize_tokens('São Paulo Rentals', 'sao-paulo') == ['sao', 'paulo', 'rentals']
+
+
+@pytest.fixture
+def refresh_on_commit(django_capture_on_commit_callbacks):
+    """Run directory refreshes queued with on_commit as each step commits."""
+    from contextlib import contextmanager
+
+    @contextmanager
+    def step():
+        with django_capture_on_commit_callbacks(execute=True):
+            yield
+
+    return step
+
+
+@pytest.mark.django_db
+class TestDirectoryIndex:
+    def test_entry_tracks_tenant_and_fleet_changes(self, user, refresh_on_commit):
+        from apps.marketing.models import RentalDirectoryEntry
+
+        with refresh_on_commit():
+            tenant = make_tenant(user, 'austin-cars', 'Austin Cars', '12 Main St\nAustin, TX 78701')
+        entry = RentalDirectoryEntry.objects.get(tenant=tenant)
+        assert entry.vehicle_count == 0
+        assert ' austin ' in entry.search_text and ' 78701 ' in entry.search_text
+
+        with refresh_on_commit():
+            vehicle = make_vehicle(tenant, 'AUS1')
+        assert RentalDirectoryEntry.objects.get(tenant=tenant).vehicle_count == 1
+
+        with refresh_on_commit():
+            vehicle.delete()
+        assert RentalDirectoryEntry.objects.get(tenant=tenant).vehicle_count == 0
+
+        with refresh_on_commit():
+            tenant.is_active = False
+            tenant.save()
+        assert not RentalDirectoryEntry.objects.get(tenant=tenant).is_listed
+
+    def test_refresh_waits_for_commit(self, user, refresh_on_commit):
+        from apps.marketing.models import RentalDirectoryEntry
+
+        with refresh_on_commit():
+            tenant = make_tenant(user, 'waiting', 'Waiting Rentals')
+        make_vehicle(tenant, 'WAIT1')
+        assert RentalDirectoryEntry.objects.get(tenant=tenant).vehicle_count == 0
+
+    def test_migrate_indexes_existing_tenants(self, user, refresh_on_commit):
+        from django.apps import apps
+        from django.db.models.signals import post_migrate
+        from apps.marketing.models import RentalDirectoryEntry
+
+        # Created outside on_commit capture, as before the directory existed
+        tenant = make_tenant(user, 'legacy', 'Legacy Rentals')
+        make_vehicle(tenant, 'LEG1')
+        assert not RentalDirectoryEntry.objects.filter(tenant=tenant).exists()
+
+        marketing = apps.get_app_config('marketing')
+        post_migrate.send(sender=marketing, app_config=marketing, using='default')
+
+        assert RentalDirectoryEntry.objects.get(tenant=tenant).vehicle_count == 1
+
+    def test_deleting_tenant_with_fleet_and_bookings(self, user, refresh_on_commit):
+        from apps.marketing.models import RentalDirectoryAvailability, RentalDirectoryEntry
+        from apps.tenants.models import Tenant
+
+        with refresh_on_commit():
+            tenant = make_tenant(user, 'closing', 'Closing Rentals')
+            start = date.today() + timedelta(days=1)
+            book(make_vehicle(tenant, 'CLS1'), start, start + timedelta(days=3))
+            make_vehicle(tenant, 'CLS2')
+        assert RentalDirectoryAvailability.objects.filter(entry_id=tenant.pk).exists()
+
+        # Bookings protect their vehicle, so they go first, in the same transaction
+        with refresh_on_commit(), transaction.atomic():
+            tenant.reservation_set.all().delete()
+            tenant.delete()
+
+        assert not Tenant.objects.filter(pk=tenant.pk).exists()
+        assert not RentalDirectoryEntry.objects.filter(tenant_id=tenant.pk).exists()
+        assert not RentalDirectoryAvailability.objects.filter(entry_id=tenant.pk).exists()
+
+    def test_availability_counts_blocking_reservations(self, user, refresh_on_commit):
+        from apps.marketing.models import RentalDirectoryAvailability
+
+        with refresh_on_commit():
+            tenant = make_tenant(user, 'dallas-cars', 'Dallas Cars')
+            first = make_vehicle(tenant, 'DAL1')
+            make_vehicle(tenant, 'DAL2')
+            make_vehicle(tenant, 'DAL3', status='maintenance')
+            start = date.today() + timedelta(days=2)
+            book(first, start, start + timedelta(days=2))
+
+        counts = dict(
+            RentalDirectoryAvailability.objects.filter(entry_id=tenant.pk)
+            .values_list('date', 'available_count')
+        )
+        assert counts[start - timedelta(days=1)] == 2
+        assert counts[start] == 1
+        assert counts[start + timedelta(days=1)] == 1
+        # Return day is free again, matching Reservation.has_conflict
+        assert counts[start + timedelta(days=2)] == 2
+
+    def test_async_refresh_waits_for_commit(self, user, settings, django_capture_on_commit_callbacks):
+        from unittest.mock import patch
+        from apps.marketing.models import RentalDirectoryEntry
+
+        settings.RENTAL_DIRECTORY_ASYNC_REFRESH = True
+        with patch('apps.marketing.tasks.refresh_rental_directory.delay') as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                tenant = make_tenant(user, 'queued', 'Queued Rentals')
+            delay.assert_called_once_with([tenant.pk])
+        assert not RentalDirectoryEntry.objects.filter(tenant=tenant).exists()
+
+
+@pytest.mark.django_db
+class TestRentalSearchView:
+    def test_search_filters_by_availability(self, client, user, refresh_on_commit):
+        pickup = date.today() + timedelta(days=5)
+        with refresh_on_commit():
+            busy = make_tenant(user, 'busy-austin', 'Busy Austin Rentals')
+            free = make_tenant(user, 'free-austin', 'Free Austin Rentals')
+            book(make_vehicle(busy, 'BUSY1'), pickup, pickup + timedelta(days=3))
+            make_vehicle(free, 'FREE1')
+
+        response = client.get(reverse('marketing:rental-search'), {
+            'location': 'austin',
+            'pickup_date': pickup.isoformat(),
+            'return_date': (pickup + timedelta(days=2)).isoformat(),
+        })
+
+        entries = list(response.context['tenants'])
+        assert [e.tenant_id for e in entries] == [free.pk]
+        assert entries[0].available_count == 1
+
+        response = client.get(reverse('marketing:rental-search'), {'location': 'austin'})
+        assert {e.tenant_id for e in response.context['tenants']} == {busy.pk, free.pk}
+
+    def test_location_tokens_match_word_prefixes(self, client, user, refresh_on_commit):
+        with refresh_on_commit():
+            tenant = make_tenant(user, 'hill-country', 'Hill Country Cars', 'Fredericksburg, TX')
+
+        response = client.get(reverse('marketing:rental-search'), {'location': 'Fredericks'})
+        assert [e.tenant_id for e in response.context['tenants']] == [tenant.pk]
+
+        response = client.get(reverse('marketing:rental-search'), {'location': 'ericksburg'})
+        assert list(response.context['tenants']) == []
+
+    def test_query_count_does_not_grow_with_tenants(self, client, user, refresh_on_commit):
+        url = reverse('marketing:rental-search')
+        params = {'location': 'rentals', 'pickup_date': (date.today() + timedelta(days=1)).isoformat()}
+
+        with refresh_on_commit():
+            tenant = make_tenant(user, 'one', 'One Rentals')
+            make_vehicle(tenant, 'ONE1')
+        with CaptureQueriesContext(connection) as few:
+            client.get(url, params)
+
+        with refresh_on_commit():
+            for i in range(5):
+                other = make_tenant(user, f'more-{i}', f'More {i} Rentals')
+                make_vehicle(other, f'MORE{i}')
+        with CaptureQueriesContext(connection) as many:
+            response = client.get(url, params)
+
+        assert len(response.context['tenants']) == 6
+        assert len(many) == len(few)
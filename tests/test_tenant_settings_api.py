@@ -184,7 +184,7 @@ class TestTenantSettingsAPI:
 
 @pytest.mark.django_db
 class TestAPIKeyValidation:
-    @patch('apps.tenants.views.httpx.Client')
+    @patch('apps.automation.ocr.client.httpx.Client')
     def test_test_api_key_valid(self, mock_client_class, authenticated_api_client, tenant, settings):
         settings.FIELD_ENCRYPTION_KEY = 'test-key-for-settings-api'
         reset_encryption_key_cache()
@@ -216,13 +216,14 @@ class TestAPIKeyValidation:
         assert data['valid'] is True
         assert data['label'] == 'Test Key'
 
-    @patch('apps.tenants.views.httpx.Client')
+    @patch('apps.automation.ocr.client.httpx.Client')
     def test_test_api_key_invalid(self, mock_client_class, authenticated_api_client, tenant, settings):
         settings.FIELD_ENCRYPTION_KEY = 'test-key-for-settings-api'
         reset_encryption_key_cache()
 
         mock_response = Mock()
         mock_response.status_code = 401
+        mock_response.headers = {}
 
         mock_client = Mock()
         mock_client.get.return_value = mock_response
@@ -256,7 +257,7 @@ class TestAPIKeyValidation:
         assert data['valid'] is False
         assert 'no api key' in data['error'].lower()
 
-    @patch('apps.tenants.views.httpx.Client')
+    @patch('apps.automation.ocr.client.httpx.Client')
     def test_test_api_key_uses_stored_key(self, mock_client_class, authenticated_api_client, tenant, settings):
         settings.FIELD_ENCRYPTION_KEY = 'test-key-for-settings-api'
         reset_encryption_key_cache()
@@ -287,7 +288,7 @@ class TestAPIKeyValidation:
         call_args = mock_client.get.call_args
         assert 'Bearer sk-or-stored-key' in str(call_args)
 
-    @patch('apps.tenants.views.httpx.Client')
+    @patch('apps.automation.ocr.client.httpx.Client')
     def test_test_api_key_timeout(self, mock_client_class, authenticated_api_client, tenant, settings):
         import httpx
         settings.FIELD_ENCRYPTION_KEY = 'test-key-for-settings-api'
@@ -0,0 +1,113 @@
+"""Tests for precomputed tenant usage snapshots."""
+import pytest
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+@pytest.fixture
+def superuser(db):
+    return User.objects.create_superuser(email='admin@fleetflow.com', password='adminpass123')
+
+
+@pytest.mark.django_db
+class TestRefreshUsageSnapshots:
+    def test_counts_revenue_and_activity(self, tenant_user, reservation):
+        from apps.platform_admin.models import TenantUsageSnapshot
+        from apps.platform_admin.usage import refresh_usage_snapshots
+        from apps.tenants.models import log_activity
+
+        tenant = tenant_user.tenant
+        log = log_activity(tenant, tenant_user.user, 'create', reservation)
+
+        assert refresh_usage_snapshots() == 1
+
+        snapshot = TenantUsageSnapshot.objects.get(tenant=tenant)
+        assert snapshot.user_count == 1
+        assert snapshot.vehicle_count == 1
+        assert snapshot.customer_count == 1
+        assert snapshot.reservation_count == 1
+        assert snapshot.reservations_this_month == 1
+        assert snapshot.mrr == Decimal(tenant.get_base_price())
+        assert snapshot.rental_fees_this_month == tenant.rental_fee
+        assert snapshot.last_activity_at == log.timestamp
+
+    def test_refresh_updates_existing_rows(self, tenant, vehicle):
+        from apps.platform_admin.models import TenantUsageSnapshot
+        from apps.platform_admin.usage import refresh_usage_snapshots
+
+        refresh_usage_snapshots()
+        vehicle.delete()
+        refresh_usage_snapshots([tenant.pk])
+
+        assert TenantUsageSnapshot.objects.get(tenant=tenant).vehicle_count == 0
+        assert TenantUsageSnapshot.objects.count() == 1
+
+    def test_trialing_and_suspended_tenants_have_no_mrr(self, tenant):
+        from apps.platform_admin.usage import get_monthly_recurring_revenue
+
+        tenant.subscription_status = 'trialing'
+        assert get_monthly_recurring_revenue(tenant) == 0
+        tenant.subscription_status = 'active'
+        tenant.is_active = False
+        assert get_monthly_recurring_revenue(tenant) == 0
+
+    def test_cancelled_reservations_accrue_no_fee(self, tenant, reservation):
+        from apps.platform_admin.models import TenantUsageSnapshot
+        from apps.platform_admin.usage import refresh_usage_snapshots
+
+        reservation.status = 'cancelled'
+        reservation.save(update_fields=['status'])
+        refresh_usage_snapshots()
+
+        snapshot = TenantUsageSnapshot.objects.get(tenant=tenant)
+        assert snapshot.reservation_count == 1
+        assert snapshot.rental_fees_this_month == 0
+
+
+@pytest.mark.django_db
+class TestPlatformPagesUseSnapshots:
+    def test_tenant_list_sorts_by_snapshot_column(self, client, superuser, tenant, vehicle):
+        from apps.platform_admin.usage import refresh_usage_snapshots
+        from apps.tenants.models import Tenant
+
+        empty = Tenant.objects.create(
+            name='Empty', slug='empty', owner=superuser, business_name='Empty',
+            business_email='empty@example.com',
+        )
+        refresh_usage_snapshots()
+        client.force_login(superuser)
+
+        response = client.get('/admin-platform/tenants/', {'sort': '-vehicles'})
+        assert [t.pk for t in response.context['tenants']] == [tenant.pk, empty.pk]
+        assert response.context['tenants'][0].vehicle_count == 1
+
+        response = client.get('/admin-platform/tenants/', {'sort': 'vehicles'})
+        assert [t.pk for t in response.context['tenants']] == [empty.pk, tenant.pk]
+
+    def test_unknown_sort_falls_back_to_default(self, client, superuser, tenant):
+        client.force_login(superuser)
+        response = client.get('/admin-platform/tenants/', {'sort': 'password'})
+        assert response.status_code == 200
+        assert response.context['sort'] == '-created'
+
+    def test_tenant_detail_builds_missing_snapshot(self, client, superuser, tenant, vehicle):
+        from apps.platform_admin.models import TenantUsageSnapshot
+
+        client.force_login(superuser)
+        response = client.get(f'/admin-platform/tenants/{tenant.pk}/')
+
+        assert response.status_code == 200
+        assert response.context['vehicle_count'] == 1
+        assert TenantUsageSnapshot.objects.filter(tenant=tenant).exists()
+
+    def test_dashboard_shows_snapshot_totals(self, client, superuser, tenant):
+        from apps.platform_admin.usage import refresh_usage_snapshots
+
+        refresh_usage_snapshots()
+        client.force_login(superuser)
+        response = client.get('/admin-platform/')
+
+        assert response.context['usage_totals']['mrr'] == Decimal(tenant.get_base_price())